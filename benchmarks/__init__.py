@@ -0,0 +1 @@
+"""Repeatable performance benchmarks for custodian (see ``benchmarks/run.py``)."""
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""Concurrent-session load generator for ``custodian/mcp_http_server.py``.
+
+    python -m benchmarks.load run --sessions 20 --duration 30
+    python -m benchmarks.load run --trace calls.jsonl --db /tmp/custodian-copy.db
+    python -m benchmarks.load run --url http://127.0.0.1:8223 --token "$CUSTODIAN_MCP_TOKEN"
+    python -m benchmarks.load record --from-db custodian/custodian.db --output calls.jsonl
+
+``run`` starts a local server (against a synthetic db unless ``--db`` is
+given), opens N real streamable-HTTP MCP sessions and replays a tool-call mix
+from a trace file or ``query_log``. It reports throughput, client-side tail
+latency, and — from the instrumented local server — event-loop lag and time
+spent waiting on SQLite writes.
+
+Traces are JSONL, one call per line (``ts``, ``session_id``, ``tool``,
+``arguments``). ``record`` exports them from ``query_log``; for live capture
+with real session ids and timing, start the server with
+``CUSTODIAN_RECORD_TOOL_CALLS=/path/calls.jsonl``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import secrets
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.run import compare, load_thresholds  # noqa: E402
+from benchmarks.suites import metric, point_custodian_at  # noqa: E402
+from custodian.db.connection import TrackedConnection  # noqa: E402
+
+READ_ONLY_PREFIXES = (
+    "get_",
+    "list_",
+    "lookup_",
+    "find_",
+    "read_",
+    "check_",
+    "memory_search",
+    "memory_context",
+    "memory_get",
+    "memory_list",
+)
+WRITE_KEYWORDS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER", "BEGIN")
+LAG_PROBE_INTERVAL = 0.05
+
+
+# --------------------------------------------------------------------------- workload
+
+def _parse_timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace(" ", "T")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def read_trace(path: Path) -> list[dict[str, Any]]:
+    calls = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(entry, dict) and entry.get("tool"):
+            entry.setdefault("arguments", {})
+            calls.append(entry)
+    return calls
+
+
+def read_query_log(db_path: Path, limit: int) -> list[dict[str, Any]]:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT tool_name, project_name, query_params, timestamp FROM query_log ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+    calls = []
+    for tool_name, project_name, query_params, timestamp in reversed(rows):
+        if not tool_name:
+            continue
+        try:
+            arguments = json.loads(query_params) if query_params else {}
+        except ValueError:
+            arguments = {}
+        if not isinstance(arguments, dict):
+            arguments = {}
+        if project_name and "project" not in arguments:
+            arguments["project"] = project_name
+        calls.append({"ts": _parse_timestamp(timestamp), "session_id": None, "tool": tool_name, "arguments": arguments})
+    return calls
+
+
+def filter_calls(calls: list[dict[str, Any]], *, allow_writes: bool, tools: set[str] | None) -> list[dict[str, Any]]:
+    kept = []
+    for call in calls:
+        if tools and call["tool"] not in tools:
+            continue
+        if not allow_writes and not call["tool"].startswith(READ_ONLY_PREFIXES):
+            continue
+        kept.append(call)
+    return kept
+
+
+def assign_sessions(calls: list[dict[str, Any]], sessions: int) -> list[list[dict[str, Any]]]:
+    """Keep recorded sessions together; otherwise give each worker a rotated copy of the mix."""
+    recorded = collections.OrderedDict()
+    for call in calls:
+        if call.get("session_id"):
+            recorded.setdefault(call["session_id"], []).append(call)
+    if len(recorded) >= sessions:
+        buckets: list[list[dict[str, Any]]] = [[] for _ in range(sessions)]
+        for index, group in enumerate(recorded.values()):
+            buckets[index % sessions].extend(group)
+        return buckets
+    step = max(1, len(calls) // sessions)
+    return [calls[(index * step) % len(calls):] + calls[:(index * step) % len(calls)] for index in range(sessions)]
+
+
+# --------------------------------------------------------------------------- instrumented server
+
+_LAG_SAMPLES: collections.deque[float] = collections.deque(maxlen=200_000)
+_WRITE_SAMPLES: collections.deque[float] = collections.deque(maxlen=200_000)
+_LOCKED_ERRORS = 0
+
+
+class _TimedConnection(TrackedConnection):
+    """Connection that records how long write statements and commits block."""
+
+    def _timed(self, method, sql: str | None, *args):
+        global _LOCKED_ERRORS
+        is_write = sql is None or sql.lstrip().upper().startswith(WRITE_KEYWORDS)
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        except sqlite3.OperationalError as exc:
+            if "locked" in str(exc).lower():
+                _LOCKED_ERRORS += 1
+            raise
+        finally:
+            if is_write:
+                _WRITE_SAMPLES.append((time.perf_counter() - started) * 1000)
+
+    def execute(self, sql, *args):
+        return self._timed(super().execute, sql, sql, *args)
+
+    def executemany(self, sql, *args):
+        return self._timed(super().executemany, sql, sql, *args)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        return self._timed(super().commit, None)
+
+
+def _percentiles(samples) -> dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def pick(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))], 3)
+
+    return {
+        "count": len(ordered),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+        "total": round(sum(ordered), 3),
+    }
+
+
+def _server_stats() -> dict[str, Any]:
+    return {
+        "event_loop_lag_ms": _percentiles(_LAG_SAMPLES),
+        "sqlite_write_wait_ms": _percentiles(_WRITE_SAMPLES),
+        "sqlite_locked_errors": _LOCKED_ERRORS,
+    }
+
+
+async def _lag_probe() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        _LAG_SAMPLES.append(max(0.0, (loop.time() - started - LAG_PROBE_INTERVAL) * 1000))
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    global _LOCKED_ERRORS
+    import uvicorn
+    from starlette.requests import Request as StarletteRequest
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    from custodian import mcp_http_server
+    from custodian.db import connection
+
+    point_custodian_at(Path(args.db))
+
+    def instrumented_get_db() -> sqlite3.Connection:
+        conn = sqlite3.connect(connection.DB_PATH, factory=_TimedConnection)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    connection.get_db = instrumented_get_db
+
+    async def stats(_request: StarletteRequest):
+        return JSONResponse(_server_stats())
+
+    async def reset(_request: StarletteRequest):
+        global _LOCKED_ERRORS
+        _LAG_SAMPLES.clear()
+        _WRITE_SAMPLES.clear()
+        _LOCKED_ERRORS = 0
+        return JSONResponse({"reset": True})
+
+    app = mcp_http_server.create_starlette_app(args.token)
+    app.router.routes.insert(0, Route("/__bench/stats", endpoint=stats, methods=["GET"]))
+    app.router.routes.insert(0, Route("/__bench/reset", endpoint=reset, methods=["POST"]))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    probe = asyncio.create_task(_lag_probe())
+    try:
+        await server.serve()
+    finally:
+        probe.cancel()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _http_json(url: str, method: str = "GET", timeout: float = 5) -> Any:
+    with urlopen(Request(url, method=method, data=b"" if method == "POST" else None), timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def start_local_server(db_path: Path, workdir: Path, token: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ)
+    env.setdefault("CUSTODIAN_TRACE_DB", str(workdir / "trace_store.db"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load", "serve", "--db", str(db_path), "--port", str(port), "--token", token],
+        cwd=str(REPO_ROOT),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=open(workdir / "server.log", "wb"),
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 90
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"local server exited early; see {workdir / 'server.log'}")
+        try:
+            _http_json(f"{url}/")
+            return process, url
+        except (URLError, OSError, ValueError):
+            time.sleep(0.25)
+    process.terminate()
+    raise SystemExit(f"local server did not come up within 90s; see {workdir / 'server.log'}")
+
+
+# --------------------------------------------------------------------------- clients
+
+async def _session_worker(
+    url: str,
+    token: str,
+    calls: list[dict[str, Any]],
+    deadline: float,
+    think_s: float,
+    samples: list[tuple[float, str, float, bool]],
+    init_samples: list[float],
+    failures: collections.Counter,
+) -> None:
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    try:
+        async with streamablehttp_client(f"{url}/mcp", headers={"Authorization": f"Bearer {token}"}) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                started = time.perf_counter()
+                await session.initialize()
+                init_samples.append((time.perf_counter() - started) * 1000)
+                index = 0
+                while time.perf_counter() < deadline:
+                    call = calls[index % len(calls)]
+                    index += 1
+                    started = time.perf_counter()
+                    try:
+                        result = await session.call_tool(call["tool"], call["arguments"])
+                        text = getattr(result.content[0], "text", "") if result.content else ""
+                        ok = not result.isError and not text.startswith(("Error:", "Unknown tool"))
+                    except Exception as exc:  # noqa: BLE001 - every failure counts toward the error rate
+                        failures[type(exc).__name__] += 1
+                        ok = False
+                    samples.append((started, call["tool"], (time.perf_counter() - started) * 1000, ok))
+                    if think_s:
+                        await asyncio.sleep(think_s)
+    except Exception as exc:  # noqa: BLE001
+        failures[f"session:{type(exc).__name__}"] += 1
+
+
+async def drive_load(
+    url: str,
+    token: str,
+    buckets: list[list[dict[str, Any]]],
+    *,
+    duration: float,
+    warmup: float,
+    think_ms: float,
+    has_stats: bool,
+) -> dict[str, Any]:
+    samples: list[tuple[float, str, float, bool]] = []
+    init_samples: list[float] = []
+    failures: collections.Counter = collections.Counter()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    async def reset_after_warmup() -> None:
+        await asyncio.sleep(warmup)
+        if has_stats:
+            await asyncio.to_thread(_http_json, f"{url}/__bench/reset", "POST")
+
+    workers = [
+        _session_worker(url, token, bucket, deadline, think_ms / 1000, samples, init_samples, failures)
+        for bucket in buckets
+        if bucket
+    ]
+    await asyncio.gather(reset_after_warmup(), *workers)
+
+    measured = [sample for sample in samples if sample[0] >= measure_from]
+    window = max(1e-9, min(deadline, time.perf_counter()) - measure_from)
+    per_tool: dict[str, list[tuple[float, bool]]] = collections.defaultdict(list)
+    for _, tool, elapsed_ms, ok in measured:
+        per_tool[tool].append((elapsed_ms, ok))
+
+    report: dict[str, Any] = {
+        "sessions": len(workers),
+        "calls": len(measured),
+        "errors": sum(1 for sample in measured if not sample[3]),
+        "failures": dict(failures),
+        "throughput_calls_per_sec": round(len(measured) / window, 2),
+        "latency_ms": _percentiles([sample[2] for sample in measured]),
+        "session_init_ms": _percentiles(init_samples),
+        "per_tool": {
+            tool: {
+                **_percentiles([elapsed for elapsed, _ in entries]),
+                "errors": sum(1 for _, ok in entries if not ok),
+            }
+            for tool, entries in sorted(per_tool.items())
+        },
+    }
+    if has_stats:
+        report["server"] = await asyncio.to_thread(_http_json, f"{url}/__bench/stats")
+    return report
+
+
+def _as_metrics(report: dict[str, Any]) -> dict[str, Any]:
+    metrics = {"load.throughput_calls_per_sec": metric(report["throughput_calls_per_sec"], "calls/s", better="higher")}
+    if report["calls"]:
+        metrics["load.error_rate"] = metric(report["errors"] / report["calls"], "ratio")
+        for key in ("p50", "p95", "p99"):
+            metrics[f"load.latency_{key}_ms"] = metric(report["latency_ms"][key], "ms")
+    server = report.get("server") or {}
+    lag = server.get("event_loop_lag_ms") or {}
+    if lag.get("count"):
+        metrics["load.event_loop_lag_p99_ms"] = metric(lag["p99"], "ms")
+    writes = server.get("sqlite_write_wait_ms") or {}
+    if writes.get("count"):
+        metrics["load.sqlite_write_wait_p99_ms"] = metric(writes["p99"], "ms")
+    return metrics
+
+
+# --------------------------------------------------------------------------- commands
+
+def cmd_record(args: argparse.Namespace) -> int:
+    calls = read_query_log(Path(args.from_db), args.limit)
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w", encoding="utf-8") as handle:
+        for call in calls:
+            handle.write(json.dumps(call, default=str) + "\n")
+    print(f"[load] wrote {len(calls)} calls to {output}", file=sys.stderr)
+    return 0
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="custodian-load-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    process = None
+    token = args.token or secrets.token_hex(16)
+
+    if args.url:
+        url = args.url.rstrip("/")
+        db_path = Path(args.db) if args.db else None
+    else:
+        if args.db:
+            db_path = Path(args.db)
+        else:
+            db_path = workdir / "custodian.db"
+            synthetic.build_database(db_path, scale=args.scale, project_root=workdir / "projects")
+        process, url = start_local_server(db_path, workdir, token)
+
+    try:
+        if args.trace:
+            calls = read_trace(Path(args.trace))
+        elif db_path is not None:
+            calls = read_query_log(db_path, args.limit)
+        else:
+            raise SystemExit("--trace or --db is required with --url")
+        tools = {name.strip() for name in args.tools.split(",") if name.strip()} if args.tools else None
+        calls = filter_calls(calls, allow_writes=args.allow_writes, tools=tools)
+        if not calls:
+            raise SystemExit("no replayable tool calls after filtering (see --allow-writes / --tools)")
+
+        buckets = assign_sessions(calls, args.sessions)
+        has_stats = process is not None
+        report = asyncio.run(
+            drive_load(url, token, buckets, duration=args.duration, warmup=args.warmup, think_ms=args.think_ms, has_stats=has_stats)
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "url": url,
+            "sessions": args.sessions,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "think_ms": args.think_ms,
+            "workload_calls": len(calls),
+            "workdir": str(workdir),
+        },
+        "report": report,
+        "metrics": _as_metrics(report),
+    }
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        result["comparison"] = compare(result, baseline, load_thresholds())
+
+    output = Path(args.output) if args.output else REPO_ROOT / "benchmarks" / "results" / f"load-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    latency = report["latency_ms"]
+    print(f"sessions={report['sessions']} calls={report['calls']} errors={report['errors']} "
+          f"throughput={report['throughput_calls_per_sec']}/s")
+    if latency.get("count"):
+        print(f"latency ms p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    server = report.get("server")
+    if server:
+        lag = server["event_loop_lag_ms"]
+        writes = server["sqlite_write_wait_ms"]
+        print(f"event-loop lag ms p99={lag.get('p99')} max={lag.get('max')}")
+        print(f"sqlite write wait ms p99={writes.get('p99')} total={writes.get('total')} "
+              f"locked_errors={server['sqlite_locked_errors']}")
+    print(f"[load] results written to {output}", file=sys.stderr)
+    regressions = [row for row in result.get("comparison", []) if row["regressed"]]
+    for row in regressions:
+        print(f"[load] REGRESSION {row['metric']}: {row['baseline']} -> {row['current']} ({row['change_pct']:+.1f}%)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for the custodian streamable HTTP MCP server")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Replay a tool-call mix over N concurrent MCP sessions")
+    run.add_argument("--sessions", type=int, default=10)
+    run.add_argument("--duration", type=float, default=20.0, help="Measured seconds (after warmup)")
+    run.add_argument("--warmup", type=float, default=3.0)
+    run.add_argument("--think-ms", type=float, default=0.0, help="Pause between calls within one session")
+    run.add_argument("--trace", help="JSONL trace to replay (from `record` or CUSTODIAN_RECORD_TOOL_CALLS)")
+    run.add_argument("--db", help="Database to serve (use a copy) and/or read query_log from")
+    run.add_argument("--limit", type=int, default=5000, help="Most recent query_log rows to replay")
+    run.add_argument("--tools", help="Comma-separated allowlist of tools to replay")
+    run.add_argument("--allow-writes", action="store_true", help="Also replay tools outside the read-only set")
+    run.add_argument("--url", help="Target an already running server instead of starting one")
+    run.add_argument("--token", help="Bearer token (generated for the local server when omitted)")
+    run.add_argument("--scale", choices=sorted(synthetic.SCALES), default="small")
+    run.add_argument("--workdir")
+    run.add_argument("--output")
+    run.add_argument("--baseline", help="Earlier load result JSON to compare against")
+    run.set_defaults(func=cmd_run)
+
+    record = sub.add_parser("record", help="Export query_log traffic as a replayable JSONL trace")
+    record.add_argument("--from-db", required=True)
+    record.add_argument("--output", required=True)
+    record.add_argument("--limit", type=int, default=5000)
+    record.set_defaults(func=cmd_record)
+
+    serve = sub.add_parser("serve", help=argparse.SUPPRESS)
+    serve.add_argument("--db", required=True)
+    serve.add_argument("--port", type=int, required=True)
+    serve.add_argument("--token", required=True)
+    serve.set_defaults(func=lambda args: asyncio.run(_serve(args)) or 0)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Run the custodian benchmark suite and compare against a saved baseline.
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --baseline benchmarks/results/baseline.json
+
+Results are written as JSON (default ``benchmarks/results/<timestamp>.json``).
+With ``--baseline`` each shared metric is compared using the tolerances in
+``benchmarks/thresholds.json``; the exit status is 1 when anything regressed.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks import suites, synthetic  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+THRESHOLDS_PATH = Path(__file__).resolve().parent / "thresholds.json"
+SUITES = ("tools", "pipeline", "parser")
+
+
+def _git_revision() -> str | None:
+    try:
+        completed = subprocess.run(
+            ["git", "-C", str(REPO_ROOT), "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return completed.stdout.strip() or None
+
+
+def load_thresholds(path: Path = THRESHOLDS_PATH) -> dict[str, Any]:
+    if not path.exists():
+        return {"default": 0.25, "metrics": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _tolerance(name: str, thresholds: dict[str, Any]) -> float:
+    for pattern, tolerance in (thresholds.get("metrics") or {}).items():
+        if fnmatch.fnmatchcase(name, pattern):
+            return float(tolerance)
+    return float(thresholds.get("default", 0.25))
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], thresholds: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return one row per shared metric with its relative change and regression verdict."""
+    rows = []
+    for name, entry in sorted(current.get("metrics", {}).items()):
+        previous = baseline.get("metrics", {}).get(name)
+        if not previous or not previous.get("value"):
+            continue
+        change = (entry["value"] - previous["value"]) / previous["value"]
+        worse = change if entry.get("better", "lower") == "lower" else -change
+        tolerance = _tolerance(name, thresholds)
+        rows.append({
+            "metric": name,
+            "baseline": previous["value"],
+            "current": entry["value"],
+            "change_pct": round(change * 100, 1),
+            "tolerance_pct": round(tolerance * 100, 1),
+            "regressed": worse > tolerance,
+        })
+    return rows
+
+
+def run_suite(args: argparse.Namespace) -> dict[str, Any]:
+    selected = [name.strip() for name in args.suite.split(",") if name.strip()]
+    unknown = sorted(set(selected) - set(SUITES))
+    if unknown:
+        raise SystemExit(f"unknown suite(s): {', '.join(unknown)}")
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="custodian-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    db_path = workdir / "custodian.db"
+    os.environ.setdefault("CUSTODIAN_TRACE_DB", str(workdir / "trace_store.db"))
+
+    started = time.perf_counter()
+    manifest = synthetic.build_database(db_path, scale=args.scale, project_root=workdir / "projects", seed=args.seed)
+    setup_seconds = time.perf_counter() - started
+    print(f"[bench] synthetic {args.scale} db ready in {setup_seconds:.1f}s at {db_path}", file=sys.stderr)
+
+    from custodian.services import tracing
+
+    tracing.TRACE_DB_PATH = os.environ["CUSTODIAN_TRACE_DB"]
+    suites.point_custodian_at(db_path)
+
+    metrics: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    if "tools" in selected:
+        outcome = suites.bench_tools(manifest, iterations=args.iterations, warmup=args.warmup)
+        metrics.update(outcome["metrics"])
+        errors.update(outcome["errors"])
+    if "pipeline" in selected:
+        outcome = suites.bench_pipeline(db_path, workdir / "pipeline-output", runs=args.pipeline_runs)
+        metrics.update(outcome["metrics"])
+        errors.update(outcome["errors"])
+    if "parser" in selected:
+        tree = Path(manifest["hot_paths"][manifest["hot_projects"][0]])
+        outcome = suites.bench_parser(tree)
+        metrics.update(outcome["metrics"])
+        errors.update(outcome["errors"])
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "sizes": manifest["sizes"],
+            "iterations": args.iterations,
+            "setup_seconds": round(setup_seconds, 2),
+            "workdir": str(workdir),
+        },
+        "metrics": metrics,
+        "errors": errors,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Custodian benchmark suite")
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="medium")
+    parser.add_argument("--suite", default=",".join(SUITES), help="Comma-separated subset of: " + ", ".join(SUITES))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--pipeline-runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workdir", help="Where to build the synthetic db and trees (default: a temp dir)")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier result JSON to compare against")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_PATH))
+    args = parser.parse_args(argv)
+
+    result = run_suite(args)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        result["comparison"] = compare(result, baseline, load_thresholds(Path(args.thresholds)))
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    for name, entry in sorted(result["metrics"].items()):
+        print(f"{name:<40} {entry['value']:>12.3f} {entry['unit']}")
+    for name, error in sorted(result["errors"].items()):
+        print(f"[bench] {name} skipped: {error}", file=sys.stderr)
+
+    regressions = [row for row in result.get("comparison", []) if row["regressed"]]
+    for row in regressions:
+        print(
+            f"[bench] REGRESSION {row['metric']}: {row['baseline']} -> {row['current']} "
+            f"({row['change_pct']:+.1f}%, tolerance {row['tolerance_pct']}%)",
+            file=sys.stderr,
+        )
+    print(f"[bench] results written to {output}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+"""Benchmark suites: hot MCP tools, PipelineRun throughput and symbol parsing."""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+PIPELINE_SPEC = """
+name: bench-throughput
+version: 1
+description: synthetic throughput pipeline
+trigger: manual
+input_schema:
+  items:
+    type: list
+steps:
+  - name: fan_out
+    type: foreach
+    over: "$input.items"
+    as: item
+    parallel: {parallel}
+    steps:
+      - name: fetch
+        type: tool
+        project: bench
+        tool: fetch_item
+        input:
+          value: "$item"
+        output: result
+      - name: score
+        type: tool
+        project: bench
+        tool: score_item
+        input:
+          value: "$fetch.result.value"
+        output: result
+"""
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict[str, Any]:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def latency_metrics(prefix: str, samples_ms: list[float]) -> dict[str, dict[str, Any]]:
+    ordered = sorted(samples_ms)
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        f"{prefix}.p50_ms": metric(pick(0.50), "ms"),
+        f"{prefix}.p95_ms": metric(pick(0.95), "ms"),
+        f"{prefix}.p99_ms": metric(pick(0.99), "ms"),
+        f"{prefix}.mean_ms": metric(statistics.fmean(ordered), "ms"),
+    }
+
+
+def point_custodian_at(db_path: Path) -> None:
+    """Redirect every loaded custodian module that captured DB_PATH to ``db_path``."""
+    from custodian.db import connection
+
+    original = connection.DB_PATH
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("custodian.") or module is None:
+            continue
+        if getattr(module, "DB_PATH", None) == original:
+            module.DB_PATH = str(db_path)
+
+
+def _tool_cases(manifest: dict) -> dict[str, list[dict[str, Any]]]:
+    project = manifest["hot_projects"][0]
+    words = manifest["words"]
+    symbols = manifest["symbol_names"] or ["get_"]
+    return {
+        "memory_search": [{"query": word, "project": project, "limit": 20} for word in words],
+        "memory_context": [{"project": project, "topics": [words[i], words[-1 - i]]} for i in range(len(words) // 2)],
+        "get_project_state": [{"project": name} for name in manifest["hot_projects"]],
+        "lookup_symbol": [{"project": project, "symbol": name.split("_")[0] + "_"} for name in symbols[:5]],
+        "get_symbol_context": [{"project": project, "symbol": name} for name in symbols],
+    }
+
+
+async def _bench_tools(manifest: dict, iterations: int, warmup: int) -> dict[str, Any]:
+    from custodian.core import server
+
+    server.initialize_runtime(force=True)
+    results: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    for tool_name, cases in _tool_cases(manifest).items():
+        samples: list[float] = []
+        for index in range(warmup + iterations):
+            arguments = cases[index % len(cases)]
+            started = time.perf_counter()
+            response = await server.call_tool(tool_name, dict(arguments))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            text = response[0].text if response else ""
+            if text.startswith(("Error:", "Unknown tool")):
+                errors[tool_name] = text[:200]
+                break
+            if index >= warmup:
+                samples.append(elapsed_ms)
+        if samples:
+            results.update(latency_metrics(f"tool.{tool_name}", samples))
+    server.stop_tool_watcher()
+    return {"metrics": results, "errors": errors}
+
+
+def bench_tools(manifest: dict, *, iterations: int = 50, warmup: int = 5) -> dict[str, Any]:
+    """Time ``call_tool`` end to end for the hot tools against the synthetic db."""
+    return asyncio.run(_bench_tools(manifest, iterations, warmup))
+
+
+class _StandInBridge(BaseHTTPRequestHandler):
+    latency_s = 0.0
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length", "0"))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        params = payload.get("params") or {}
+        body = json.dumps({"result": {"value": params.get("value"), "tool": payload.get("tool_name")}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        return
+
+
+def start_stand_in_bridge(latency_ms: float = 0.0) -> tuple[ThreadingHTTPServer, str]:
+    """Serve a box-bridge-shaped ``/call-tool`` that echoes ``params.value``."""
+    handler = type("StandInBridge", (_StandInBridge,), {"latency_s": latency_ms / 1000})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="bench-stand-in-bridge", daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}/call-tool"
+
+
+def bench_pipeline(
+    db_path: Path,
+    output_base: Path,
+    *,
+    runs: int = 5,
+    items: int = 40,
+    parallel: int = 8,
+    bridge_latency_ms: float = 2.0,
+) -> dict[str, Any]:
+    """Run a foreach tool pipeline against the stand-in bridge and report throughput."""
+    from custodian.pipeline import PipelineRun, PipelineSpec
+
+    spec = PipelineSpec.from_yaml(PIPELINE_SPEC.format(parallel=parallel))
+    httpd, bridge_url = start_stand_in_bridge(bridge_latency_ms)
+    durations: list[float] = []
+    try:
+        conn = sqlite3.connect(db_path)
+        first_run_id = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM pipeline_runs").fetchone()[0] or 0) + 1
+        for offset in range(runs):
+            conn.execute(
+                """INSERT INTO pipeline_runs (id, pipeline_id, run_name, input, output_dir, status)
+                   VALUES (?, 1, ?, '{}', ?, 'running')""",
+                (first_run_id + offset, f"bench_{offset}", str(output_base)),
+            )
+        conn.commit()
+        conn.close()
+
+        for offset in range(runs):
+            run_name = f"bench_{offset}"
+            run = PipelineRun(
+                spec,
+                {"items": list(range(items))},
+                str(db_path),
+                str(output_base),
+                pipeline_id=1,
+                run_id=first_run_id + offset,
+                run_name=run_name,
+                output_dir=str(output_base / spec.name / run_name),
+                bridge_url=bridge_url,
+            )
+            started = time.perf_counter()
+            result = asyncio.run(run.execute())
+            durations.append(time.perf_counter() - started)
+            if result.get("status") != "completed":
+                return {"metrics": {}, "errors": {"pipeline": json.dumps(result, default=str)[:500]}}
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    total = sum(durations)
+    steps = runs * items * 2
+    return {
+        "metrics": {
+            "pipeline.steps_per_sec": metric(steps / total, "steps/s", better="higher"),
+            "pipeline.run_p50_ms": metric(statistics.median(durations) * 1000, "ms"),
+        },
+        "errors": {},
+    }
+
+
+def bench_parser(tree_root: Path, *, repeats: int = 3) -> dict[str, Any]:
+    """Measure ``parse_symbols.scan_directory`` over a synthetic tree."""
+    try:
+        from custodian import parse_symbols
+    except SystemExit:
+        return {"metrics": {}, "errors": {"parser": "tree-sitter-languages is not installed"}}
+
+    file_count = sum(
+        1
+        for _root, _dirs, files in os.walk(tree_root)
+        for filename in files
+        if Path(filename).suffix in parse_symbols.LANG_MAP
+    )
+    best = float("inf")
+    symbol_count = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        symbols = parse_symbols.scan_directory(tree_root)
+        best = min(best, time.perf_counter() - started)
+        symbol_count = len(symbols)
+    return {
+        "metrics": {
+            "parser.files_per_sec": metric(file_count / best, "files/s", better="higher"),
+            "parser.symbols_per_sec": metric(symbol_count / best, "symbols/s", better="higher"),
+        },
+        "errors": {},
+    }
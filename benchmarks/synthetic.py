@@ -0,0 +1,257 @@
+"""Synthetic custodian.db and project trees for the benchmark suite.
+
+Everything here is deterministic for a given seed so two runs of the suite
+measure the same data set.
+"""
+from __future__ import annotations
+
+import json
+import random
+import shutil
+import sqlite3
+import subprocess
+from pathlib import Path
+
+from custodian.db.migrations import (
+    _migration_001_native_extensions,
+    _migration_002_workstations,
+    _migration_003_memory_index,
+)
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "custodian" / "schema.sql"
+HOT_PROJECT_COUNT = 3
+
+SCALES: dict[str, dict[str, int]] = {
+    "small": {
+        "projects": 200,
+        "fossils_per_project": 2,
+        "symbols_per_fossil": 40,
+        "memories": 5_000,
+        "pipeline_runs": 300,
+        "query_log": 5_000,
+        "tree_files": 120,
+        "functions_per_file": 12,
+    },
+    "medium": {
+        "projects": 2_000,
+        "fossils_per_project": 3,
+        "symbols_per_fossil": 60,
+        "memories": 50_000,
+        "pipeline_runs": 3_000,
+        "query_log": 50_000,
+        "tree_files": 600,
+        "functions_per_file": 16,
+    },
+    "large": {
+        "projects": 5_000,
+        "fossils_per_project": 4,
+        "symbols_per_fossil": 80,
+        "memories": 200_000,
+        "pipeline_runs": 10_000,
+        "query_log": 200_000,
+        "tree_files": 2_000,
+        "functions_per_file": 20,
+    },
+}
+
+WORDS = [
+    "bridge", "pipeline", "fossil", "symbol", "memory", "agent", "sandbox", "router", "token", "session",
+    "keepa", "brand", "scanner", "parser", "index", "cache", "laptop", "container", "watcher", "ticker",
+    "deploy", "schema", "migration", "oauth", "client", "server", "worker", "queue", "retry", "timeout",
+    "budget", "report", "export", "import", "config", "secret", "build", "release", "review", "commit",
+]
+VERBS = ["get", "load", "parse", "build", "render", "resolve", "sync", "fetch", "store", "handle"]
+TAGS = ["architecture", "bug", "decision", "workflow", "preference", "infra", "pipeline", "agent", "todo", "gotcha"]
+HOT_TOOLS = ["memory_search", "memory_context", "get_project_state", "lookup_symbol", "get_symbol_context"]
+
+
+def project_name(index: int) -> str:
+    return f"bench-project-{index:04d}"
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def _symbol_name(rng: random.Random, index: int) -> str:
+    return f"{rng.choice(VERBS)}_{rng.choice(WORDS)}_{index}"
+
+
+def build_project_tree(root: Path, *, files: int, functions_per_file: int, seed: int = 0) -> Path:
+    """Write a mixed Python/TypeScript tree and commit it when git is available."""
+    rng = random.Random(seed)
+    if root.exists():
+        shutil.rmtree(root)
+    for index in range(files):
+        package = root / "src" / f"pkg_{index % 12:02d}"
+        package.mkdir(parents=True, exist_ok=True)
+        if index % 3 == 2:
+            lines = [f"export interface {rng.choice(WORDS).title()}Shape{index} {{ id: number; name: string }}", ""]
+            for fn in range(functions_per_file):
+                name = _symbol_name(rng, index * 100 + fn)
+                lines.append(f"export function {name}(value: number): number {{")
+                lines.append(f"  return value * {fn + 1};")
+                lines.append("}")
+                lines.append("")
+            (package / f"module_{index:04d}.ts").write_text("\n".join(lines), encoding="utf-8")
+        else:
+            lines = [f"class {rng.choice(WORDS).title()}Service{index}:", "    pass", ""]
+            for fn in range(functions_per_file):
+                name = _symbol_name(rng, index * 100 + fn)
+                lines.append(f"def {name}(value, limit=10):")
+                lines.append(f"    return [value] * min(limit, {fn + 1})")
+                lines.append("")
+            (package / f"module_{index:04d}.py").write_text("\n".join(lines), encoding="utf-8")
+    (root / "README.md").write_text(f"# {root.name}\n\n{_sentence(rng, 40)}\n", encoding="utf-8")
+
+    if shutil.which("git"):
+        env_args = ["-c", "user.name=bench", "-c", "user.email=bench@localhost", "-c", "commit.gpgsign=false"]
+        subprocess.run(["git", "init", "-q", str(root)], check=False, capture_output=True)
+        subprocess.run(["git", "-C", str(root), "add", "-A"], check=False, capture_output=True)
+        for message in ("initial import", "tune timeouts", "add cache layer"):
+            subprocess.run(
+                ["git", "-C", str(root), *env_args, "commit", "-q", "--allow-empty", "-m", message],
+                check=False,
+                capture_output=True,
+            )
+    return root
+
+
+def build_database(path: Path, *, scale: str = "medium", project_root: Path | None = None, seed: int = 1234) -> dict:
+    """Create a populated custodian.db at ``path`` and return a manifest of what it holds."""
+    sizes = SCALES[scale]
+    rng = random.Random(seed)
+    if path.exists():
+        path.unlink()
+
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    _migration_001_native_extensions(conn)
+    _migration_002_workstations(conn)
+
+    hot_paths: dict[str, str] = {}
+    project_rows = []
+    for index in range(sizes["projects"]):
+        name = project_name(index)
+        if project_root is not None and index < HOT_PROJECT_COUNT:
+            tree = build_project_tree(
+                project_root / name,
+                files=sizes["tree_files"],
+                functions_per_file=sizes["functions_per_file"],
+                seed=seed + index,
+            )
+            hot_paths[name] = str(tree)
+            path_value = str(tree)
+        else:
+            path_value = f"/srv/bench/{name}"
+        project_rows.append((index + 1, name, path_value, rng.choice(["python", "node", "rust"]), f"B{index:04d}"))
+    conn.executemany(
+        "INSERT INTO projects (id, name, path, stack, task_prefix) VALUES (?, ?, ?, ?, ?)",
+        project_rows,
+    )
+
+    fossil_id = 0
+    symbol_names: list[str] = []
+    for project_id in range(1, sizes["projects"] + 1):
+        for version in range(1, sizes["fossils_per_project"] + 1):
+            fossil_id += 1
+            conn.execute(
+                """INSERT INTO fossils (id, project_id, version, file_tree, architecture, summary)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    fossil_id,
+                    project_id,
+                    version,
+                    json.dumps([{"path": f"src/module_{i:04d}.py", "lines": rng.randint(20, 400)} for i in range(20)]),
+                    _sentence(rng, 60),
+                    _sentence(rng, 30),
+                ),
+            )
+            rows = []
+            for offset in range(sizes["symbols_per_fossil"]):
+                name = _symbol_name(rng, offset)
+                if project_id == 1 and version == sizes["fossils_per_project"]:
+                    symbol_names.append(name)
+                rows.append((
+                    project_id,
+                    fossil_id,
+                    f"src/pkg_{offset % 12:02d}/module_{offset:04d}.py",
+                    rng.randint(1, 500),
+                    rng.choice(["function", "class", "component", "type"]),
+                    name,
+                    "(value, limit=10)",
+                    _sentence(rng, 12),
+                    json.dumps({"calls": [_symbol_name(rng, offset + 1)], "called_by": [], "depends_on": []}),
+                ))
+            conn.executemany(
+                """INSERT INTO symbols (project_id, fossil_id, file_path, line_number, type, name,
+                                        signature, description, relationships)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+
+    conn.executemany(
+        """INSERT INTO memories (content, tags, project_id, importance, access_count, updated_at)
+           VALUES (?, ?, ?, ?, ?, datetime('now', ?))""",
+        (
+            (
+                _sentence(rng, rng.randint(12, 60)),
+                json.dumps(rng.sample(TAGS, rng.randint(0, 3))),
+                None if rng.random() < 0.2 else rng.randint(1, sizes["projects"]),
+                rng.randint(1, 10),
+                rng.choice([0, 0, 0, 1, 3, 12]),
+                f"-{rng.randint(0, 720)} hours",
+            )
+            for _ in range(sizes["memories"])
+        ),
+    )
+    _migration_003_memory_index(conn)
+
+    conn.execute(
+        "INSERT INTO pipelines (id, name, description, spec) VALUES (1, 'bench-pipeline', 'synthetic', 'name: bench-pipeline')"
+    )
+    for run_id in range(1, sizes["pipeline_runs"] + 1):
+        conn.execute(
+            """INSERT INTO pipeline_runs (id, pipeline_id, run_name, input, output_dir, status, finished_at)
+               VALUES (?, 1, ?, '{}', '/tmp/bench', ?, datetime('now'))""",
+            (run_id, f"run_{run_id:05d}", rng.choice(["completed", "completed", "failed"])),
+        )
+        conn.executemany(
+            """INSERT INTO pipeline_step_results (run_id, step_name, step_type, status, output, duration_ms)
+               VALUES (?, ?, 'tool', 'completed', ?, ?)""",
+            [(run_id, f"step_{step}", json.dumps({"ok": True}), rng.randint(5, 5000)) for step in range(3)],
+        )
+
+    hot_names = list(hot_paths) or [project_name(0)]
+    conn.executemany(
+        "INSERT INTO query_log (tool_name, project_name, query_params, timestamp) VALUES (?, ?, ?, datetime('now', ?))",
+        (
+            _query_log_row(rng, hot_names, symbol_names)
+            for _ in range(sizes["query_log"])
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+    return {
+        "scale": scale,
+        "sizes": dict(sizes),
+        "hot_projects": hot_names,
+        "hot_paths": hot_paths,
+        "symbol_names": symbol_names[:50],
+        "words": list(WORDS),
+    }
+
+
+def _query_log_row(rng: random.Random, hot_names: list[str], symbol_names: list[str]) -> tuple:
+    tool = rng.choice(HOT_TOOLS)
+    project = rng.choice(hot_names)
+    if tool == "memory_search":
+        params = {"query": rng.choice(WORDS), "project": project, "limit": 20}
+    elif tool == "memory_context":
+        params = {"project": project, "topics": rng.sample(WORDS, 2)}
+    elif tool == "get_project_state":
+        params = {"project": project}
+    else:
+        params = {"project": project, "symbol": rng.choice(symbol_names) if symbol_names else "get_"}
+    return (tool, project, json.dumps(params), f"-{rng.randint(0, 10_000)} minutes")
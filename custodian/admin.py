@@ -216,7 +216,9 @@ def get_db_stats():
         "fossils": conn.execute("SELECT COUNT(*) FROM fossils").fetchone()[0],
         "symbols": conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0],
         "insights": conn.execute("SELECT COUNT(*) FROM detective_insights").fetchone()[0],
-        "queries": conn.execute("SELECT COUNT(*) FROM query_log").fetchone()[0],
+        "queries": conn.execute(
+            "SELECT (SELECT COUNT(*) FROM query_log) + (SELECT COALESCE(SUM(calls), 0) FROM query_log_daily)"
+        ).fetchone()[0],
         "prompts": conn.execute("SELECT COUNT(*) FROM custodian_prompts").fetchone()[0],
         "db_size": os.path.getsize(DB_PATH) if os.path.exists(DB_PATH) else 0,
     }
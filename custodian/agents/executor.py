@@ -12,13 +12,15 @@ import urllib.error
 import urllib.request
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Awaitable
 
 from pydantic import BaseModel
 
 from custodian.agents.prompt_compiler import compile_prompt
 from custodian.agents.schema import AgentSpec, GenericStructuredResult, LlmAgentSpec, ServiceAgentSpec, get_schema
-from custodian.services.tool_router import resolve_agent_tools, route_tool_call
+from custodian.services import agent_events, cancellation, llm_cache, tracing
+from custodian.services.tool_fanout import AGENT_TOOL_CONCURRENCY, is_serial, run_tool_calls
+from custodian.services.tool_router import resolve_agent_tools, route_box_batch, route_tool_call
 
 
 MAX_TOOL_ITERATIONS = int(os.environ.get("CUSTODIAN_AGENT_MAX_TOOL_ITERATIONS", "10"))
@@ -59,9 +61,11 @@ async def execute_llm_agent(spec: LlmAgentSpec, input_payload: dict[str, Any], m
             "description": _tool_description(item),
             "params": _tool_params(item),
             "source": item["source"],
+            "serial": _tool_serial(item),
         }
         for item in tool_resolution["resolved"]
     ]
+    tool_map = {tool["name"]: tool for tool in tool_defs}
     compiled = compile_prompt(spec, input_payload, tools=tool_defs)
     model = model_override or compiled["model"]
     messages = [
@@ -73,15 +77,33 @@ async def execute_llm_agent(spec: LlmAgentSpec, input_payload: dict[str, Any], m
     total_input_tokens = 0
     total_output_tokens = 0
 
-    for _ in range(MAX_TOOL_ITERATIONS):
-        response_text, usage = await _call_llm(model, messages, base_url, provider)
+    async def run_call(call: dict[str, Any]) -> dict[str, Any]:
+        with tracing.span("agent.tool", tool=call["name"], turn=turn), agent_events.tool_call(call["name"]):
+            return await _execute_tool(spec.project, call["name"], call["params"], tool_defs, batched.get(id(call)))
+
+    for turn in range(MAX_TOOL_ITERATIONS):
+        cancellation.check()
+        agent_events.publish("turn_start", turn=turn + 1)
+        with tracing.span("llm.call", model=model, provider=provider, turn=turn):
+            response_text, usage = await _call_llm(model, messages, base_url, provider, spec.llm_cache)
         total_input_tokens += int(usage.get("prompt_tokens") or 0)
         total_output_tokens += int(usage.get("completion_tokens") or 0)
+        agent_events.publish("text", text=response_text)
+        if usage:
+            agent_events.publish("usage", tokens=total_input_tokens + total_output_tokens)
         parsed = _parse_response(response_text)
         if parsed["type"] == "tool_call":
-            tool_result = await _execute_tool(spec.project, parsed["name"], parsed["params"], tool_defs)
+            calls = parsed["calls"]
+            batched = _start_box_batch(spec.project, calls, tool_map, spec.tool_concurrency)
+            tool_results = await run_tool_calls(
+                calls,
+                run_call,
+                serial=lambda call: is_serial(tool_map.get(call["name"])),
+                concurrency=spec.tool_concurrency,
+            )
             messages.append({"role": "assistant", "content": response_text})
-            messages.append({"role": "user", "content": f"[Tool Result: {parsed['name']}]\n{json.dumps(tool_result, sort_keys=True)}"})
+            for call, tool_result in zip(calls, tool_results):
+                messages.append({"role": "user", "content": f"[Tool Result: {call['name']}]\n{json.dumps(tool_result, sort_keys=True)}"})
             continue
         if parsed["type"] == "final_answer":
             output_schema = compiled["output_schema"]
@@ -148,23 +170,22 @@ async def _call_llm(
     messages: list[dict[str, str]],
     base_url: str,
     provider: str = "openai-proxy",
+    cache_mode: str | None = None,
 ) -> tuple[str, dict[str, Any]]:
-    body = json.dumps(
-        {
-            "model": _chat_model_name(model, provider),
-            "messages": messages,
-            "max_tokens": 4096,
-        }
-    ).encode("utf-8")
+    payload = {
+        "model": _chat_model_name(model, provider),
+        "messages": messages,
+        "max_tokens": 4096,
+    }
     request = urllib.request.Request(
         f"{base_url}/chat/completions",
-        data=body,
+        data=json.dumps(payload).encode("utf-8"),
         headers={"Content-Type": "application/json"},
         method="POST",
     )
 
     try:
-        response_body = await asyncio.to_thread(_read_http_response, request)
+        response_body = await llm_cache.fetch(payload, lambda: cancellation.to_thread(_read_http_response, request), cache_mode)
     except (urllib.error.URLError, socket.timeout, TimeoutError) as exc:
         raise RuntimeError(f"LLM request failed: {exc}") from exc
 
@@ -189,7 +210,7 @@ async def _call_llm(
 
 
 def _read_http_response(request: urllib.request.Request) -> str:
-    with urllib.request.urlopen(request, timeout=120) as response:
+    with urllib.request.urlopen(request, timeout=cancellation.timeout(120)) as response:
         return response.read().decode("utf-8")
 
 
@@ -210,12 +231,22 @@ def _parse_response(text: str) -> dict[str, Any]:
         return {"type": "invalid", "error": str(exc)}
     if not isinstance(decoded, dict):
         return {"type": "invalid", "error": "JSON response must be an object"}
+    tool_calls = decoded.get("tool_calls")
+    if isinstance(tool_calls, list) and tool_calls:
+        calls = [
+            {"name": call["name"], "params": call.get("params", {})}
+            for call in tool_calls
+            if isinstance(call, dict) and isinstance(call.get("name"), str) and isinstance(call.get("params", {}), dict)
+        ]
+        if len(calls) == len(tool_calls):
+            return {"type": "tool_call", "calls": calls}
+        return {"type": "invalid", "error": "each entry in tool_calls must include string name and object params"}
     tool_call = decoded.get("tool_call")
     if isinstance(tool_call, dict):
         name = tool_call.get("name")
         params = tool_call.get("params", {})
         if isinstance(name, str) and isinstance(params, dict):
-            return {"type": "tool_call", "name": name, "params": params}
+            return {"type": "tool_call", "calls": [{"name": name, "params": params}]}
     final_answer = decoded.get("final_answer")
     if isinstance(final_answer, dict):
         return {"type": "final_answer", "data": final_answer}
@@ -232,6 +263,16 @@ def _tool_description(item: dict[str, Any]) -> str:
     return str(details.get("description") or "")
 
 
+def _tool_serial(item: dict[str, Any]) -> bool:
+    details = item.get("details")
+    if not isinstance(details, dict):
+        return False
+    metadata = details.get("metadata")
+    if isinstance(metadata, dict):
+        return bool(metadata.get("serial"))
+    return bool(details.get("serial") or details.get("known_side_effects"))
+
+
 def _tool_params(item: dict[str, Any]) -> dict[str, Any]:
     details = item.get("details")
     if not isinstance(details, dict):
@@ -242,9 +283,41 @@ def _tool_params(item: dict[str, Any]) -> dict[str, Any]:
     return details.get("input_schema") or {}
 
 
-async def _execute_tool(project: str, tool_name: str, params: dict[str, Any], tool_defs: list[dict[str, Any]]) -> dict[str, Any]:
+def _start_box_batch(
+    project: str,
+    calls: list[dict[str, Any]],
+    tool_map: dict[str, dict[str, Any]],
+    concurrency: int | None,
+) -> dict[int, Awaitable[Any]]:
+    """Send a turn's box calls to the box in one bridge hop; keyed by ``id(call)``.
+
+    Only for two or more box calls in a turn without serial calls, whose ordering the batch could not keep.
+    """
+    box_calls = [call for call in calls if (tool_map.get(call["name"]) or {}).get("source") == "box"]
+    if len(box_calls) < 2 or any(is_serial(tool_map.get(call["name"])) for call in calls):
+        return {}
+    batch = asyncio.ensure_future(route_box_batch(project, box_calls, concurrency or AGENT_TOOL_CONCURRENCY))
+
+    async def result_of(position: int, call: dict[str, Any]) -> Any:
+        results = await asyncio.shield(batch)
+        if results is None:
+            return await route_tool_call(call["name"], call["params"], project=project)
+        return results[position]
+
+    return {id(call): result_of(position, call) for position, call in enumerate(box_calls)}
+
+
+async def _execute_tool(
+    project: str,
+    tool_name: str,
+    params: dict[str, Any],
+    tool_defs: list[dict[str, Any]],
+    batched: Awaitable[Any] | None = None,
+) -> dict[str, Any]:
     try:
-        response = await route_tool_call(tool_name, params, project=project)
+        response = await (batched if batched is not None else route_tool_call(tool_name, params, project=project))
+    except cancellation.Cancelled:
+        raise
     except Exception as exc:
         return {"error": str(exc)}
     if isinstance(response, dict):
@@ -316,8 +389,8 @@ def _request_box_tool_server(project: str, method: str, path: str, payload: dict
 
 def _http_json_request(url: str, method: str, payload: dict[str, Any] | None) -> Any:
     body = json.dumps(payload).encode("utf-8") if payload is not None else None
-    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method=method)
-    with urllib.request.urlopen(request, timeout=120) as response:
+    request = urllib.request.Request(url, data=body, headers=cancellation.inject({"Content-Type": "application/json"}), method=method)
+    with urllib.request.urlopen(request, timeout=cancellation.timeout(120)) as response:
         response_body = response.read().decode("utf-8")
     return json.loads(response_body)
 
@@ -327,7 +400,7 @@ def _docker_tool_request(project: str, port: int, method: str, path: str, payloa
     if payload is not None:
         command.extend(["-d", json.dumps(payload)])
     command.append(f"http://127.0.0.1:{port}{path}")
-    completed = subprocess.run(command, check=True, capture_output=True, text=True, timeout=120)
+    completed = subprocess.run(command, check=True, capture_output=True, text=True, timeout=cancellation.timeout(120))
     return json.loads(completed.stdout)
 
 
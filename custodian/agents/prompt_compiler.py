@@ -77,6 +77,10 @@ When you need to use a tool, respond with ONLY this JSON (no other text):
 
 You will receive the tool's result in the next message. Then continue or call another tool.
 
+To run several independent tools at once, respond with ONLY:
+{"tool_calls": [{"name": "<tool_name>", "params": {<params>}}, ...]}
+Their results come back in the same order as the calls.
+
 When you have the final answer, respond with ONLY this JSON (no other text):
 {"final_answer": {<output matching the Output Schema>}}""",
         f"[Output Schema]\n{_describe_schema(output_schema)}",
@@ -35,6 +35,8 @@ class LlmAgentSpec(BaseModel):
     guidance: str | None = None
     runtime: RuntimeConfig | None = None
     workstation: str | None = None
+    tool_concurrency: int | None = Field(default=None, gt=0)
+    llm_cache: Literal["off", "on", "replay"] | None = None
 
     @model_validator(mode="after")
     def validate_tool_sources(self) -> "LlmAgentSpec":
@@ -3,30 +3,181 @@
 
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from email.parser import BytesParser
 from email.policy import default as email_policy
+import http.client
 import json
 import os
+import queue
 import shlex
 import sqlite3
 import subprocess
+import sys
 import tempfile
+import threading
+import time
 from pathlib import Path, PurePosixPath
 from typing import Any
-from urllib import error, request
+from urllib.parse import quote
 
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel, Field
 from starlette.background import BackgroundTask
 
+from custodian.services import cancellation, tracing
+
 
 DB_PATH = Path("/home/dev/projects/nai-workbench/custodian/custodian.db")
 BRIDGE_HOST = "0.0.0.0"
 BRIDGE_PORT = 9099
+BOX_HOST = "127.0.0.1"
+ROUTE_TTL_SECONDS = float(os.environ.get("BOX_BRIDGE_ROUTE_TTL", "30"))
+HEALTH_INTERVAL_SECONDS = float(os.environ.get("BOX_BRIDGE_HEALTH_INTERVAL", "10"))
+# A request for a container missing from the snapshot waits this long for the monitor to look again.
+HEALTH_WAIT_SECONDS = float(os.environ.get("BOX_BRIDGE_HEALTH_WAIT", "5"))
+# Once a fresh snapshot confirms a container is missing, requests for it fail fast for this many seconds.
+HEALTH_MISS_TTL_SECONDS = float(os.environ.get("BOX_BRIDGE_HEALTH_MISS_TTL", "2"))
+BOX_POOL_SIZE = int(os.environ.get("BOX_BRIDGE_POOL_SIZE", "8"))
+FORWARD_TIMEOUT_SECONDS = 15
+
+
+@dataclass
+class _Route:
+    project: str
+    project_id: int
+    container_name: str
+    tool_server_port: int | None
+    box_status: str | None
+    last_healthcheck: str | None
+    loaded_at: float
+
+
+@dataclass
+class _HealthSnapshot:
+    running: frozenset[str]
+    checked_at: float
+
+
+_ROUTES: dict[str, _Route] = {}
+_ROUTES_LOCK = threading.Lock()
+_HEALTH: _HealthSnapshot | None = None
+_HEALTH_LOCK = threading.Lock()
+_HEALTH_CHANGED = threading.Condition(_HEALTH_LOCK)
+_HEALTH_MISSES: dict[str, float] = {}
+_MONITOR_STOP = threading.Event()
+_MONITOR_WAKE = threading.Event()
+
+
+class _BoxConnectionPool:
+    """Keep-alive HTTP connections to one box tool server."""
+
+    def __init__(self, host: str, port: int, size: int = BOX_POOL_SIZE) -> None:
+        self.host = host
+        self.port = port
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(maxsize=size)
+
+    def request(
+        self, method: str, path: str, body: bytes | None, headers: dict[str, str], timeout: float = FORWARD_TIMEOUT_SECONDS
+    ) -> tuple[int, Any, bytes]:
+        for attempt in range(2):
+            conn, reused = self._acquire()
+            _set_timeout(conn, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                # An idle keep-alive socket the box already closed; retry once on a fresh one.
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, response.headers, data
+        raise ConnectionError(f"no connection to {self.host}:{self.port}")
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=FORWARD_TIMEOUT_SECONDS), False
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        _set_timeout(conn, FORWARD_TIMEOUT_SECONDS)
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def _set_timeout(conn: http.client.HTTPConnection, timeout: float) -> None:
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+
+
+_POOLS: dict[tuple[str, int], _BoxConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool_for(port: int) -> _BoxConnectionPool:
+    key = (BOX_HOST, port)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = _BoxConnectionPool(BOX_HOST, port)
+        return pool
+
+
+def _close_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
 
 
-app = FastAPI(title="Custodian Box Bridge")
+def _health_monitor() -> None:
+    while not _MONITOR_STOP.is_set():
+        try:
+            _refresh_health()
+        except HTTPException as exc:
+            print(f"[box-bridge] health check failed: {exc.detail}", file=sys.stderr)
+        _MONITOR_WAKE.wait(HEALTH_INTERVAL_SECONDS)
+        _MONITOR_WAKE.clear()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    _MONITOR_STOP.clear()
+    _MONITOR_WAKE.clear()
+    monitor = threading.Thread(target=_health_monitor, name="box-bridge-health", daemon=True)
+    monitor.start()
+    try:
+        yield
+    finally:
+        _MONITOR_STOP.set()
+        _MONITOR_WAKE.set()
+        _close_pools()
+
+
+app = FastAPI(title="Custodian Box Bridge", lifespan=lifespan)
 
 
 class RunRequest(BaseModel):
@@ -41,6 +192,18 @@ class CallToolRequest(BaseModel):
     params: dict[str, Any] = Field(default_factory=dict)
 
 
+class BatchToolCall(BaseModel):
+    tool: str
+    params: dict[str, Any] = Field(default_factory=dict)
+
+
+class CallBatchRequest(BaseModel):
+    project: str
+    calls: list[BatchToolCall] = Field(min_length=1, max_length=64)
+    concurrency: int = Field(default=1, ge=1, le=16)
+    stop_on_error: bool = False
+
+
 class RegisterToolRequest(BaseModel):
     name: str
     project: str
@@ -102,24 +265,156 @@ def _container_name_for(project: sqlite3.Row, box_row: sqlite3.Row | None) -> st
     return f"alpha-{project['name']}"
 
 
-def _docker_running(container_name: str) -> bool:
+def _refresh_health() -> _HealthSnapshot:
+    """Record which containers are running with one ``docker ps`` for all boxes."""
+    global _HEALTH
+    # Stamp the snapshot with when docker was asked, so a waiter knows it reflects a box started before then.
+    started = time.monotonic()
     try:
-        result = subprocess.run(
-            ["docker", "inspect", "--format", "{{.State.Running}}", container_name],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
+        with tracing.span("docker.ps", service="box_bridge"):
+            result = subprocess.run(
+                ["docker", "ps", "--format", "{{.Names}}"],
+                capture_output=True,
+                text=True,
+                timeout=10,
+            )
     except subprocess.TimeoutExpired as exc:
-        raise HTTPException(status_code=502, detail=f"docker inspect timed out for {container_name}") from exc
+        raise HTTPException(status_code=502, detail="docker ps timed out") from exc
     except OSError as exc:
-        raise HTTPException(status_code=502, detail=f"docker inspect failed: {exc}") from exc
-    return result.returncode == 0 and result.stdout.strip().lower() == "true"
+        raise HTTPException(status_code=502, detail=f"docker ps failed: {exc}") from exc
+    if result.returncode != 0:
+        raise HTTPException(status_code=502, detail=f"docker ps failed: {result.stderr.strip()}")
+    snapshot = _HealthSnapshot(
+        running=frozenset(line.strip() for line in result.stdout.splitlines() if line.strip()),
+        checked_at=started,
+    )
+    with _HEALTH_CHANGED:
+        _HEALTH = snapshot
+        _HEALTH_CHANGED.notify_all()
+    return snapshot
+
+
+def _await_health(since: float) -> _HealthSnapshot | None:
+    """Wake the monitor and wait, bounded, for a snapshot it started at or after ``since``."""
+    _MONITOR_WAKE.set()
+    limit = HEALTH_WAIT_SECONDS
+    left = cancellation.remaining()
+    if left is not None:
+        limit = max(0.0, min(limit, left))
+    deadline = time.monotonic() + limit
+    with _HEALTH_CHANGED:
+        while _HEALTH is None or _HEALTH.checked_at < since:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                break
+            _HEALTH_CHANGED.wait(wait)
+        return _HEALTH
+
+
+def _health_snapshot() -> _HealthSnapshot:
+    """Return the monitor's latest snapshot; requests never run docker themselves."""
+    with _HEALTH_LOCK:
+        snapshot = _HEALTH
+    if snapshot is None:
+        snapshot = _await_health(float("-inf"))
+        if snapshot is None:
+            raise HTTPException(status_code=502, detail="container health not available yet")
+    elif time.monotonic() - snapshot.checked_at > HEALTH_INTERVAL_SECONDS * 3:
+        _MONITOR_WAKE.set()
+    return snapshot
+
+
+def _forget_health() -> None:
+    global _HEALTH
+    with _HEALTH_LOCK:
+        _HEALTH = None
+        _HEALTH_MISSES.clear()
+
+
+def _recheck_health() -> None:
+    """Have the monitor look again now; requests keep using the last snapshot until it has."""
+    with _HEALTH_LOCK:
+        _HEALTH_MISSES.clear()
+    _MONITOR_WAKE.set()
 
 
 def _ensure_running(container_name: str) -> None:
-    if not _docker_running(container_name):
-        raise HTTPException(status_code=502, detail=f"container not running: {container_name}")
+    snapshot = _health_snapshot()
+    if container_name in snapshot.running:
+        return
+    # The monitor may not have seen a box started since its last pass (e.g. by _ensure_box_running):
+    # wake it and recheck against its next snapshot. A miss that a fresh snapshot confirmed within
+    # the TTL fails fast instead of waiting again.
+    now = time.monotonic()
+    with _HEALTH_LOCK:
+        missed_at = _HEALTH_MISSES.get(container_name)
+        confirmed = missed_at is not None and now - missed_at <= HEALTH_MISS_TTL_SECONDS and snapshot.checked_at >= missed_at
+        if not confirmed:
+            _HEALTH_MISSES[container_name] = now
+    if not confirmed:
+        snapshot = _await_health(now)
+        if snapshot is not None and container_name in snapshot.running:
+            return
+    raise HTTPException(status_code=502, detail=f"container not running: {container_name}")
+
+
+def _load_route(project_name: str) -> _Route:
+    project = _get_project(project_name)
+    box_row = _get_project_box(project["id"])
+    return _Route(
+        project=project["name"],
+        project_id=int(project["id"]),
+        container_name=_container_name_for(project, box_row),
+        tool_server_port=int(box_row["tool_server_port"]) if box_row and box_row["tool_server_port"] else None,
+        box_status=box_row["status"] if box_row else None,
+        last_healthcheck=box_row["last_healthcheck"] if box_row else None,
+        loaded_at=time.monotonic(),
+    )
+
+
+def _route_for(project_name: str) -> _Route:
+    """Return the cached project -> container/port route, reloading it after ROUTE_TTL_SECONDS."""
+    with _ROUTES_LOCK:
+        route = _ROUTES.get(project_name)
+    if route is not None and time.monotonic() - route.loaded_at <= ROUTE_TTL_SECONDS:
+        return route
+    route = _load_route(project_name)
+    with _ROUTES_LOCK:
+        _ROUTES[project_name] = route
+    return route
+
+
+def _invalidate_route(project_name: str | None = None) -> None:
+    with _ROUTES_LOCK:
+        if project_name is None:
+            _ROUTES.clear()
+        else:
+            _ROUTES.pop(project_name, None)
+
+
+def _running_route(project_name: str) -> _Route:
+    with tracing.span("box_bridge.resolve_box", service="box_bridge"):
+        route = _route_for(project_name)
+    _ensure_running(route.container_name)
+    return route
+
+
+def _route_tool_port(route: _Route) -> int:
+    if route.tool_server_port:
+        return route.tool_server_port
+    _invalidate_route(route.project)
+    raise HTTPException(status_code=404, detail=f"no tool server running for project {route.project}")
+
+
+def _forward_to_box(route: _Route, method: str, path: str, payload: dict[str, Any] | None = None) -> Any:
+    try:
+        return _forward_json(method, _route_tool_port(route), path, payload)
+    except HTTPException as exc:
+        if exc.status_code == 502:
+            # The port or container may have changed under us; reload the route and have the monitor recheck.
+            _invalidate_route(route.project)
+            _recheck_health()
+        raise
 
 
 def _container_file_path(value: str, field_name: str = "path") -> PurePosixPath:
@@ -133,6 +428,10 @@ def _container_file_path(value: str, field_name: str = "path") -> PurePosixPath:
 
 
 def _docker_exec(container_name: str, command: str, timeout: int) -> dict[str, Any]:
+    try:
+        timeout = int(cancellation.timeout(timeout))
+    except cancellation.Cancelled as exc:
+        raise HTTPException(status_code=504, detail=f"caller deadline exceeded: {exc}") from exc
     try:
         result = subprocess.run(
             ["docker", "exec", "-w", "/workspace", container_name, "bash", "-lc", command],
@@ -231,32 +530,38 @@ def _parse_upload_form(content_type: str, body: bytes) -> tuple[str, str, bytes]
     return project, dest_path, file_bytes
 
 
-def _discover_tool_port(project: sqlite3.Row, box_row: sqlite3.Row | None) -> int:
-    if box_row and box_row["tool_server_port"]:
-        return int(box_row["tool_server_port"])
-    raise HTTPException(status_code=404, detail=f"no tool server running for project {project['name']}")
-
-
-def _forward_json(method: str, url: str, payload: dict[str, Any] | None = None) -> Any:
+def _forward_json(method: str, port: int, path: str, payload: dict[str, Any] | None = None) -> Any:
     body = None
     headers = {"Accept": "application/json"}
     if payload is not None:
         body = json.dumps(payload).encode("utf-8")
         headers["Content-Type"] = "application/json"
 
-    req = request.Request(url, data=body, method=method, headers=headers)
-    try:
-        with request.urlopen(req, timeout=15) as response:
-            raw = response.read().decode("utf-8")
-            return json.loads(raw) if raw else {}
-    except error.HTTPError as exc:
+    url = f"http://{BOX_HOST}:{port}{path}"
+    with tracing.span("box_bridge.forward", service="box_bridge", method=method, url=url):
+        tracing.inject(headers)
+        cancellation.inject(headers)
         try:
-            payload = json.loads(exc.read().decode("utf-8"))
-        except Exception:
-            payload = {"error": exc.reason}
-        raise HTTPException(status_code=exc.code, detail=payload) from exc
-    except error.URLError as exc:
-        raise HTTPException(status_code=502, detail=f"bridge request failed: {exc.reason}") from exc
+            timeout = cancellation.timeout(FORWARD_TIMEOUT_SECONDS)
+            status_code, response_headers, raw = _pool_for(port).request(method, path, body, headers, timeout)
+        except cancellation.Cancelled as exc:
+            raise HTTPException(status_code=504, detail=f"caller deadline exceeded: {exc}") from exc
+        except OSError as exc:
+            left = cancellation.remaining()
+            if left is not None and left <= 0:
+                raise HTTPException(status_code=504, detail="caller deadline exceeded") from exc
+            raise HTTPException(status_code=502, detail=f"bridge request failed: {exc}") from exc
+        except http.client.HTTPException as exc:
+            raise HTTPException(status_code=502, detail=f"bridge request failed: {exc!r}") from exc
+        tracing.record_remote_span(response_headers.get(tracing.REMOTE_SPAN_HEADER))
+        text = raw.decode("utf-8")
+        if status_code >= 400:
+            try:
+                detail = json.loads(text)
+            except Exception:
+                detail = {"error": text[:500] or f"HTTP {status_code}"}
+            raise HTTPException(status_code=status_code, detail=detail)
+        return json.loads(text) if text else {}
 
 
 def _tool_registry_exists() -> bool:
@@ -287,7 +592,24 @@ def _tool_registry_payload(body: RegisterToolRequest) -> tuple[Any, ...]:
 
 @app.get("/health")
 def health() -> dict[str, Any]:
-    return {"status": "ok", "port": BRIDGE_PORT}
+    with _HEALTH_LOCK:
+        snapshot = _HEALTH
+    with _ROUTES_LOCK:
+        routes = len(_ROUTES)
+    return {
+        "status": "ok",
+        "port": BRIDGE_PORT,
+        "cached_routes": routes,
+        "running_containers": len(snapshot.running) if snapshot else None,
+        "health_age_s": round(time.monotonic() - snapshot.checked_at, 1) if snapshot else None,
+    }
+
+
+@app.post("/routes/refresh")
+def refresh_routes() -> dict[str, Any]:
+    _invalidate_route()
+    snapshot = _refresh_health()
+    return {"status": "refreshed", "running_containers": len(snapshot.running)}
 
 
 @app.get("/projects")
@@ -303,12 +625,10 @@ def list_projects() -> list[dict[str, Any]]:
 
 
 @app.post("/run")
-def run_in_box(body: RunRequest) -> dict[str, Any]:
-    project = _get_project(body.project)
-    box_row = _get_project_box(project["id"])
-    container_name = _container_name_for(project, box_row)
-    _ensure_running(container_name)
-    return _docker_exec(container_name, body.command, body.timeout)
+def run_in_box(body: RunRequest, http_request: Request) -> dict[str, Any]:
+    with cancellation.scope(timeout=cancellation.extract(http_request.headers)):
+        route = _running_route(body.project)
+        return _docker_exec(route.container_name, body.command, body.timeout)
 
 
 @app.post("/upload", response_model=None)
@@ -385,23 +705,44 @@ def download_file(
 
 
 @app.post("/call-tool")
-def call_tool(body: CallToolRequest) -> Any:
-    project = _get_project(body.project)
-    box_row = _get_project_box(project["id"])
-    container_name = _container_name_for(project, box_row)
-    _ensure_running(container_name)
-    port = _discover_tool_port(project, box_row)
-    return _forward_json("POST", f"http://localhost:{port}/tools/{body.tool_name}", body.params)
+def call_tool(body: CallToolRequest, http_request: Request) -> Any:
+    with tracing.span(
+        "box_bridge.call_tool",
+        service="box_bridge",
+        parent=tracing.extract(http_request.headers),
+        project=body.project,
+        tool=body.tool_name,
+    ), cancellation.scope(timeout=cancellation.extract(http_request.headers)):
+        route = _running_route(body.project)
+        return _forward_to_box(route, "POST", f"/tools/{quote(body.tool_name, safe='')}", body.params)
+
+
+@app.post("/call-batch")
+def call_batch(body: CallBatchRequest, http_request: Request) -> Any:
+    with tracing.span(
+        "box_bridge.call_batch",
+        service="box_bridge",
+        parent=tracing.extract(http_request.headers),
+        project=body.project,
+        calls=len(body.calls),
+    ), cancellation.scope(timeout=cancellation.extract(http_request.headers)):
+        route = _running_route(body.project)
+        return _forward_to_box(
+            route,
+            "POST",
+            "/call-batch",
+            {
+                "calls": [call.model_dump() for call in body.calls],
+                "concurrency": body.concurrency,
+                "stop_on_error": body.stop_on_error,
+            },
+        )
 
 
 @app.get("/tools/{project_name}")
 def list_tools(project_name: str) -> Any:
-    project = _get_project(project_name)
-    box_row = _get_project_box(project["id"])
-    container_name = _container_name_for(project, box_row)
-    _ensure_running(container_name)
-    port = _discover_tool_port(project, box_row)
-    return _forward_json("GET", f"http://localhost:{port}/tools")
+    route = _running_route(project_name)
+    return _forward_to_box(route, "GET", "/tools")
 
 
 @app.get("/status")
@@ -418,19 +759,18 @@ def status(project: str | None = Query(default=None)) -> dict[str, Any]:
     except sqlite3.Error as exc:
         raise HTTPException(status_code=500, detail=f"database error: {exc}") from exc
 
+    snapshot = _health_snapshot()
     result = []
     for row in rows:
-        box_row = _get_project_box(row["id"])
-        container_name = _container_name_for(row, box_row)
-        running = _docker_running(container_name)
+        route = _route_for(row["name"])
         result.append(
             {
                 "project": row["name"],
-                "container": container_name,
-                "running": running,
-                "tool_server_port": int(box_row["tool_server_port"]) if box_row and box_row["tool_server_port"] else None,
-                "box_status": box_row["status"] if box_row else None,
-                "last_healthcheck": box_row["last_healthcheck"] if box_row else None,
+                "container": route.container_name,
+                "running": route.container_name in snapshot.running,
+                "tool_server_port": route.tool_server_port,
+                "box_status": route.box_status,
+                "last_healthcheck": route.last_healthcheck,
             }
         )
     return {"projects": result}
@@ -3,6 +3,17 @@
 
 Discovers Python tool modules in /workspace/tools and exposes them over a
 small stdlib-only HTTP API.
+
+Async handlers run on one long-lived event loop owned by the server, so
+module-level clients and caches they create survive between calls.
+``POST /call-batch`` runs several tool calls in one round trip::
+
+    {"calls": [{"tool": "fetch", "params": {...}}, ...], "concurrency": 4}
+
+A caller may send its remaining time in ``X-Custodian-Deadline`` (seconds).
+Past it the server answers 504 and cancels the async handler or batch it was
+waiting on; a sync handler cannot be interrupted and only gets the up-front
+check.
 """
 
 from __future__ import annotations
@@ -13,6 +24,8 @@ import inspect
 import json
 import os
 import sys
+import threading
+import time
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from urllib.parse import unquote
@@ -20,6 +33,11 @@ from urllib.parse import unquote
 
 TOOLS_DIR = Path("/workspace/tools")
 DEFAULT_PORT = 9100
+TRACEPARENT_HEADER = "traceparent"
+SPAN_HEADER = "X-Custodian-Span"
+DEADLINE_HEADER = "X-Custodian-Deadline"
+MAX_BATCH_CALLS = 64
+MAX_BATCH_CONCURRENCY = 16
 
 
 class ToolRegistry:
@@ -91,15 +109,143 @@ def _json_bytes(payload: dict) -> bytes:
     return json.dumps(payload).encode("utf-8")
 
 
-def _run_handler(handler, params: dict):
+_LOOP: asyncio.AbstractEventLoop | None = None
+_LOOP_LOCK = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Return the server's event loop, starting its thread on first use."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="box-tool-loop", daemon=True).start()
+            _LOOP = loop
+        return _LOOP
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before the tool finished."""
+
+
+def _deadline(headers) -> float | None:
+    try:
+        return float(headers.get(DEADLINE_HEADER) or "")
+    except ValueError:
+        return None
+
+
+def _wait(future, timeout: float | None):
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise DeadlineExceeded(f"deadline exceeded after {timeout:.1f}s") from None
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+def _run_handler(handler, params: dict, timeout: float | None = None):
+    if timeout is not None and timeout <= 0:
+        raise DeadlineExceeded("deadline exceeded before the tool started")
     result = handler(params)
     if inspect.isawaitable(result):
-        return asyncio.run(result)
+        return _wait(asyncio.run_coroutine_threadsafe(_await(result), _event_loop()), timeout)
+    return result
+
+
+async def _call_in_loop(handler, params: dict):
+    if inspect.iscoroutinefunction(handler):
+        return await handler(params)
+    result = await asyncio.get_running_loop().run_in_executor(None, handler, params)
+    if inspect.isawaitable(result):
+        result = await result
     return result
 
 
+async def _run_batch(calls: list[dict], concurrency: int, stop_on_error: bool) -> list[dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = asyncio.Event()
+
+    async def run_one(call: dict) -> dict:
+        tool_name = call["tool"]
+        async with semaphore:
+            if stop_on_error and failed.is_set():
+                return {"tool": tool_name, "status": "skipped"}
+            tool = REGISTRY.get(tool_name)
+            if tool is None:
+                failed.set()
+                return {"tool": tool_name, "status": "error", "error": f"tool not found: {tool_name}"}
+            started = time.perf_counter()
+            try:
+                result = await _call_in_loop(tool["handler"], call["params"])
+            except Exception as exc:
+                failed.set()
+                return {
+                    "tool": tool_name,
+                    "status": "error",
+                    "error": str(exc),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                }
+            return {
+                "tool": tool_name,
+                "status": "ok",
+                "result": result,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+
+    return list(await asyncio.gather(*(run_one(call) for call in calls)))
+
+
+def run_batch(calls: list[dict], concurrency: int = 1, stop_on_error: bool = False, timeout: float | None = None) -> list[dict]:
+    """Run ``calls`` on the server loop; results keep the order of ``calls``."""
+    if timeout is not None and timeout <= 0:
+        raise DeadlineExceeded("deadline exceeded before the batch started")
+    future = asyncio.run_coroutine_threadsafe(_run_batch(calls, concurrency, stop_on_error), _event_loop())
+    return _wait(future, timeout)
+
+
+def _parse_batch(body: dict) -> tuple[list[dict], int, bool]:
+    calls = body.get("calls")
+    if not isinstance(calls, list) or not calls:
+        raise ValueError("calls must be a non-empty list")
+    if len(calls) > MAX_BATCH_CALLS:
+        raise ValueError(f"at most {MAX_BATCH_CALLS} calls per batch")
+    parsed = []
+    for index, call in enumerate(calls):
+        if not isinstance(call, dict) or not isinstance(call.get("tool"), str) or not call["tool"]:
+            raise ValueError(f"calls[{index}].tool is required")
+        params = call.get("params") or {}
+        if not isinstance(params, dict):
+            raise ValueError(f"calls[{index}].params must be an object")
+        parsed.append({"tool": call["tool"], "params": params})
+    try:
+        concurrency = int(body.get("concurrency") or 1)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("concurrency must be an integer") from exc
+    concurrency = max(1, min(concurrency, MAX_BATCH_CONCURRENCY))
+    return parsed, concurrency, bool(body.get("stop_on_error"))
+
+
+def _span_header(tool_name: str, started: float, status: str, traceparent: str | None) -> dict[str, str]:
+    if not traceparent:
+        return {}
+    payload = {
+        "span_id": os.urandom(8).hex(),
+        "name": f"box_tool.{tool_name}",
+        "service": "box_tool_server",
+        "start": started,
+        "end": time.time(),
+        "status": status,
+    }
+    return {SPAN_HEADER: json.dumps(payload)}
+
+
 class ToolRequestHandler(BaseHTTPRequestHandler):
     server_version = "BoxToolServer/0.1"
+    protocol_version = "HTTP/1.1"
 
     def do_GET(self) -> None:
         if self.path == "/health":
@@ -111,10 +257,16 @@ class ToolRequestHandler(BaseHTTPRequestHandler):
         self._write_json(404, {"error": "not found"})
 
     def do_POST(self) -> None:
+        # Drain the body up front so an early error reply leaves a keep-alive connection usable.
+        content_length = int(self.headers.get("Content-Length", "0") or "0")
+        self._raw_body = self.rfile.read(content_length) if content_length > 0 else b""
         if self.path == "/reload":
             REGISTRY.load()
             self._write_json(200, {"status": "reloaded", "tools": len(REGISTRY.list_tools())})
             return
+        if self.path == "/call-batch":
+            self._handle_batch()
+            return
         prefix = "/tools/"
         if not self.path.startswith(prefix):
             self._write_json(404, {"error": "not found"})
@@ -126,38 +278,75 @@ class ToolRequestHandler(BaseHTTPRequestHandler):
             self._write_json(404, {"error": f"tool not found: {tool_name}"})
             return
 
-        content_length = int(self.headers.get("Content-Length", "0") or "0")
-        raw_body = self.rfile.read(content_length) if content_length > 0 else b"{}"
-        try:
-            body = json.loads(raw_body.decode("utf-8")) if raw_body else {}
-        except json.JSONDecodeError:
-            self._write_json(400, {"error": "invalid JSON"})
+        body = self._read_json_body()
+        if body is None:
             return
 
-        if not isinstance(body, dict):
-            self._write_json(400, {"error": "invalid JSON"})
+        traceparent = self.headers.get(TRACEPARENT_HEADER)
+        started = time.time()
+        try:
+            result = _run_handler(tool["handler"], body, _deadline(self.headers))
+            self._write_json(200, {"result": result}, _span_header(tool_name, started, "ok", traceparent))
+        except DeadlineExceeded as exc:
+            self._write_json(504, {"error": str(exc)}, _span_header(tool_name, started, "error", traceparent))
+        except Exception as exc:
+            self._write_json(500, {"error": str(exc)}, _span_header(tool_name, started, "error", traceparent))
+
+    def _handle_batch(self) -> None:
+        body = self._read_json_body()
+        if body is None:
+            return
+        try:
+            calls, concurrency, stop_on_error = _parse_batch(body)
+        except ValueError as exc:
+            self._write_json(400, {"error": str(exc)})
             return
 
+        traceparent = self.headers.get(TRACEPARENT_HEADER)
+        started = time.time()
         try:
-            result = _run_handler(tool["handler"], body)
-            self._write_json(200, {"result": result})
+            results = run_batch(calls, concurrency, stop_on_error, _deadline(self.headers))
+        except DeadlineExceeded as exc:
+            self._write_json(504, {"error": str(exc)}, _span_header("batch", started, "error", traceparent))
+            return
         except Exception as exc:
-            self._write_json(500, {"error": str(exc)})
+            self._write_json(500, {"error": str(exc)}, _span_header("batch", started, "error", traceparent))
+            return
+        status = "ok" if all(item["status"] == "ok" for item in results) else "error"
+        self._write_json(
+            200,
+            {"results": results, "concurrency": concurrency},
+            _span_header("batch", started, status, traceparent),
+        )
+
+    def _read_json_body(self) -> dict | None:
+        raw_body = self._raw_body
+        try:
+            body = json.loads(raw_body.decode("utf-8")) if raw_body else {}
+        except json.JSONDecodeError:
+            body = None
+        if not isinstance(body, dict):
+            self._write_json(400, {"error": "invalid JSON"})
+            return None
+        return body
 
     def log_message(self, format: str, *args) -> None:
         print(f"[box-tool-server] {self.address_string()} - {format % args}", file=sys.stderr)
 
-    def _write_json(self, status: int, payload) -> None:
+    def _write_json(self, status: int, payload, headers: dict[str, str] | None = None) -> None:
         body = _json_bytes(payload)
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(body)
 
 
 def main() -> None:
     REGISTRY.load()
+    _event_loop()
     port = int(os.environ.get("BOX_TOOL_PORT", str(DEFAULT_PORT)))
     server = ThreadingHTTPServer(("0.0.0.0", port), ToolRequestHandler)
     print(f"[box-tool-server] listening on {port} with {len(REGISTRY.list_tools())} tools", file=sys.stderr)
@@ -108,12 +108,16 @@ When you need to use a tool, respond with ONLY this JSON (no other text):
 
 You will receive the tool's result in the next message. Then continue or call another tool.
 
+To run several independent tools at once, respond with ONLY:
+{"tool_calls": [{"name": "<tool_name>", "params": {<params>}}, ...]}
+Their results come back in the same order as the calls.
+
 When you have the final answer, respond with ONLY this JSON (no other text):
 {"final_answer": {<final structured JSON>}}
 
 Rules:
-- One tool call per message
-- Always wait for the result before calling the next tool
+- Batch tool calls only when none of them needs another's result
+- Always wait for the results before calling a tool that depends on them
 - If a tool returns an error, you may retry with different params or report the error in your final answer""",
     ]
     user = f"[Input Payload]\n{json.dumps(input_data, indent=2, sort_keys=True)}"
@@ -2,10 +2,13 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import contextvars
 import importlib
 import importlib.util
+import json
 import logging
+import os
 import signal
 import sys
 import threading
@@ -20,7 +23,9 @@ from mcp.types import JSONRPCMessage, JSONRPCNotification, ServerNotification, T
 
 from custodian.core.legacy import cleanup_legacy_resources
 from custodian.db.connection import db_connection
+from custodian.db import retention
 from custodian.db.migrations import run_all_migrations
+from custodian.services import agent_events, tool_cache
 from custodian.services.tool_router import set_mcp_registry
 from custodian.session_registry import disconnect_session, ensure_registry, register_session, touch_session
 
@@ -39,6 +44,8 @@ _WATCHER_STARTED = False
 _RUNTIME_LOOP: asyncio.AbstractEventLoop | None = None
 _HTTP_SESSION_MANAGERS: set[object] = set()
 _NOTIFY_LOCK = threading.Lock()
+_RECORD_PATH = os.environ.get("CUSTODIAN_RECORD_TOOL_CALLS", "").strip()
+_RECORD_LOCK = threading.Lock()
 
 app = Server("custodian")
 _ORIGINAL_CREATE_INITIALIZATION_OPTIONS = app.create_initialization_options
@@ -182,6 +189,7 @@ def reload_tool_registry(notify: bool = True) -> tuple[int, dict[str, str]]:
         _TOOL_LOAD_ERRORS = errors
         _WATCHER_STATE = _tool_file_state()
     set_mcp_registry(new_registry)
+    tool_cache.invalidate(tables=["mcp_registry"])
 
     if errors:
         logging.getLogger("uvicorn.error").warning(
@@ -252,6 +260,7 @@ def initialize_runtime(force: bool = False) -> None:
         logging.getLogger("uvicorn.error").error("[custodian] failed to load tool module %s: %s", module_name, error)
     _RUNTIME_INITIALIZED = True
     ensure_tool_watcher_started()
+    retention.start_scheduler()
 
 
 def get_tool_load_failures() -> dict[str, str]:
@@ -304,11 +313,75 @@ async def call_tool(name: str, arguments: dict):
     if entry is None:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
+    started = time.time()
+    cache_plan = tool_cache.plan(entry["metadata"], arguments)
+    result = tool_cache.get(cache_plan) if cache_plan is not None else None
+    if result is None:
+        try:
+            progress = _progress_notifier()
+            with db_connection() as conn, agent_events.listen(progress) if progress else contextlib.nullcontext():
+                result = await entry["handler"](arguments or {}, conn)
+        except Exception as exc:
+            result = [TextContent(type="text", text=f"Error: {exc}")]
+        else:
+            if cache_plan is not None and not _is_error_result(result):
+                tool_cache.put(cache_plan, result)
+    if _RECORD_PATH:
+        _record_tool_call(session_id, name, arguments or {}, started, result)
+    return result
+
+
+def _progress_notifier():
+    """Forward agent progress to the client as MCP progress notifications when it sent a progressToken."""
     try:
-        with db_connection() as conn:
-            return await entry["handler"](arguments or {}, conn)
-    except Exception as exc:
-        return [TextContent(type="text", text=f"Error: {exc}")]
+        request_context = app.request_context
+    except LookupError:
+        return None
+    progress_token = getattr(request_context.meta, "progressToken", None) if request_context.meta else None
+    if progress_token is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    loop_thread = threading.get_ident()
+    sent = {"count": 0}
+
+    def notify(event) -> None:
+        message = agent_events.describe(event)
+        if message is None:
+            return
+        sent["count"] += 1
+        notification = request_context.session.send_progress_notification(
+            progress_token, float(sent["count"]), message=message, related_request_id=str(request_context.request_id)
+        )
+        if threading.get_ident() == loop_thread:
+            loop.create_task(notification)
+        else:
+            asyncio.run_coroutine_threadsafe(notification, loop)
+
+    return notify
+
+
+def _is_error_result(result) -> bool:
+    first_text = getattr(result[0], "text", "") if result else ""
+    return first_text.startswith(("Error:", "Unknown tool"))
+
+
+def _record_tool_call(session_id: str | None, name: str, arguments: dict, started: float, result) -> None:
+    """Append one tool call to the CUSTODIAN_RECORD_TOOL_CALLS JSONL trace for later replay."""
+    entry = {
+        "ts": round(started, 6),
+        "session_id": session_id,
+        "tool": name,
+        "arguments": arguments,
+        "duration_ms": round((time.time() - started) * 1000, 3),
+        "error": _is_error_result(result),
+    }
+    try:
+        line = json.dumps(entry, default=str)
+        with _RECORD_LOCK, open(_RECORD_PATH, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+    except (OSError, TypeError, ValueError):
+        logging.getLogger("uvicorn.error").warning("[custodian] failed to record tool call %s", name, exc_info=True)
 
 
 async def main():
@@ -343,4 +416,5 @@ async def main():
         _STDIO_SESSION_ID.reset(session_token)
         disconnect_session(stdio_session_id)
         stop_tool_watcher()
+        retention.stop_scheduler()
         cleanup_legacy_resources()
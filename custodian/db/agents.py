@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import collections
 import json
 import os
@@ -10,12 +11,15 @@ import subprocess
 from datetime import datetime
 import yaml
 
+from custodian.db import run_owners
 from custodian.db.connection import DB_PATH, db_connection
+from custodian.services.project_resolver import get_project_by_name
 from custodian.db.system import log_query
 from custodian.db.tools_registry import _ensure_box_running, _ensure_project_box
 from custodian.agents.executor import execute_agent
 from custodian.agents.schema import LlmAgentSpec
 from custodian.agents.spec_loader import load_spec
+from custodian.services import agent_events, cancellation, llm_cache, tracing
 from mcp.types import TextContent
 
 def _check_wsl():
@@ -48,18 +52,10 @@ def _find_symbol(*args, **kwargs):
     return find_symbol(*args, **kwargs)
 
 
-def get_project_by_name(conn, name):
-    row = conn.execute("SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    row = conn.execute("SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    return conn.execute("SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'", (f"%{name}%",)).fetchone()
 
 import logging
 from custodian.pipeline import DEFAULT_OUTPUT_BASE, PipelineError, PipelinePaused, PipelineRun, PipelineSpec
-from custodian.services.opencode import OpenCodeRunnerError, list_available_models, run_opencode
+from custodian.services.opencode import OpenCodeRunnerError, list_available_models, progress_listener, run_opencode
 
 def _validate_agent_model_name(model):
     """Validate an OpenAI model ID against OpenCode's live model list."""
@@ -197,11 +193,24 @@ def _resolve_agent(conn, identifier):
     return row
 
 
-def _ensure_agent_workstation_column(conn):
+def _ensure_agent_columns(conn):
     columns = {row[1] for row in conn.execute("PRAGMA table_info(agents)").fetchall()}
     if "workstation" not in columns:
         conn.execute("ALTER TABLE agents ADD COLUMN workstation TEXT")
         conn.commit()
+    if "tool_concurrency" not in columns:
+        conn.execute("ALTER TABLE agents ADD COLUMN tool_concurrency INTEGER")
+        conn.commit()
+    if "llm_cache" not in columns:
+        conn.execute("ALTER TABLE agents ADD COLUMN llm_cache TEXT")
+        conn.commit()
+
+
+def _validate_llm_cache(value):
+    mode = str(value or "").strip().lower() or None
+    if mode is not None and mode not in llm_cache.MODES:
+        return None, f"Error: llm_cache must be one of {', '.join(llm_cache.MODES)}."
+    return mode, None
 
 
 def _validate_workstation(conn, name):
@@ -220,7 +229,7 @@ async def handle_agent_list(args):
     status = args.get("status", "active")
 
     with db_connection() as conn:
-        _ensure_agent_workstation_column(conn)
+        _ensure_agent_columns(conn)
         rows = conn.execute(
             """SELECT a.*, p.name as project_name,
                       (SELECT COUNT(*) FROM agent_runs ar WHERE ar.agent_id = a.id) as run_count,
@@ -247,6 +256,10 @@ async def handle_agent_list(args):
             lines.append(f"      spec_path: {r['spec_path']}")
         if "workstation" in r.keys() and r["workstation"]:
             lines.append(f"      workstation: {r['workstation']}")
+        if "tool_concurrency" in r.keys() and r["tool_concurrency"]:
+            lines.append(f"      tool_concurrency: {r['tool_concurrency']}")
+        if "llm_cache" in r.keys() and r["llm_cache"]:
+            lines.append(f"      llm_cache: {r['llm_cache']}")
         if desc:
             lines.append(f"      {desc}")
     return [TextContent(type="text", text="\n".join(lines))]
@@ -259,18 +272,22 @@ async def handle_agent_create(args):
     model = args.get("model", "openai/gpt-5.4")
     project_name = str(args.get("project") or "").strip()
     max_turns = args.get("max_turns", 20)
+    tool_concurrency = int(args["tool_concurrency"]) if args.get("tool_concurrency") else None
     spec_path = str(args.get("spec_path") or "").strip() or None
     workstation = str(args.get("workstation") or "").strip() or None
     log_query("agent_create", project_name, args)
 
     if not name:
         return [TextContent(type="text", text="Error: 'name' is required.")]
+    cache_mode, cache_error = _validate_llm_cache(args.get("llm_cache"))
+    if cache_error:
+        return [TextContent(type="text", text=cache_error)]
     _available_models, model_error = _validate_agent_model_name(model)
     if model_error:
         return [TextContent(type="text", text=model_error)]
 
     with db_connection() as conn:
-        _ensure_agent_workstation_column(conn)
+        _ensure_agent_columns(conn)
         # Check name uniqueness
         existing = conn.execute("SELECT id FROM agents WHERE name = ?", (name,)).fetchone()
         if existing:
@@ -305,8 +322,9 @@ async def handle_agent_create(args):
         now = datetime.now().isoformat()
         cursor = conn.execute(
             """INSERT INTO agents (name, description, system_prompt, model,
-               project_id, max_turns, spec_path, workstation, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (name, description, system_prompt, model, project_id, max_turns, spec_path, workstation, now),
+               project_id, max_turns, tool_concurrency, llm_cache, spec_path, workstation, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (name, description, system_prompt, model, project_id, max_turns, tool_concurrency, cache_mode, spec_path, workstation, now),
         )
         conn.commit()
         agent_id = cursor.lastrowid
@@ -325,7 +343,7 @@ async def handle_agent_update(args):
         return [TextContent(type="text", text="Error: 'agent' (name or ID) is required.")]
 
     with db_connection() as conn:
-        _ensure_agent_workstation_column(conn)
+        _ensure_agent_columns(conn)
         agent = _resolve_agent(conn, identifier)
         if not agent:
             return [TextContent(type="text", text=f"Agent '{identifier}' not found.")]
@@ -361,6 +379,15 @@ async def handle_agent_update(args):
         if "max_turns" in args:
             updates.append("max_turns = ?")
             params.append(int(args["max_turns"]))
+        if "tool_concurrency" in args:
+            updates.append("tool_concurrency = ?")
+            params.append(int(args["tool_concurrency"]) if args["tool_concurrency"] else None)
+        if "llm_cache" in args:
+            cache_mode, cache_error = _validate_llm_cache(args["llm_cache"])
+            if cache_error:
+                return [TextContent(type="text", text=cache_error)]
+            updates.append("llm_cache = ?")
+            params.append(cache_mode)
         if "spec_path" in args:
             updates.append("spec_path = ?")
             params.append(args["spec_path"].strip() if args["spec_path"] else None)
@@ -397,7 +424,7 @@ async def handle_get_agent_spec(args):
         return [TextContent(type="text", text="Error: 'name' is required.")]
 
     with db_connection() as conn:
-        _ensure_agent_workstation_column(conn)
+        _ensure_agent_columns(conn)
         agent = _resolve_agent(conn, identifier)
         if not agent:
             return [TextContent(type="text", text=f"Agent '{identifier}' not found.")]
@@ -438,10 +465,13 @@ async def handle_agent_run(args):
     identifier = args.get("agent", "")
     user_prompt = args.get("prompt", "")
     input_payload = args.get("input", {})
+    timeout_seconds = args.get("timeout_seconds")
     log_query("agent_run", None, args)
 
     if not identifier:
         return [TextContent(type="text", text="Error: 'agent' (name or ID) is required.")]
+    if timeout_seconds is not None and (isinstance(timeout_seconds, bool) or not isinstance(timeout_seconds, (int, float)) or timeout_seconds <= 0):
+        return [TextContent(type="text", text="Error: 'timeout_seconds' must be a positive number.")]
 
     is_yaml_agent = False
 
@@ -474,6 +504,13 @@ async def handle_agent_run(args):
         conn.commit()
         run_id = cursor.lastrowid
 
+    with tracing.span("agent.run", run_kind="agent", run_id=run_id, agent=agent["name"]), agent_events.run_scope(
+        run_id, agent["name"], progress=lambda snapshot: _write_run_progress(run_id, snapshot)
+    ), cancellation.scope("agent", run_id, timeout=timeout_seconds), run_owners.owned("agent", run_id):
+        return await _dispatch_agent_run(agent, run_id, user_prompt, input_payload, is_yaml_agent, cwd)
+
+
+async def _dispatch_agent_run(agent, run_id, user_prompt, input_payload, is_yaml_agent, cwd):
     prompt_text = user_prompt or agent.get("description") or f"Execute your purpose as {agent['name']}"
     fallback_warning = None
 
@@ -482,7 +519,7 @@ async def handle_agent_run(args):
             from custodian.services.workstations import dispatch_agent
 
             dispatch_task = user_prompt or (json.dumps(input_payload, sort_keys=True) if input_payload else prompt_text)
-            result = dispatch_agent(agent["name"], dispatch_task, agent_run_id=run_id)
+            result = await cancellation.to_thread(dispatch_agent, agent["name"], dispatch_task, agent_run_id=run_id)
             with db_connection() as conn:
                 conn.execute(
                     """UPDATE agent_runs SET status='completed', output=?,
@@ -495,14 +532,15 @@ async def handle_agent_run(args):
                 text=f"Agent '{agent['name']}' completed via workstation '{agent['workstation']}' (run #{run_id}).\n\n{json.dumps(result, indent=2)}",
             )]
         except Exception as e:
+            status = _failure_status(e)
             with db_connection() as conn:
                 conn.execute(
-                    """UPDATE agent_runs SET status='failed', error=?,
+                    """UPDATE agent_runs SET status=?, error=?,
                        finished_at=datetime('now') WHERE id=?""",
-                    (str(e), run_id),
+                    (status, str(e), run_id),
                 )
                 conn.commit()
-            return [TextContent(type="text", text=f"Agent '{agent['name']}' failed via workstation (run #{run_id}).\nError: {e}")]
+            return [TextContent(type="text", text=f"Agent '{agent['name']}' {status} via workstation (run #{run_id}).\nError: {e}")]
 
     if is_yaml_agent:
         try:
@@ -538,26 +576,29 @@ async def handle_agent_run(args):
             )]
         except Exception as e:
             error_text = str(e)
+            status = _failure_status(e)
             with db_connection() as conn:
                 conn.execute(
-                    """UPDATE agent_runs SET status='failed', error=?,
+                    """UPDATE agent_runs SET status=?, error=?,
                        finished_at=datetime('now') WHERE id=?""",
-                    (error_text, run_id),
+                    (status, error_text, run_id),
                 )
                 conn.commit()
             return [TextContent(
                 type="text",
-                text=f"Agent '{agent['name']}' failed via Custodian agent executor (run #{run_id}).\nError: {error_text}",
+                text=f"Agent '{agent['name']}' {status} via Custodian agent executor (run #{run_id}).\nError: {error_text}",
             )]
 
     try:
-        result = run_opencode(
+        result = await cancellation.to_thread(
+            run_opencode,
             prompt=prompt_text,
             model=agent["model"],
             system_prompt=agent["system_prompt"],
             project_dir=cwd,
             max_turns=agent.get("max_turns"),
             timeout=600,
+            on_event=progress_listener(),
         )
         with db_connection() as conn:
             conn.execute(
@@ -591,14 +632,88 @@ async def handle_agent_run(args):
             text=f"Agent '{agent['name']}' failed (run #{run_id}).\nError: {e.stderr or str(e)}\nOutput: {e.text[:2000]}",
         )]
     except Exception as e:
+        status = _failure_status(e)
         with db_connection() as conn:
             conn.execute(
-                """UPDATE agent_runs SET status='failed', error=?,
+                """UPDATE agent_runs SET status=?, error=?,
                    finished_at=datetime('now') WHERE id=?""",
-                (str(e), run_id),
+                (status, str(e), run_id),
             )
             conn.commit()
-        return [TextContent(type="text", text=f"Agent run error: {e}")]
+        return [TextContent(type="text", text=f"Agent run {'cancelled' if status == 'cancelled' else 'error'}: {e}")]
+
+
+def _failure_status(exc):
+    return "cancelled" if isinstance(exc, cancellation.Cancelled) else "failed"
+
+
+async def handle_cancel_agent_run(args):
+    """Cancel a running agent run and free the workstation slots it holds."""
+    run_id = args.get("run_id")
+    reason = str(args.get("reason") or "").strip() or "cancelled by cancel_agent_run"
+    if run_id is None:
+        return [TextContent(type="text", text="Error: 'run_id' is required.")]
+    run_id = int(run_id)
+    with db_connection() as conn:
+        log_query(conn, "cancel_agent_run", None, {"run_id": run_id, "reason": reason})
+        run = conn.execute(
+            """SELECT ar.status, a.name AS agent_name FROM agent_runs ar
+               JOIN agents a ON a.id = ar.agent_id WHERE ar.id = ?""",
+            (run_id,),
+        ).fetchone()
+    if not run:
+        return [TextContent(type="text", text=f"Error: agent run #{run_id} not found.")]
+    if run["status"] != "running":
+        return [TextContent(type="text", text=f"Agent run #{run_id} is already {run['status']}.")]
+
+    cancelling = [TextContent(type="text", text=f"Cancelling agent run #{run_id} ({run['agent_name']}); in-flight work is being stopped.")]
+    if cancellation.cancel("agent", run_id, reason):
+        # The run unwinds in its own call: it stops its work, releases its slots and records 'cancelled'.
+        return cancelling
+    with db_connection() as conn:
+        if run_owners.owner_alive(conn, "agent", run_id):
+            # Another process runs it: leave the request for its watcher, which cancels the run there.
+            run_owners.request_cancel(conn, "agent", run_id, reason)
+            conn.commit()
+            return cancelling
+
+    # No live process owns the run (e.g. the server restarted mid-run): close the record directly.
+    from custodian.services.workstations import release_agent_slots
+
+    with db_connection() as conn:
+        conn.execute(
+            """UPDATE agent_runs SET status='cancelled', error=?,
+               finished_at=datetime('now') WHERE id=? AND status='running'""",
+            (reason, run_id),
+        )
+        conn.commit()
+    released = await asyncio.to_thread(release_agent_slots, run_id)
+    text = f"Agent run #{run_id} ({run['agent_name']}) marked cancelled"
+    if released:
+        text += f"; released {len(released)} workstation slot(s)"
+    return [TextContent(type="text", text=text + ".")]
+
+def _write_run_progress(run_id, snapshot):
+    """Persist a live progress snapshot on the agent_runs row."""
+    with db_connection() as conn:
+        conn.execute("UPDATE agent_runs SET progress = ? WHERE id = ?", (json.dumps(snapshot), run_id))
+        conn.commit()
+
+
+def _progress_line(progress_json):
+    try:
+        progress = json.loads(progress_json) if progress_json else None
+    except json.JSONDecodeError:
+        return None
+    if not progress:
+        return None
+    parts = [f"turn {progress.get('turn', 0)}", f"{progress.get('tokens', 0)} tokens", f"{progress.get('tool_calls', 0)} tool calls"]
+    if progress.get("cost_usd") is not None:
+        parts.append(f"${progress['cost_usd']:.4f}")
+    if progress.get("tools_in_flight"):
+        parts.append("running " + ", ".join(str(name) for name in progress["tools_in_flight"]))
+    return "; ".join(parts)
+
 
 async def handle_agent_runs(args):
     """Get run history for agents."""
@@ -638,13 +753,16 @@ async def handle_agent_runs(args):
 
     lines = [f"Last {len(rows)} run(s) for {agent_name}:\n"]
     for r in rows:
-        status_icon = {"completed": "+", "failed": "X", "running": "~"}.get(r["status"], "?")
+        status_icon = {"completed": "+", "failed": "X", "running": "~", "cancelled": "-"}.get(r["status"], "?")
         tokens = r["tokens_used"] or 0
         output_preview = (r["output"] or "")[:100].replace("\n", " ")
         lines.append(
             f"  [{status_icon}] #{r['id']} {r['agent_name']} — {r['status']} "
             f"({(r['started_at'] or '')[:16]}, {tokens} tokens)"
         )
+        progress = _progress_line(r["progress"]) if r["status"] == "running" and "progress" in r.keys() else None
+        if progress:
+            lines.append(f"      Progress: {progress}")
         if r["error"]:
             lines.append(f"      Error: {r['error'][:100]}")
         elif output_preview:
@@ -687,3 +805,7 @@ async def agent_run(conn, **params):
 
 async def agent_runs(conn, **params):
     return _unwrap(await handle_agent_runs(params))
+
+
+async def cancel_agent_run(conn, **params):
+    return _unwrap(await handle_cancel_agent_run(params))
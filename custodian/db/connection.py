@@ -1,16 +1,70 @@
 from __future__ import annotations
 
+import logging
 import os
-import shutil
 import sqlite3
 from contextlib import contextmanager
+from typing import Callable
 
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "custodian.db")
+_WRITE_ACTIONS = {sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE}
+_WRITE_LISTENERS: list[Callable[[set[str]], None]] = []
+
+
+def add_write_listener(callback: Callable[[set[str]], None]) -> None:
+    """Call ``callback(tables)`` whenever a tracked connection commits or closes after writing."""
+    if callback not in _WRITE_LISTENERS:
+        _WRITE_LISTENERS.append(callback)
+
+
+def notify_tables_written(tables: set[str]) -> None:
+    """Run the write listeners for ``tables``; for writes that bypass ``TrackedConnection``."""
+    for callback in list(_WRITE_LISTENERS):
+        try:
+            callback(set(tables))
+        except Exception:
+            logging.getLogger("uvicorn.error").warning("[custodian] db write listener failed", exc_info=True)
+
+
+class TrackedConnection(sqlite3.Connection):
+    """Connection that reports the tables it wrote to registered write listeners."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written_tables: set[str] = set()
+        self.set_authorizer(self._authorize)
+
+    def _authorize(self, action, arg1, arg2, db_name, trigger):
+        if action in _WRITE_ACTIONS and arg1:
+            self.written_tables.add(arg1)
+        return sqlite3.SQLITE_OK
+
+    def _flush_invalidations(self) -> None:
+        # The set is never cleared: statements are cached per connection, so a
+        # repeated write is not re-authorized and must stay on record.
+        if not self.written_tables:
+            return
+        notify_tables_written(self.written_tables)
+
+    def commit(self):
+        super().commit()
+        self._flush_invalidations()
+
+    def __exit__(self, exc_type, exc, tb):
+        result = super().__exit__(exc_type, exc, tb)
+        self._flush_invalidations()
+        return result
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._flush_invalidations()
 
 
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, factory=TrackedConnection)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys=ON")
@@ -28,14 +82,19 @@ def db_connection():
 
 
 def save_point(task_id: str) -> str:
-    backup = f"{DB_PATH}.pre-{task_id}"
-    shutil.copy2(DB_PATH, backup)
-    return backup
+    """Take an online snapshot labelled ``pre-<task_id>``; returns its path."""
+    from custodian.db import snapshots
+
+    return str(snapshots.snapshot_dir() / snapshots.create_snapshot(f"pre-{task_id}")["name"])
 
 
 def restore_save_point(task_id: str) -> bool:
-    backup = f"{DB_PATH}.pre-{task_id}"
-    if not os.path.exists(backup):
+    """Restore the newest ``pre-<task_id>`` snapshot; ``False`` if there is none."""
+    from custodian.db import snapshots
+
+    try:
+        path = snapshots.find_snapshot(label=f"pre-{task_id}")
+    except snapshots.SnapshotError:
         return False
-    shutil.copy2(backup, DB_PATH)
+    snapshots.restore_snapshot(path)
     return True
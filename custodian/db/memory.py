@@ -1,52 +1,37 @@
 from __future__ import annotations
 
+import atexit
 import json
+import logging
+import os
 import re
 import sqlite3
+import threading
+from collections import Counter
 from datetime import datetime
 from mcp.types import TextContent
 
+from custodian.db import sequences
 from custodian.db.connection import db_connection
+from custodian.services.project_resolver import get_project_by_name
+from custodian.db.memory_index import hybrid_search, index_memory, tag_filter_sql
 from custodian.db.tasks import _parse_stored_json_array
 from custodian.db.system import log_query
 
 MEMORY_PREVIEW_CHARS = 2000
+ACCESS_FLUSH_SECONDS = float(os.environ.get("CUSTODIAN_MEMORY_ACCESS_FLUSH_SECONDS", "30"))
+ACCESS_FLUSH_BATCH = int(os.environ.get("CUSTODIAN_MEMORY_ACCESS_FLUSH_BATCH", "500"))
+
+_ACCESS_LOCK = threading.Lock()
+_PENDING_ACCESS: Counter = Counter()
+_ACCESS_TIMER: threading.Timer | None = None
 
-def get_project_by_name(conn, name):
-    """Look up a project by name (case-insensitive, partial match)."""
-    # Try exact match first
-    row = conn.execute(
-        "SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)
-    ).fetchone()
-    if row:
-        return row
-
-    # Try case-insensitive
-    row = conn.execute(
-        "SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)
-    ).fetchone()
-    if row:
-        return row
-
-    # Try partial match
-    row = conn.execute(
-        "SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'",
-        (f"%{name}%",),
-    ).fetchone()
-    return row
 
 def _next_meta_id(conn, table_name, prefix):
-    """Generate the next race-safe meta-log ID for a supported table."""
+    """Allocate the next meta-log ID for a supported table from its sequence."""
     if table_name not in {"friction_points", "changelog_entries", "memory_flags"}:
         raise ValueError(f"Unsupported meta-log table: {table_name}")
-
-    start_index = len(prefix) + 2
-    max_num = conn.execute(
-        f"SELECT MAX(CAST(SUBSTR(id, ?) AS INTEGER)) FROM {table_name} WHERE id LIKE ?",
-        (start_index, f"{prefix}-%"),
-    ).fetchone()[0]
-    next_num = (max_num or 0) + 1
-    return f"{prefix}-{next_num:03d}"
+    return sequences.next_id(conn, table_name, prefix)
 
 def _normalize_memory_flag_status(status, *, allow_open=True):
     """Validate a memory drift flag status value."""
@@ -90,16 +75,61 @@ def _serialize_memory_flag_row(row):
         )
     return result
 
-def _bump_access(conn, memory_ids):
-    """Increment access_count for retrieved memories."""
+def _bump_access(memory_ids):
+    """Count an access for each retrieved memory without writing on the read path.
+
+    Counts accumulate in memory and are written by ``flush_access_counts`` in
+    one transaction, ACCESS_FLUSH_SECONDS after the first pending access or as
+    soon as ACCESS_FLUSH_BATCH accesses are waiting.
+    """
+    global _ACCESS_TIMER
     if not memory_ids:
         return
-    placeholders = ",".join("?" for _ in memory_ids)
-    conn.execute(
-        f"UPDATE memories SET access_count = access_count + 1 WHERE id IN ({placeholders})",
-        memory_ids,
-    )
-    conn.commit()
+    flush_now = False
+    with _ACCESS_LOCK:
+        _PENDING_ACCESS.update(memory_ids)
+        if sum(_PENDING_ACCESS.values()) >= ACCESS_FLUSH_BATCH:
+            flush_now = True
+        elif _ACCESS_TIMER is None:
+            _ACCESS_TIMER = threading.Timer(ACCESS_FLUSH_SECONDS, flush_access_counts)
+            _ACCESS_TIMER.daemon = True
+            _ACCESS_TIMER.start()
+    if flush_now:
+        threading.Thread(target=flush_access_counts, name="memory-access-flush", daemon=True).start()
+
+
+def pending_access_count(memory_id):
+    with _ACCESS_LOCK:
+        return _PENDING_ACCESS.get(memory_id, 0)
+
+
+def flush_access_counts():
+    """Write buffered access counts in a single transaction. Returns the number of rows touched."""
+    global _ACCESS_TIMER
+    with _ACCESS_LOCK:
+        pending = dict(_PENDING_ACCESS)
+        _PENDING_ACCESS.clear()
+        if _ACCESS_TIMER is not None:
+            _ACCESS_TIMER.cancel()
+            _ACCESS_TIMER = None
+    if not pending:
+        return 0
+    try:
+        with db_connection() as conn:
+            conn.executemany(
+                "UPDATE memories SET access_count = access_count + ? WHERE id = ?",
+                [(count, memory_id) for memory_id, count in pending.items()],
+            )
+            conn.commit()
+    except sqlite3.Error:
+        logging.getLogger("uvicorn.error").warning("[custodian] memory access flush failed", exc_info=True)
+        with _ACCESS_LOCK:
+            _PENDING_ACCESS.update(pending)
+        return 0
+    return len(pending)
+
+
+atexit.register(flush_access_counts)
 
 def _format_memory(row):
     """Format a memory row for display."""
@@ -139,8 +169,9 @@ async def handle_memory_store(args):
                VALUES (?, ?, ?, 'mcp', ?, ?, ?)""",
             (content, tags, project_id, importance, now, now),
         )
-        conn.commit()
         memory_id = cursor.lastrowid
+        index_memory(conn, memory_id, content, tags)
+        conn.commit()
 
     return [TextContent(
         type="text",
@@ -148,11 +179,14 @@ async def handle_memory_store(args):
     )]
 
 async def handle_memory_search(args):
-    """Search memories with FTS5 or filters."""
+    """Search memories: bm25 and local vector rankings fused with RRF, or filters only."""
     query = args.get("query", "").strip()
     project_name = args.get("project", "")
     filter_tags = args.get("tags", [])
     limit = min(args.get("limit", 20), 100)
+    mode = args.get("mode", "hybrid")
+    if mode not in {"hybrid", "lexical", "vector"}:
+        return [TextContent(type="text", text="Error: 'mode' must be one of: hybrid, lexical, vector.")]
 
     with db_connection() as conn:
         project_id = None
@@ -162,27 +196,20 @@ async def handle_memory_search(args):
                 project_id = project["id"]
 
         if query:
-            # FTS5 search with bm25 ranking
-            sql = """
-                SELECT m.*, p.name as project_name, bm25(memories_fts) as rank
-                FROM memories_fts fts
-                JOIN memories m ON m.id = fts.rowid
-                LEFT JOIN projects p ON p.id = m.project_id
-                WHERE memories_fts MATCH ?
-            """
-            params = [query]
-
-            if project_id is not None:
-                sql += " AND (m.project_id = ? OR m.project_id IS NULL)"
-                params.append(project_id)
-
-            if filter_tags:
-                for tag in filter_tags:
-                    sql += " AND EXISTS (SELECT 1 FROM json_each(m.tags) WHERE json_each.value = ?)"
-                    params.append(tag)
-
-            sql += " ORDER BY rank LIMIT ?"
-            params.append(limit)
+            ranked_ids = hybrid_search(conn, query, project_id=project_id, tags=filter_tags, limit=limit, mode=mode)
+            rows = []
+            if ranked_ids:
+                placeholders = ",".join("?" for _ in ranked_ids)
+                by_id = {
+                    r["id"]: r
+                    for r in conn.execute(
+                        f"""SELECT m.*, p.name as project_name FROM memories m
+                            LEFT JOIN projects p ON p.id = m.project_id
+                            WHERE m.id IN ({placeholders})""",
+                        ranked_ids,
+                    ).fetchall()
+                }
+                rows = [by_id[memory_id] for memory_id in ranked_ids if memory_id in by_id]
         else:
             # No query — filter only
             sql = """
@@ -197,21 +224,20 @@ async def handle_memory_search(args):
                 sql += " AND (m.project_id = ? OR m.project_id IS NULL)"
                 params.append(project_id)
 
-            if filter_tags:
-                for tag in filter_tags:
-                    sql += " AND EXISTS (SELECT 1 FROM json_each(m.tags) WHERE json_each.value = ?)"
-                    params.append(tag)
+            tag_sql, tag_params = tag_filter_sql(filter_tags)
+            sql += tag_sql
+            params.extend(tag_params)
 
             sql += " ORDER BY m.importance DESC, m.updated_at DESC LIMIT ?"
             params.append(limit)
 
-        rows = conn.execute(sql, params).fetchall()
+            rows = conn.execute(sql, params).fetchall()
 
         if not rows:
             return [TextContent(type="text", text="No memories found.")]
 
         ids = [r["id"] for r in rows]
-        _bump_access(conn, ids)
+        _bump_access(ids)
 
     lines = [f"Found {len(rows)} memory/memories:\n"]
     for r in rows:
@@ -234,7 +260,7 @@ async def handle_memory_get(args):
         if not row:
             return [TextContent(type="text", text=f"Memory #{memory_id} not found.")]
 
-        _bump_access(conn, [memory_id])
+        _bump_access([memory_id])
 
     result = {
         "id": row["id"],
@@ -244,7 +270,7 @@ async def handle_memory_get(args):
         "importance": row["importance"],
         "created_at": row["created_at"],
         "updated_at": row["updated_at"],
-        "access_count": (row["access_count"] or 0) + 1,
+        "access_count": (row["access_count"] or 0) + pending_access_count(row["id"]),
     }
     return [TextContent(type="text", text=json.dumps(result, indent=2))]
 
@@ -328,6 +354,9 @@ async def handle_memory_update(args):
             f"UPDATE memories SET {', '.join(updates)} WHERE id = ?",
             params,
         )
+        if "content" in args or "tags" in args:
+            row = conn.execute("SELECT content, tags FROM memories WHERE id = ?", (memory_id,)).fetchone()
+            index_memory(conn, memory_id, row["content"], row["tags"])
         conn.commit()
 
     return [TextContent(type="text", text=f"Memory #{memory_id} updated.")]
@@ -349,15 +378,39 @@ async def handle_memory_delete(args):
 
     return [TextContent(type="text", text=f"Memory #{memory_id} deleted.")]
 
+def _context_sql(project_filter, *, with_topics):
+    """Rank context candidates in tiers: importance >= 7, recently accessed, topic FTS match."""
+    topic_cte = ""
+    topic_join = ""
+    topic_tier = ""
+    topic_match = ""
+    topic_order = ""
+    if with_topics:
+        topic_cte = "WITH topic AS (SELECT rowid AS id, bm25(memories_fts) AS rank FROM memories_fts WHERE memories_fts MATCH ?)"
+        topic_join = "LEFT JOIN topic t ON t.id = m.id"
+        topic_tier = "WHEN t.id IS NOT NULL THEN 2"
+        topic_match = "OR t.id IS NOT NULL"
+        topic_order = "CASE WHEN m.importance >= 7 OR m.access_count > 0 THEN NULL ELSE t.rank END,"
+    return f"""{topic_cte}
+        SELECT m.*, p.name as project_name,
+               CASE WHEN m.importance >= 7 THEN 0 WHEN m.access_count > 0 THEN 1 {topic_tier} END AS tier
+        FROM memories m
+        LEFT JOIN projects p ON p.id = m.project_id
+        {topic_join}
+        WHERE (m.importance >= 7 OR m.access_count > 0 {topic_match}) {project_filter}
+        ORDER BY tier,
+                 CASE WHEN m.importance >= 7 THEN m.importance END DESC,
+                 {topic_order}
+                 m.updated_at DESC
+        LIMIT ?"""
+
+
 async def handle_memory_context(args):
-    """Load relevant memories for session context. 3-pass merge: high-importance, recent, topic-matched."""
+    """Load relevant memories for session context in one ranked read: high-importance, recent, topic-matched."""
     project_name = args.get("project", "")
     topics = args.get("topics", [])
     limit = min(args.get("limit", 30), 100)
 
-    seen_ids = set()
-    results = []
-
     with db_connection() as conn:
         project_id = None
         if project_name:
@@ -371,61 +424,20 @@ async def handle_memory_context(args):
             project_filter = "AND (m.project_id = ? OR m.project_id IS NULL)"
             project_params = (project_id,)
 
-        # Pass 1: High-importance memories (>= 7)
-        rows = conn.execute(
-            f"""SELECT m.*, p.name as project_name FROM memories m
-                LEFT JOIN projects p ON p.id = m.project_id
-                WHERE m.importance >= 7 {project_filter}
-                ORDER BY m.importance DESC, m.updated_at DESC
-                LIMIT ?""",
-            (*project_params, limit),
-        ).fetchall()
-        for r in rows:
-            if r["id"] not in seen_ids:
-                seen_ids.add(r["id"])
-                results.append(r)
-
-        # Pass 2: Recently accessed
-        remaining = limit - len(results)
-        if remaining > 0:
-            rows = conn.execute(
-                f"""SELECT m.*, p.name as project_name FROM memories m
-                    LEFT JOIN projects p ON p.id = m.project_id
-                    WHERE m.access_count > 0 {project_filter}
-                    ORDER BY m.updated_at DESC
-                    LIMIT ?""",
-                (*project_params, remaining),
-            ).fetchall()
-            for r in rows:
-                if r["id"] not in seen_ids:
-                    seen_ids.add(r["id"])
-                    results.append(r)
-
-        # Pass 3: Topic FTS match
-        remaining = limit - len(results)
-        if remaining > 0 and topics:
-            topic_query = " OR ".join(topics)
+        # One ranked pass: high-importance first, then recently accessed, then topic matches.
+        results = []
+        if topics:
             try:
-                rows = conn.execute(
-                    f"""SELECT m.*, p.name as project_name, bm25(memories_fts) as rank
-                        FROM memories_fts fts
-                        JOIN memories m ON m.id = fts.rowid
-                        LEFT JOIN projects p ON p.id = m.project_id
-                        WHERE memories_fts MATCH ?
-                        {project_filter.replace('m.project_id', 'm.project_id')}
-                        ORDER BY rank LIMIT ?""",
-                    (topic_query, *project_params, remaining),
+                results = conn.execute(
+                    _context_sql(project_filter, with_topics=True),
+                    (" OR ".join(topics), *project_params, limit),
                 ).fetchall()
-                for r in rows:
-                    if r["id"] not in seen_ids:
-                        seen_ids.add(r["id"])
-                        results.append(r)
-            except Exception:
-                pass  # FTS query syntax error — skip topic matching
+            except sqlite3.OperationalError:
+                topics = []  # FTS query syntax error — skip topic matching
+        if not topics:
+            results = conn.execute(_context_sql(project_filter, with_topics=False), (*project_params, limit)).fetchall()
 
-        # Bump access counts
-        all_ids = [r["id"] for r in results]
-        _bump_access(conn, all_ids)
+    _bump_access([r["id"] for r in results])
 
     if not results:
         return [TextContent(type="text", text="No memories found for this context.")]
@@ -476,6 +488,7 @@ async def handle_flag_memory_drift(args):
                 return [TextContent(type="text", text=json.dumps(dict(row), indent=2))]
             except sqlite3.IntegrityError:
                 conn.rollback()
+                sequences.resync(conn, "memory_flags", "MF")
                 continue
 
     return [TextContent(type="text", text="Error: could not generate a unique MF-ID. Please try again.")]
@@ -0,0 +1,213 @@
+"""Local sparse-vector index and hybrid ranking for memories.
+
+Each memory is embedded as a hashed term-frequency vector: word tokens plus a
+5-character prefix stem for longer words, each hashed with CRC32 into a
+feature id. Document weights are ``1 + log(tf)`` cosine-normalised and live in
+``memory_vector_terms``; the query side carries the IDF (SMART ``lnc.ltc``), so
+adding or removing a memory never re-weights anything already stored.
+``memory_vector_df`` keeps document frequencies and is maintained by triggers.
+
+``hybrid_search`` fuses the FTS5 bm25 ranking with the cosine ranking using
+reciprocal rank fusion. Everything is plain SQLite, offline and CPU-only.
+"""
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+import zlib
+from collections import Counter
+
+RRF_K = 60
+PREFIX_STEM_CHARS = 5
+PREFIX_WEIGHT = 0.5
+# Query features present in more than this share of memories carry no signal
+# and would only make the posting-list scan long.
+MAX_FEATURE_DF_RATIO = 0.5
+CANDIDATE_FLOOR = 50
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its me my no not of on "
+    "or our so that the their then there these they this to was we were what when where which who why will with "
+    "you your".split()
+)
+
+
+def _tokens(text: str) -> list[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+def _feature_id(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def features(text: str) -> Counter:
+    """Return weighted term counts keyed by hashed feature id."""
+    counts: Counter = Counter()
+    for token in _tokens(text):
+        counts[_feature_id(f"w:{token}")] += 1.0
+        if len(token) > PREFIX_STEM_CHARS:
+            counts[_feature_id(f"p:{token[:PREFIX_STEM_CHARS]}")] += PREFIX_WEIGHT
+    return counts
+
+
+def _document_vector(text: str) -> dict[int, float]:
+    weights = {feature: 1.0 + math.log(count) if count >= 1 else count for feature, count in features(text).items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    if not norm:
+        return {}
+    return {feature: weight / norm for feature, weight in weights.items()}
+
+
+def _memory_text(content: str, tags: str | list | None) -> str:
+    if isinstance(tags, list):
+        tag_text = " ".join(str(tag) for tag in tags)
+    else:
+        tag_text = str(tags or "")
+    return f"{content}\n{tag_text}"
+
+
+def index_memory(conn: sqlite3.Connection, memory_id: int, content: str, tags: str | list | None = None) -> int:
+    """(Re)build the vector for one memory. Call inside the writing transaction."""
+    conn.execute("DELETE FROM memory_vector_terms WHERE memory_id = ?", (memory_id,))
+    vector = _document_vector(_memory_text(content, tags))
+    conn.executemany(
+        "INSERT INTO memory_vector_terms (feature, memory_id, weight) VALUES (?, ?, ?)",
+        [(feature, memory_id, weight) for feature, weight in vector.items()],
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO memory_vector_docs (memory_id, indexed_at) VALUES (?, datetime('now'))",
+        (memory_id,),
+    )
+    return len(vector)
+
+
+def index_missing(conn: sqlite3.Connection, batch_size: int = 500) -> int:
+    """Index every memory without a current vector. Returns how many were indexed."""
+    indexed = 0
+    while True:
+        rows = conn.execute(
+            """SELECT m.id, m.content, m.tags FROM memories m
+               LEFT JOIN memory_vector_docs d ON d.memory_id = m.id
+               WHERE d.memory_id IS NULL
+               LIMIT ?""",
+            (batch_size,),
+        ).fetchall()
+        if not rows:
+            return indexed
+        for memory_id, content, tags in rows:
+            index_memory(conn, memory_id, content or "", tags)
+        conn.commit()
+        indexed += len(rows)
+
+
+def _query_vector(conn: sqlite3.Connection, text: str) -> dict[int, float]:
+    counts = features(text)
+    if not counts:
+        return {}
+    total = conn.execute("SELECT COUNT(*) FROM memory_vector_docs").fetchone()[0]
+    if not total:
+        return {}
+    placeholders = ",".join("?" for _ in counts)
+    df = dict(
+        conn.execute(f"SELECT feature, df FROM memory_vector_df WHERE feature IN ({placeholders})", list(counts)).fetchall()
+    )
+    weights = {}
+    for feature, count in counts.items():
+        frequency = df.get(feature, 0)
+        if not frequency or frequency > total * MAX_FEATURE_DF_RATIO:
+            continue
+        tf = 1.0 + math.log(count) if count >= 1 else count
+        weights[feature] = tf * math.log((total + 1) / frequency)
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {feature: weight / norm for feature, weight in weights.items()} if norm else {}
+
+
+def tag_filter_sql(tags: list[str], alias: str = "m") -> tuple[str, list]:
+    """SQL fragment requiring every tag in ``tags``, answered from ``memory_tags``."""
+    unique = sorted({str(tag) for tag in tags})
+    if not unique:
+        return "", []
+    placeholders = ",".join("?" for _ in unique)
+    return (
+        f" AND {alias}.id IN (SELECT memory_id FROM memory_tags WHERE tag IN ({placeholders})"
+        f" GROUP BY memory_id HAVING COUNT(*) = ?)",
+        [*unique, len(unique)],
+    )
+
+
+def _scope_sql(project_id: int | None, tags: list[str]) -> tuple[str, list]:
+    sql = ""
+    params: list = []
+    if project_id is not None:
+        sql += " AND (m.project_id = ? OR m.project_id IS NULL)"
+        params.append(project_id)
+    tag_sql, tag_params = tag_filter_sql(tags)
+    return sql + tag_sql, params + tag_params
+
+
+def lexical_ranking(conn: sqlite3.Connection, query: str, project_id: int | None, tags: list[str], limit: int) -> list[int]:
+    scope_sql, scope_params = _scope_sql(project_id, tags)
+    try:
+        rows = conn.execute(
+            f"""SELECT m.id FROM memories_fts fts
+                JOIN memories m ON m.id = fts.rowid
+                WHERE memories_fts MATCH ? {scope_sql}
+                ORDER BY bm25(memories_fts) LIMIT ?""",
+            [query, *scope_params, limit],
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Not valid FTS5 syntax; the vector ranking still answers the query.
+        return []
+    return [row[0] for row in rows]
+
+
+def vector_ranking(conn: sqlite3.Connection, query: str, project_id: int | None, tags: list[str], limit: int) -> list[tuple[int, float]]:
+    vector = _query_vector(conn, query)
+    if not vector:
+        return []
+    scope_sql, scope_params = _scope_sql(project_id, tags)
+    values = ",".join("(?, ?)" for _ in vector)
+    rows = conn.execute(
+        f"""WITH q(feature, weight) AS (VALUES {values})
+            SELECT t.memory_id, SUM(t.weight * q.weight) AS score
+            FROM q
+            JOIN memory_vector_terms t ON t.feature = q.feature
+            JOIN memories m ON m.id = t.memory_id
+            WHERE 1=1 {scope_sql}
+            GROUP BY t.memory_id
+            ORDER BY score DESC
+            LIMIT ?""",
+        [value for item in vector.items() for value in item] + scope_params + [limit],
+    ).fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = RRF_K) -> list[tuple[int, float]]:
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, memory_id in enumerate(ranking, start=1):
+            scores[memory_id] = scores.get(memory_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def hybrid_search(
+    conn: sqlite3.Connection,
+    query: str,
+    *,
+    project_id: int | None = None,
+    tags: list[str] | None = None,
+    limit: int = 20,
+    mode: str = "hybrid",
+) -> list[int]:
+    """Return memory ids ranked by ``mode``: ``hybrid`` (RRF), ``lexical`` or ``vector``."""
+    tags = tags or []
+    depth = max(limit * 3, CANDIDATE_FLOOR)
+    lexical = lexical_ranking(conn, query, project_id, tags, depth) if mode in {"hybrid", "lexical"} else []
+    vector = [memory_id for memory_id, _score in vector_ranking(conn, query, project_id, tags, depth)] if mode in {"hybrid", "vector"} else []
+    if mode == "lexical":
+        return lexical[:limit]
+    if mode == "vector":
+        return vector[:limit]
+    return [memory_id for memory_id, _score in reciprocal_rank_fusion([lexical, vector])[:limit]]
@@ -6,6 +6,7 @@ import sqlite3
 from datetime import datetime
 from mcp.types import TextContent
 
+from custodian.db import sequences
 from custodian.db.connection import db_connection
 from custodian.db.tasks import _parse_stored_json_array
 from custodian.db.system import log_query, normalize_since_input
@@ -89,17 +90,10 @@ def _serialize_changelog_entry_row(row):
     }
 
 def _next_meta_id(conn, table_name, prefix):
-    """Generate the next race-safe meta-log ID for a supported table."""
+    """Allocate the next meta-log ID for a supported table from its sequence."""
     if table_name not in {"friction_points", "changelog_entries", "memory_flags"}:
         raise ValueError(f"Unsupported meta-log table: {table_name}")
-
-    start_index = len(prefix) + 2
-    max_num = conn.execute(
-        f"SELECT MAX(CAST(SUBSTR(id, ?) AS INTEGER)) FROM {table_name} WHERE id LIKE ?",
-        (start_index, f"{prefix}-%"),
-    ).fetchone()[0]
-    next_num = (max_num or 0) + 1
-    return f"{prefix}-{next_num:03d}"
+    return sequences.next_id(conn, table_name, prefix)
 
 async def handle_add_system_update(args):
     title = args.get("title", "").strip()
@@ -227,6 +221,7 @@ async def handle_log_friction_point(args):
                 return [TextContent(type="text", text=json.dumps(dict(row), indent=2))]
             except sqlite3.IntegrityError:
                 conn.rollback()
+                sequences.resync(conn, "friction_points", "FP")
                 continue
 
     return [TextContent(type="text", text="Error: could not generate a unique FP-ID. Please try again.")]
@@ -319,6 +314,7 @@ async def handle_log_changelog_entry(args):
                 return [TextContent(type="text", text=json.dumps(dict(row), indent=2))]
             except sqlite3.IntegrityError:
                 conn.rollback()
+                sequences.resync(conn, "changelog_entries", "CL")
                 continue
 
     return [TextContent(type="text", text="Error: could not generate a unique CL-ID. Please try again.")]
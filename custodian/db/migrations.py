@@ -4,6 +4,8 @@ import os
 import sqlite3
 
 from custodian.db.connection import DB_PATH
+from custodian.db.memory_index import index_missing
+from custodian.db.sequences import seed_sequences
 from custodian.oauth_provider import ensure_oauth_schema
 
 
@@ -85,6 +87,61 @@ def _migration_002_workstations(conn: sqlite3.Connection) -> None:
     _ensure_column(conn, "agents", "workstation", "TEXT")
 
 
+def _migration_003_memory_index(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO memory_tags(tag, memory_id)
+        SELECT j.value, m.id
+        FROM memories m, json_each(CASE WHEN json_valid(m.tags) THEN m.tags ELSE '[]' END) j
+        WHERE j.type = 'text'
+          AND NOT EXISTS (SELECT 1 FROM memory_tags t WHERE t.memory_id = m.id)
+        """
+    )
+    index_missing(conn)
+
+
+def _migration_004_memory_fts_trigger(conn: sqlite3.Connection) -> None:
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'memories_au'").fetchone()
+    if row is not None and "UPDATE OF" in row[0]:
+        return
+    conn.executescript(
+        """
+        DROP TRIGGER IF EXISTS memories_au;
+        CREATE TRIGGER memories_au AFTER UPDATE OF content, tags ON memories BEGIN
+            INSERT INTO memories_fts(memories_fts, rowid, content, tags) VALUES ('delete', old.id, old.content, old.tags);
+            INSERT INTO memories_fts(rowid, content, tags) VALUES (new.id, new.content, new.tags);
+        END;
+        """
+    )
+
+
+def _migration_005_agent_tool_concurrency(conn: sqlite3.Connection) -> None:
+    _ensure_column(conn, "agents", "tool_concurrency", "INTEGER")
+
+
+def _migration_006_agent_progress(conn: sqlite3.Connection) -> None:
+    _ensure_column(conn, "agent_runs", "progress", "TEXT")
+    _ensure_column(conn, "pipeline_step_results", "progress", "TEXT")
+
+
+def _migration_007_id_sequences(conn: sqlite3.Connection) -> None:
+    seed_sequences(conn)
+
+
+def _migration_008_retention(conn: sqlite3.Connection) -> None:
+    _ensure_column(conn, "pipeline_runs", "payloads_archive", "TEXT")
+
+
+def _migration_009_agent_llm_cache(conn: sqlite3.Connection) -> None:
+    _ensure_column(conn, "agents", "llm_cache", "TEXT")
+
+
+def _migration_010_run_owners(conn: sqlite3.Connection) -> None:
+    for table in ("pipeline_runs", "agent_runs"):
+        _ensure_column(conn, table, "cancel_requested", "TEXT")
+        _ensure_column(conn, table, "heartbeat_at", "TEXT")
+
+
 def _ensure_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
     columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
     if column not in columns:
@@ -99,6 +156,14 @@ def run_migrations() -> None:
             conn.executescript(handle.read())
         _migration_001_native_extensions(conn)
         _migration_002_workstations(conn)
+        _migration_003_memory_index(conn)
+        _migration_004_memory_fts_trigger(conn)
+        _migration_005_agent_tool_concurrency(conn)
+        _migration_006_agent_progress(conn)
+        _migration_007_id_sequences(conn)
+        _migration_008_retention(conn)
+        _migration_009_agent_llm_cache(conn)
+        _migration_010_run_owners(conn)
         conn.commit()
     finally:
         conn.close()
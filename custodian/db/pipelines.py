@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import collections
 import json
 import os
@@ -15,7 +16,9 @@ import time
 from datetime import datetime
 from urllib.parse import quote
 
+from custodian.db import retention, run_owners
 from custodian.db.connection import DB_PATH, db_connection
+from custodian.db.system import log_query
 from mcp.types import TextContent
 
 LIVE_FILE_TREE_ENTRY_LIMIT = 50
@@ -56,17 +59,10 @@ def _find_symbol(*args, **kwargs):
     return find_symbol(*args, **kwargs)
 
 
-def get_project_by_name(conn, name):
-    row = conn.execute("SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    row = conn.execute("SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    return conn.execute("SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'", (f"%{name}%",)).fetchone()
 
 from pathlib import Path
 from custodian.pipeline import DEFAULT_OUTPUT_BASE, PipelineError, PipelinePaused, PipelineRun, PipelineSpec
+from custodian.services import cancellation
 from datetime import timedelta
 from datetime import datetime as _datetime
 
@@ -88,7 +84,7 @@ def _pipeline_run_summary(conn, run_row):
     pipeline = conn.execute("SELECT name FROM pipelines WHERE id = ?", (run_row["pipeline_id"],)).fetchone()
     step_rows = conn.execute(
         """
-        SELECT step_name, step_type, status, duration_ms, error, iteration_index, output
+        SELECT step_name, step_type, status, duration_ms, error, iteration_index, output, progress
         FROM pipeline_step_results
         WHERE run_id = ?
         ORDER BY id
@@ -108,6 +104,8 @@ def _pipeline_run_summary(conn, run_row):
                     "duration_ms": row["duration_ms"],
                     "error": row["error"],
                 }
+                if row["status"] == "running" and row["progress"]:
+                    item["progress"] = json.loads(row["progress"])
                 if row["step_type"] in {"foreach", "watcher"} and row["output"]:
                     payload = json.loads(row["output"])
                     results = payload.get("results", []) if isinstance(payload, dict) else payload
@@ -128,6 +126,7 @@ def _pipeline_run_summary(conn, run_row):
         "stats": json.loads(run_row["stats"]) if run_row["stats"] else None,
         "output_dir": run_row["output_dir"],
         "error": run_row["error"],
+        "payloads_archived": bool(run_row["payloads_archive"]),
         "steps": list(grouped.values()),
     }
 
@@ -187,10 +186,13 @@ async def handle_create_pipeline(args):
 async def handle_invoke_pipeline(args):
     pipeline_ref = args.get("pipeline")
     input_data = args.get("input")
+    timeout_seconds = args.get("timeout_seconds")
     log_query("invoke_pipeline", None, {"pipeline": pipeline_ref})
 
     if not isinstance(input_data, dict):
         return [TextContent(type="text", text="Error: 'input' must be an object.")]
+    if timeout_seconds is not None and (isinstance(timeout_seconds, bool) or not isinstance(timeout_seconds, (int, float)) or timeout_seconds <= 0):
+        return [TextContent(type="text", text="Error: 'timeout_seconds' must be a positive number.")]
 
     with db_connection() as conn:
         pipeline_row = _pipeline_row_by_ref(conn, pipeline_ref)
@@ -230,6 +232,7 @@ async def handle_invoke_pipeline(args):
         run_id=run_id,
         run_name=run_name,
         output_dir=output_dir,
+        timeout_seconds=timeout_seconds,
     )
     try:
         result = await runner.execute()
@@ -287,6 +290,11 @@ async def handle_resume_pipeline_run(args):
         pipeline_row = conn.execute("SELECT * FROM pipelines WHERE id = ?", (run_row["pipeline_id"],)).fetchone()
         if not pipeline_row:
             return [TextContent(type="text", text="Error: pipeline for run not found.")]
+        if run_row["payloads_archive"]:
+            try:
+                retention.restore_run_payloads(conn, int(run_id))
+            except OSError as exc:
+                return [TextContent(type="text", text=f"Error: could not restore archived step payloads: {exc}")]
 
         if run_row["status"] == "paused":
             current_step = run_row["current_step"]
@@ -346,6 +354,66 @@ async def handle_resume_pipeline_run(args):
         return [TextContent(type="text", text=json.dumps(result, indent=2))]
     return [TextContent(type="text", text=json.dumps(result, indent=2))]
 
+async def handle_cancel_pipeline_run(args):
+    run_id = args.get("run_id")
+    reason = str(args.get("reason") or "").strip() or "cancelled by cancel_pipeline_run"
+    if run_id is None:
+        return [TextContent(type="text", text="Error: 'run_id' is required.")]
+    run_id = int(run_id)
+    with db_connection() as conn:
+        log_query(conn, "cancel_pipeline_run", None, {"run_id": run_id, "reason": reason})
+        run_row = conn.execute("SELECT * FROM pipeline_runs WHERE id = ?", (run_id,)).fetchone()
+    if not run_row:
+        return [TextContent(type="text", text="Error: pipeline run not found.")]
+    if run_row["status"] not in ("running", "paused"):
+        return [TextContent(type="text", text=f"Error: pipeline run {run_id} is already {run_row['status']}.")]
+
+    cancelling = [TextContent(type="text", text=json.dumps({"run_id": run_id, "status": "cancelling", "reason": reason}, indent=2))]
+    if run_row["status"] == "running":
+        if cancellation.cancel("pipeline", run_id, reason):
+            # The runner unwinds in its own call and records the cancelled step and run.
+            return cancelling
+        with db_connection() as conn:
+            if run_owners.owner_alive(conn, "pipeline", run_id):
+                # Another process runs it: leave the request for its watcher, which cancels the runner there.
+                run_owners.request_cancel(conn, "pipeline", run_id, reason)
+                conn.commit()
+                return cancelling
+
+    # Paused, or running in a process that no longer exists: close the records here.
+    from custodian.services.workstations import release_agent_slots
+
+    released = []
+    with db_connection() as conn:
+        conn.execute(
+            """
+            UPDATE pipeline_step_results
+            SET status = 'cancelled', error = ?, finished_at = datetime('now')
+            WHERE run_id = ? AND status IN ('running', 'waiting')
+            """,
+            (reason, run_id),
+        )
+        agent_runs = conn.execute(
+            "SELECT id FROM agent_runs WHERE pipeline_id = ? AND status = 'running' AND started_at >= ?",
+            (run_row["pipeline_id"], run_row["started_at"]),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE agent_runs SET status = 'cancelled', error = ?, finished_at = datetime('now') WHERE id = ?",
+            [(reason, row["id"]) for row in agent_runs],
+        )
+        conn.execute(
+            "UPDATE pipeline_runs SET status = 'cancelled', error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (reason, run_id),
+        )
+        conn.commit()
+    for row in agent_runs:
+        released.extend(await asyncio.to_thread(release_agent_slots, row["id"]))
+    with db_connection() as conn:
+        result = _pipeline_run_summary(conn, conn.execute("SELECT * FROM pipeline_runs WHERE id = ?", (run_id,)).fetchone())
+    if released:
+        result["released_slots"] = len(released)
+    return [TextContent(type="text", text=json.dumps(result, indent=2))]
+
 async def handle_list_pipelines(args):
     status = str(args.get("status") or "").strip()
 
@@ -409,5 +477,9 @@ async def resume_pipeline_run(conn, **params):
     return _unwrap(await handle_resume_pipeline_run(params))
 
 
+async def cancel_pipeline_run(conn, **params):
+    return _unwrap(await handle_cancel_pipeline_run(params))
+
+
 async def list_pipelines(conn, **params):
     return _unwrap(await handle_list_pipelines(params))
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
+import asyncio
 import collections
-import concurrent.futures
 import json
 import logging
 import os
@@ -9,7 +9,6 @@ import platform as _platform
 import re
 import shlex
 import sqlite3
-import subprocess
 import sys
 import tempfile
 import threading
@@ -18,9 +17,12 @@ from datetime import datetime
 from urllib.parse import quote
 
 from custodian.db.connection import DB_PATH, db_connection
+from custodian.services import file_tree, git_state, project_resolver
+from custodian.services.project_resolver import get_project_by_name
 from mcp.types import TextContent
 
 LIVE_FILE_TREE_ENTRY_LIMIT = 50
+LIVE_FILE_TREE_MAX_LIMIT = 500
 SHARED_FOLDER_ROOT = "/mnt/c/Users/Big A/custodian-shared"
 SHARED_FOLDER_MAX_BYTES = 5 * 1024 * 1024
 SHARED_FOLDER_BINARY_SNIFF_BYTES = 8192
@@ -58,14 +60,6 @@ def _find_symbol(*args, **kwargs):
     return find_symbol(*args, **kwargs)
 
 
-def get_project_by_name(conn, name):
-    row = conn.execute("SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    row = conn.execute("SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    return conn.execute("SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'", (f"%{name}%",)).fetchone()
 
 def _shared_project_root(project_name):
     return os.path.join(SHARED_FOLDER_ROOT, project_name)
@@ -228,178 +222,20 @@ def _build_fossil_description_map(file_tree_value):
             descriptions[rel_path.replace("\\", "/")] = description
     return descriptions
 
-def _stat_file_tree_entry(args):
-    """Read file metadata for one live file tree entry."""
-    full_path, rel_path, fossil_descriptions = args
-    try:
-        stat = os.stat(full_path)
-    except OSError:
-        return None
-
-    item = {
-        "path": rel_path,
-        "size": stat.st_size,
-        "mtime": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-    }
-    description = fossil_descriptions.get(rel_path)
-    if description:
-        item["description"] = description
-    return item
-
-def _path_allowed_for_live_tree(rel_path, excluded_dirs, max_depth):
-    """Apply directory exclusions and depth limit to a relative file path."""
-    normalized = rel_path.replace("\\", "/")
-    parts = [part for part in normalized.split("/") if part and part != "."]
-    if not parts:
-        return False
-    if len(parts) > max_depth:
-        return False
-    for part in parts[:-1]:
-        if part in excluded_dirs or part.endswith(".egg-info"):
-            return False
-    return True
-
-def _build_live_file_tree(project_path, fossil_descriptions, max_entries=500, max_depth=8):
-    """Walk the live project tree and return compact file metadata."""
-    excluded_dirs = {
-        "node_modules", ".git", "dist", ".next", "__pycache__",
-        ".venv", "build", ".cache", "target", ".pytest_cache",
-        ".idea", ".vscode", "coverage", "htmlcov",
-    }
-    entries = []
-    pending_stats = []
-    total_files = 0
-
-    git_dir = os.path.join(project_path, ".git")
-    if os.path.exists(git_dir):
-        try:
-            git_list = subprocess.run(
-                ["git", "-C", project_path, "ls-files", "-co", "--exclude-standard"],
-                capture_output=True,
-                text=True,
-                timeout=2,
-            )
-            if git_list.returncode == 0:
-                for raw_path in git_list.stdout.splitlines():
-                    rel_path = raw_path.strip().replace("\\", "/")
-                    if not rel_path or not _path_allowed_for_live_tree(rel_path, excluded_dirs, max_depth):
-                        continue
-                    total_files += 1
-                    if len(pending_stats) < max_entries:
-                        pending_stats.append((os.path.join(project_path, rel_path), rel_path, fossil_descriptions))
-
-                if pending_stats or total_files == 0:
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
-                        for item in executor.map(_stat_file_tree_entry, pending_stats):
-                            if item is not None:
-                                entries.append(item)
-                    entries.sort(key=lambda item: item["path"])
-                    return {
-                        "entries": entries,
-                        "total_files": total_files,
-                        "truncated_at": max_entries if total_files > max_entries else None,
-                    }
-        except Exception:
-            pass
-
-    for root, dirs, files in os.walk(project_path):
-        rel_root = os.path.relpath(root, project_path)
-        depth = 0 if rel_root == "." else rel_root.count(os.sep) + 1
-        dirs[:] = [
-            d for d in dirs
-            if d not in excluded_dirs and not d.endswith(".egg-info")
-        ]
-        if depth >= max_depth:
-            dirs[:] = []
-
-        for filename in files:
-            full_path = os.path.join(root, filename)
-            rel_path = os.path.relpath(full_path, project_path).replace("\\", "/")
-            total_files += 1
-            if len(pending_stats) >= max_entries:
-                continue
-
-            pending_stats.append((full_path, rel_path, fossil_descriptions))
-
-    if pending_stats:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
-            for item in executor.map(_stat_file_tree_entry, pending_stats):
-                if item is not None:
-                    entries.append(item)
-
-    entries.sort(key=lambda item: item["path"])
-    return {
-        "entries": entries,
-        "total_files": total_files,
-        "truncated_at": max_entries if total_files > max_entries else None,
-    }
-
-def _parse_git_status(stdout, max_entries=50):
-    """Parse git status --porcelain into capped buckets."""
-    status = {
-        "modified": [],
-        "added": [],
-        "deleted": [],
-        "untracked": [],
-    }
-
-    for raw_line in stdout.splitlines():
-        if not raw_line:
-            continue
-        code = raw_line[:2]
-        path = raw_line[3:].strip()
-        if not path:
-            continue
-
-        if code == "??":
-            bucket = "untracked"
-        elif "D" in code:
-            bucket = "deleted"
-        elif "A" in code:
-            bucket = "added"
-        else:
-            bucket = "modified"
-
-        if len(status[bucket]) < max_entries:
-            status[bucket].append(path)
-
-    return status
-
-def _parse_git_log(stdout):
-    """Parse git log --oneline output into hash/message pairs."""
-    commits = []
-    for line in stdout.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split(" ", 1)
-        commits.append({
-            "hash": parts[0],
-            "message": parts[1] if len(parts) > 1 else "",
-        })
-    return commits
-
-def _run_git_command(project_path, *git_args):
-    """Run a small git command with a short timeout."""
-    try:
-        result = subprocess.run(
-            ["git", "-C", project_path, *git_args],
-            capture_output=True,
-            text=True,
-            timeout=2,
-        )
-    except subprocess.TimeoutExpired:
-        return None, "git command timed out after 2 seconds"
-    except FileNotFoundError:
-        return None, "git executable not available"
-    except Exception as e:
-        return None, f"git command failed: {e}"
-
-    if result.returncode != 0:
-        error = (result.stderr or result.stdout or "git command failed").strip()
-        return None, error or "git command failed"
-
-    return result.stdout, None
+def _build_live_file_tree(project_path, fossil_descriptions, max_entries=500, max_depth=8, prefix="", offset=0):
+    """Return one page of the live project tree from the watched in-memory cache."""
+    snapshot = file_tree.get_tree(project_path).snapshot(
+        prefix=prefix,
+        offset=offset,
+        limit=max_entries,
+        max_depth=max_depth,
+    )
+    for entry in snapshot["entries"]:
+        entry["mtime"] = datetime.fromtimestamp(entry["mtime"]).isoformat()
+        description = fossil_descriptions.get(entry["path"])
+        if description:
+            entry["description"] = description
+    return snapshot
 
 def _decode_session_update_row(row):
     """Normalize a session_updates row for get_project_state output."""
@@ -434,6 +270,19 @@ def _decode_session_update_row(row):
         "source": row["source"],
     }
 
+_PROJECTS_ROOT_LISTING = (None, [])
+
+
+def _projects_root_entries(projects_root):
+    """List ``projects_root``, re-reading it only when its mtime changes."""
+    global _PROJECTS_ROOT_LISTING
+    mtime = os.stat(projects_root).st_mtime_ns
+    cached_mtime, entries = _PROJECTS_ROOT_LISTING
+    if cached_mtime != mtime:
+        entries = [entry for entry in os.listdir(projects_root) if os.path.isdir(os.path.join(projects_root, entry))]
+        _PROJECTS_ROOT_LISTING = (mtime, entries)
+    return entries
+
 def _resolve_live_project_path(project_name, stored_path):
     """Prefer a native Linux mirror under /home/dev/projects when available."""
     native_path = _to_native_path(stored_path)
@@ -442,15 +291,13 @@ def _resolve_live_project_path(project_name, stored_path):
         return native_path
 
     try:
-        entries = os.listdir(projects_root)
+        entries = _projects_root_entries(projects_root)
         for entry in entries:
-            candidate = os.path.join(projects_root, entry)
-            if entry == str(project_name) and os.path.isdir(candidate):
-                return candidate
+            if entry == str(project_name):
+                return os.path.join(projects_root, entry)
         for entry in entries:
-            candidate = os.path.join(projects_root, entry)
-            if entry.lower() == str(project_name).lower() and os.path.isdir(candidate):
-                return candidate
+            if entry.lower() == str(project_name).lower():
+                return os.path.join(projects_root, entry)
     except OSError:
         pass
 
@@ -496,6 +343,7 @@ async def handle_register_project(args):
     path = str(args.get("path") or "").strip()
     stack = str(args.get("stack") or "")
     status = str(args.get("status") or "active").strip() or "active"
+    aliases = sorted({str(alias).strip() for alias in args.get("aliases") or [] if str(alias).strip()}, key=str.lower)
     log_query("register_project", name or None, {**args, "path": path})
 
     if not name:
@@ -510,11 +358,22 @@ async def handle_register_project(args):
         ).fetchone()
         if existing:
             return [TextContent(type="text", text=f"Error: project '{name}' already exists.")]
-
-        conn.execute(
+        for alias in aliases:
+            taken = conn.execute(
+                "SELECT 1 FROM projects WHERE LOWER(name) = LOWER(?) UNION ALL SELECT 1 FROM project_aliases WHERE alias = ?",
+                (alias, alias),
+            ).fetchone()
+            if taken:
+                return [TextContent(type="text", text=f"Error: alias '{alias}' is already used by another project.")]
+
+        cursor = conn.execute(
             "INSERT INTO projects (name, path, stack, status) VALUES (?, ?, ?, ?)",
             (name, path, stack, status),
         )
+        conn.executemany(
+            "INSERT INTO project_aliases (alias, project_id) VALUES (?, ?)",
+            [(alias, cursor.lastrowid) for alias in aliases],
+        )
         conn.commit()
 
         row = conn.execute(
@@ -537,6 +396,8 @@ async def handle_register_project(args):
         "fossil_count": row["fossil_count"],
         "symbol_count": row["symbol_count"],
     }
+    if aliases:
+        project["aliases"] = aliases
     return [TextContent(type="text", text=json.dumps(project, indent=2))]
 
 async def handle_get_fossil(args):
@@ -547,7 +408,7 @@ async def handle_get_fossil(args):
     with db_connection() as conn:
         project = get_project_by_name(conn, project_name)
         if not project:
-            return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+            return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
 
         fossil = conn.execute(
             """SELECT * FROM fossils
@@ -589,13 +450,14 @@ async def handle_get_project_state(args):
     project_name = args["project"]
     include_file_tree = args.get("include_file_tree", True)
     max_recent_commits = max(1, min(int(args.get("max_recent_commits", 10)), 50))
+    file_tree_limit = max(1, min(int(args.get("file_tree_limit", LIVE_FILE_TREE_ENTRY_LIMIT)), LIVE_FILE_TREE_MAX_LIMIT))
     overall_start = time.perf_counter()
 
     fossil_duration = 0.0
     with db_connection() as conn:
         project = get_project_by_name(conn, project_name)
         if not project:
-            return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+            return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
 
         session_rows = conn.execute(
             """
@@ -653,9 +515,7 @@ async def handle_get_project_state(args):
             project_name,
             fossil=fossil_duration,
             filesystem=0.0,
-            git_branch=0.0,
-            git_status=0.0,
-            git_log=0.0,
+            git=0.0,
             session_updates=0.0,
             total=time.perf_counter() - overall_start,
         )
@@ -665,80 +525,56 @@ async def handle_get_project_state(args):
     filesystem_duration = 0.0
     if include_file_tree:
         filesystem_start = time.perf_counter()
-        result["file_tree"] = _build_live_file_tree(
+        result["file_tree"] = await asyncio.to_thread(
+            _build_live_file_tree,
             project_path,
             {},
-            max_entries=LIVE_FILE_TREE_ENTRY_LIMIT,
+            max_entries=file_tree_limit,
+            prefix=str(args.get("file_tree_path") or ""),
+            offset=max(0, int(args.get("file_tree_offset", 0))),
         )
         filesystem_duration = time.perf_counter() - filesystem_start
 
     session_updates_duration = 0.0
 
-    git_dir = os.path.join(project_path, ".git")
-    if not os.path.exists(git_dir):
+    git_start = time.perf_counter()
+    state = await asyncio.to_thread(git_state.get_git_state, project_path)
+    git_duration = time.perf_counter() - git_start
+    git_cached = bool(state and state["cached"])
+
+    if state is None:
         result["git_accessible"] = False
         result["git_reason"] = "Project is not a git repository."
-        _log_project_state_timing(
-            project_name,
-            fossil=fossil_duration,
-            filesystem=filesystem_duration,
-            git_branch=0.0,
-            git_status=0.0,
-            git_log=0.0,
-            session_updates=session_updates_duration,
-            total=time.perf_counter() - overall_start,
-        )
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
-
-    git_branch_start = time.perf_counter()
-    branch_stdout, branch_error = _run_git_command(project_path, "branch", "--show-current")
-    git_branch_duration = time.perf_counter() - git_branch_start
-    git_status_start = time.perf_counter()
-    status_stdout, status_error = _run_git_command(project_path, "status", "--porcelain")
-    git_status_duration = time.perf_counter() - git_status_start
-    git_log_start = time.perf_counter()
-    log_stdout, log_error = _run_git_command(project_path, "log", "--oneline", "-n", str(max_recent_commits))
-    git_log_duration = time.perf_counter() - git_log_start
-
-    if branch_stdout is None and status_stdout is None and log_stdout is None:
+    elif state["status"] is None and state["commits"] is None:
         result["git_accessible"] = False
-        result["git_reason"] = branch_error or status_error or log_error or "Git metadata unavailable."
-        _log_project_state_timing(
-            project_name,
-            fossil=fossil_duration,
-            filesystem=filesystem_duration,
-            git_branch=git_branch_duration,
-            git_status=git_status_duration,
-            git_log=git_log_duration,
-            session_updates=session_updates_duration,
-            total=time.perf_counter() - overall_start,
-        )
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
-
-    git_status = _parse_git_status(status_stdout or "") if status_stdout is not None else None
-    commits = _parse_git_log(log_stdout or "") if log_stdout is not None else None
-
-    result["git_accessible"] = True
-    result["git"] = {
-        "branch": branch_stdout.strip() if branch_stdout is not None else None,
-        "status": git_status,
-        "commits_since_fossil": commits,
-        "uncommitted_changes": bool(git_status and any(git_status.values())) if git_status is not None else None,
-    }
-    if branch_error or status_error or log_error:
-        result["git_errors"] = {
-            "branch": branch_error,
-            "status": status_error,
-            "commits_since_fossil": log_error,
+        result["git_reason"] = state["status_error"] or state["log_error"] or "Git metadata unavailable."
+    else:
+        branch = state["branch"] or {}
+        git_status = state["status"]
+        result["git_accessible"] = True
+        result["git"] = {
+            "branch": branch.get("head"),
+            "upstream": branch.get("upstream"),
+            "ahead": branch.get("ahead"),
+            "behind": branch.get("behind"),
+            "status": git_status,
+            "commits_since_fossil": state["commits"][:max_recent_commits] if state["commits"] is not None else None,
+            "uncommitted_changes": bool(git_status and any(git_status.values())) if git_status is not None else None,
+            "collected_at": datetime.fromtimestamp(state["collected_at"]).isoformat(timespec="seconds"),
         }
+        if state["status_error"] or state["log_error"]:
+            result["git_errors"] = {
+                "branch": state["status_error"],
+                "status": state["status_error"],
+                "commits_since_fossil": state["log_error"],
+            }
 
     _log_project_state_timing(
         project_name,
         fossil=fossil_duration,
         filesystem=filesystem_duration,
-        git_branch=git_branch_duration,
-        git_status=git_status_duration,
-        git_log=git_log_duration,
+        git=git_duration,
+        git_cached=float(git_cached),
         session_updates=session_updates_duration,
         total=time.perf_counter() - overall_start,
     )
@@ -764,7 +600,7 @@ async def handle_setup_project_folder(args):
     with db_connection() as conn:
         project = get_project_by_name(conn, project_name)
         if not project:
-            return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+            return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
 
         existing = conn.execute(
             "SELECT * FROM project_folders WHERE project = ? AND category = ?",
@@ -830,7 +666,7 @@ async def handle_get_project_folders(args):
     with db_connection() as conn:
         project = get_project_by_name(conn, project_name)
         if not project:
-            return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+            return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
 
         rows = conn.execute(
             """
@@ -0,0 +1,437 @@
+"""Retention, rollups and compaction for the high-volume tables.
+
+Each table has a ``RetentionPolicy``: rows older than ``max_age_days``, or
+beyond the newest ``max_rows``, are processed:
+
+- ``query_log``: folded into ``query_log_daily`` (calls per day, tool and
+  project), then deleted
+- ``pipeline_step_results``: the inputs, outputs and progress of a finished
+  run move to one gzip JSONL sidecar per run under ``archive/pipeline_runs``
+  next to the DB (counted in runs). ``restore_run_payloads`` puts them back
+  before a resume
+- ``pipeline_runs``: finished runs are deleted with their step results and
+  sidecar
+- ``session_updates``: deleted
+- ``sessions`` (the session registry DB): disconnected sessions are deleted
+- ``spans`` (the trace store): deleted
+
+Work goes in ``BATCH_ROWS`` chunks, each committed on its own, so tool calls
+never queue behind one long write. A run ends with a bounded
+``PRAGMA incremental_vacuum``. Until the DB uses incremental auto-vacuum that
+step is skipped: switching takes one full ``VACUUM`` that holds the write lock
+for the whole rewrite, so it only happens when a run asks for it with
+``convert_auto_vacuum=True``.
+
+Every server process starts the scheduler, so a run that changes anything
+holds a lease row (``retention_lock`` in ``config``) and runs finding another
+process's live lease are skipped. Each run's payloads are read, archived and
+cleared in one ``BEGIN IMMEDIATE`` transaction, which skips runs that are
+already archived.
+
+``run(dry_run=True)`` reports what a run would do without changing anything.
+The scheduler also takes a rotating snapshot after each run (see
+``snapshots``).
+Policy overrides live in the ``config`` table under ``retention_policies`` as
+JSON (``{"query_log": {"max_age_days": 7}}``).
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable
+
+from custodian import session_registry
+from custodian.db import connection, snapshots
+from custodian.db.system import get_config_value, set_config_value
+from custodian.services import tracing
+
+BATCH_ROWS = 2000
+ARCHIVE_BATCH_RUNS = 20
+VACUUM_PAGES = int(os.environ.get("CUSTODIAN_RETENTION_VACUUM_PAGES", "4096"))
+INTERVAL_HOURS = float(os.environ.get("CUSTODIAN_RETENTION_INTERVAL_HOURS", "6"))
+CONFIG_KEY = "retention_policies"
+LOCK_KEY = "retention_lock"
+LOCK_LEASE_SECONDS = 3600
+_FINISHED_RUN = "status IN ('completed', 'failed', 'cancelled')"
+_HAS_PAYLOAD = (
+    "EXISTS (SELECT 1 FROM pipeline_step_results s WHERE s.run_id = pipeline_runs.id "
+    "AND (s.input IS NOT NULL OR s.output IS NOT NULL OR s.progress IS NOT NULL))"
+)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    max_age_days: float | None = None
+    max_rows: int | None = None
+
+
+DEFAULT_POLICIES = {
+    "query_log": RetentionPolicy(max_age_days=30, max_rows=200_000),
+    "pipeline_step_results": RetentionPolicy(max_age_days=14, max_rows=200),
+    "pipeline_runs": RetentionPolicy(max_age_days=365, max_rows=5_000),
+    "session_updates": RetentionPolicy(max_age_days=365, max_rows=20_000),
+    "sessions": RetentionPolicy(max_age_days=7),
+    "spans": RetentionPolicy(max_age_days=7, max_rows=200_000),
+}
+
+_RUN_LOCK = threading.Lock()
+_LOCK_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_SCHEDULER_STOP = threading.Event()
+_SCHEDULER_THREAD: threading.Thread | None = None
+
+
+def load_policies(conn: sqlite3.Connection, overrides: dict[str, Any] | None = None) -> dict[str, RetentionPolicy]:
+    """Default policies, then the ``retention_policies`` config entry, then ``overrides``."""
+    policies = dict(DEFAULT_POLICIES)
+    stored = get_config_value(conn, CONFIG_KEY)
+    for layer in (json.loads(stored) if stored else None, overrides):
+        for table, values in (layer or {}).items():
+            if table not in policies:
+                raise ValueError(f"Unknown retention table: {table}")
+            if not isinstance(values, dict) or set(values) - {"max_age_days", "max_rows"}:
+                raise ValueError(f"Policy for {table} takes only max_age_days and max_rows.")
+            for key, value in values.items():
+                if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+                    raise ValueError(f"{table}.{key} must be a non-negative number or null.")
+            policies[table] = replace(policies[table], **values)
+    return policies
+
+
+def run(
+    dry_run: bool = False,
+    tables: list[str] | None = None,
+    policies: dict[str, Any] | None = None,
+    convert_auto_vacuum: bool = False,
+) -> dict[str, Any]:
+    """Apply retention to ``tables`` (default: all) and compact; with ``dry_run`` only report.
+
+    ``convert_auto_vacuum`` allows the one-off full ``VACUUM`` that switches the DB to incremental auto-vacuum.
+    """
+    started = time.perf_counter()
+    with _RUN_LOCK, connection.db_connection() as conn:
+        active = load_policies(conn, policies)
+        selected = list(tables or active)
+        unknown = [table for table in selected if table not in active]
+        if unknown:
+            raise ValueError(f"Unknown retention table(s): {', '.join(unknown)}")
+        report: dict[str, Any] = {"dry_run": dry_run, "tables": {}}
+        if not dry_run and not _acquire_lease(conn):
+            report["skipped"] = "retention is running in another process"
+            report["elapsed_ms"] = int((time.perf_counter() - started) * 1000)
+            return report
+        try:
+            for table in selected:
+                try:
+                    result = _HANDLERS[table](conn, active[table], dry_run)
+                except (sqlite3.Error, OSError) as exc:
+                    conn.rollback()
+                    result = {"error": str(exc)}
+                report["tables"][table] = {"policy": asdict(active[table]), **result}
+            report["compaction"] = _compact(conn, dry_run, convert_auto_vacuum)
+        finally:
+            if not dry_run:
+                _release_lease(conn)
+    report["elapsed_ms"] = int((time.perf_counter() - started) * 1000)
+    return report
+
+
+def _acquire_lease(conn: sqlite3.Connection) -> bool:
+    """Take the cross-process retention lease unless another process holds a live one."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        held = get_config_value(conn, LOCK_KEY)
+        lease = json.loads(held) if held else {}
+        if lease.get("owner") not in (None, _LOCK_OWNER) and float(lease.get("expires") or 0) > time.time():
+            conn.rollback()
+            return False
+        set_config_value(conn, LOCK_KEY, json.dumps({"owner": _LOCK_OWNER, "expires": time.time() + LOCK_LEASE_SECONDS}))
+    except BaseException:
+        conn.rollback()
+        raise
+    return True
+
+
+def _release_lease(conn: sqlite3.Connection) -> None:
+    if conn.in_transaction:
+        conn.rollback()
+    conn.execute("DELETE FROM config WHERE key = ? AND json_extract(value, '$.owner') = ?", (LOCK_KEY, _LOCK_OWNER))
+    conn.commit()
+
+
+def restore_run_payloads(conn: sqlite3.Connection, run_id: int) -> int:
+    """Move a run's archived step payloads back into ``pipeline_step_results``; returns rows restored."""
+    row = conn.execute("SELECT payloads_archive FROM pipeline_runs WHERE id = ?", (run_id,)).fetchone()
+    if row is None or not row[0]:
+        return 0
+    path = Path(row[0])
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        records = [json.loads(line) for line in handle if line.strip()]
+    conn.executemany(
+        "UPDATE pipeline_step_results SET input = ?, output = ?, progress = ? WHERE id = ? AND run_id = ?",
+        [(item["input"], item["output"], item["progress"], item["id"], run_id) for item in records],
+    )
+    conn.execute("UPDATE pipeline_runs SET payloads_archive = NULL WHERE id = ?", (run_id,))
+    conn.commit()
+    path.unlink(missing_ok=True)
+    return len(records)
+
+
+def archive_dir() -> Path:
+    return Path(os.path.dirname(os.path.abspath(connection.DB_PATH))) / "archive" / "pipeline_runs"
+
+
+def start_scheduler(interval_hours: float = INTERVAL_HOURS) -> bool:
+    """Run retention every ``interval_hours`` on a daemon thread; ``False`` if disabled or already running."""
+    global _SCHEDULER_THREAD
+    if interval_hours <= 0 or (_SCHEDULER_THREAD is not None and _SCHEDULER_THREAD.is_alive()):
+        return False
+    _SCHEDULER_STOP.clear()
+    _SCHEDULER_THREAD = threading.Thread(
+        target=_scheduler_loop, args=(interval_hours * 3600,), name="custodian-retention", daemon=True
+    )
+    _SCHEDULER_THREAD.start()
+    return True
+
+
+def stop_scheduler() -> None:
+    global _SCHEDULER_THREAD
+    _SCHEDULER_STOP.set()
+    if _SCHEDULER_THREAD is not None:
+        _SCHEDULER_THREAD.join(timeout=5)
+    _SCHEDULER_THREAD = None
+
+
+def _scheduler_loop(interval_seconds: float) -> None:
+    logger = logging.getLogger("uvicorn.error")
+    while not _SCHEDULER_STOP.wait(interval_seconds):
+        try:
+            report = run()
+        except Exception:
+            logger.exception("[custodian] retention run failed")
+            continue
+        if report.get("skipped"):
+            logger.info("[custodian] retention: %s", report["skipped"])
+            continue
+        processed = {table: result.get("rows", result.get("error")) for table, result in report["tables"].items()}
+        logger.info("[custodian] retention: %s in %s ms", processed, report["elapsed_ms"])
+        if snapshots.KEEP > 0:
+            try:
+                snapshot = snapshots.create_snapshot()
+            except (sqlite3.Error, OSError, snapshots.SnapshotError):
+                logger.exception("[custodian] scheduled snapshot failed")
+                continue
+            logger.info("[custodian] snapshot %s (%s bytes, %s ms)", snapshot["name"], snapshot["bytes"], snapshot["elapsed_ms"])
+
+
+def _selection(
+    conn: sqlite3.Connection, table: str, policy: RetentionPolicy, time_column: str, scope: str = "1"
+) -> tuple[str, list[Any]]:
+    """WHERE clause for rows in ``scope`` that are past the policy's age or row limit."""
+    clauses, params = [], []
+    if policy.max_age_days is not None:
+        clauses.append(f"{time_column} < datetime('now', ?)")
+        params.append(f"-{float(policy.max_age_days)} days")
+    if policy.max_rows is not None:
+        row = conn.execute(
+            f"SELECT id FROM {table} WHERE {scope} ORDER BY id DESC LIMIT 1 OFFSET ?", (int(policy.max_rows),)
+        ).fetchone()
+        if row is not None:
+            clauses.append("id <= ?")
+            params.append(row[0])
+    return f"({scope}) AND ({' OR '.join(clauses) or '0'})", params
+
+
+def _count(conn: sqlite3.Connection, table: str, where: str, params: list[Any]) -> int:
+    return int(conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0])
+
+
+def _batched(
+    conn: sqlite3.Connection,
+    table: str,
+    where: str,
+    params: list[Any],
+    process: Callable[[list[int], str], None],
+    batch: int = BATCH_ROWS,
+) -> int:
+    """Call ``process(ids, placeholders)`` per chunk of matching ids, committing each; ``process`` must make them stop matching."""
+    done = 0
+    while True:
+        ids = [row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE {where} ORDER BY id LIMIT ?", (*params, batch))]
+        if not ids:
+            return done
+        process(ids, ", ".join("?" for _ in ids))
+        conn.commit()
+        done += len(ids)
+
+
+def _rollup_query_log(conn: sqlite3.Connection, policy: RetentionPolicy, dry_run: bool) -> dict[str, Any]:
+    where, params = _selection(conn, "query_log", policy, "timestamp")
+    if dry_run:
+        return {"action": "rollup", "rows": _count(conn, "query_log", where, params)}
+
+    def fold(ids: list[int], marks: str) -> None:
+        conn.execute(
+            f"""
+            INSERT INTO query_log_daily (day, tool_name, project_name, calls)
+            SELECT date(COALESCE(timestamp, CURRENT_TIMESTAMP)), COALESCE(tool_name, ''), COALESCE(project_name, ''), COUNT(*)
+            FROM query_log
+            WHERE id IN ({marks})
+            GROUP BY 1, 2, 3
+            ON CONFLICT(day, tool_name, project_name) DO UPDATE SET calls = calls + excluded.calls
+            """,
+            ids,
+        )
+        conn.execute(f"DELETE FROM query_log WHERE id IN ({marks})", ids)
+
+    return {"action": "rollup", "rows": _batched(conn, "query_log", where, params, fold)}
+
+
+def _archive_step_payloads(conn: sqlite3.Connection, policy: RetentionPolicy, dry_run: bool) -> dict[str, Any]:
+    where, params = _selection(conn, "pipeline_runs", policy, "finished_at", _FINISHED_RUN)
+    where = f"{where} AND payloads_archive IS NULL AND {_HAS_PAYLOAD}"
+    if dry_run:
+        size = conn.execute(
+            f"""
+            SELECT COUNT(*), COALESCE(SUM(IFNULL(LENGTH(input), 0) + IFNULL(LENGTH(output), 0) + IFNULL(LENGTH(progress), 0)), 0)
+            FROM pipeline_step_results
+            WHERE run_id IN (SELECT id FROM pipeline_runs WHERE {where})
+            """,
+            params,
+        ).fetchone()
+        return {"action": "archive", "runs": _count(conn, "pipeline_runs", where, params), "rows": size[0], "bytes": size[1]}
+
+    folder = archive_dir()
+    folder.mkdir(parents=True, exist_ok=True)
+    totals = {"rows": 0, "bytes": 0}
+
+    def archive(ids: list[int], _marks: str) -> None:
+        for run_id in ids:
+            # Read, archive and clear under one write lock: a run another writer archived or restored
+            # since the selection is re-checked here, so its already-cleared payloads never overwrite the sidecar.
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = conn.execute(
+                    f"SELECT 1 FROM pipeline_runs WHERE id = ? AND payloads_archive IS NULL AND {_HAS_PAYLOAD}", (run_id,)
+                ).fetchone()
+                if pending is None:
+                    conn.rollback()
+                    continue
+                rows = conn.execute(
+                    "SELECT id, input, output, progress FROM pipeline_step_results WHERE run_id = ? ORDER BY id", (run_id,)
+                ).fetchall()
+                path = folder / f"run-{run_id}.jsonl.gz"
+                partial = path.with_name(path.name + ".tmp")
+                with gzip.open(partial, "wt", encoding="utf-8") as handle:
+                    for row in rows:
+                        handle.write(json.dumps({"id": row[0], "input": row[1], "output": row[2], "progress": row[3]}) + "\n")
+                os.replace(partial, path)
+                conn.execute(
+                    "UPDATE pipeline_step_results SET input = NULL, output = NULL, progress = NULL WHERE run_id = ?", (run_id,)
+                )
+                conn.execute("UPDATE pipeline_runs SET payloads_archive = ? WHERE id = ?", (str(path), run_id))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            totals["rows"] += len(rows)
+            totals["bytes"] += sum(len(value or "") for row in rows for value in row[1:])
+
+    runs = _batched(conn, "pipeline_runs", where, params, archive, batch=ARCHIVE_BATCH_RUNS)
+    return {"action": "archive", "runs": runs, **totals}
+
+
+def _delete_pipeline_runs(conn: sqlite3.Connection, policy: RetentionPolicy, dry_run: bool) -> dict[str, Any]:
+    where, params = _selection(conn, "pipeline_runs", policy, "finished_at", _FINISHED_RUN)
+    if dry_run:
+        return {"action": "delete", "rows": _count(conn, "pipeline_runs", where, params)}
+
+    archives: list[str] = []
+
+    def delete(ids: list[int], marks: str) -> None:
+        archives.extend(
+            row[0] for row in conn.execute(f"SELECT payloads_archive FROM pipeline_runs WHERE id IN ({marks}) AND payloads_archive IS NOT NULL", ids)
+        )
+        conn.execute(f"DELETE FROM pipeline_step_results WHERE run_id IN ({marks})", ids)
+        conn.execute(f"DELETE FROM pipeline_runs WHERE id IN ({marks})", ids)
+
+    rows = _batched(conn, "pipeline_runs", where, params, delete)
+    for path in archives:
+        Path(path).unlink(missing_ok=True)
+    return {"action": "delete", "rows": rows}
+
+
+def _delete_session_updates(conn: sqlite3.Connection, policy: RetentionPolicy, dry_run: bool) -> dict[str, Any]:
+    where, params = _selection(conn, "session_updates", policy, "created_at")
+    if dry_run:
+        return {"action": "delete", "rows": _count(conn, "session_updates", where, params)}
+    rows = _batched(
+        conn, "session_updates", where, params, lambda ids, marks: conn.execute(f"DELETE FROM session_updates WHERE id IN ({marks})", ids)
+    )
+    return {"action": "delete", "rows": rows}
+
+
+def _prune_sessions(conn: sqlite3.Connection, policy: RetentionPolicy, dry_run: bool) -> dict[str, Any]:
+    if policy.max_age_days is None:
+        return {"action": "delete", "rows": 0}
+    return {"action": "delete", "rows": session_registry.prune_sessions(policy.max_age_days, dry_run=dry_run)}
+
+
+def _prune_spans(conn: sqlite3.Connection, policy: RetentionPolicy, dry_run: bool) -> dict[str, Any]:
+    return {"action": "delete", "rows": tracing.prune_spans(policy.max_age_days, policy.max_rows, dry_run=dry_run)}
+
+
+_HANDLERS: dict[str, Callable[[sqlite3.Connection, RetentionPolicy, bool], dict[str, Any]]] = {
+    "query_log": _rollup_query_log,
+    "pipeline_step_results": _archive_step_payloads,
+    "pipeline_runs": _delete_pipeline_runs,
+    "session_updates": _delete_session_updates,
+    "sessions": _prune_sessions,
+    "spans": _prune_spans,
+}
+
+
+def _compact(conn: sqlite3.Connection, dry_run: bool, convert_auto_vacuum: bool = False) -> dict[str, Any]:
+    def stats() -> dict[str, Any]:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        return {
+            "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(mode, mode),
+            "db_bytes": page_size * pages,
+            "free_bytes": page_size * free,
+        }
+
+    before = stats()
+    if dry_run:
+        return before
+    conn.commit()
+    if before["auto_vacuum"] != "incremental":
+        if not convert_auto_vacuum:
+            return {
+                "action": "none",
+                "before": before,
+                "note": "auto_vacuum is not incremental; run_retention with convert_auto_vacuum=true switches it with one full VACUUM",
+            }
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        action = "vacuum"
+    else:
+        # Each step of the pragma frees one page; it only runs while rows are fetched.
+        conn.execute(f"PRAGMA incremental_vacuum({int(VACUUM_PAGES)})").fetchall()
+        conn.commit()
+        action = "incremental_vacuum"
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    return {"action": action, "before": before, "after": stats()}
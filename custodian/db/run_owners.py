@@ -0,0 +1,127 @@
+"""Cross-process cancellation for pipeline and agent runs.
+
+The stdio MCP server, the HTTP server and the sidecar are separate processes
+sharing custodian.db, so ``cancellation.cancel`` only reaches runs started in
+the calling process. While a run is ``owned``, its process:
+
+- stamps the run row's ``heartbeat_at`` every ``HEARTBEAT_SECONDS``
+- polls the row's ``cancel_requested`` every ``POLL_SECONDS`` and cancels the
+  run's token when another process has set it
+
+``request_cancel`` is the other process's side. ``owner_alive`` tells a cancel
+handler whether a live process still owns the run, so rows are only closed
+directly once their owner is gone.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from custodian.db import connection
+from custodian.services import cancellation
+
+POLL_SECONDS = float(os.environ.get("CUSTODIAN_RUN_CANCEL_POLL_SECONDS", "1"))
+HEARTBEAT_SECONDS = float(os.environ.get("CUSTODIAN_RUN_HEARTBEAT_SECONDS", "10"))
+# An owner whose heartbeat is older than this is treated as gone.
+OWNER_TIMEOUT_SECONDS = HEARTBEAT_SECONDS * 3
+TABLES = {"pipeline": "pipeline_runs", "agent": "agent_runs"}
+
+_OWNED: dict[tuple[str, int], str] = {}
+_LOCK = threading.Lock()
+_WATCHER: threading.Thread | None = None
+
+
+@contextmanager
+def owned(kind: str, run_id: int, db_path: str | os.PathLike | None = None) -> Iterator[None]:
+    """Heartbeat ``(kind, run_id)`` and watch its row for cancel requests while the block runs."""
+    global _WATCHER
+    db_path = str(db_path or connection.DB_PATH)
+    key = (kind, int(run_id))
+    _sync(db_path, {kind: [key[1]]}, beat=True, claim=True)
+    with _LOCK:
+        _OWNED[key] = db_path
+        if _WATCHER is None:
+            _WATCHER = threading.Thread(target=_watch, name="run-owners", daemon=True)
+            _WATCHER.start()
+    try:
+        yield
+    finally:
+        with _LOCK:
+            if _OWNED.get(key) == db_path:
+                del _OWNED[key]
+
+
+def request_cancel(conn: sqlite3.Connection, kind: str, run_id: int, reason: str) -> bool:
+    """Ask the process owning a running run to cancel it; the caller commits."""
+    cursor = conn.execute(
+        f"UPDATE {TABLES[kind]} SET cancel_requested = ? WHERE id = ? AND status = 'running'",
+        (reason, int(run_id)),
+    )
+    return cursor.rowcount > 0
+
+
+def owner_alive(conn: sqlite3.Connection, kind: str, run_id: int) -> bool:
+    """Whether a process heartbeat the run within ``OWNER_TIMEOUT_SECONDS``."""
+    row = conn.execute(
+        f"SELECT heartbeat_at >= datetime('now', ?) FROM {TABLES[kind]} WHERE id = ?",
+        (f"-{OWNER_TIMEOUT_SECONDS:g} seconds", int(run_id)),
+    ).fetchone()
+    return bool(row and row[0])
+
+
+def _watch() -> None:
+    global _WATCHER
+    last_beat = time.monotonic()
+    while True:
+        time.sleep(POLL_SECONDS)
+        with _LOCK:
+            if not _OWNED:
+                _WATCHER = None
+                return
+            owned_runs = dict(_OWNED)
+        beat = time.monotonic() - last_beat >= HEARTBEAT_SECONDS
+        by_path: dict[str, dict[str, list[int]]] = {}
+        for (kind, run_id), db_path in owned_runs.items():
+            by_path.setdefault(db_path, {}).setdefault(kind, []).append(run_id)
+        for db_path, runs in by_path.items():
+            _sync(db_path, runs, beat=beat)
+        if beat:
+            last_beat = time.monotonic()
+
+
+def _sync(db_path: str, runs: dict[str, list[int]], beat: bool, claim: bool = False) -> None:
+    """Cancel runs another process asked to stop; optionally heartbeat them, or claim them afresh."""
+    try:
+        conn = sqlite3.connect(db_path, timeout=5, factory=connection.TrackedConnection)
+    except sqlite3.Error as exc:
+        print(f"[run-owners] cannot open {db_path}: {exc}", file=sys.stderr)
+        return
+    try:
+        for kind, run_ids in runs.items():
+            table = TABLES[kind]
+            placeholders = ", ".join("?" for _ in run_ids)
+            if claim:
+                # A resumed run starts without the request that stopped its previous attempt.
+                conn.execute(
+                    f"UPDATE {table} SET cancel_requested = NULL, heartbeat_at = datetime('now') WHERE id IN ({placeholders})",
+                    run_ids,
+                )
+                continue
+            requested = conn.execute(
+                f"SELECT id, cancel_requested FROM {table} WHERE id IN ({placeholders}) AND cancel_requested IS NOT NULL",
+                run_ids,
+            ).fetchall()
+            for run_id, reason in requested:
+                cancellation.cancel(kind, run_id, reason)
+            if beat:
+                conn.execute(f"UPDATE {table} SET heartbeat_at = datetime('now') WHERE id IN ({placeholders})", run_ids)
+        conn.commit()
+    except sqlite3.Error as exc:
+        print(f"[run-owners] heartbeat failed: {exc}", file=sys.stderr)
+    finally:
+        conn.close()
@@ -0,0 +1,116 @@
+"""Sequence allocator for human-readable IDs (``CT-042``, ``TD-007``, ``FP-013``).
+
+Each sequence is a row in ``sequences`` named ``<table>:<prefix>`` that holds
+the last number handed out. Allocation is one ``UPDATE ... RETURNING`` on that
+row, so it is O(1) and, inside the caller's write transaction, collision-free
+between concurrent writers. A rolled-back insert also rolls back its number.
+
+A sequence missing its row is seeded from the highest ID already in the table
+(the one-off ``MAX(CAST(SUBSTR(...)))`` scan), which covers new task prefixes.
+``resync`` repeats that scan after a collision with a row written without the
+allocator.
+"""
+from __future__ import annotations
+
+import sqlite3
+
+# Table -> column holding its human-readable ID.
+ID_COLUMNS = {
+    "tasks": "ct_id",
+    "todo_items": "todo_id",
+    "session_transports": "cs_id",
+    "friction_points": "id",
+    "changelog_entries": "id",
+    "memory_flags": "id",
+}
+FIXED_PREFIXES = {
+    "todo_items": "TD",
+    "session_transports": "CS",
+    "friction_points": "FP",
+    "changelog_entries": "CL",
+    "memory_flags": "MF",
+}
+
+
+def format_id(prefix: str, number: int) -> str:
+    return f"{prefix}-{number:03d}"
+
+
+def next_id(conn: sqlite3.Connection, table: str, prefix: str) -> str:
+    """Allocate the next ID for ``prefix`` in ``table``."""
+    return format_id(prefix, reserve(conn, table, prefix))
+
+
+def reserve_ids(conn: sqlite3.Connection, table: str, prefix: str, count: int) -> list[str]:
+    """Allocate ``count`` consecutive IDs with a single increment, for batch inserts."""
+    first = reserve(conn, table, prefix, count)
+    return [format_id(prefix, number) for number in range(first, first + count)]
+
+
+def reserve(conn: sqlite3.Connection, table: str, prefix: str, count: int = 1) -> int:
+    """Advance the sequence by ``count``; returns the first number of the reserved block."""
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    name = _sequence_name(table, prefix)
+    row = _advance(conn, name, count)
+    if row is None:
+        conn.execute(
+            "INSERT OR IGNORE INTO sequences (name, value) VALUES (?, ?)",
+            (name, _max_used(conn, table, prefix)),
+        )
+        row = _advance(conn, name, count)
+    return int(row[0]) - count + 1
+
+
+def resync(conn: sqlite3.Connection, table: str, prefix: str) -> int:
+    """Move the sequence past every ID already in ``table`` and commit; returns its value."""
+    value = _seed(conn, table, prefix)
+    conn.commit()
+    return value
+
+
+def seed_sequences(conn: sqlite3.Connection) -> None:
+    """Seed every sequence from existing rows (idempotent; never moves a sequence back)."""
+    for table, prefix in FIXED_PREFIXES.items():
+        _seed(conn, table, prefix)
+    prefixes = conn.execute(
+        "SELECT DISTINCT substr(ct_id, 1, instr(ct_id, '-') - 1) FROM tasks WHERE instr(ct_id, '-') > 1"
+    ).fetchall()
+    for (prefix,) in prefixes:
+        _seed(conn, "tasks", prefix)
+
+
+def _sequence_name(table: str, prefix: str) -> str:
+    if table not in ID_COLUMNS:
+        raise ValueError(f"Unsupported sequence table: {table}")
+    return f"{table}:{prefix}"
+
+
+def _advance(conn: sqlite3.Connection, name: str, count: int):
+    return conn.execute(
+        "UPDATE sequences SET value = value + ? WHERE name = ? RETURNING value",
+        (count, name),
+    ).fetchone()
+
+
+def _max_used(conn: sqlite3.Connection, table: str, prefix: str) -> int:
+    column = ID_COLUMNS[table]
+    max_num = conn.execute(
+        f"SELECT MAX(CAST(SUBSTR({column}, ?) AS INTEGER)) FROM {table} WHERE {column} LIKE ?",
+        (len(prefix) + 2, f"{prefix}-%"),
+    ).fetchone()[0]
+    return int(max_num or 0)
+
+
+def _seed(conn: sqlite3.Connection, table: str, prefix: str) -> int:
+    name = _sequence_name(table, prefix)
+    return int(
+        conn.execute(
+            """
+            INSERT INTO sequences (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)
+            RETURNING value
+            """,
+            (name, _max_used(conn, table, prefix)),
+        ).fetchone()[0]
+    )
@@ -16,6 +16,8 @@ from datetime import datetime
 from urllib.parse import quote
 
 from custodian.db.connection import DB_PATH, db_connection
+from custodian.services import project_resolver
+from custodian.services.project_resolver import get_project_by_name
 from custodian.db.projects import (
     _read_text_file_preview,
     _read_text_file_window,
@@ -64,14 +66,6 @@ def _find_symbol(*args, **kwargs):
     return find_symbol(*args, **kwargs)
 
 
-def get_project_by_name(conn, name):
-    row = conn.execute("SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    row = conn.execute("SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    return conn.execute("SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'", (f"%{name}%",)).fetchone()
 
 import mimetypes
 
@@ -90,7 +84,7 @@ async def handle_create_shared_folder(args):
     with db_connection() as conn:
         project = get_project_by_name(conn, project_name)
         if not project:
-            return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+            return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
 
     path = os.path.join(_shared_project_root(project["name"]), category, "")
     created = not os.path.isdir(path)
@@ -123,7 +117,7 @@ async def handle_read_shared_file(args):
     with db_connection() as conn:
         project = get_project_by_name(conn, project_name)
         if not project:
-            return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+            return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
 
     project_root = _shared_project_root(project["name"])
     absolute_path = os.path.join(project_root, relative_path)
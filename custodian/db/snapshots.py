@@ -0,0 +1,210 @@
+"""Online snapshots of ``custodian.db``.
+
+Snapshots use the SQLite online backup API, copying ``PAGES_PER_STEP`` pages
+per step and pausing ``STEP_PAUSE_SECONDS`` between steps. The steps all read
+inside one WAL read transaction. That pins a consistent image, so writers
+never wait on the copy and their commits do not restart it. A passive WAL
+checkpoint runs first, so the backup copies mostly from the main file. The
+snapshot is switched to a rollback journal, leaving one self-contained file.
+``compact=True`` uses ``VACUUM INTO`` instead, which gives a smaller,
+defragmented copy inside a single read transaction.
+
+Snapshots live in ``snapshots/`` next to the DB. Each ``.db`` file has a
+``.json`` manifest with its sha256, page count and label. Unlabelled
+snapshots form a rotating set trimmed to ``KEEP``. Labelled ones (save
+points) stay until ``delete_snapshot``, except the ``pre-restore`` safety
+copies, which keep the newest ``KEEP_PRE_RESTORE``. ``restore_snapshot``
+verifies the checksum and ``integrity_check`` first. It then copies the
+snapshot back through the backup API, so open connections see the restored
+data instead of a file swapped under them, and runs the write listeners for
+every restored table so in-process caches reload.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from custodian.db import connection
+
+PAGES_PER_STEP = int(os.environ.get("CUSTODIAN_SNAPSHOT_PAGES_PER_STEP", "1024"))
+STEP_PAUSE_SECONDS = float(os.environ.get("CUSTODIAN_SNAPSHOT_STEP_PAUSE_SECONDS", "0.005"))
+KEEP = int(os.environ.get("CUSTODIAN_SNAPSHOT_KEEP", "8"))
+KEEP_PRE_RESTORE = int(os.environ.get("CUSTODIAN_SNAPSHOT_KEEP_PRE_RESTORE", "3"))
+_LABEL_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+_LOCK = threading.Lock()
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_dir() -> Path:
+    return Path(os.path.dirname(os.path.abspath(connection.DB_PATH))) / "snapshots"
+
+
+def create_snapshot(label: str | None = None, *, compact: bool = False) -> dict[str, Any]:
+    """Write a consistent snapshot of the live DB; unlabelled ones rotate out after ``KEEP``."""
+    if label is not None and not _LABEL_RE.match(label):
+        raise SnapshotError("label must be 1-64 letters, digits, '.', '_' or '-'.")
+    folder = snapshot_dir()
+    folder.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = folder / f"custodian-{stamp}-{label or 'auto'}.db"
+    partial = path.with_name(path.name + ".tmp")
+    started = time.perf_counter()
+    with _LOCK:
+        partial.unlink(missing_ok=True)
+        source = sqlite3.connect(connection.DB_PATH)
+        try:
+            source.execute("PRAGMA busy_timeout = 5000")
+            source.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            if compact:
+                source.execute("VACUUM INTO ?", (str(partial),))
+            else:
+                target = sqlite3.connect(partial)
+                try:
+                    # Without a pinned read transaction, every commit by another connection restarts the backup.
+                    source.execute("BEGIN")
+                    source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                    source.backup(target, pages=PAGES_PER_STEP, progress=_pause)
+                    source.rollback()
+                finally:
+                    target.close()
+        finally:
+            source.close()
+        target = sqlite3.connect(partial)
+        try:
+            target.execute("PRAGMA journal_mode=DELETE").fetchall()
+            pages = target.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            target.close()
+        os.replace(partial, path)
+        manifest = {
+            "name": path.name,
+            "label": label,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "method": "vacuum_into" if compact else "backup",
+            "bytes": path.stat().st_size,
+            "pages": pages,
+            "sha256": _sha256(path),
+            "elapsed_ms": int((time.perf_counter() - started) * 1000),
+        }
+        _manifest_path(path).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        if label is None:
+            manifest["rotated_out"] = prune_snapshots(KEEP)
+    return manifest
+
+
+def list_snapshots() -> list[dict[str, Any]]:
+    """Manifests of every snapshot, newest first."""
+    folder = snapshot_dir()
+    if not folder.exists():
+        return []
+    manifests = []
+    for manifest_path in folder.glob("custodian-*.json"):
+        try:
+            manifests.append(json.loads(manifest_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return sorted(manifests, key=lambda item: item["name"], reverse=True)
+
+
+def find_snapshot(name: str | None = None, label: str | None = None) -> Path:
+    """The snapshot called ``name``, or the newest one with ``label``."""
+    for manifest in list_snapshots():
+        if (name and manifest["name"] == name) or (not name and label and manifest["label"] == label):
+            return snapshot_dir() / manifest["name"]
+    raise SnapshotError(f"Snapshot not found: {name or label}")
+
+
+def verify_snapshot(path: Path) -> dict[str, Any]:
+    """Check a snapshot against its manifest checksum and run ``PRAGMA integrity_check`` on it."""
+    manifest_path = _manifest_path(path)
+    if not path.exists() or not manifest_path.exists():
+        raise SnapshotError(f"Snapshot not found: {path.name}")
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    checksum_ok = _sha256(path) == manifest["sha256"]
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check").fetchall()]
+    except sqlite3.DatabaseError as exc:
+        problems = [str(exc)]
+    finally:
+        conn.close()
+    integrity_ok = problems == ["ok"]
+    return {
+        "name": path.name,
+        "ok": checksum_ok and integrity_ok,
+        "checksum_ok": checksum_ok,
+        "integrity": "ok" if integrity_ok else problems[:20],
+    }
+
+
+def restore_snapshot(path: Path) -> dict[str, Any]:
+    """Verify ``path`` and copy it over the live DB; a ``pre-restore`` snapshot is taken first."""
+    check = verify_snapshot(path)
+    if not check["ok"]:
+        raise SnapshotError(f"Snapshot {path.name} failed verification: {check}")
+    safety = create_snapshot("pre-restore")
+    prune_snapshots(KEEP_PRE_RESTORE, label="pre-restore")
+    started = time.perf_counter()
+    with _LOCK:
+        source = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        target = sqlite3.connect(connection.DB_PATH)
+        try:
+            target.execute("PRAGMA busy_timeout = 5000")
+            # The destination stays write-locked until the copy finishes, so copy in one step.
+            source.backup(target)
+            target.execute("PRAGMA journal_mode=WAL").fetchall()
+            target.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            tables = {row[0] for row in target.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            target.close()
+            source.close()
+    # The copy bypassed TrackedConnection: tool_cache, the tool_router index and the project resolver never saw it.
+    connection.notify_tables_written(tables)
+    return {
+        "restored": path.name,
+        "safety_snapshot": safety["name"],
+        "elapsed_ms": int((time.perf_counter() - started) * 1000),
+    }
+
+
+def delete_snapshot(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    _manifest_path(path).unlink(missing_ok=True)
+
+
+def prune_snapshots(keep: int = KEEP, label: str | None = None) -> list[str]:
+    """Delete snapshots labelled ``label`` (default: unlabelled) beyond the newest ``keep``; returns the removed names."""
+    rotating = [manifest["name"] for manifest in list_snapshots() if manifest["label"] == label]
+    removed = rotating[max(0, keep):]
+    for name in removed:
+        delete_snapshot(snapshot_dir() / name)
+    return removed
+
+
+def _pause(_status: int, remaining: int, _total: int) -> None:
+    # Let the threads serving tool calls run between steps.
+    if remaining and STEP_PAUSE_SECONDS > 0:
+        time.sleep(STEP_PAUSE_SECONDS)
+
+
+def _manifest_path(path: Path) -> Path:
+    return path.with_suffix(".json")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
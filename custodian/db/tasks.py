@@ -4,31 +4,12 @@ import json
 import sqlite3
 from mcp.types import TextContent
 
+from custodian.db import sequences
 from custodian.db.connection import db_connection
+from custodian.services import project_resolver
+from custodian.services.project_resolver import get_project_by_name
 from custodian.db.system import log_query
 
-def get_project_by_name(conn, name):
-    """Look up a project by name (case-insensitive, partial match)."""
-    # Try exact match first
-    row = conn.execute(
-        "SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)
-    ).fetchone()
-    if row:
-        return row
-
-    # Try case-insensitive
-    row = conn.execute(
-        "SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)
-    ).fetchone()
-    if row:
-        return row
-
-    # Try partial match
-    row = conn.execute(
-        "SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'",
-        (f"%{name}%",),
-    ).fetchone()
-    return row
 
 def _parse_stored_json_array(value):
     """Return a stored JSON array or [] for null/empty/malformed values."""
@@ -125,7 +106,7 @@ def _insert_session_update_row(
     """Insert a session_updates row using the shared tool write path."""
     project = get_project_by_name(conn, project_name)
     if not project:
-        raise ValueError(f"Project '{project_name}' not found. Use list_projects to see available projects.")
+        raise ValueError(project_resolver.not_found_message(conn, project_name))
 
     cursor = conn.execute(
         """
@@ -148,14 +129,8 @@ def _insert_session_update_row(
     return cursor.lastrowid, project["name"]
 
 def _next_task_id(conn, prefix):
-    """Generate the next race-safe task ID for a prefix."""
-    start_index = len(prefix) + 2
-    max_num = conn.execute(
-        "SELECT MAX(CAST(SUBSTR(ct_id, ?) AS INTEGER)) FROM tasks WHERE ct_id LIKE ?",
-        (start_index, f"{prefix}-%"),
-    ).fetchone()[0]
-    next_num = (max_num or 0) + 1
-    return f"{prefix}-{next_num:03d}"
+    """Allocate the next task ID for a prefix from its sequence."""
+    return sequences.next_id(conn, "tasks", prefix)
 
 def _normalize_ct_id(ct_id):
     """Normalize user-provided CT IDs to uppercase trimmed form."""
@@ -231,7 +206,7 @@ async def handle_submit_task(args):
         if project_name:
             project = get_project_by_name(conn, project_name)
             if not project:
-                return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+                return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
             project_name = project["name"]
             task_prefix = (project["task_prefix"] or "").strip()
             if not task_prefix:
@@ -268,6 +243,7 @@ async def handle_submit_task(args):
                 return [TextContent(type="text", text=json.dumps(result, indent=2))]
             except sqlite3.IntegrityError:
                 conn.rollback()
+                sequences.resync(conn, "tasks", task_prefix)
                 continue
 
         return [TextContent(type="text", text=f"Error: could not generate a unique {task_prefix}-ID. Please try again.")]
@@ -5,40 +5,17 @@ import re
 import sqlite3
 from mcp.types import TextContent
 
+from custodian.db import sequences
 from custodian.db.connection import db_connection
+from custodian.services import project_resolver
+from custodian.services.project_resolver import get_project_by_name
 from custodian.db.tasks import _next_task_id
 from custodian.db.system import log_query
 
-def get_project_by_name(conn, name):
-    """Look up a project by name (case-insensitive, partial match)."""
-    # Try exact match first
-    row = conn.execute(
-        "SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)
-    ).fetchone()
-    if row:
-        return row
-
-    # Try case-insensitive
-    row = conn.execute(
-        "SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)
-    ).fetchone()
-    if row:
-        return row
-
-    # Try partial match
-    row = conn.execute(
-        "SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'",
-        (f"%{name}%",),
-    ).fetchone()
-    return row
 
 def _next_todo_id(conn):
-    """Generate the next race-safe todo ID."""
-    max_num = conn.execute(
-        "SELECT MAX(CAST(SUBSTR(todo_id, 4) AS INTEGER)) FROM todo_items WHERE todo_id LIKE 'TD-%'"
-    ).fetchone()[0]
-    next_num = (max_num or 0) + 1
-    return f"TD-{next_num:03d}"
+    """Allocate the next todo ID from its sequence."""
+    return sequences.next_id(conn, "todo_items", "TD")
 
 def _normalize_todo_id(todo_id):
     raw = str(todo_id or "").strip().upper()
@@ -99,7 +76,7 @@ async def handle_add_todo(args):
         if project_name:
             project = get_project_by_name(conn, project_name)
             if not project:
-                return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+                return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
             project_name = project["name"]
 
         for _attempt in range(3):
@@ -122,6 +99,7 @@ async def handle_add_todo(args):
                 }, indent=2))]
             except sqlite3.IntegrityError:
                 conn.rollback()
+                sequences.resync(conn, "todo_items", "TD")
                 continue
 
     return [TextContent(type="text", text="Error: could not generate a unique TD-ID. Please try again.")]
@@ -155,7 +133,7 @@ async def handle_list_todos(args):
         if project_name:
             project = get_project_by_name(conn, project_name)
             if not project:
-                return [TextContent(type="text", text=f"Project '{project_name}' not found. Use list_projects to see available projects.")]
+                return [TextContent(type="text", text=project_resolver.not_found_message(conn, project_name))]
             project_name = project["name"]
             query += " AND project = ?"
             params.append(project_name)
@@ -249,6 +227,7 @@ async def handle_promote_todo(args):
                 }, indent=2))]
             except sqlite3.IntegrityError:
                 conn.rollback()
+                sequences.resync(conn, "tasks", task_prefix)
                 continue
 
     return [TextContent(type="text", text=f"Error: could not generate a unique {task_prefix}-ID. Please try again.")]
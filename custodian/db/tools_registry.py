@@ -16,6 +16,7 @@ from datetime import datetime
 from urllib.parse import quote
 
 from custodian.db.connection import DB_PATH, db_connection
+from custodian.services.project_resolver import get_project_by_name
 from custodian.db.projects import _ensure_shared_project_root, _safe_json_loads
 from custodian.db.system import log_query
 from mcp.types import TextContent
@@ -58,14 +59,6 @@ def _find_symbol(*args, **kwargs):
     return find_symbol(*args, **kwargs)
 
 
-def get_project_by_name(conn, name):
-    row = conn.execute("SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    row = conn.execute("SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    return conn.execute("SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'", (f"%{name}%",)).fetchone()
 
 from urllib.request import Request, urlopen
 from urllib.error import HTTPError, URLError
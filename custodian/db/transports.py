@@ -5,6 +5,7 @@ import sqlite3
 
 from mcp.types import TextContent
 
+from custodian.db import sequences
 from custodian.db.connection import db_connection
 from custodian.db.system import log_query
 
@@ -15,9 +16,8 @@ def _normalize_cs_id(cs_id: str) -> str:
 
 
 def _next_transport_id(conn: sqlite3.Connection) -> str:
-    """Generate the next race-safe transport ID."""
-    max_id = conn.execute("SELECT MAX(id) FROM session_transports").fetchone()[0]
-    return f"CS-{(max_id or 0) + 1:03d}"
+    """Allocate the next transport ID from its sequence."""
+    return sequences.next_id(conn, "session_transports", "CS")
 
 
 async def handle_submit_transport(args: dict) -> list[TextContent]:
@@ -60,6 +60,7 @@ async def handle_submit_transport(args: dict) -> list[TextContent]:
                 return [TextContent(type="text", text=json.dumps(result, indent=2))]
             except sqlite3.IntegrityError:
                 conn.rollback()
+                sequences.resync(conn, "session_transports", "CS")
                 continue
 
         return [TextContent(type="text", text="Error: could not generate a unique CS-ID. Please try again.")]
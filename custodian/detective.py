@@ -122,10 +122,14 @@ def build_analysis_context(project_name=None):
                 sym_summary = ", ".join(f"{s['type']}: {s['count']}" for s in symbols)
                 context_parts.append(f"Latest symbols: {sym_summary}")
 
-    # Include query log analysis
+    # Include query log analysis (recent rows plus the daily rollups retention left behind)
     queries = conn.execute(
-        """SELECT tool_name, project_name, query_params, COUNT(*) as count
-           FROM query_log
+        """SELECT tool_name, project_name, SUM(calls) as count
+           FROM (
+               SELECT tool_name, project_name, COUNT(*) as calls FROM query_log GROUP BY tool_name, project_name
+               UNION ALL
+               SELECT tool_name, NULLIF(project_name, ''), SUM(calls) FROM query_log_daily GROUP BY tool_name, project_name
+           )
            GROUP BY tool_name, project_name
            ORDER BY count DESC LIMIT 30"""
     ).fetchall()
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import json
 import socket
 from dataclasses import dataclass
@@ -8,6 +7,10 @@ from typing import Any
 from urllib.error import URLError
 from urllib.request import Request, urlopen
 
+from custodian.services import agent_events, cancellation, llm_cache, tracing
+from custodian.services.context_budget import READ_TOOL_RESULT, ContextBudget
+from custodian.services.tool_fanout import is_serial, run_tool_calls
+
 
 DEFAULT_CHAT_COMPLETIONS_URL = "http://127.0.0.1:4096/v1/chat/completions"
 DEFAULT_BOX_BRIDGE_URL = "http://localhost:9099/call-tool"
@@ -28,6 +31,8 @@ async def run_agent_loop(
     max_turns: int,
     tools: list[dict[str, Any]],
     bridge_url: str = DEFAULT_BOX_BRIDGE_URL,
+    tool_concurrency: int | None = None,
+    cache_mode: str | None = None,
 ) -> AgentLoopResult:
     messages: list[dict[str, str]] = [
         {"role": "system", "content": compiled_prompt["system"]},
@@ -37,23 +42,45 @@ async def run_agent_loop(
     total_output = 0
     total_tokens = 0
     tool_map = {str(tool.get("name")): tool for tool in tools}
-
-    for _ in range(max(1, int(max_turns))):
-        response_text, usage = await _call_llm(model, messages)
+    context = ContextBudget(model)
+
+    async def run_call(call: dict[str, Any]) -> dict[str, Any]:
+        if call["name"] == READ_TOOL_RESULT and READ_TOOL_RESULT not in tool_map:
+            return context.read(call["params"])
+        with tracing.span("agent.tool", tool=call["name"], turn=turn), agent_events.tool_call(call["name"]):
+            return await _execute_tool(tool_map, call["name"], call["params"], bridge_url)
+
+    for turn in range(max(1, int(max_turns))):
+        cancellation.check()
+        agent_events.publish("turn_start", turn=turn + 1)
+        prompt_estimate = context.compact(messages)
+        with tracing.span("llm.call", model=model, turn=turn, prompt_tokens_estimate=prompt_estimate):
+            response_text, usage = await _call_llm(model, messages, cache_mode)
+        context.calibrate(messages, int(usage.get("prompt_tokens") or 0))
         total_input += int(usage.get("prompt_tokens") or 0)
         total_output += int(usage.get("completion_tokens") or 0)
         total_tokens += int(usage.get("total_tokens") or 0)
+        agent_events.publish("text", text=response_text)
+        if usage:
+            agent_events.publish("usage", tokens=total_tokens or total_input + total_output)
         parsed = _parse_response(response_text)
 
         if parsed["type"] == "tool_call":
-            tool_result = await _execute_tool(tool_map, parsed["name"], parsed["params"], bridge_url)
-            messages.append({"role": "assistant", "content": response_text})
-            messages.append(
-                {
-                    "role": "user",
-                    "content": f"[Tool Result: {parsed['name']}]\n{json.dumps(tool_result, sort_keys=True)}",
-                }
+            calls = parsed["calls"]
+            tool_results = await run_tool_calls(
+                calls,
+                run_call,
+                serial=lambda call: is_serial(tool_map.get(call["name"])),
+                concurrency=tool_concurrency,
             )
+            messages.append({"role": "assistant", "content": response_text})
+            for call, tool_result in zip(calls, tool_results):
+                messages.append(
+                    {
+                        "role": "user",
+                        "content": f"[Tool Result: {call['name']}]\n{context.tool_result_text(call['name'], tool_result)}",
+                    }
+                )
             continue
 
         if parsed["type"] == "final_answer":
@@ -79,17 +106,17 @@ async def run_agent_loop(
     raise RuntimeError(f"Agent loop hit max iterations ({max_turns})")
 
 
-async def _call_llm(model: str, messages: list[dict[str, str]]) -> tuple[str, dict[str, Any]]:
-    body = json.dumps({"model": _chat_model_name(model), "messages": messages}).encode("utf-8")
+async def _call_llm(model: str, messages: list[dict[str, str]], cache_mode: str | None = None) -> tuple[str, dict[str, Any]]:
+    payload = {"model": _chat_model_name(model), "messages": messages}
     request = Request(
         DEFAULT_CHAT_COMPLETIONS_URL,
-        data=body,
+        data=json.dumps(payload).encode("utf-8"),
         headers={"Content-Type": "application/json"},
         method="POST",
     )
 
     try:
-        response_body = await asyncio.to_thread(_read_http_response, request)
+        response_body = await llm_cache.fetch(payload, lambda: cancellation.to_thread(_read_http_response, request), cache_mode)
     except (URLError, socket.timeout, TimeoutError) as exc:
         raise RuntimeError(f"LLM request failed: {exc}") from exc
 
@@ -114,7 +141,7 @@ async def _call_llm(model: str, messages: list[dict[str, str]]) -> tuple[str, di
 
 
 def _read_http_response(request: Request) -> str:
-    with urlopen(request, timeout=120) as response:
+    with urlopen(request, timeout=cancellation.timeout(120)) as response:
         return response.read().decode("utf-8")
 
 
@@ -133,16 +160,27 @@ def _parse_response(text: str) -> dict[str, Any]:
     if not isinstance(decoded, dict):
         return {"type": "invalid", "error": "JSON response must be an object"}
 
+    tool_calls = decoded.get("tool_calls")
+    if isinstance(tool_calls, list) and tool_calls:
+        calls = []
+        for tool_call in tool_calls:
+            name = tool_call.get("name") if isinstance(tool_call, dict) else None
+            params = tool_call.get("params", {}) if isinstance(tool_call, dict) else None
+            if not isinstance(name, str) or not isinstance(params, dict):
+                return {"type": "invalid", "error": "each entry in tool_calls must include string name and object params"}
+            calls.append({"name": name, "params": params})
+        return {"type": "tool_call", "calls": calls}
+
     tool_call = decoded.get("tool_call")
     if isinstance(tool_call, dict):
         name = tool_call.get("name")
         params = tool_call.get("params", {})
         if isinstance(name, str) and isinstance(params, dict):
-            return {"type": "tool_call", "name": name, "params": params}
+            return {"type": "tool_call", "calls": [{"name": name, "params": params}]}
         return {"type": "invalid", "error": "tool_call must include string name and object params"}
 
     if isinstance(decoded.get("name"), str) and isinstance(decoded.get("params", {}), dict):
-        return {"type": "tool_call", "name": decoded["name"], "params": decoded.get("params", {})}
+        return {"type": "tool_call", "calls": [{"name": decoded["name"], "params": decoded.get("params", {})}]}
 
     final_answer = decoded.get("final_answer")
     if isinstance(final_answer, dict):
@@ -172,13 +210,15 @@ async def _execute_tool(
     request = Request(
         bridge_url,
         data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
+        headers=cancellation.inject(tracing.inject({"Content-Type": "application/json"})),
         method="POST",
     )
 
     try:
-        response_body = await asyncio.to_thread(_read_http_response, request)
+        response_body = await cancellation.to_thread(_read_http_response, request)
         decoded = json.loads(response_body)
+    except cancellation.Cancelled:
+        raise
     except Exception as exc:
         return {"error": str(exc)}
 
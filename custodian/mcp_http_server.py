@@ -174,6 +174,7 @@ def create_starlette_app(static_token: str) -> Starlette:
                 "status": "ok",
                 "server": "custodian",
                 "transport": "streamable-http",
+                "oauth_token_cache": provider.token_cache.stats(),
             }
         )
 
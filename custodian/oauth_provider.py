@@ -5,9 +5,14 @@ from __future__ import annotations
 
 import asyncio
 import hashlib
+import hmac
 import json
+import os
 import secrets
+import threading
 import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
 from typing import Any
 from uuid import uuid4
 
@@ -31,6 +36,11 @@ AUTH_CODE_PREFIX = "custodian_code_"
 DEFAULT_SCOPES = ["custodian.full"]
 ACCESS_TOKEN_TTL = 3600
 AUTH_CODE_TTL = 600
+# Verified access tokens are remembered in memory so only the first request
+# per token pays for bcrypt. Revocations made through this process evict
+# immediately; ones made by another process are bounded by the TTL.
+TOKEN_CACHE_TTL = float(os.environ.get("CUSTODIAN_OAUTH_TOKEN_CACHE_TTL", "60"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get("CUSTODIAN_OAUTH_TOKEN_CACHE_ENTRIES", "1024"))
 
 
 class CustodianAccessToken(AccessToken):
@@ -150,6 +160,117 @@ def _verify_hash(value: str, stored_hash: str) -> bool:
     return bcrypt.checkpw(digest, stored_hash.encode("utf-8"))
 
 
+@dataclass
+class _VerifiedToken:
+    token: "CustodianAccessToken"
+    valid_until: float
+
+
+class VerifiedTokenCache:
+    """LRU of bcrypt-verified access tokens keyed by HMAC-SHA256 of the bearer value.
+
+    The HMAC key is random per process, so the keys are useless outside it
+    and plaintext tokens are never held as dict keys. An entry lives until
+    the earlier of ``TOKEN_CACHE_TTL`` and the token's own expiry.
+
+    Every ``evict`` bumps a revocation generation. A loader reads
+    ``generation()`` before its DB lookup and passes it to ``put``, which drops
+    the entry if a revocation happened in between: the row it read may
+    predate that revocation.
+    """
+
+    def __init__(self, ttl: float = TOKEN_CACHE_TTL, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, _VerifiedToken] = OrderedDict()
+        self._stats: Counter = Counter()
+        self._generation = 0
+
+    def _digest(self, token: str) -> bytes:
+        return hmac.new(self._key, token.encode("utf-8"), hashlib.sha256).digest()
+
+    def get(self, token: str) -> "CustodianAccessToken | None":
+        digest = self._digest(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.valid_until <= now:
+                del self._entries[digest]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._stats["hits"] += 1
+            return entry.token
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, token: "CustodianAccessToken", generation: int | None = None) -> None:
+        ttl = self.ttl
+        if token.expires_at is not None:
+            ttl = min(ttl, token.expires_at - time.time())
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        digest = self._digest(token.token)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self._stats["stale_puts"] += 1
+                return
+            self._entries[digest] = _VerifiedToken(token, time.monotonic() + ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def evict(self, *, family_id: str | None = None, token_id: str | None = None) -> int:
+        """Drop every entry for ``family_id`` and/or ``token_id``; returns how many."""
+        with self._lock:
+            doomed = [
+                digest
+                for digest, entry in self._entries.items()
+                if (family_id and entry.token.family_id == family_id) or (token_id and entry.token.token_id == token_id)
+            ]
+            for digest in doomed:
+                del self._entries[digest]
+            self._generation += 1
+            self._stats["revoked"] += len(doomed)
+        return len(doomed)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+                "expired": self._stats["expired"],
+                "evictions": self._stats["evictions"],
+                "revoked": self._stats["revoked"],
+                "stale_puts": self._stats["stale_puts"],
+                "bcrypt_verifications": self._stats["bcrypt_verifications"],
+            }
+
+    def record_verification(self) -> None:
+        with self._lock:
+            self._stats["bcrypt_verifications"] += 1
+
+
 def _build_secret_value(prefix: str) -> tuple[str, str, str]:
     record_id = uuid4().hex
     secret = secrets.token_hex(32)
@@ -200,6 +321,7 @@ class CustodianOAuthProvider(
     def __init__(self, resource_server_url: str, default_scopes: list[str] | None = None):
         self.resource_server_url = resource_server_url
         self.default_scopes = default_scopes or list(DEFAULT_SCOPES)
+        self.token_cache = VerifiedTokenCache()
 
     async def ensure_schema(self) -> None:
         await asyncio.to_thread(ensure_oauth_schema)
@@ -410,9 +532,15 @@ class CustodianOAuthProvider(
                 resource=refresh_token.resource,
             )
             conn.commit()
-            return token
+        # After the commit, so later loads see the family revoked; a load that read it before the commit
+        # started under the previous cache generation, and its put is dropped.
+        self.token_cache.evict(family_id=refresh_token.family_id)
+        return token
 
     async def load_access_token(self, token: str) -> CustodianAccessToken | None:
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            return cached
         return await asyncio.to_thread(self._load_access_token_sync, token)
 
     def _load_access_token_sync(self, token: str) -> CustodianAccessToken | None:
@@ -420,6 +548,7 @@ class CustodianOAuthProvider(
         if token_id is None:
             return None
 
+        generation = self.token_cache.generation()
         with db_connection() as conn:
             row = conn.execute(
                 "SELECT * FROM oauth_tokens WHERE id = ? AND token_type = 'access' AND revoked = 0",
@@ -427,9 +556,10 @@ class CustodianOAuthProvider(
             ).fetchone()
             if row is None:
                 return None
+            self.token_cache.record_verification()
             if not _verify_hash(token, row["token_hash"]):
                 return None
-            return CustodianAccessToken(
+            access_token = CustodianAccessToken(
                 token=token,
                 client_id=row["client_id"],
                 scopes=_json_loads(row["scopes"], []),
@@ -438,6 +568,8 @@ class CustodianOAuthProvider(
                 token_id=row["id"],
                 family_id=row["family_id"],
             )
+        self.token_cache.put(access_token, generation)
+        return access_token
 
     async def revoke_token(
         self,
@@ -454,6 +586,10 @@ class CustodianOAuthProvider(
             elif token_id:
                 conn.execute("UPDATE oauth_tokens SET revoked = 1 WHERE id = ?", (token_id,))
             conn.commit()
+        if family_id:
+            self.token_cache.evict(family_id=family_id)
+        elif token_id:
+            self.token_cache.evict(token_id=token_id)
 
     def _issue_token_pair_sync(
         self,
@@ -13,22 +13,57 @@ prepended to the user message as:
 OpenCode does not expose a turn-limit flag. The helper accepts ``max_turns`` to
 match existing Custodian APIs, but treats it as advisory only and logs a DEBUG
 message when a non-default value is provided.
+
+``NAI_WORKBENCH_OPENCODE_MODE`` picks how prompts run:
+
+- ``cli`` (default): one ``opencode run --format json`` process per prompt.
+- ``server``: a small pool of long-lived ``opencode serve`` workers per project
+  directory. Each prompt becomes a session on an idle worker, so CLI start-up,
+  config loading and provider initialization are paid once per worker instead
+  of once per prompt. Workers idle for ``NAI_WORKBENCH_OPENCODE_IDLE_SECONDS``
+  are stopped; a worker that fails to start falls back to the CLI.
+
+Either way ``on_event`` receives the raw OpenCode events for the prompt's
+session as they arrive. A prompt running under a ``cancellation`` scope is
+capped by its deadline, and cancelling the scope kills the CLI process or
+aborts the server session.
 """
 
 from __future__ import annotations
 
+import atexit
 import json
 import logging
 import os
+import re
 import subprocess
+import threading
 import time
-from dataclasses import dataclass
+import urllib.error
+import urllib.request
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+try:
+    from custodian.services import cancellation
+except ImportError:  # run as a script from custodian/ (detective.py, admin.py)
+    from services import cancellation
 
 OPENCODE_BIN = os.environ.get(
     "NAI_WORKBENCH_OPENCODE_BIN", os.path.expanduser("~/.opencode/bin/opencode")
 )
+OPENCODE_MODE = os.environ.get("NAI_WORKBENCH_OPENCODE_MODE", "cli").strip().lower()
+OPENCODE_POOL_SIZE = int(os.environ.get("NAI_WORKBENCH_OPENCODE_POOL_SIZE", "2"))
+OPENCODE_IDLE_SECONDS = float(os.environ.get("NAI_WORKBENCH_OPENCODE_IDLE_SECONDS", "600"))
+OPENCODE_STARTUP_TIMEOUT = float(os.environ.get("NAI_WORKBENCH_OPENCODE_STARTUP_TIMEOUT", "30"))
+MODEL_CACHE_SECONDS = float(os.environ.get("NAI_WORKBENCH_OPENCODE_MODELS_TTL", "600"))
 
 _MODEL_CACHE: dict[str, object] = {"timestamp": 0.0, "models": []}
+_MODEL_LOCK = threading.Lock()
+_LISTEN_URL = re.compile(r"https?://[^\s/]+")
+
+log = logging.getLogger(__name__)
 
 
 @dataclass
@@ -63,12 +98,25 @@ class OpenCodeRunnerError(RuntimeError):
 
 
 def list_available_models() -> list[str]:
-    """Return available OpenAI models from OpenCode, cached briefly."""
-    now = time.time()
-    cached_models = _MODEL_CACHE.get("models")
-    if cached_models and now - float(_MODEL_CACHE.get("timestamp", 0.0)) < 60:
-        return list(cached_models)
+    """Return available OpenAI models from OpenCode, cached for ``MODEL_CACHE_SECONDS``."""
+    with _MODEL_LOCK:
+        now = time.time()
+        cached_models = _MODEL_CACHE.get("models")
+        if cached_models and now - float(_MODEL_CACHE.get("timestamp", 0.0)) < MODEL_CACHE_SECONDS:
+            return list(cached_models)
+
+        models = _server_models() if OPENCODE_MODE == "server" else None
+        if models is None:
+            models = _cli_models()
+        if not models:
+            raise OpenCodeRunnerError("OpenCode returned no available OpenAI models")
 
+        _MODEL_CACHE["timestamp"] = now
+        _MODEL_CACHE["models"] = models
+        return list(models)
+
+
+def _cli_models() -> list[str]:
     try:
         result = subprocess.run(
             [OPENCODE_BIN, "models", "openai"],
@@ -86,13 +134,29 @@ def list_available_models() -> list[str]:
             exit_code=result.returncode,
         )
 
-    models = [line.strip() for line in result.stdout.splitlines() if line.strip().startswith("openai/")]
-    if not models:
-        raise OpenCodeRunnerError("OpenCode returned no available OpenAI models")
+    return [line.strip() for line in result.stdout.splitlines() if line.strip().startswith("openai/")]
+
 
-    _MODEL_CACHE["timestamp"] = now
-    _MODEL_CACHE["models"] = models
-    return list(models)
+def _server_models() -> list[str] | None:
+    """Read the provider list from a pooled worker; ``None`` when none can start."""
+    try:
+        server = _acquire(os.getcwd())
+    except OpenCodeRunnerError as exc:
+        log.warning("OpenCode server unavailable, listing models via the CLI: %s", exc)
+        return None
+    try:
+        payload = server.request("GET", "/config/providers", timeout=30)
+    except OpenCodeRunnerError:
+        server.stop()
+        raise
+    finally:
+        _release(server)
+    models = []
+    for provider in payload.get("providers") or []:
+        if provider.get("id") != "openai":
+            continue
+        models.extend(f"openai/{model_id}" for model_id in provider.get("models") or {})
+    return sorted(models)
 
 
 def _build_input(prompt: str, system_prompt: str | None) -> str:
@@ -109,14 +173,42 @@ def run_opencode(
     project_dir: str | None = None,
     max_turns: int | None = None,
     timeout: int = 600,
+    on_event: Callable[[dict[str, Any]], None] | None = None,
 ) -> OpenCodeResult:
-    """Run a one-shot OpenCode prompt and return text/tokens/cost metadata."""
+    """Run an OpenCode prompt and return text/tokens/cost metadata."""
     if max_turns not in (None, 20):
-        logging.getLogger(__name__).debug(
+        log.debug(
             "OpenCode runner received advisory max_turns=%s but opencode run has no turn-limit flag.",
             max_turns,
         )
 
+    input_text = _build_input(prompt, system_prompt)
+    timeout = cancellation.timeout(timeout)
+    try:
+        if OPENCODE_MODE == "server":
+            try:
+                server = _acquire(project_dir or os.getcwd())
+            except OpenCodeRunnerError as exc:
+                log.warning("OpenCode server unavailable, running the prompt via the CLI: %s", exc)
+            else:
+                try:
+                    return server.prompt(input_text, model, timeout=timeout, on_event=on_event)
+                finally:
+                    _release(server)
+        return _run_cli(input_text, model, project_dir, timeout, on_event)
+    except OpenCodeRunnerError:
+        # A killed process or aborted session is reported as the cancellation that caused it.
+        cancellation.check()
+        raise
+
+
+def _run_cli(
+    input_text: str,
+    model: str,
+    project_dir: str | None,
+    timeout: float,
+    on_event: Callable[[dict[str, Any]], None] | None,
+) -> OpenCodeResult:
     env = os.environ.copy()
     env.setdefault("OPENCODE_DISABLE_UPDATE_CHECK", "1")
 
@@ -125,7 +217,6 @@ def run_opencode(
     if project_dir:
         cmd.extend(["--dir", project_dir])
 
-    input_text = _build_input(prompt, system_prompt)
     text_parts: list[str] = []
     tokens_used = 0
     cost_usd = None
@@ -147,6 +238,12 @@ def run_opencode(
     except Exception as exc:
         raise OpenCodeRunnerError(f"failed to start OpenCode: {exc}") from exc
 
+    # proc.wait(timeout) only starts once stdout closes; the timer also bounds the streaming phase.
+    timed_out = threading.Event()
+    timer = threading.Timer(timeout, lambda: (timed_out.set(), proc.kill()))
+    timer.daemon = True
+    timer.start()
+    remove = cancellation.on_cancel(proc.kill)
     try:
         assert proc.stdin is not None
         proc.stdin.write(input_text)
@@ -163,6 +260,8 @@ def run_opencode(
                 continue
             parsed_events += 1
             session_id = session_id or event.get("sessionID")
+            if on_event is not None:
+                on_event(event)
 
             if event.get("type") == "text":
                 text_parts.append(event.get("part", {}).get("text", ""))
@@ -172,12 +271,14 @@ def run_opencode(
                 cost_usd = part.get("cost", cost_usd)
 
         proc.wait(timeout=timeout)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
         stderr_text = proc.stderr.read().strip() if proc.stderr is not None else ""
     except subprocess.TimeoutExpired as exc:
         proc.kill()
         stderr_text = proc.stderr.read().strip() if proc.stderr is not None else ""
         raise OpenCodeRunnerError(
-            f"OpenCode timed out after {timeout}s",
+            f"OpenCode timed out after {timeout:g}s",
             stderr=stderr_text,
             exit_code=None,
             text="".join(text_parts),
@@ -197,6 +298,9 @@ def run_opencode(
             cost_usd=cost_usd,
             session_id=session_id,
         ) from exc
+    finally:
+        timer.cancel()
+        remove()
 
     full_text = "".join(text_parts)
     if proc.returncode != 0:
@@ -228,3 +332,274 @@ def run_opencode(
         exit_code=proc.returncode,
         stderr=stderr_text,
     )
+
+
+def _event_session(event: dict[str, Any]) -> str | None:
+    props = event.get("properties") or {}
+    return props.get("sessionID") or (props.get("part") or {}).get("sessionID") or (props.get("info") or {}).get("sessionID")
+
+
+def _split_model(model: str) -> dict[str, str]:
+    provider, _, model_id = model.partition("/")
+    if not model_id:
+        provider, model_id = "openai", model
+    return {"providerID": provider, "modelID": model_id}
+
+
+@dataclass(eq=False)
+class _OpenCodeServer:
+    """One ``opencode serve`` worker bound to a project directory."""
+
+    project_dir: str
+    busy: bool = False
+    last_used: float = field(default_factory=time.time)
+    url: str | None = None
+    proc: subprocess.Popen | None = None
+    _output: deque = field(default_factory=lambda: deque(maxlen=50))
+    _ready: threading.Event = field(default_factory=threading.Event)
+    _listeners: dict[str, tuple[Callable[[dict[str, Any]], None], threading.Event]] = field(default_factory=dict)
+    _events_ready: threading.Event | None = None
+    _opener: urllib.request.OpenerDirector = field(
+        default_factory=lambda: urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    )
+
+    def start(self) -> None:
+        env = os.environ.copy()
+        env.setdefault("OPENCODE_DISABLE_UPDATE_CHECK", "1")
+        try:
+            self.proc = subprocess.Popen(
+                [OPENCODE_BIN, "serve", "--hostname", "127.0.0.1", "--port", "0"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                cwd=self.project_dir,
+                env=env,
+            )
+        except FileNotFoundError as exc:
+            raise OpenCodeRunnerError(f"OpenCode CLI not found at {OPENCODE_BIN}") from exc
+        except Exception as exc:
+            raise OpenCodeRunnerError(f"failed to start OpenCode server: {exc}") from exc
+
+        threading.Thread(target=self._drain, name="opencode-serve-output", daemon=True).start()
+        if not self._ready.wait(OPENCODE_STARTUP_TIMEOUT) or self.url is None:
+            self.stop()
+            raise OpenCodeRunnerError(
+                f"OpenCode server did not report a listening address within {OPENCODE_STARTUP_TIMEOUT:g}s",
+                stderr="\n".join(self._output),
+                exit_code=self.proc.returncode,
+            )
+        log.info("OpenCode server for %s listening on %s", self.project_dir, self.url)
+
+    def _drain(self) -> None:
+        # Keep reading so a chatty server never blocks on a full pipe.
+        assert self.proc is not None and self.proc.stdout is not None
+        for line in iter(self.proc.stdout.readline, ""):
+            self._output.append(line.rstrip())
+            if self.url is None:
+                match = _LISTEN_URL.search(line)
+                if match:
+                    self.url = match.group(0)
+                    self._ready.set()
+        self._ready.set()
+
+    def alive(self) -> bool:
+        # A worker that is still starting counts as alive.
+        return self.proc is None or self.proc.poll() is None
+
+    def stop(self) -> None:
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def request(self, method: str, path: str, body: dict[str, Any] | None = None, timeout: float = 30) -> dict[str, Any]:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(
+            f"{self.url}{path}",
+            data=data,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with self._opener.open(request, timeout=timeout) as response:
+                raw = response.read()
+        except urllib.error.HTTPError as exc:
+            detail = exc.read().decode("utf-8", "replace").strip()
+            raise OpenCodeRunnerError(f"OpenCode server returned HTTP {exc.code} for {method} {path}", stderr=detail) from exc
+        except TimeoutError as exc:
+            raise OpenCodeRunnerError(f"OpenCode timed out after {timeout}s") from exc
+        except (urllib.error.URLError, OSError) as exc:
+            raise OpenCodeRunnerError(
+                f"OpenCode server request failed: {exc}", stderr="\n".join(self._output)
+            ) from exc
+        return json.loads(raw) if raw.strip() else {}
+
+    def _ensure_events(self) -> None:
+        ready = self._events_ready
+        if ready is None:
+            ready = self._events_ready = threading.Event()
+            threading.Thread(target=self._read_events, args=(ready,), name="opencode-serve-events", daemon=True).start()
+        ready.wait(5)
+
+    def _read_events(self, ready: threading.Event) -> None:
+        request = urllib.request.Request(f"{self.url}/event", headers={"Accept": "text/event-stream"})
+        try:
+            with self._opener.open(request) as response:
+                ready.set()
+                for raw in response:
+                    line = raw.decode("utf-8", "replace").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    try:
+                        event = json.loads(line[5:])
+                    except json.JSONDecodeError:
+                        continue
+                    listener = self._listeners.get(_event_session(event) or "")
+                    if listener is None:
+                        continue
+                    callback, idle = listener
+                    try:
+                        callback(event)
+                    except Exception:
+                        log.exception("OpenCode event listener failed")
+                    if event.get("type") == "session.idle":
+                        idle.set()
+        except Exception as exc:
+            log.debug("OpenCode event stream for %s closed: %s", self.project_dir, exc)
+        finally:
+            ready.set()
+            self._events_ready = None
+
+    def prompt(
+        self,
+        input_text: str,
+        model: str,
+        *,
+        timeout: float,
+        on_event: Callable[[dict[str, Any]], None] | None,
+    ) -> OpenCodeResult:
+        session_id = self.request("POST", "/session", {}).get("id")
+        if not session_id:
+            raise OpenCodeRunnerError("OpenCode server did not return a session id")
+        remove = cancellation.on_cancel(lambda: self.request("POST", f"/session/{session_id}/abort", {}, timeout=5))
+        idle = threading.Event()
+        if on_event is not None:
+            self._ensure_events()
+            self._listeners[session_id] = (on_event, idle)
+        try:
+            reply = self.request(
+                "POST",
+                f"/session/{session_id}/message",
+                {"parts": [{"type": "text", "text": input_text}], "model": _split_model(model)},
+                timeout=timeout,
+            )
+        except OpenCodeRunnerError as exc:
+            try:
+                self.request("POST", f"/session/{session_id}/abort", {}, timeout=5)
+            except OpenCodeRunnerError:
+                pass
+            exc.session_id = session_id
+            raise
+        finally:
+            remove()
+            if on_event is not None:
+                # The reply can beat the tail of the event stream; deliver it before returning.
+                idle.wait(2)
+            self._listeners.pop(session_id, None)
+
+        info = reply.get("info") or {}
+        text = "".join(part.get("text", "") for part in reply.get("parts") or [] if part.get("type") == "text")
+        tokens = info.get("tokens") or {}
+        tokens_used = int(tokens.get("total") or sum(int(tokens.get(key) or 0) for key in ("input", "output", "reasoning")))
+        cost_usd = info.get("cost")
+        error = info.get("error")
+        if error:
+            message = (error.get("data") or {}).get("message") or error.get("name") if isinstance(error, dict) else error
+            raise OpenCodeRunnerError(
+                f"OpenCode session failed: {message}",
+                text=text,
+                tokens_used=tokens_used,
+                cost_usd=cost_usd,
+                session_id=session_id,
+            )
+        if not text:
+            raise OpenCodeRunnerError(
+                "OpenCode produced no parseable text output",
+                tokens_used=tokens_used,
+                cost_usd=cost_usd,
+                session_id=session_id,
+            )
+        return OpenCodeResult(
+            text=text,
+            tokens_used=tokens_used,
+            cost_usd=cost_usd,
+            session_id=session_id,
+            exit_code=0,
+            stderr="",
+        )
+
+
+_POOLS: dict[str, list[_OpenCodeServer]] = {}
+_POOL_CONDITION = threading.Condition()
+
+
+def _acquire(project_dir: str) -> _OpenCodeServer:
+    """Hand out an idle worker for ``project_dir``, starting one if the pool has room."""
+    key = os.path.abspath(project_dir)
+    idle: list[_OpenCodeServer] = []
+    with _POOL_CONDITION:
+        while True:
+            now = time.time()
+            for pool in _POOLS.values():
+                for server in list(pool):
+                    stale = not server.busy and now - server.last_used > OPENCODE_IDLE_SECONDS
+                    if stale or not server.alive():
+                        pool.remove(server)
+                        idle.append(server)
+            pool = _POOLS.setdefault(key, [])
+            server = next((server for server in pool if not server.busy), None)
+            if server is not None:
+                server.busy = True
+                break
+            if len(pool) < max(1, OPENCODE_POOL_SIZE):
+                server = _OpenCodeServer(key, busy=True)
+                pool.append(server)
+                break
+            _POOL_CONDITION.wait(timeout=1.0)
+    for stale in idle:
+        stale.stop()
+
+    if server.proc is not None:
+        return server
+    try:
+        server.start()
+    except OpenCodeRunnerError:
+        with _POOL_CONDITION:
+            _POOLS[key].remove(server)
+            _POOL_CONDITION.notify()
+        raise
+    return server
+
+
+def _release(server: _OpenCodeServer) -> None:
+    with _POOL_CONDITION:
+        server.busy = False
+        server.last_used = time.time()
+        _POOL_CONDITION.notify()
+
+
+def shutdown_opencode_servers() -> None:
+    """Stop every pooled OpenCode worker."""
+    with _POOL_CONDITION:
+        servers = [server for pool in _POOLS.values() for server in pool]
+        _POOLS.clear()
+    for server in servers:
+        server.stop()
+
+
+atexit.register(shutdown_opencode_servers)
@@ -17,6 +17,10 @@ from urllib.request import Request, urlopen
 
 import yaml
 
+from custodian.db import run_owners
+from custodian.db.connection import TrackedConnection
+from custodian.services import agent_events, cancellation, tracing
+
 
 DEFAULT_BRIDGE_URL = "http://localhost:9099/call-tool"
 DEFAULT_OUTPUT_BASE = "/mnt/c/Users/Big A/custodian-shared/pipelines"
@@ -173,6 +177,7 @@ class PipelineSpec:
     trigger: str
     input_schema: dict[str, Any]
     steps: list[StepSpec]
+    timeout_seconds: float | None = None
 
     @classmethod
     def from_yaml(cls, yaml_text: str) -> "PipelineSpec":
@@ -199,6 +204,9 @@ class PipelineSpec:
             raise PipelineError("pipeline must define a non-empty steps list")
         steps = [StepSpec.from_dict(step) for step in raw_steps]
         _ensure_unique_step_names(steps)
+        timeout_seconds = data.get("timeout_seconds")
+        if timeout_seconds is not None and (isinstance(timeout_seconds, bool) or not isinstance(timeout_seconds, (int, float)) or timeout_seconds <= 0):
+            raise PipelineError("timeout_seconds must be a positive number")
         return cls(
             name=name,
             version=version,
@@ -206,6 +214,7 @@ class PipelineSpec:
             trigger=trigger,
             input_schema=input_schema,
             steps=steps,
+            timeout_seconds=timeout_seconds,
         )
 
     def validate_input(self, input_data: dict[str, Any]) -> list[str]:
@@ -297,6 +306,7 @@ class PipelineRun:
         run_name: str | None = None,
         output_dir: str | None = None,
         bridge_url: str = DEFAULT_BRIDGE_URL,
+        timeout_seconds: float | None = None,
     ) -> None:
         self.spec = spec
         self.input_data = input_data
@@ -307,6 +317,7 @@ class PipelineRun:
         self.output_base = Path(output_base)
         self.output_dir = Path(output_dir) if output_dir else self.output_base / spec.name / self.run_name
         self.bridge_url = bridge_url
+        self.timeout_seconds = timeout_seconds or spec.timeout_seconds
         self.context = RefResolver([{"input": input_data}])
         self._resumed_step_name: str | None = None
         self._resume_iteration_state: dict[str, dict[int, dict[str, Any]]] = {}
@@ -320,7 +331,10 @@ class PipelineRun:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self._started_monotonic = time.monotonic()
         self._write_meta(status="running", current_step=None)
-        return await self._run_steps(self.spec.steps)
+        with tracing.span("pipeline.run", run_kind="pipeline", run_id=self.run_id, pipeline=self.spec.name, run_name=self.run_name), cancellation.scope(
+            "pipeline", self.run_id, timeout=self.timeout_seconds
+        ), run_owners.owned("pipeline", self.run_id, self.db_path):
+            return await self._run_steps(self.spec.steps)
 
     async def resume(self, from_step: str | None = None) -> dict[str, Any]:
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -330,7 +344,15 @@ class PipelineRun:
         self._resumed_step_name = target
         self._load_resume_iteration_state()
         self._write_meta(status="running", current_step=target)
-        return await self._run_steps(self.spec.steps, from_step=target)
+        with tracing.span(
+            "pipeline.resume",
+            run_kind="pipeline",
+            run_id=self.run_id,
+            pipeline=self.spec.name,
+            run_name=self.run_name,
+            from_step=target,
+        ), cancellation.scope("pipeline", self.run_id, timeout=self.timeout_seconds), run_owners.owned("pipeline", self.run_id, self.db_path):
+            return await self._run_steps(self.spec.steps, from_step=target)
 
     async def _run_steps(self, steps: list[StepSpec], from_step: str | None = None) -> dict[str, Any]:
         skipping = from_step is not None
@@ -412,8 +434,9 @@ class PipelineRun:
                 "output_dir": str(self.output_dir),
             }
         except Exception as exc:
-            stats = self._final_stats(status="failed")
-            self._set_run_state(status="failed", error=str(exc), stats=stats)
+            status = "cancelled" if isinstance(exc, cancellation.Cancelled) else "failed"
+            stats = self._final_stats(status=status)
+            self._set_run_state(status=status, error=str(exc), stats=stats)
             raise
 
     async def execute_step(
@@ -424,6 +447,34 @@ class PipelineRun:
         *,
         iteration_index: int | None = None,
         iteration_key: str | None = None,
+    ) -> Any:
+        cancellation.check()
+        with tracing.span(
+            f"step.{step.name}",
+            step_type=step.type,
+            iteration_index=iteration_index,
+            iteration_key=iteration_key,
+        ) as step_span:
+            try:
+                return await self._dispatch_step(
+                    step,
+                    context,
+                    base_dir,
+                    iteration_index=iteration_index,
+                    iteration_key=iteration_key,
+                )
+            except PipelinePaused:
+                step_span.status = "paused"
+                raise
+
+    async def _dispatch_step(
+        self,
+        step: StepSpec,
+        context: RefResolver,
+        base_dir: Path,
+        *,
+        iteration_index: int | None = None,
+        iteration_key: str | None = None,
     ) -> Any:
         if step.type == "agent":
             return await self.execute_agent_step(
@@ -529,7 +580,10 @@ class PipelineRun:
                     task_text = str(resolved_input.get("task") or resolved_input.get("prompt") or json.dumps(resolved_input, sort_keys=True))
                 else:
                     task_text = str(resolved_input)
-                agent_output = await asyncio.to_thread(dispatch_agent, step.agent or "", task_text, agent_run_id)
+                with tracing.span("agent.run", run_kind="agent", run_id=agent_run_id, agent=step.agent, workstation=True), agent_events.run_scope(
+                    agent_run_id, step.agent, progress=lambda snapshot: self._write_agent_progress(row_id, agent_run_id, snapshot)
+                ), cancellation.scope("agent", agent_run_id), run_owners.owned("agent", agent_run_id, self.db_path):
+                    agent_output = await cancellation.to_thread(dispatch_agent, step.agent or "", task_text, agent_run_id)
                 output_path = self._step_output_path(base_dir, step.name)
                 output_path.write_text(json.dumps(agent_output, indent=2), encoding="utf-8")
                 duration_ms = int((time.time() - started) * 1000)
@@ -566,13 +620,18 @@ class PipelineRun:
                 input_data=resolved_input,
                 db=conn,
             )
-            agent_result = await run_agent_loop(
-                model=agent["model"] or "openai/gpt-5.4",
-                compiled_prompt=compiled,
-                max_turns=int(agent["max_turns"] or 20),
-                tools=tool_defs,
-                bridge_url=self.bridge_url,
-            )
+            with tracing.span("agent.run", run_kind="agent", run_id=agent_run_id, agent=step.agent), agent_events.run_scope(
+                agent_run_id, step.agent, progress=lambda snapshot: self._write_agent_progress(row_id, agent_run_id, snapshot)
+            ), cancellation.scope("agent", agent_run_id), run_owners.owned("agent", agent_run_id, self.db_path):
+                agent_result = await run_agent_loop(
+                    model=agent["model"] or "openai/gpt-5.4",
+                    compiled_prompt=compiled,
+                    max_turns=int(agent["max_turns"] or 20),
+                    tools=tool_defs,
+                    bridge_url=self.bridge_url,
+                    tool_concurrency=agent["tool_concurrency"] if "tool_concurrency" in agent.keys() else None,
+                    cache_mode=agent["llm_cache"] if "llm_cache" in agent.keys() else None,
+                )
             output_path = self._step_output_path(base_dir, step.name)
             output_path.write_text(json.dumps(agent_result.output, indent=2), encoding="utf-8")
             duration_ms = int((time.time() - started) * 1000)
@@ -601,10 +660,11 @@ class PipelineRun:
             return agent_result.output
         except Exception as exc:
             duration_ms = int((time.time() - started) * 1000)
+            status = "cancelled" if isinstance(exc, cancellation.Cancelled) else "failed"
             self._steps_failed += 1
             self._finish_step_result(
                 row_id,
-                status="failed",
+                status=status,
                 output=None,
                 output_file=None,
                 finished_at=_utc_now(),
@@ -616,10 +676,10 @@ class PipelineRun:
                     conn.execute(
                         """
                         UPDATE agent_runs
-                        SET status = 'failed', error = ?, finished_at = datetime('now')
+                        SET status = ?, error = ?, finished_at = datetime('now')
                         WHERE id = ?
                         """,
-                        (str(exc), agent_run_id),
+                        (status, str(exc), agent_run_id),
                     )
                     conn.commit()
             raise
@@ -657,7 +717,7 @@ class PipelineRun:
             started_at=start_iso,
         )
         try:
-            result = await asyncio.to_thread(_call_bridge, self.bridge_url, step.project or "", step.tool or "", resolved_input)
+            result = await cancellation.to_thread(_call_bridge, self.bridge_url, step.project or "", step.tool or "", resolved_input)
             output_path = self._step_output_path(base_dir, step.name)
             output_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
             duration_ms = int((time.time() - started) * 1000)
@@ -678,7 +738,7 @@ class PipelineRun:
             self._steps_failed += 1
             self._finish_step_result(
                 row_id,
-                status="failed",
+                status="cancelled" if isinstance(exc, cancellation.Cancelled) else "failed",
                 output=None,
                 output_file=None,
                 finished_at=_utc_now(),
@@ -834,7 +894,7 @@ class PipelineRun:
         try:
             from custodian.services.workstations import dispatch_batch
 
-            batch = await asyncio.to_thread(dispatch_batch, step.agent or "", tasks, step.parallel)
+            batch = await cancellation.to_thread(dispatch_batch, step.agent or "", tasks, step.parallel)
             results: list[dict[str, Any]] = []
             for index, (item, task_text, payload) in enumerate(zip(items, tasks, batch.get("results", []))):
                 item_key = _iteration_key(item, index)
@@ -879,7 +939,7 @@ class PipelineRun:
             self._steps_failed += 1
             self._finish_step_result(
                 row_id,
-                status="failed",
+                status="cancelled" if isinstance(exc, cancellation.Cancelled) else "failed",
                 output=None,
                 output_file=None,
                 finished_at=_utc_now(),
@@ -965,6 +1025,7 @@ class PipelineRun:
                 )
 
         while True:
+            cancellation.check()
             done_now = [task for task in in_flight if task.done()]
             for task in done_now:
                 in_flight.remove(task)
@@ -976,7 +1037,7 @@ class PipelineRun:
 
             if paused_exc is None:
                 resolved_poll_input = context.resolve(step.poll_input)
-                polled = await asyncio.to_thread(
+                polled = await cancellation.to_thread(
                     _call_bridge,
                     self.bridge_url,
                     step.poll_project or "",
@@ -1107,6 +1168,8 @@ class PipelineRun:
             item_results["_pause"] = paused
             return item_results
         except Exception as exc:
+            # A cancelled agent fails its item; a cancelled run stops the whole step.
+            cancellation.check()
             item_results["status"] = "failed"
             item_results["error"] = str(exc)
             return item_results
@@ -1247,7 +1310,7 @@ class PipelineRun:
         return base_dir / f"{step_name}.json"
 
     def _db(self):
-        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn = sqlite3.connect(self.db_path, timeout=30, factory=TrackedConnection)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys=ON")
         return conn
@@ -1337,6 +1400,14 @@ class PipelineRun:
                 conn.commit()
             self._write_meta()
 
+    def _write_agent_progress(self, row_id: int, agent_run_id: int, snapshot: dict[str, Any]) -> None:
+        progress = json.dumps(snapshot)
+        with self._state_lock:
+            with self._db() as conn:
+                conn.execute("UPDATE pipeline_step_results SET progress = ? WHERE id = ?", (progress, row_id))
+                conn.execute("UPDATE agent_runs SET progress = ? WHERE id = ?", (progress, agent_run_id))
+                conn.commit()
+
     def _record_step_result(self, **kwargs: Any) -> None:
         row_id = self._insert_step_result(
             step_name=kwargs["step_name"],
@@ -1366,7 +1437,7 @@ class PipelineRun:
                 conn.execute(
                     """
                     UPDATE pipeline_runs
-                    SET status = ?, current_step = ?, error = ?, stats = ?, finished_at = CASE WHEN ? IN ('completed', 'failed') THEN CURRENT_TIMESTAMP ELSE finished_at END
+                    SET status = ?, current_step = ?, error = ?, stats = ?, finished_at = CASE WHEN ? IN ('completed', 'failed', 'cancelled') THEN CURRENT_TIMESTAMP ELSE finished_at END
                     WHERE id = ?
                     """,
                     (
@@ -1434,6 +1505,7 @@ class PipelineRun:
                     "params": input_schema,
                     "input_schema": input_schema,
                     "output_schema": output_schema,
+                    "serial": bool(row["known_side_effects"]),
                 }
             )
         return tool_defs
@@ -1676,20 +1748,21 @@ def _call_bridge(bridge_url: str, project: str, tool_name: str, params: dict[str
         "tool_name": tool_name,
         "params": params,
     }
-    request = Request(
-        bridge_url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with urlopen(request, timeout=120) as response:
-            data = json.loads(response.read().decode("utf-8"))
-    except HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace")
-        raise PipelineError(f"tool step bridge call failed for '{tool_name}' on '{project}': HTTP {exc.code} {body}") from exc
-    except URLError as exc:
-        raise PipelineError(f"tool step bridge call failed for '{tool_name}' on '{project}': {exc.reason}") from exc
+    with tracing.span("bridge.call", project=project, tool=tool_name):
+        request = Request(
+            bridge_url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers=cancellation.inject(tracing.inject({"Content-Type": "application/json"})),
+            method="POST",
+        )
+        try:
+            with urlopen(request, timeout=cancellation.timeout(120)) as response:
+                data = json.loads(response.read().decode("utf-8"))
+        except HTTPError as exc:
+            body = exc.read().decode("utf-8", errors="replace")
+            raise PipelineError(f"tool step bridge call failed for '{tool_name}' on '{project}': HTTP {exc.code} {body}") from exc
+        except URLError as exc:
+            raise PipelineError(f"tool step bridge call failed for '{tool_name}' on '{project}': {exc.reason}") from exc
     if isinstance(data, dict) and "result" in data and len(data) == 1:
         return data["result"]
     return data
@@ -332,6 +332,13 @@ function buildTickerItems(wb, config) {
     }
   }
 
+  if (wb.agent_runs && wb.agent_runs.length > 0) {
+    for (const r of wb.agent_runs) {
+      const tools = r.tools && r.tools.length ? ' \u2192 ' + r.tools.join(', ') : '';
+      items.push({dot: 'yellow', text: 'AGENT ' + r.agent + ' #' + r.id + ' turn ' + r.turn + ' \u00B7 ' + r.tokens + ' tok' + tools});
+    }
+  }
+
   if (config.indexing && wb.indexing && wb.indexing.active) {
     items.push({dot: 'yellow', text: 'INDEXING ' + wb.indexing.project + ' ' + wb.indexing.step});
   }
@@ -477,6 +484,13 @@ function buildItems(wb, config) {
     }
   }
 
+  if (wb.agent_runs && wb.agent_runs.length > 0) {
+    for (const r of wb.agent_runs) {
+      const tools = r.tools && r.tools.length ? ' \u2192 ' + r.tools.join(', ') : '';
+      items.push({dot: 'yellow', text: 'AGENT ' + r.agent + ' #' + r.id + ' turn ' + r.turn + ' \u00B7 ' + r.tokens + ' tok' + tools});
+    }
+  }
+
   if (config.indexing && wb.indexing && wb.indexing.active) {
     items.push({dot: 'yellow', text: 'INDEXING ' + wb.indexing.project + ' ' + wb.indexing.step});
   }
@@ -737,6 +751,7 @@ def _get_workbench_status():
         "fossils": [],
         "shared_files": [],
         "projects": [],
+        "agent_runs": [],
     }
 
     # Check for running indexing processes
@@ -813,6 +828,29 @@ def _get_workbench_status():
     except Exception:
         pass
 
+    # Live agent runs (progress snapshots written by the agent event bus)
+    try:
+        conn = sqlite3.connect(DB_PATH, timeout=2)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            """SELECT ar.id, a.name, ar.progress
+               FROM agent_runs ar JOIN agents a ON a.id = ar.agent_id
+               WHERE ar.status = 'running'
+               ORDER BY ar.id DESC LIMIT 5"""
+        ).fetchall()
+        conn.close()
+        for r in rows:
+            progress = json.loads(r["progress"]) if r["progress"] else {}
+            result["agent_runs"].append({
+                "id": r["id"],
+                "agent": r["name"],
+                "turn": progress.get("turn", 0),
+                "tokens": progress.get("tokens", 0),
+                "tools": progress.get("tools_in_flight", []),
+            })
+    except Exception:
+        pass
+
     # Shared files
     if os.path.isdir(SHARED_DIR):
         try:
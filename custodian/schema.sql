@@ -26,6 +26,13 @@ CREATE UNIQUE INDEX IF NOT EXISTS idx_projects_task_prefix
     ON projects(task_prefix)
     WHERE task_prefix IS NOT NULL;
 
+-- Extra names a project resolves under (see services/project_resolver.py).
+CREATE TABLE IF NOT EXISTS project_aliases (
+    alias TEXT PRIMARY KEY COLLATE NOCASE,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE IF NOT EXISTS fossils (
     id INTEGER PRIMARY KEY,
     project_id INTEGER NOT NULL REFERENCES projects(id),
@@ -81,6 +88,15 @@ CREATE TABLE IF NOT EXISTS query_log (
     timestamp TEXT DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Daily per-tool call counts for query_log rows removed by retention
+CREATE TABLE IF NOT EXISTS query_log_daily (
+    day TEXT NOT NULL,
+    tool_name TEXT NOT NULL DEFAULT '',
+    project_name TEXT NOT NULL DEFAULT '',
+    calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, tool_name, project_name)
+);
+
 CREATE INDEX IF NOT EXISTS idx_fossils_project ON fossils(project_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_symbols_project ON symbols(project_id, name);
 CREATE INDEX IF NOT EXISTS idx_symbols_type ON symbols(project_id, type);
@@ -125,6 +141,8 @@ CREATE TABLE IF NOT EXISTS agents (
     model TEXT DEFAULT 'openai/gpt-5.4',
     project_id INTEGER REFERENCES projects(id),
     max_turns INTEGER DEFAULT 20,
+    tool_concurrency INTEGER,            -- Max tool calls run at once per turn (NULL = CUSTODIAN_AGENT_TOOL_CONCURRENCY)
+    llm_cache TEXT,                      -- LLM response cache mode: off, on, replay (NULL = CUSTODIAN_LLM_CACHE)
     tools TEXT,                          -- JSON: allowed tool names
     mcp_servers TEXT,                    -- JSON: MCP server configs
     spec_path TEXT,                      -- YAML spec path relative to the project box /workspace root
@@ -158,7 +176,10 @@ CREATE TABLE IF NOT EXISTS pipeline_runs (
     started_at TEXT DEFAULT CURRENT_TIMESTAMP,
     finished_at TEXT,
     error TEXT,
-    stats TEXT
+    stats TEXT,
+    payloads_archive TEXT,               -- gzip sidecar holding step inputs/outputs moved out by retention
+    cancel_requested TEXT,               -- cancel reason left for the owning process (see db/run_owners.py)
+    heartbeat_at TEXT                    -- last heartbeat from the owning process
 );
 
 CREATE TABLE IF NOT EXISTS pipeline_step_results (
@@ -175,7 +196,8 @@ CREATE TABLE IF NOT EXISTS pipeline_step_results (
     started_at TEXT,
     finished_at TEXT,
     duration_ms INTEGER,
-    error TEXT
+    error TEXT,
+    progress TEXT                        -- live agent progress snapshot (JSON) while running
 );
 
 CREATE TABLE IF NOT EXISTS agent_runs (
@@ -190,7 +212,10 @@ CREATE TABLE IF NOT EXISTS agent_runs (
     output TEXT,
     tokens_used INTEGER,
     error TEXT,
-    triggered_by TEXT                    -- manual, schedule, pipeline
+    triggered_by TEXT,                   -- manual, schedule, pipeline
+    progress TEXT,                       -- live progress snapshot (JSON): turn, tokens, tools in flight
+    cancel_requested TEXT,               -- cancel reason left for the owning process (see db/run_owners.py)
+    heartbeat_at TEXT                    -- last heartbeat from the owning process
 );
 
 CREATE TABLE IF NOT EXISTS reindex_requests (
@@ -408,6 +433,12 @@ CREATE TABLE IF NOT EXISTS todo_items (
 CREATE INDEX IF NOT EXISTS idx_todo_project ON todo_items(project);
 CREATE INDEX IF NOT EXISTS idx_todo_status ON todo_items(status);
 
+-- Last number handed out per human-readable ID sequence ('tasks:CT', 'todo_items:TD', ...)
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
 -- System-wide updates broadcast: new tools, rules, capabilities
 CREATE TABLE IF NOT EXISTS system_updates (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -529,11 +560,75 @@ CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
     INSERT INTO memories_fts(memories_fts, rowid, content, tags) VALUES ('delete', old.id, old.content, old.tags);
 END;
 
-CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
+-- Only content/tags changes touch the FTS index; access_count bumps do not
+CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE OF content, tags ON memories BEGIN
     INSERT INTO memories_fts(memories_fts, rowid, content, tags) VALUES ('delete', old.id, old.content, old.tags);
     INSERT INTO memories_fts(rowid, content, tags) VALUES (new.id, new.content, new.tags);
 END;
 
+-- Normalized memory tags, kept in sync with memories.tags by triggers
+CREATE TABLE IF NOT EXISTS memory_tags (
+    tag TEXT NOT NULL,
+    memory_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, memory_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_memory_tags_memory ON memory_tags(memory_id);
+
+CREATE TRIGGER IF NOT EXISTS memories_tags_ai AFTER INSERT ON memories BEGIN
+    INSERT OR IGNORE INTO memory_tags(tag, memory_id)
+    SELECT value, new.id FROM json_each(CASE WHEN json_valid(new.tags) THEN new.tags ELSE '[]' END)
+    WHERE type = 'text';
+END;
+
+CREATE TRIGGER IF NOT EXISTS memories_tags_au AFTER UPDATE OF tags ON memories BEGIN
+    DELETE FROM memory_tags WHERE memory_id = old.id;
+    INSERT OR IGNORE INTO memory_tags(tag, memory_id)
+    SELECT value, new.id FROM json_each(CASE WHEN json_valid(new.tags) THEN new.tags ELSE '[]' END)
+    WHERE type = 'text';
+END;
+
+-- Hashed sparse term vectors for hybrid memory search (see custodian/db/memory_index.py)
+CREATE TABLE IF NOT EXISTS memory_vector_terms (
+    feature INTEGER NOT NULL,        -- CRC32 of the token / prefix feature
+    memory_id INTEGER NOT NULL,
+    weight REAL NOT NULL,            -- cosine-normalized 1 + log(tf)
+    PRIMARY KEY (feature, memory_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_memory_vector_terms_memory ON memory_vector_terms(memory_id);
+
+CREATE TABLE IF NOT EXISTS memory_vector_docs (
+    memory_id INTEGER PRIMARY KEY,
+    indexed_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS memory_vector_df (
+    feature INTEGER PRIMARY KEY,
+    df INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS memory_vector_terms_ai AFTER INSERT ON memory_vector_terms BEGIN
+    INSERT INTO memory_vector_df(feature, df) VALUES (new.feature, 1)
+    ON CONFLICT(feature) DO UPDATE SET df = df + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS memory_vector_terms_ad AFTER DELETE ON memory_vector_terms BEGIN
+    UPDATE memory_vector_df SET df = df - 1 WHERE feature = old.feature;
+END;
+
+-- A changed or deleted memory loses its vector; memory_index.index_memory rebuilds it
+CREATE TRIGGER IF NOT EXISTS memories_vector_au AFTER UPDATE OF content, tags ON memories BEGIN
+    DELETE FROM memory_vector_terms WHERE memory_id = old.id;
+    DELETE FROM memory_vector_docs WHERE memory_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS memories_index_ad AFTER DELETE ON memories BEGIN
+    DELETE FROM memory_tags WHERE memory_id = old.id;
+    DELETE FROM memory_vector_terms WHERE memory_id = old.id;
+    DELETE FROM memory_vector_docs WHERE memory_id = old.id;
+END;
+
 -- Memory drift flags — passive reports that a stored memory is wrong or stale
 CREATE TABLE IF NOT EXISTS memory_flags (
     id TEXT PRIMARY KEY,
@@ -0,0 +1,284 @@
+"""In-process event bus for live agent progress.
+
+Agent loops publish as they go instead of only returning a final result:
+
+- ``run_start`` / ``run_finish`` (``status``)
+- ``turn_start`` (``turn``)
+- ``text`` (``text``; ``delta`` when it continues earlier text)
+- ``tool_start`` / ``tool_finish`` (``call_id``, ``name``; finish adds ``ok``
+  and ``duration_ms``)
+- ``usage`` (running ``tokens`` and ``cost_usd`` totals)
+
+Events belong to the run opened with ``run_scope`` in the current context, so
+they follow the work into tasks and ``asyncio.to_thread`` workers. Consumers
+either ``subscribe`` process-wide or ``listen`` for the events published under
+the current context (an MCP tool call, a pipeline step). ``ProgressRecorder``
+folds a run's events into a small snapshot for the run record.
+
+Workstation containers have no bus to publish to: ``agent_loop.py`` prints
+events as ``EVENT_LINE_PREFIX`` lines on stdout and the host re-publishes them
+with ``forward_line``.
+
+Stdlib-only: copied next to ``agent_loop.py`` into workstation containers.
+"""
+from __future__ import annotations
+
+import contextvars
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+EVENT_LINE_PREFIX = "@@agent_event "
+PROGRESS_FLUSH_SECONDS = float(os.environ.get("CUSTODIAN_PROGRESS_FLUSH_SECONDS", "0.5"))
+RECENT_EVENTS = 200
+RECENT_RUNS = 64
+TEXT_TAIL_CHARS = 400
+
+Listener = Callable[["AgentEvent"], None]
+
+
+@dataclass(frozen=True)
+class AgentEvent:
+    kind: str
+    run_id: int | None
+    agent: str | None
+    seq: int
+    ts: float
+    data: dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"kind": self.kind, "run_id": self.run_id, "agent": self.agent, "seq": self.seq, "ts": round(self.ts, 3), **self.data}
+
+
+@dataclass
+class _Scope:
+    run_id: int | None
+    agent: str | None
+    seq: Iterator[int] = field(default_factory=lambda: itertools.count(1))
+    calls: Iterator[int] = field(default_factory=lambda: itertools.count(1))
+
+
+_SCOPE: contextvars.ContextVar[_Scope | None] = contextvars.ContextVar("custodian_agent_run", default=None)
+_LISTENERS: contextvars.ContextVar[tuple[Listener, ...]] = contextvars.ContextVar("custodian_agent_listeners", default=())
+_SUBSCRIBERS: list[tuple[Listener, int | None]] = []
+_SUBSCRIBERS_LOCK = threading.Lock()
+_RECENT: OrderedDict[int, deque] = OrderedDict()
+_RECENT_LOCK = threading.Lock()
+
+
+def subscribe(callback: Listener, run_id: int | None = None) -> Callable[[], None]:
+    """Receive every event (or one run's events) from this process; returns an unsubscribe function."""
+    entry = (callback, run_id)
+    with _SUBSCRIBERS_LOCK:
+        _SUBSCRIBERS.append(entry)
+
+    def unsubscribe() -> None:
+        with _SUBSCRIBERS_LOCK:
+            if entry in _SUBSCRIBERS:
+                _SUBSCRIBERS.remove(entry)
+
+    return unsubscribe
+
+
+@contextmanager
+def listen(callback: Listener) -> Iterator[None]:
+    """Receive the events published by code running under the current context."""
+    token = _LISTENERS.set(_LISTENERS.get() + (callback,))
+    try:
+        yield
+    finally:
+        _LISTENERS.reset(token)
+
+
+@contextmanager
+def run_scope(
+    run_id: int | None,
+    agent: str | None = None,
+    *,
+    progress: Callable[[dict[str, Any]], None] | None = None,
+) -> Iterator[None]:
+    """Attribute events published inside the block to ``run_id``.
+
+    ``progress`` receives the run's ``ProgressRecorder`` snapshot as it changes.
+    """
+    recorder = ProgressRecorder(progress, run_id=run_id) if progress is not None else None
+    listener_token = _LISTENERS.set(_LISTENERS.get() + (recorder,)) if recorder is not None else None
+    token = _SCOPE.set(_Scope(run_id, agent))
+    status = "failed"
+    try:
+        publish("run_start")
+        yield
+        status = "completed"
+    finally:
+        publish("run_finish", status=status)
+        _SCOPE.reset(token)
+        if listener_token is not None:
+            _LISTENERS.reset(listener_token)
+
+
+def publish(kind: str, **data: Any) -> AgentEvent | None:
+    return _publish(_SCOPE.get(), _LISTENERS.get(), kind, data)
+
+
+def bind() -> Callable[..., AgentEvent | None]:
+    """A ``publish`` tied to the current run, for callbacks invoked from other threads."""
+    scope, listeners = _SCOPE.get(), _LISTENERS.get()
+    return lambda kind, **data: _publish(scope, listeners, kind, data)
+
+
+def _publish(scope: _Scope | None, listeners: tuple[Listener, ...], kind: str, data: dict[str, Any]) -> AgentEvent | None:
+    if scope is None and not listeners and not _SUBSCRIBERS:
+        return None
+    event = AgentEvent(
+        kind=kind,
+        run_id=scope.run_id if scope else None,
+        agent=scope.agent if scope else None,
+        seq=next(scope.seq) if scope else 0,
+        ts=time.time(),
+        data=data,
+    )
+    if event.run_id is not None:
+        with _RECENT_LOCK:
+            events = _RECENT.get(event.run_id)
+            if events is None:
+                events = _RECENT[event.run_id] = deque(maxlen=RECENT_EVENTS)
+                while len(_RECENT) > RECENT_RUNS:
+                    _RECENT.popitem(last=False)
+            events.append(event)
+    with _SUBSCRIBERS_LOCK:
+        subscribers = [callback for callback, run_id in _SUBSCRIBERS if run_id is None or run_id == event.run_id]
+    for callback in (*listeners, *subscribers):
+        try:
+            callback(event)
+        except Exception as exc:
+            print(f"[agent_events] {kind} subscriber failed: {exc}", file=sys.stderr)
+    return event
+
+
+@contextmanager
+def tool_call(name: str) -> Iterator[None]:
+    """Publish ``tool_start`` and ``tool_finish`` around one tool execution."""
+    scope = _SCOPE.get()
+    call_id = f"c{next(scope.calls)}" if scope else name
+    publish("tool_start", call_id=call_id, name=name)
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        publish("tool_finish", call_id=call_id, name=name, ok=ok, duration_ms=int((time.perf_counter() - started) * 1000))
+
+
+def recent(run_id: int, after: int = 0) -> list[dict[str, Any]]:
+    """Events this process has seen for ``run_id`` with ``seq`` greater than ``after``."""
+    with _RECENT_LOCK:
+        events = list(_RECENT.get(run_id) or ())
+    return [event.to_dict() for event in events if event.seq > after]
+
+
+def describe(event: AgentEvent) -> str | None:
+    """One-line summary for progress displays; ``None`` for text chunks."""
+    data = event.data
+    if event.kind == "turn_start":
+        return f"turn {data.get('turn')}"
+    if event.kind == "tool_start":
+        return f"tool {data.get('name')} started"
+    if event.kind == "tool_finish":
+        outcome = "finished" if data.get("ok", True) else "failed"
+        return f"tool {data.get('name')} {outcome} ({data.get('duration_ms', 0)} ms)"
+    if event.kind == "usage":
+        cost = data.get("cost_usd")
+        return f"{data.get('tokens', 0)} tokens" + (f", ${cost:.4f}" if cost is not None else "")
+    if event.kind == "run_start":
+        return f"{event.agent or 'agent'} started"
+    if event.kind == "run_finish":
+        return f"{event.agent or 'agent'} {'finished' if data.get('status') == 'completed' else data.get('status')}"
+    return None
+
+
+class ProgressRecorder:
+    """Fold one run's events into a snapshot and pass it to ``write``.
+
+    Text chunks are written at most every ``PROGRESS_FLUSH_SECONDS``; every
+    other event is written immediately.
+    """
+
+    def __init__(self, write: Callable[[dict[str, Any]], None], *, run_id: int | None = None, flush_seconds: float | None = None):
+        self.run_id = run_id
+        self.snapshot: dict[str, Any] = {
+            "finished": False,
+            "turn": 0,
+            "tokens": 0,
+            "cost_usd": None,
+            "tool_calls": 0,
+            "tools_in_flight": [],
+            "text_tail": "",
+            "last_event": None,
+            "updated_at": None,
+        }
+        self._write = write
+        self._flush_seconds = PROGRESS_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, event: AgentEvent) -> None:
+        if self.run_id is not None and event.run_id != self.run_id:
+            return
+        with self._lock:
+            self._fold(event)
+            now = time.monotonic()
+            if event.kind == "text" and now - self._last_flush < self._flush_seconds:
+                return
+            self._last_flush = now
+            self._write(json.loads(json.dumps(self.snapshot)))
+
+    def _fold(self, event: AgentEvent) -> None:
+        snapshot, data = self.snapshot, event.data
+        if event.kind == "turn_start":
+            snapshot["turn"] = data.get("turn", snapshot["turn"])
+        elif event.kind == "text":
+            text = str(data.get("text") or "")
+            snapshot["text_tail"] = ((snapshot["text_tail"] + text) if data.get("delta") else text)[-TEXT_TAIL_CHARS:]
+        elif event.kind == "tool_start":
+            snapshot["tools_in_flight"].append(data.get("name"))
+        elif event.kind == "tool_finish":
+            snapshot["tool_calls"] += 1
+            if data.get("name") in snapshot["tools_in_flight"]:
+                snapshot["tools_in_flight"].remove(data.get("name"))
+        elif event.kind == "usage":
+            snapshot["tokens"] = data.get("tokens", snapshot["tokens"])
+            snapshot["cost_usd"] = data.get("cost_usd", snapshot["cost_usd"])
+        elif event.kind == "run_finish":
+            snapshot["finished"] = True
+            snapshot["tools_in_flight"] = []
+        snapshot["last_event"] = event.kind
+        snapshot["updated_at"] = round(event.ts, 3)
+
+
+def print_event(event: AgentEvent) -> None:
+    """Subscriber for workstation containers: one prefixed JSON line per event on stdout."""
+    payload = {"kind": event.kind, **event.data}
+    print(EVENT_LINE_PREFIX + json.dumps(payload, default=str), flush=True)
+
+
+def forward_line(line: str) -> bool:
+    """Re-publish an event line printed by a container loop; ``False`` for any other output."""
+    if not line.startswith(EVENT_LINE_PREFIX):
+        return False
+    try:
+        payload = json.loads(line[len(EVENT_LINE_PREFIX):])
+    except json.JSONDecodeError:
+        return False
+    kind = payload.pop("kind", None)
+    # The host opens and closes the run itself.
+    if kind and kind not in ("run_start", "run_finish"):
+        publish(str(kind), **payload)
+    return True
@@ -13,6 +13,17 @@ from typing import Any
 
 import httpx
 
+try:
+    from custodian.services import agent_events, cancellation, llm_cache
+    from custodian.services.context_budget import READ_TOOL_RESULT, ContextBudget
+    from custodian.services.tool_fanout import is_serial, run_tool_calls
+except ImportError:  # copied next to agent_loop.py inside workstation containers
+    import agent_events
+    import cancellation
+    import llm_cache
+    from context_budget import READ_TOOL_RESULT, ContextBudget
+    from tool_fanout import is_serial, run_tool_calls
+
 
 def _chat_model_name(model: str) -> str:
     if "/" in model:
@@ -59,6 +70,7 @@ async def _call_proxy(
     model: str,
     messages: list[dict[str, Any]],
     tools: list[dict[str, Any]],
+    cache_mode: str | None = None,
 ) -> dict[str, Any]:
     payload: dict[str, Any] = {
         "model": _chat_model_name(model),
@@ -68,22 +80,27 @@ async def _call_proxy(
         payload["tools"] = [_tool_schema(tool) for tool in tools]
         payload["tool_choice"] = "auto"
 
-    last_error: Exception | None = None
-    for attempt in range(3):
-        try:
-            async with httpx.AsyncClient(timeout=120) as client:
-                response = await client.post(proxy_url, json=payload)
-            if response.status_code in {429, 500, 502, 503, 504}:
+    async def post() -> str:
+        last_error: Exception | None = None
+        for attempt in range(3):
+            timeout = cancellation.timeout(120)
+            try:
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    response = await client.post(proxy_url, json=payload)
+                if response.status_code in {429, 500, 502, 503, 504}:
+                    response.raise_for_status()
                 response.raise_for_status()
-            response.raise_for_status()
-            decoded = response.json()
-            return decoded["choices"][0]["message"]
-        except Exception as exc:  # noqa: BLE001 - retryable proxy boundary
-            last_error = exc
-            if attempt == 2:
-                break
-            await asyncio.sleep(2**attempt)
-    raise RuntimeError(f"LLM proxy request failed after 3 attempts: {last_error}")
+                response.json()["choices"][0]["message"]
+                return response.text
+            except Exception as exc:  # noqa: BLE001 - retryable proxy boundary
+                last_error = exc
+                if attempt == 2:
+                    break
+                await asyncio.sleep(2**attempt)
+        raise RuntimeError(f"LLM proxy request failed after 3 attempts: {last_error}")
+
+    decoded = json.loads(await llm_cache.fetch(payload, post, cache_mode))
+    return decoded["choices"][0]["message"]
 
 
 def _content_text(content: Any) -> str:
@@ -214,7 +231,7 @@ async def _execute_tool(tool: dict[str, Any], params: dict[str, Any], working_di
         command = _format_command(str(template), params)
     except Exception as exc:  # noqa: BLE001 - returned to model as tool result
         return {"ok": False, "error": str(exc)}
-    timeout = int(tool.get("timeout") or 60)
+    timeout = cancellation.timeout(int(tool.get("timeout") or 60))
     try:
         result = await asyncio.to_thread(
             subprocess.run,
@@ -225,7 +242,7 @@ async def _execute_tool(tool: dict[str, Any], params: dict[str, Any], working_di
             timeout=timeout,
         )
     except subprocess.TimeoutExpired as exc:
-        return {"ok": False, "error": f"tool timed out after {timeout}s", "stdout": exc.stdout or "", "stderr": exc.stderr or ""}
+        return {"ok": False, "error": f"tool timed out after {timeout:g}s", "stdout": exc.stdout or "", "stderr": exc.stderr or ""}
     except Exception as exc:  # noqa: BLE001 - returned to model as tool result
         return {"ok": False, "error": str(exc)}
 
@@ -249,6 +266,9 @@ async def run_agent_loop(
     working_dir: str = ".",
     output_dir: str = "./output",
     max_turns: int = 30,
+    context_budget: int | None = None,
+    tool_concurrency: int | None = None,
+    cache_mode: str | None = None,
 ) -> dict[str, Any]:
     """Run a workstation-local tool-use loop until the model returns final text."""
 
@@ -259,18 +279,37 @@ async def run_agent_loop(
         {"role": "user", "content": task},
     ]
     tool_calls_made: list[dict[str, Any]] = []
-
-    for _turn in range(max(1, int(max_turns))):
-        message = await _call_proxy(proxy_url=proxy_url, model=model, messages=messages, tools=tools)
+    context = ContextBudget(model, budget=context_budget)
+
+    async def run_call(call: dict[str, Any]) -> dict[str, Any]:
+        tool = tool_map.get(call["name"])
+        if call["name"] == READ_TOOL_RESULT and tool is None:
+            return context.read(call.get("arguments") or {})
+        if tool is None:
+            return {"ok": False, "error": f"tool '{call['name']}' is not available"}
+        with agent_events.tool_call(call["name"]):
+            return await _execute_tool(tool, call.get("arguments") or {}, working_dir)
+
+    for turn in range(max(1, int(max_turns))):
+        cancellation.check()
+        agent_events.publish("turn_start", turn=turn + 1)
+        context.compact(messages)
+        message = await _call_proxy(
+            proxy_url=proxy_url, model=model, messages=messages, tools=context.tools(tools), cache_mode=cache_mode
+        )
+        text = _content_text(message.get("content"))
+        if text:
+            agent_events.publish("text", text=text)
         calls = _message_tool_calls(message)
         if calls:
             messages.append(message)
-            for call in calls:
-                tool = tool_map.get(call["name"])
-                if tool is None:
-                    result = {"ok": False, "error": f"tool '{call['name']}' is not available"}
-                else:
-                    result = await _execute_tool(tool, call.get("arguments") or {}, working_dir)
+            results = await run_tool_calls(
+                calls,
+                run_call,
+                serial=lambda call: is_serial(tool_map.get(call["name"])),
+                concurrency=tool_concurrency,
+            )
+            for call, result in zip(calls, results):
                 tool_calls_made.append({"name": call["name"], "arguments": call.get("arguments") or {}, "result": result})
                 if call.get("native"):
                     messages.append(
@@ -278,11 +317,11 @@ async def run_agent_loop(
                             "role": "tool",
                             "tool_call_id": call["id"],
                             "name": call["name"],
-                            "content": json.dumps(result, sort_keys=True),
+                            "content": context.tool_result_text(call["name"], result),
                         }
                     )
                 else:
-                    messages.append({"role": "user", "content": f"[Tool Result: {call['name']}]\n{json.dumps(result, sort_keys=True)}"})
+                    messages.append({"role": "user", "content": f"[Tool Result: {call['name']}]\n{context.tool_result_text(call['name'], result)}"})
             continue
 
         result = {
@@ -290,6 +329,7 @@ async def run_agent_loop(
             "response": _final_response_text(_content_text(message.get("content"))),
             "tool_calls_made": tool_calls_made,
             "model": model,
+            "context": context.stats(),
             "timestamp": datetime.now(timezone.utc).isoformat(),
         }
         Path(output_dir, "result.json").write_text(json.dumps(result, indent=2), encoding="utf-8")
@@ -300,6 +340,7 @@ async def run_agent_loop(
         "response": "",
         "tool_calls_made": tool_calls_made,
         "model": model,
+        "context": context.stats(),
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "error": f"max_turns exceeded ({max_turns})",
     }
@@ -312,7 +353,10 @@ def main() -> None:
     parser.add_argument("--task-file", required=True)
     args = parser.parse_args()
     task_data = json.loads(Path(args.task_file).read_text(encoding="utf-8"))
-    result = asyncio.run(run_agent_loop(**task_data))
+    agent_events.subscribe(agent_events.print_event)
+    # The host's remaining deadline for this slot; the loop stops itself when it runs out.
+    with cancellation.scope("agent", timeout=task_data.pop("timeout_seconds", None)):
+        result = asyncio.run(run_agent_loop(**task_data))
     print(json.dumps(result))
 
 
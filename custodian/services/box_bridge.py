@@ -6,6 +6,8 @@ from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from custodian.services import cancellation, tracing
+
 
 BOX_BRIDGE_URL = os.environ.get("BOX_BRIDGE_URL", "http://127.0.0.1:9099")
 
@@ -16,9 +18,9 @@ def _json_request(method: str, path: str, payload: dict | None = None) -> object
     if payload is not None:
         body = json.dumps(payload).encode("utf-8")
         headers["Content-Type"] = "application/json"
-    request = Request(f"{BOX_BRIDGE_URL}{path}", data=body, method=method, headers=headers)
+    request = Request(f"{BOX_BRIDGE_URL}{path}", data=body, method=method, headers=cancellation.inject(tracing.inject(headers)))
     try:
-        with urlopen(request, timeout=30) as response:
+        with urlopen(request, timeout=cancellation.timeout(30)) as response:
             raw = response.read().decode("utf-8")
             return json.loads(raw) if raw else {}
     except HTTPError as exc:
@@ -46,6 +48,15 @@ def call_project_tool(project: str, tool_name: str, params: dict | None = None)
     return _json_request("POST", "/call-tool", {"project": project, "tool_name": tool_name, "params": params or {}})
 
 
+def call_project_tools_batch(project: str, calls: list[dict], concurrency: int = 1, stop_on_error: bool = False) -> object:
+    """Run ``[{"tool": ..., "params": {...}}, ...]`` in the project's box with one bridge hop."""
+    return _json_request(
+        "POST",
+        "/call-batch",
+        {"project": project, "calls": calls, "concurrency": concurrency, "stop_on_error": stop_on_error},
+    )
+
+
 def list_project_tools(project: str) -> object:
     return _json_request("GET", f"/tools/{project}")
 
@@ -0,0 +1,217 @@
+"""Deadlines and cooperative cancellation for pipeline and agent runs.
+
+``scope`` opens a ``CancelToken`` for the work running in the current
+context. The token follows that work into tasks and ``asyncio.to_thread``
+workers. A scope opened inside another one inherits its deadline (the earlier
+one wins) and is cancelled along with it. Runs register under
+``(kind, run_id)``, so ``cancel`` can reach them from another MCP call.
+
+Cancellation is cooperative:
+
+- loops call ``check()`` between turns and steps
+- blocking calls size their timeouts with ``timeout(default)``
+- code holding a subprocess or remote session registers ``on_cancel`` to
+  stop it
+- ``to_thread`` stops waiting on a worker as soon as the run is cancelled
+
+``inject`` / ``extract`` carry the remaining time across HTTP hops as
+``DEADLINE_HEADER`` (relative seconds, so clock skew between hosts does not
+matter).
+
+Stdlib-only: copied next to ``agent_loop.py`` into workstation containers.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Mapping
+
+DEADLINE_HEADER = "X-Custodian-Deadline"
+# Floor for derived timeouts, so a nearly spent deadline still allows a clean error reply.
+MIN_TIMEOUT_SECONDS = 1.0
+
+
+class Cancelled(Exception):
+    """Raised at a cancellation point once a run is cancelled or past its deadline."""
+
+
+class CancelToken:
+    def __init__(self, kind: str | None = None, run_id: int | None = None, deadline: float | None = None) -> None:
+        self.kind = kind
+        self.run_id = run_id
+        self.deadline = deadline
+        self.reason: str | None = None
+        self._callbacks: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline; ``None`` without one."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel the token and run its callbacks; ``False`` if it was already cancelled."""
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as exc:
+                print(f"[cancellation] on_cancel callback failed: {exc}", file=sys.stderr)
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run ``callback`` when the token is cancelled (now, if it already is); returns a remover."""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def check(self) -> None:
+        remaining = self.remaining()
+        if self.reason is None and remaining is not None and remaining <= 0:
+            self.cancel("deadline exceeded")
+        if self.reason is not None:
+            raise Cancelled(self.reason)
+
+    def timeout(self, default: float) -> float:
+        """``default`` capped at the time left; raises ``Cancelled`` if none is left."""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(MIN_TIMEOUT_SECONDS, min(float(default), remaining))
+
+    def _remove(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+_CURRENT: contextvars.ContextVar[CancelToken | None] = contextvars.ContextVar("custodian_cancel_token", default=None)
+_ACTIVE: dict[tuple[str, int], CancelToken] = {}
+_ACTIVE_LOCK = threading.Lock()
+
+
+def current() -> CancelToken | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def scope(kind: str | None = None, run_id: int | None = None, *, timeout: float | None = None) -> Iterator[CancelToken]:
+    """Run the block under a new token, registered as ``(kind, run_id)`` when both are given."""
+    parent = _CURRENT.get()
+    deadline = time.monotonic() + float(timeout) if timeout is not None else None
+    if parent is not None and parent.deadline is not None:
+        deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+    token = CancelToken(kind, run_id, deadline)
+    unlink = parent.on_cancel(lambda: token.cancel(parent.reason or "cancelled")) if parent is not None else None
+    key = (kind, int(run_id)) if kind and run_id is not None else None
+    if key is not None:
+        with _ACTIVE_LOCK:
+            _ACTIVE[key] = token
+    context_token = _CURRENT.set(token)
+    try:
+        yield token
+    finally:
+        _CURRENT.reset(context_token)
+        if key is not None:
+            with _ACTIVE_LOCK:
+                if _ACTIVE.get(key) is token:
+                    del _ACTIVE[key]
+        if unlink is not None:
+            unlink()
+
+
+def cancel(kind: str, run_id: int, reason: str = "cancelled") -> bool:
+    """Cancel the run registered as ``(kind, run_id)`` in this process; ``False`` if none is."""
+    with _ACTIVE_LOCK:
+        token = _ACTIVE.get((kind, int(run_id)))
+    if token is None:
+        return False
+    token.cancel(reason)
+    return True
+
+
+def check() -> None:
+    token = _CURRENT.get()
+    if token is not None:
+        token.check()
+
+
+def timeout(default: float) -> float:
+    token = _CURRENT.get()
+    return token.timeout(default) if token is not None else default
+
+
+def remaining() -> float | None:
+    token = _CURRENT.get()
+    return token.remaining() if token is not None else None
+
+
+def on_cancel(callback: Callable[[], None]) -> Callable[[], None]:
+    token = _CURRENT.get()
+    return token.on_cancel(callback) if token is not None else (lambda: None)
+
+
+async def to_thread(func: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """``asyncio.to_thread`` that raises ``Cancelled`` as soon as the run is cancelled or times out.
+
+    The worker thread is not interrupted; ``on_cancel`` callbacks registered
+    inside it are what stop its subprocess or remote call.
+    """
+    token = _CURRENT.get()
+    if token is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    token.check()
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+
+    def stop() -> None:
+        loop.call_soon_threadsafe(lambda: stopped.done() or stopped.set_result(None))
+
+    work = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+    remove = token.on_cancel(stop)
+    try:
+        await asyncio.wait({work, stopped}, timeout=token.remaining(), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        remove()
+    if work.done():
+        return work.result()
+    # The abandoned worker's outcome no longer matters; retrieve it so asyncio does not log it.
+    work.add_done_callback(lambda done: done.cancelled() or done.exception())
+    if not token.cancelled:
+        token.cancel("deadline exceeded")
+    token.check()
+
+
+def inject(headers: dict[str, str]) -> dict[str, str]:
+    """Add the time left on the current deadline to outgoing request headers."""
+    left = remaining()
+    if left is not None:
+        headers[DEADLINE_HEADER] = f"{max(0.0, left):.3f}"
+    return headers
+
+
+def extract(headers: Mapping[str, str] | None) -> float | None:
+    """Seconds the caller will still wait, from ``DEADLINE_HEADER``; ``None`` without one."""
+    if headers is None:
+        return None
+    try:
+        return float(headers.get(DEADLINE_HEADER) or "")
+    except ValueError:
+        return None
@@ -0,0 +1,234 @@
+"""Token-budgeted message history for the agent loops.
+
+Both loops (``custodian.executor`` and the workstation ``agent_loop.py``) keep
+the whole conversation in ``messages`` and resend it every turn. A
+``ContextBudget`` keeps that bounded:
+
+- Tool results larger than ``TOOL_RESULT_CHARS`` are stored out-of-band and
+  the model sees a preview plus a short handle (``r3``). The model reads the
+  rest with the ``read_tool_result`` tool, which the loops answer locally.
+- Before each call, ``compact`` estimates the prompt size (chars per token,
+  calibrated from the proxy's reported ``prompt_tokens`` when available). If
+  the estimate is over budget, it replaces the oldest tool results with one-line
+  stubs that point at their handle. If that is not enough, it shortens old
+  assistant text. The system prompt, the task and the last ``keep_recent``
+  messages are never touched, and message roles and ids stay in place so native
+  tool-call pairing stays valid.
+
+This module is stdlib-only: it is copied next to ``agent_loop.py`` into
+workstation containers.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+CONTEXT_BUDGET_TOKENS = int(os.environ.get("CUSTODIAN_CONTEXT_BUDGET_TOKENS", "24000"))
+TOOL_RESULT_CHARS = int(os.environ.get("CUSTODIAN_CONTEXT_TOOL_RESULT_CHARS", "6000"))
+KEEP_RECENT_MESSAGES = int(os.environ.get("CUSTODIAN_CONTEXT_KEEP_RECENT", "6"))
+PREVIEW_CHARS = 1500
+ASSISTANT_KEEP_CHARS = 400
+CHARS_PER_TOKEN = 4.0
+MESSAGE_OVERHEAD_TOKENS = 4
+READ_TOOL_RESULT = "read_tool_result"
+TOOL_RESULT_PREFIX = "[Tool Result: "
+
+# Approximate context windows; the budget never exceeds half of the model's window.
+MODEL_CONTEXT_WINDOWS: dict[str, int] = {
+    "gpt-5": 400_000,
+    "gpt-4.1": 1_000_000,
+    "gpt-4o": 128_000,
+    "gpt-4": 8_192,
+    "o3": 200_000,
+    "o4": 200_000,
+    "claude": 200_000,
+    "gemini": 1_000_000,
+    "qwen": 32_768,
+    "llama": 128_000,
+    "deepseek": 64_000,
+}
+
+READ_TOOL_RESULT_SCHEMA: dict[str, Any] = {
+    "name": READ_TOOL_RESULT,
+    "description": "Read a stored tool result by handle. Use offset/limit (characters) to page through it.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "handle": {"type": "string"},
+            "offset": {"type": "integer", "minimum": 0},
+            "limit": {"type": "integer", "minimum": 1},
+        },
+        "required": ["handle"],
+    },
+}
+
+
+def _model_key(model: str) -> str:
+    return model.rsplit("/", 1)[-1].split(":", 1)[-1].lower()
+
+
+def context_window(model: str) -> int | None:
+    key = _model_key(model)
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if key.startswith(prefix)]
+    if not matches:
+        return None
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def budget_for(model: str, budget: int | None = None) -> int:
+    tokens = int(budget or CONTEXT_BUDGET_TOKENS)
+    window = context_window(model)
+    if window is not None:
+        tokens = min(tokens, window // 2)
+    return max(1000, tokens)
+
+
+def _content_chars(content: Any) -> int:
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content)
+    return len(json.dumps(content, sort_keys=True))
+
+
+class ContextBudget:
+    """Per-run tool-result store and history compactor."""
+
+    def __init__(
+        self,
+        model: str,
+        *,
+        budget: int | None = None,
+        tool_result_chars: int | None = None,
+        keep_recent: int | None = None,
+    ) -> None:
+        self.model = model
+        self.budget = budget_for(model, budget)
+        self.tool_result_chars = int(tool_result_chars or TOOL_RESULT_CHARS)
+        self.keep_recent = KEEP_RECENT_MESSAGES if keep_recent is None else max(0, int(keep_recent))
+        self.chars_per_token = CHARS_PER_TOKEN
+        self._results: dict[str, str] = {}
+        self._elided: set[int] = set()
+        self._stats = {"stored": 0, "elided": 0, "shortened": 0, "reads": 0, "compactions": 0}
+
+    # -- tool results -----------------------------------------------------
+
+    def _store(self, text: str) -> str:
+        handle = f"r{len(self._results) + 1}"
+        self._results[handle] = text
+        self._stats["stored"] += 1
+        return handle
+
+    def tool_result_text(self, name: str, result: Any) -> str:
+        """Serialize ``result`` for the transcript, storing it behind a handle if oversized."""
+        text = result if isinstance(result, str) else json.dumps(result, sort_keys=True)
+        if len(text) <= self.tool_result_chars:
+            return text
+        handle = self._store(text)
+        return (
+            f"{text[:PREVIEW_CHARS]}\n... [{len(text) - PREVIEW_CHARS} more chars of {name} output stored as "
+            f"handle {handle}; read it with {{\"tool_call\":{{\"name\":\"{READ_TOOL_RESULT}\",\"params\":"
+            f"{{\"handle\":\"{handle}\",\"offset\":{PREVIEW_CHARS}}}}}}}]"
+        )
+
+    def read(self, params: dict[str, Any]) -> dict[str, Any]:
+        """Answer a ``read_tool_result`` call."""
+        handle = str(params.get("handle") or "")
+        text = self._results.get(handle)
+        if text is None:
+            return {"ok": False, "error": f"unknown handle '{handle}'", "handles": sorted(self._results)}
+        offset = max(0, int(params.get("offset") or 0))
+        # Stay under the inline limit so a read is never stored behind another handle.
+        limit = min(max(1, int(params.get("limit") or self.tool_result_chars)), self.tool_result_chars - 200)
+        chunk = text[offset : offset + limit]
+        self._stats["reads"] += 1
+        payload: dict[str, Any] = {"ok": True, "handle": handle, "offset": offset, "total_chars": len(text), "content": chunk}
+        if offset + len(chunk) < len(text):
+            payload["next_offset"] = offset + len(chunk)
+        return payload
+
+    def tools(self, tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Append the ``read_tool_result`` schema once something has been stored."""
+        if not self._results or any(tool.get("name") == READ_TOOL_RESULT for tool in tools):
+            return tools
+        return [*tools, READ_TOOL_RESULT_SCHEMA]
+
+    # -- history compaction -----------------------------------------------
+
+    def estimate_tokens(self, messages: list[dict[str, Any]]) -> int:
+        chars = 0
+        for message in messages:
+            chars += _content_chars(message.get("content"))
+            if message.get("tool_calls"):
+                chars += _content_chars(message["tool_calls"])
+        return int(chars / self.chars_per_token) + MESSAGE_OVERHEAD_TOKENS * len(messages)
+
+    def calibrate(self, messages: list[dict[str, Any]], prompt_tokens: int) -> None:
+        """Adjust chars-per-token from the proxy's reported usage for the prompt just sent."""
+        if prompt_tokens <= 0:
+            return
+        chars = sum(_content_chars(message.get("content")) for message in messages)
+        observed = chars / max(1, prompt_tokens - MESSAGE_OVERHEAD_TOKENS * len(messages))
+        if 1.0 <= observed <= 8.0:
+            self.chars_per_token = 0.7 * self.chars_per_token + 0.3 * observed
+
+    def _is_tool_result(self, message: dict[str, Any]) -> bool:
+        if message.get("role") == "tool":
+            return True
+        content = message.get("content")
+        return message.get("role") == "user" and isinstance(content, str) and content.startswith(TOOL_RESULT_PREFIX)
+
+    def _elide(self, message: dict[str, Any]) -> None:
+        content = message.get("content")
+        text = content if isinstance(content, str) else json.dumps(content, sort_keys=True)
+        name = message.get("name")
+        if not name and text.startswith(TOOL_RESULT_PREFIX):
+            name = text[len(TOOL_RESULT_PREFIX) :].split("]", 1)[0]
+        handle = self._store(text)
+        stub = (
+            f"[earlier {name or 'tool'} result ({len(text)} chars) elided to save context; "
+            f"read it with {{\"tool_call\":{{\"name\":\"{READ_TOOL_RESULT}\",\"params\":{{\"handle\":\"{handle}\"}}}}}}]"
+        )
+        message["content"] = f"{TOOL_RESULT_PREFIX}{name}]\n{stub}" if message.get("role") == "user" else stub
+        self._stats["elided"] += 1
+
+    def compact(self, messages: list[dict[str, Any]]) -> int:
+        """Shrink ``messages`` in place until it fits the budget; return the new estimate."""
+        estimate = self.estimate_tokens(messages)
+        if estimate <= self.budget:
+            return estimate
+        self._stats["compactions"] += 1
+        # messages[0] is the system prompt and messages[1] the task.
+        older = range(2, max(2, len(messages) - self.keep_recent))
+
+        for index in older:
+            if estimate <= self.budget:
+                return estimate
+            message = messages[index]
+            if id(message) in self._elided or not self._is_tool_result(message):
+                continue
+            before = _content_chars(message.get("content"))
+            self._elide(message)
+            self._elided.add(id(message))
+            estimate -= int((before - _content_chars(message.get("content"))) / self.chars_per_token)
+
+        for index in older:
+            if estimate <= self.budget:
+                break
+            message = messages[index]
+            content = message.get("content")
+            if message.get("role") != "assistant" or not isinstance(content, str) or len(content) <= ASSISTANT_KEEP_CHARS:
+                continue
+            message["content"] = f"{content[:ASSISTANT_KEEP_CHARS]} ... [{len(content) - ASSISTANT_KEEP_CHARS} chars elided]"
+            self._stats["shortened"] += 1
+            estimate -= int((len(content) - len(message["content"])) / self.chars_per_token)
+        return estimate
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "budget_tokens": self.budget,
+            "chars_per_token": round(self.chars_per_token, 2),
+            "stored_chars": sum(len(text) for text in self._results.values()),
+            **self._stats,
+        }
@@ -0,0 +1,466 @@
+"""Live project file trees kept in memory and current with inotify.
+
+``get_tree(root)`` builds a project's tree once (``git ls-files`` when the
+root is a repository, otherwise a directory walk), stats every file, and then
+keeps it current from inotify events. Linux inotify is used through ctypes, so
+there is no extra dependency. Where inotify is unavailable or out of watches,
+or the root is on a filesystem whose remote side it cannot see (WSL's
+``/mnt/<drive>`` drvfs/9p mounts, NFS, SMB), the tree is rescanned on its own
+thread, every ``FILE_TREE_POLL_SECONDS`` at
+first. The interval doubles after each scan that finds nothing, up to
+``FILE_TREE_POLL_MAX_SECONDS``, and is never shorter than 20 scan durations,
+so a large tree costs at most about 5% of a core. A change resets it.
+Either way the request path never walks or stats the tree.
+
+Other subsystems can follow the same change feed with ``subscribe``: the
+callback receives the tree root and the set of relative paths that changed.
+"""
+from __future__ import annotations
+
+import bisect
+import concurrent.futures
+import ctypes
+import ctypes.util
+import logging
+import os
+import re
+import select
+import stat as stat_module
+import struct
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+EXCLUDED_DIRS = frozenset({
+    "node_modules", ".git", "dist", ".next", "__pycache__",
+    ".venv", "build", ".cache", "target", ".pytest_cache",
+    ".idea", ".vscode", "coverage", "htmlcov",
+})
+FILE_TREE_BACKEND = os.environ.get("CUSTODIAN_FILE_TREE_BACKEND", "auto").strip().lower()
+FILE_TREE_POLL_SECONDS = float(os.environ.get("CUSTODIAN_FILE_TREE_POLL_SECONDS", "5"))
+FILE_TREE_POLL_MAX_SECONDS = float(os.environ.get("CUSTODIAN_FILE_TREE_POLL_MAX_SECONDS", "60"))
+POLL_SCAN_SHARE = 20
+# inotify watches succeed on these but never report changes made from the other side of the mount.
+REMOTE_FILESYSTEMS = frozenset({"9p", "drvfs", "nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs"})
+FILE_TREE_MAX_TREES = int(os.environ.get("CUSTODIAN_FILE_TREE_MAX_TREES", "16"))
+DEBOUNCE_SECONDS = 0.2
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+_LOGGER = logging.getLogger("uvicorn.error")
+_LOCK = threading.Lock()
+_TREES: OrderedDict[str, "FileTree"] = OrderedDict()
+_SUBSCRIBERS: list[Callable[[str, set[str]], None]] = []
+
+
+def _excluded(name: str) -> bool:
+    return name in EXCLUDED_DIRS or name.endswith(".egg-info")
+
+
+def _path_allowed(rel_path: str) -> bool:
+    return not any(_excluded(part) for part in rel_path.split("/")[:-1])
+
+
+def _mount_fstype(path: str, mounts_file: str = "/proc/mounts") -> str | None:
+    """Filesystem type of the mount holding ``path``; ``None`` if the mount table is unreadable."""
+    best, fstype = "", None
+    try:
+        with open(mounts_file, encoding="utf-8", errors="replace") as handle:
+            for line in handle:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces, tabs and backslashes are octal-escaped in the mount table.
+                mount_point = re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), fields[1])
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        return None
+    return fstype
+
+
+class _Inotify:
+    """Minimal ctypes binding for the inotify syscalls."""
+
+    _libc = None
+
+    def __init__(self) -> None:
+        if _Inotify._libc is None:
+            _Inotify._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = _Inotify._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = _Inotify._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", errors="surrogateescape")
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class FileTree:
+    """In-memory ``rel_path -> (size, mtime)`` map for one project root."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.backend = "none"
+        self.version = 0
+        self.built_at: float | None = None
+        self._files: dict[str, tuple[int, float]] = {}
+        self._sorted: list[str] | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._is_git = os.path.exists(os.path.join(root, ".git"))
+
+    # -- building -------------------------------------------------------
+    def _list_paths(self) -> list[str]:
+        if self._is_git:
+            try:
+                listing = subprocess.run(
+                    ["git", "-C", self.root, "ls-files", "-co", "--exclude-standard"],
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                )
+                if listing.returncode == 0:
+                    paths = (line.strip().replace("\\", "/") for line in listing.stdout.splitlines())
+                    return [path for path in paths if path and _path_allowed(path)]
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        paths = []
+        for current, dirs, files in os.walk(self.root):
+            dirs[:] = [name for name in dirs if not _excluded(name)]
+            rel_dir = os.path.relpath(current, self.root).replace("\\", "/")
+            for filename in files:
+                paths.append(filename if rel_dir == "." else f"{rel_dir}/{filename}")
+        return paths
+
+    def _stat(self, rel_path: str) -> tuple[str, tuple[int, float] | None]:
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            return rel_path, None
+        if not stat_module.S_ISREG(stat.st_mode):
+            return rel_path, None
+        return rel_path, (stat.st_size, stat.st_mtime)
+
+    def _scan(self) -> dict[str, tuple[int, float]]:
+        paths = self._list_paths()
+        files = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+            for rel_path, info in executor.map(self._stat, paths, chunksize=64):
+                if info is not None:
+                    files[rel_path] = info
+        return files
+
+    def build(self) -> None:
+        files = self._scan()
+        with self._lock:
+            self._files = files
+            self._sorted = None
+            self.version += 1
+            self.built_at = time.time()
+        self._ready.set()
+
+    def wait_ready(self, timeout: float = 60) -> bool:
+        return self._ready.wait(timeout)
+
+    # -- queries --------------------------------------------------------
+    def snapshot(self, *, prefix: str = "", offset: int = 0, limit: int = 500, max_depth: int | None = None) -> dict[str, Any]:
+        """Return one page of entries under ``prefix`` (sorted by path)."""
+        prefix = prefix.strip("/").replace("\\", "/")
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._files)
+            paths = self._sorted
+            files = self._files
+            if prefix:
+                # "0" sorts right after "/", so this slice is exactly the subtree.
+                low = bisect.bisect_left(paths, prefix + "/")
+                high = bisect.bisect_left(paths, prefix + "0", low)
+                paths = ([prefix] if prefix in files else []) + paths[low:high]
+            if max_depth is not None:
+                paths = [path for path in paths if path.count("/") < max_depth]
+            page = paths[offset:offset + limit]
+            entries = [
+                {"path": path, "size": files[path][0], "mtime": files[path][1]}
+                for path in page
+            ]
+            total = len(paths)
+        return {
+            "entries": entries,
+            "total_files": total,
+            "offset": offset,
+            "truncated_at": limit if total - offset > limit else None,
+            "version": self.version,
+            "backend": self.backend,
+        }
+
+    # -- change handling ------------------------------------------------
+    def _ignored(self, rel_paths: list[str]) -> set[str]:
+        if not self._is_git or not rel_paths:
+            return set()
+        try:
+            result = subprocess.run(
+                ["git", "-C", self.root, "check-ignore", "--stdin"],
+                input="\n".join(rel_paths),
+                capture_output=True,
+                text=True,
+                timeout=10,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return set()
+        return {line.strip() for line in result.stdout.splitlines() if line.strip()}
+
+    def apply_changes(self, rel_paths: set[str]) -> set[str]:
+        """Re-stat changed paths (files or directories) and return the paths whose entry changed."""
+        updates: dict[str, tuple[int, float] | None] = {}
+        for rel_path in rel_paths:
+            full_path = os.path.join(self.root, rel_path)
+            if os.path.isdir(full_path):
+                for current, dirs, files in os.walk(full_path):
+                    dirs[:] = [name for name in dirs if not _excluded(name)]
+                    for filename in files:
+                        child = os.path.relpath(os.path.join(current, filename), self.root).replace("\\", "/")
+                        updates[child] = self._stat(child)[1]
+            elif _path_allowed(rel_path):
+                updates[rel_path] = self._stat(rel_path)[1]
+        ignored = self._ignored([path for path, info in updates.items() if info is not None])
+        changed = set()
+        with self._lock:
+            for rel_path in rel_paths:
+                # A removed directory takes every entry below it along.
+                if not os.path.exists(os.path.join(self.root, rel_path)):
+                    below = [path for path in self._files if path.startswith(rel_path + "/")]
+                    for path in below:
+                        del self._files[path]
+                    changed.update(below)
+            for rel_path, info in updates.items():
+                if info is None or rel_path in ignored:
+                    if self._files.pop(rel_path, None) is not None:
+                        changed.add(rel_path)
+                elif self._files.get(rel_path) != info:
+                    self._files[rel_path] = info
+                    changed.add(rel_path)
+            if changed:
+                self._sorted = None
+                self.version += 1
+        return changed
+
+    def _replace(self, files: dict[str, tuple[int, float]]) -> set[str]:
+        with self._lock:
+            changed = {path for path in files.keys() | self._files.keys() if files.get(path) != self._files.get(path)}
+            if changed:
+                self._files = files
+                self._sorted = None
+                self.version += 1
+        return changed
+
+    # -- watching -------------------------------------------------------
+    def start(self) -> None:
+        backend = FILE_TREE_BACKEND
+        if backend == "auto":
+            fstype = _mount_fstype(self.root)
+            if fstype in REMOTE_FILESYSTEMS:
+                _LOGGER.info("[custodian] %s is on %s, where inotify misses remote edits; polling", self.root, fstype)
+                backend = "poll"
+        if backend in {"auto", "inotify"}:
+            # Watches go in before the initial scan so nothing written meanwhile is missed.
+            try:
+                inotify = _Inotify()
+            except (OSError, AttributeError) as exc:
+                _LOGGER.info("[custodian] inotify unavailable (%s); polling %s", exc, self.root)
+                backend = "poll"
+            else:
+                watches: dict[int, str] = {}
+                try:
+                    self._watch_tree(inotify, watches, "")
+                except OSError as exc:
+                    # Usually ENOSPC: fs.inotify.max_user_watches is exhausted by a large tree.
+                    _LOGGER.info("[custodian] inotify watch failed for %s (%s); polling instead", self.root, exc)
+                    inotify.close()
+                    backend = "poll"
+                else:
+                    self._thread = threading.Thread(
+                        target=self._inotify_loop, args=(inotify, watches), name="file-tree-inotify", daemon=True
+                    )
+                    self.backend = "inotify"
+        if backend == "poll":
+            self._thread = threading.Thread(target=self._poll_loop, name="file-tree-poll", daemon=True)
+            self.backend = "poll"
+        try:
+            self.build()
+        finally:
+            self._ready.set()
+        if self._thread is not None:
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _watch_tree(self, inotify: _Inotify, watches: dict[int, str], rel_dir: str) -> None:
+        start = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        for current, dirs, _files in os.walk(start):
+            dirs[:] = [name for name in dirs if not _excluded(name)]
+            rel = os.path.relpath(current, self.root).replace("\\", "/")
+            watches[inotify.add_watch(current)] = "" if rel == "." else rel
+
+    def _inotify_loop(self, inotify: _Inotify, watches: dict[int, str]) -> None:
+        pending: set[str] = set()
+        pending_since = 0.0
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([inotify.fd], [], [], DEBOUNCE_SECONDS)
+                # Flush after a quiet period, or anyway once a burst has run for a while.
+                if pending and (not ready or time.monotonic() - pending_since > DEBOUNCE_SECONDS * 5):
+                    _notify(self.root, self.apply_changes(pending))
+                    pending = set()
+                if not ready:
+                    continue
+                rescan = False
+                for wd, mask, name in inotify.read_events():
+                    if mask & _IN_Q_OVERFLOW:
+                        rescan = True
+                        continue
+                    if mask & _IN_IGNORED:
+                        watches.pop(wd, None)
+                        continue
+                    rel_dir = watches.get(wd)
+                    if rel_dir is None or not name:
+                        continue
+                    if mask & _IN_ISDIR and _excluded(name):
+                        continue
+                    rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                    if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                        try:
+                            self._watch_tree(inotify, watches, rel_path)
+                        except OSError:
+                            rescan = True
+                    if not pending:
+                        pending_since = time.monotonic()
+                    pending.add(rel_path)
+                if rescan:
+                    pending = set()
+                    _notify(self.root, self._replace(self._scan()))
+        finally:
+            inotify.close()
+
+    def _poll_loop(self) -> None:
+        interval = FILE_TREE_POLL_SECONDS
+        while not self._stop.wait(interval):
+            started = time.monotonic()
+            changed: set[str] = set()
+            try:
+                changed = self._replace(self._scan())
+                _notify(self.root, changed)
+            except Exception:
+                _LOGGER.warning("[custodian] file tree rescan failed for %s", self.root, exc_info=True)
+            interval = _next_poll_interval(interval, bool(changed), time.monotonic() - started)
+
+
+def _next_poll_interval(interval: float, changed: bool, scan_seconds: float) -> float:
+    """Back off while the tree is quiet; never poll more often than the scan cost allows."""
+    base = FILE_TREE_POLL_SECONDS if changed else min(interval * 2, FILE_TREE_POLL_MAX_SECONDS)
+    return max(base, scan_seconds * POLL_SCAN_SHARE)
+
+
+def subscribe(callback: Callable[[str, set[str]], None]) -> None:
+    """Call ``callback(root, changed_rel_paths)`` after each applied batch of changes."""
+    if callback not in _SUBSCRIBERS:
+        _SUBSCRIBERS.append(callback)
+
+
+def _notify(root: str, changed: set[str]) -> None:
+    if not changed:
+        return
+    for callback in list(_SUBSCRIBERS):
+        try:
+            callback(root, changed)
+        except Exception:
+            _LOGGER.warning("[custodian] file tree subscriber failed", exc_info=True)
+
+
+def get_tree(root: str) -> FileTree:
+    """Return the live tree for ``root``, building and watching it on first use."""
+    key = os.path.realpath(root)
+    evicted = None
+    with _LOCK:
+        tree = _TREES.get(key)
+        created = tree is None
+        if created:
+            tree = _TREES[key] = FileTree(key)
+            if len(_TREES) > FILE_TREE_MAX_TREES:
+                _old_key, evicted = _TREES.popitem(last=False)
+        else:
+            _TREES.move_to_end(key)
+    if evicted is not None:
+        evicted.stop()
+    if created:
+        tree.start()
+    else:
+        tree.wait_ready()
+    return tree
+
+
+def drop_tree(root: str | None = None) -> None:
+    with _LOCK:
+        if root is None:
+            trees = list(_TREES.values())
+            _TREES.clear()
+        else:
+            tree = _TREES.pop(os.path.realpath(root), None)
+            trees = [tree] if tree else []
+    for tree in trees:
+        tree.stop()
+
+
+def stats() -> dict[str, Any]:
+    with _LOCK:
+        return {
+            root: {"backend": tree.backend, "files": len(tree._files), "version": tree.version}
+            for root, tree in _TREES.items()
+        }
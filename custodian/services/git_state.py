@@ -0,0 +1,237 @@
+"""Cached git state for project working trees.
+
+One ``git status --porcelain=v2 --branch`` and one ``git log`` run
+concurrently and together give branch, upstream, ahead/behind, dirty files
+and recent commits. Results are cached per repository and reused while the
+repository fingerprint (mtimes of ``.git/index``, ``HEAD``, the checked-out
+ref and ``packed-refs``) is unchanged. Edits to tracked files that have not
+been staged do not touch any of those, so entries also expire after
+``GIT_STATE_MAX_AGE`` seconds. Repositories whose file tree is watched by
+``file_tree`` are invalidated as soon as a file changes.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from custodian.services import file_tree
+
+GIT_TIMEOUT_SECONDS = 2
+GIT_LOG_DEPTH = 50
+GIT_STATE_MAX_AGE = float(os.environ.get("CUSTODIAN_GIT_STATE_MAX_AGE", "10"))
+STATUS_BUCKET_LIMIT = 50
+
+_LOCK = threading.Lock()
+_REPO_LOCKS: dict[str, threading.Lock] = {}
+_CACHE: dict[str, "_Entry"] = {}
+_STATS: Counter = Counter()
+
+
+@dataclass
+class _Entry:
+    fingerprint: tuple
+    state: dict[str, Any]
+    collected_at: float
+
+
+def _git_dir(repo_path: str) -> str | None:
+    dot_git = os.path.join(repo_path, ".git")
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        # Worktrees and submodules: ".git" is a file holding "gitdir: <path>".
+        try:
+            with open(dot_git, encoding="utf-8") as handle:
+                line = handle.readline().strip()
+        except OSError:
+            return None
+        if line.startswith("gitdir:"):
+            target = line.split(":", 1)[1].strip()
+            return os.path.normpath(os.path.join(repo_path, target))
+    return None
+
+
+def _mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def fingerprint(repo_path: str) -> tuple | None:
+    git_dir = _git_dir(repo_path)
+    if git_dir is None:
+        return None
+    head_path = os.path.join(git_dir, "HEAD")
+    ref_path = None
+    try:
+        with open(head_path, encoding="utf-8") as handle:
+            head = handle.read().strip()
+        if head.startswith("ref:"):
+            ref_path = os.path.join(git_dir, head.split(":", 1)[1].strip())
+    except OSError:
+        head = ""
+    return (
+        head,
+        _mtime_ns(os.path.join(git_dir, "index")),
+        _mtime_ns(head_path),
+        _mtime_ns(ref_path) if ref_path else None,
+        _mtime_ns(os.path.join(git_dir, "packed-refs")),
+    )
+
+
+def parse_porcelain_v2(stdout: str, max_entries: int = STATUS_BUCKET_LIMIT) -> dict[str, Any]:
+    """Parse ``git status --porcelain=v2 --branch`` into branch info and capped buckets."""
+    branch: dict[str, Any] = {"head": None, "oid": None, "upstream": None, "ahead": None, "behind": None}
+    status: dict[str, list[str]] = {"modified": [], "added": [], "deleted": [], "untracked": []}
+    for line in stdout.splitlines():
+        if not line:
+            continue
+        if line.startswith("# "):
+            key, _, value = line[2:].partition(" ")
+            if key == "branch.head":
+                branch["head"] = "" if value == "(detached)" else value
+            elif key == "branch.oid":
+                branch["oid"] = None if value == "(initial)" else value
+            elif key == "branch.upstream":
+                branch["upstream"] = value
+            elif key == "branch.ab":
+                ahead, _, behind = value.partition(" ")
+                branch["ahead"] = int(ahead.lstrip("+") or 0)
+                branch["behind"] = int(behind.lstrip("-") or 0)
+            continue
+
+        kind = line[0]
+        if kind == "?":
+            bucket, path = "untracked", line[2:]
+        elif kind in {"1", "2", "u"}:
+            code = line[2:4]
+            fields = line.split(" ", {"1": 8, "2": 9, "u": 10}[kind])
+            path = fields[-1].split("\t", 1)[0]
+            if "D" in code:
+                bucket = "deleted"
+            elif "A" in code:
+                bucket = "added"
+            else:
+                bucket = "modified"
+        else:
+            continue
+        if path and len(status[bucket]) < max_entries:
+            status[bucket].append(path)
+    return {"branch": branch, "status": status}
+
+
+def _parse_log(stdout: str) -> list[dict[str, str]]:
+    commits = []
+    for line in stdout.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        commit_hash, _, message = line.partition(" ")
+        commits.append({"hash": commit_hash, "message": message})
+    return commits
+
+
+def _spawn(repo_path: str, *args: str) -> subprocess.Popen | str:
+    try:
+        return subprocess.Popen(
+            ["git", "-C", repo_path, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+    except FileNotFoundError:
+        return "git executable not available"
+    except OSError as exc:
+        return f"git command failed: {exc}"
+
+
+def _finish(process: subprocess.Popen | str, deadline: float) -> tuple[str | None, str | None]:
+    if isinstance(process, str):
+        return None, process
+    try:
+        stdout, stderr = process.communicate(timeout=max(0.0, deadline - time.monotonic()))
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return None, f"git command timed out after {GIT_TIMEOUT_SECONDS} seconds"
+    if process.returncode != 0:
+        return None, (stderr or stdout or "git command failed").strip() or "git command failed"
+    return stdout, None
+
+
+def collect(repo_path: str) -> dict[str, Any]:
+    """Run the status and log commands concurrently and return the parsed state."""
+    deadline = time.monotonic() + GIT_TIMEOUT_SECONDS
+    status_process = _spawn(repo_path, "status", "--porcelain=v2", "--branch")
+    log_process = _spawn(repo_path, "log", "--oneline", "-n", str(GIT_LOG_DEPTH))
+    status_stdout, status_error = _finish(status_process, deadline)
+    log_stdout, log_error = _finish(log_process, deadline)
+    parsed = parse_porcelain_v2(status_stdout) if status_stdout is not None else None
+    return {
+        "branch": parsed["branch"] if parsed else None,
+        "status": parsed["status"] if parsed else None,
+        "commits": _parse_log(log_stdout) if log_stdout is not None else None,
+        "status_error": status_error,
+        "log_error": log_error,
+    }
+
+
+def _repo_lock(key: str) -> threading.Lock:
+    with _LOCK:
+        lock = _REPO_LOCKS.get(key)
+        if lock is None:
+            lock = _REPO_LOCKS[key] = threading.Lock()
+        return lock
+
+
+def get_git_state(repo_path: str) -> dict[str, Any] | None:
+    """Return cached git state for ``repo_path`` (None if it is not a repository).
+
+    The returned dict carries ``cached`` (served from memory) and
+    ``collected_at`` (epoch seconds) alongside the collected fields.
+    """
+    key = os.path.realpath(repo_path)
+    current = fingerprint(key)
+    if current is None:
+        return None
+    with _repo_lock(key):
+        with _LOCK:
+            entry = _CACHE.get(key)
+        now = time.monotonic()
+        if entry is not None and entry.fingerprint == current and now - entry.collected_at <= GIT_STATE_MAX_AGE:
+            _STATS["hits"] += 1
+            return {**entry.state, "cached": True}
+        _STATS["misses"] += 1
+        state = collect(key)
+        state["collected_at"] = time.time()
+        if state["status_error"] is None and state["log_error"] is None:
+            # Re-read the fingerprint: git itself may refresh the index during status.
+            with _LOCK:
+                _CACHE[key] = _Entry(fingerprint(key) or current, state, now)
+    return {**state, "cached": False}
+
+
+def invalidate(repo_path: str | None = None) -> None:
+    with _LOCK:
+        if repo_path is None:
+            _CACHE.clear()
+        else:
+            _CACHE.pop(os.path.realpath(repo_path), None)
+
+
+def stats() -> dict[str, Any]:
+    with _LOCK:
+        return {"repos": len(_CACHE), "hits": _STATS["hits"], "misses": _STATS["misses"], "max_age": GIT_STATE_MAX_AGE}
+
+
+def _on_files_changed(root: str, _changed: set[str]) -> None:
+    invalidate(root)
+
+
+file_tree.subscribe(_on_files_changed)
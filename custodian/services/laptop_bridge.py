@@ -1,24 +1,60 @@
 from __future__ import annotations
 
+import concurrent.futures
+import gzip
+import hashlib
 import os
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
 
 
 LAPTOP_URL = os.environ.get("LAPTOP_BRIDGE_URL", "http://100.82.234.100:8222")
 LAPTOP_TOKEN = os.environ.get("LAPTOP_BRIDGE_TOKEN", "")
+TRANSFER_CHUNK_BYTES = int(os.environ.get("LAPTOP_TRANSFER_CHUNK_BYTES", str(8 * 1024 * 1024)))
+TRANSFER_PARALLELISM = int(os.environ.get("LAPTOP_TRANSFER_PARALLELISM", "4"))
+TRANSFER_RETRIES = 5
+TRANSFER_TIMEOUT = 60
+COMPRESSIBLE_SUFFIXES = {
+    ".csv", ".tsv", ".json", ".jsonl", ".ndjson", ".txt", ".log", ".md", ".xml", ".html", ".htm",
+    ".sql", ".py", ".js", ".ts", ".yaml", ".yml", ".svg",
+}
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    """Shared keep-alive session, sized for parallel chunk transfers."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(TRANSFER_PARALLELISM, 1) + 2)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def _auth_headers() -> dict[str, str]:
+    return {"Authorization": f"Bearer {LAPTOP_TOKEN}"} if LAPTOP_TOKEN else {}
 
 
 def _headers() -> dict[str, str]:
-    headers = {"Content-Type": "application/json"}
-    if LAPTOP_TOKEN:
-        headers["Authorization"] = f"Bearer {LAPTOP_TOKEN}"
-    return headers
+    return {"Content-Type": "application/json", **_auth_headers()}
 
 
 def _call_tool(tool_name: str, arguments: dict) -> object:
     try:
-        response = requests.post(
+        response = _session().post(
             f"{LAPTOP_URL}/tool",
             json={"tool": tool_name, "arguments": arguments},
             headers=_headers(),
@@ -40,8 +76,22 @@ def run_command(command: str, cwd: str | None = None, timeout: int = 120) -> obj
     return _call_tool("laptop_run_command", {"command": command, "cwd": cwd, "timeout": timeout})
 
 
-def read_file(path: str, offset: int = 1, limit: int = 2000) -> object:
-    return _call_tool("laptop_read_file", {"path": path, "offset": offset, "limit": limit})
+def read_file(
+    path: str,
+    offset: int = 1,
+    limit: int = 2000,
+    tail: int | None = None,
+    byte_offset: int | None = None,
+    byte_length: int | None = None,
+) -> object:
+    payload = {"path": path, "offset": offset, "limit": limit}
+    if tail is not None:
+        payload["tail"] = tail
+    if byte_offset is not None:
+        payload["byte_offset"] = byte_offset
+    if byte_length is not None:
+        payload["byte_length"] = byte_length
+    return _call_tool("laptop_read_file", payload)
 
 
 def write_file(path: str, content: str) -> object:
@@ -82,28 +132,255 @@ def system_info() -> object:
     return _call_tool("laptop_system_info", {})
 
 
-def download_file(remote_path: str, local_path: str) -> object:
-    headers = {}
-    if LAPTOP_TOKEN:
-        headers["Authorization"] = f"Bearer {LAPTOP_TOKEN}"
+def _encoding_for(path: str, compress: str, available: list[str]) -> str:
+    if compress == "none":
+        return "identity"
+    if compress == "auto" and not any(path.lower().endswith(suffix) for suffix in COMPRESSIBLE_SUFFIXES):
+        return "identity"
+    preferred = ["zstd", "gzip"] if compress in ("auto", "zstd") else ["gzip"]
+    for encoding in preferred:
+        if encoding in available and (encoding != "zstd" or zstandard is not None):
+            return encoding
+    return "identity"
+
+
+def _encode(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decode(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _local_checksums(path: str, chunk_size: int) -> dict:
+    whole = hashlib.sha256()
+    chunks = []
+    with open(path, "rb") as handle:
+        for data in iter(lambda: handle.read(chunk_size), b""):
+            whole.update(data)
+            chunks.append(_sha256(data))
+    return {"size": os.path.getsize(path), "sha256": whole.hexdigest(), "chunks": chunks}
+
+
+def _read_at(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        return handle.read(length)
+
+
+def _remote_checksums(remote_path: str, chunk_size: int) -> dict | None:
+    response = _session().get(
+        f"{LAPTOP_URL}/checksum",
+        params={"path": remote_path, "chunk_size": chunk_size},
+        headers=_auth_headers(),
+        timeout=TRANSFER_TIMEOUT * 5,
+    )
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"checksum failed: {response.status_code} {response.text[:500]}")
+    return response.json()
+
+
+class _RetryableTransferError(Exception):
+    pass
+
+
+def _with_retries(action, description: str):
+    """Run ``action()`` with exponential backoff on network errors and 5xx replies."""
+    delay = 0.5
+    for attempt in range(1, TRANSFER_RETRIES + 1):
+        try:
+            return action()
+        except (requests.ConnectionError, requests.Timeout, _RetryableTransferError) as exc:
+            if attempt == TRANSFER_RETRIES:
+                raise RuntimeError(f"{description} failed after {attempt} attempts: {exc}") from exc
+            time.sleep(delay)
+            delay = min(delay * 2, 8)
+
+
+def _chunk_ranges(size: int, chunk_size: int) -> list[tuple[int, int, int]]:
+    return [(index, offset, min(chunk_size, size - offset)) for index, offset in enumerate(range(0, size, chunk_size))]
+
+
+def _run_chunks(work, chunks: list, parallel: int) -> int:
+    """Run ``work(chunk)`` for every chunk on ``parallel`` workers; returns the summed results."""
+    if not chunks:
+        return 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(parallel, len(chunks)))) as executor:
+        return sum(executor.map(work, chunks))
+
+
+def download_file(
+    remote_path: str,
+    local_path: str,
+    parallel: int | None = None,
+    compress: str = "auto",
+    chunk_size: int | None = None,
+) -> object:
+    """Download ``remote_path`` in verified chunks, resuming from ``<local_path>.part``."""
+    chunk_size = chunk_size or TRANSFER_CHUNK_BYTES
+    parallel = parallel or TRANSFER_PARALLELISM
+    started = time.monotonic()
+    part_path = f"{local_path}.part"
     try:
-        response = requests.get(
-            f"{LAPTOP_URL}/download",
-            params={"path": remote_path},
-            headers=headers,
-            timeout=60,
-            stream=True,
-        )
-        if response.status_code != 200:
-            return {"error": f"Download failed: {response.status_code} {response.text[:500]}"}
+        manifest = _with_retries(lambda: _remote_checksums(remote_path, chunk_size), "checksum")
+        if manifest is None:
+            return {"error": f"Download failed: 404 File not found: {remote_path}"}
+        size = manifest["size"]
+        encoding = _encoding_for(remote_path, compress, manifest.get("encodings", []))
         os.makedirs(os.path.dirname(os.path.abspath(local_path)), exist_ok=True)
-        with open(local_path, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=8192):
-                handle.write(chunk)
-        return {"remote_path": remote_path, "local_path": local_path, "size": os.path.getsize(local_path)}
+        resuming = os.path.exists(part_path) and os.path.getsize(part_path) == size
+        with open(part_path, "r+b" if resuming else "wb") as handle:
+            handle.truncate(size)
+
+        chunks = _chunk_ranges(size, chunk_size)
+        if resuming:
+            chunks = [
+                chunk for chunk in chunks
+                if _sha256(_read_at(part_path, chunk[1], chunk[2])) != manifest["chunks"][chunk[0]]
+            ]
+        missing_bytes = sum(length for _index, _offset, length in chunks)
+
+        def fetch(chunk: tuple[int, int, int]) -> int:
+            index, offset, length = chunk
+
+            def attempt() -> int:
+                params = {"path": remote_path}
+                if encoding != "identity":
+                    params["encoding"] = encoding
+                response = _session().get(
+                    f"{LAPTOP_URL}/download",
+                    params=params,
+                    headers={**_auth_headers(), "Range": f"bytes={offset}-{offset + length - 1}"},
+                    timeout=TRANSFER_TIMEOUT,
+                )
+                if response.status_code >= 500:
+                    raise _RetryableTransferError(f"HTTP {response.status_code}")
+                if response.status_code not in (200, 206):
+                    raise RuntimeError(f"Download failed: {response.status_code} {response.text[:500]}")
+                wire = response.content
+                data = _decode(wire, response.headers.get("X-Encoding", "identity"))
+                if response.status_code == 200:
+                    data = data[offset:offset + length]
+                if _sha256(data) != manifest["chunks"][index]:
+                    raise _RetryableTransferError(f"chunk {index} failed verification")
+                with open(part_path, "r+b") as part:
+                    part.seek(offset)
+                    part.write(data)
+                return len(wire)
+
+            return _with_retries(attempt, f"chunk {index}")
+
+        wire_bytes = _run_chunks(fetch, chunks, parallel)
+        if _local_checksums(part_path, chunk_size)["sha256"] != manifest["sha256"]:
+            return {"error": "Download failed: sha256 mismatch after transfer (the .part file is kept for retry)."}
+        os.replace(part_path, local_path)
+        return {
+            "remote_path": remote_path,
+            "local_path": local_path,
+            "size": size,
+            "sha256": manifest["sha256"],
+            "chunks": len(manifest["chunks"]),
+            "resumed_bytes": size - missing_bytes,
+            "transferred_bytes": missing_bytes,
+            "wire_bytes": wire_bytes,
+            "encoding": encoding,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
     except requests.ConnectionError:
         return {"error": "Cannot reach laptop bridge. Is the laptop on and connected via Tailscale?"}
-    except requests.Timeout:
-        return {"error": "Download timed out (60s)."}
     except Exception as exc:
         return {"error": f"Download error: {exc}"}
+
+
+def upload_file(
+    local_path: str,
+    remote_path: str,
+    parallel: int | None = None,
+    compress: str = "auto",
+    chunk_size: int | None = None,
+) -> object:
+    """Upload ``local_path`` in verified chunks, resuming a matching ``<remote_path>.part``."""
+    chunk_size = chunk_size or TRANSFER_CHUNK_BYTES
+    parallel = parallel or TRANSFER_PARALLELISM
+    started = time.monotonic()
+    if not os.path.isfile(local_path):
+        return {"error": f"Local file not found: {local_path}"}
+    try:
+        manifest = _local_checksums(local_path, chunk_size)
+        size = manifest["size"]
+        remote_part = _with_retries(lambda: _remote_checksums(f"{remote_path}.part", chunk_size), "checksum")
+        chunks = _chunk_ranges(size, chunk_size)
+        if remote_part is not None and remote_part["size"] == size:
+            chunks = [chunk for chunk in chunks if remote_part["chunks"][chunk[0]] != manifest["chunks"][chunk[0]]]
+        available = (remote_part or {}).get("encodings", ["gzip"])
+        encoding = _encoding_for(local_path, compress, available)
+        missing_bytes = sum(length for _index, _offset, length in chunks)
+        if size == 0:
+            chunks = [(0, 0, 0)]
+
+        def send(chunk: tuple[int, int, int]) -> int:
+            index, offset, length = chunk
+            data = _read_at(local_path, offset, length)
+            body = _encode(data, encoding)
+            chunk_encoding = encoding
+            if len(body) >= len(data):
+                body, chunk_encoding = data, "identity"
+
+            def attempt() -> int:
+                response = _session().put(
+                    f"{LAPTOP_URL}/upload",
+                    params={"path": remote_path, "offset": offset, "size": size, "encoding": chunk_encoding},
+                    data=body,
+                    headers={**_auth_headers(), "Content-Type": "application/octet-stream", "X-Chunk-SHA256": _sha256(data)},
+                    timeout=TRANSFER_TIMEOUT,
+                )
+                if response.status_code >= 500 or response.status_code == 422:
+                    raise _RetryableTransferError(f"HTTP {response.status_code}")
+                if response.status_code != 200:
+                    raise RuntimeError(f"Upload failed: {response.status_code} {response.text[:500]}")
+                return len(body)
+
+            return _with_retries(attempt, f"chunk {index}")
+
+        wire_bytes = _run_chunks(send, chunks, parallel)
+        response = _with_retries(
+            lambda: _session().post(
+                f"{LAPTOP_URL}/upload/complete",
+                json={"path": remote_path, "size": size, "sha256": manifest["sha256"]},
+                headers=_headers(),
+                timeout=TRANSFER_TIMEOUT * 5,
+            ),
+            "upload completion",
+        )
+        if response.status_code != 200:
+            return {"error": f"Upload failed: {response.status_code} {response.text[:500]}"}
+        return {
+            "local_path": local_path,
+            "remote_path": remote_path,
+            "size": size,
+            "sha256": manifest["sha256"],
+            "chunks": len(manifest["chunks"]),
+            "resumed_bytes": size - missing_bytes,
+            "transferred_bytes": missing_bytes,
+            "wire_bytes": wire_bytes,
+            "encoding": encoding,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
+    except requests.ConnectionError:
+        return {"error": "Cannot reach laptop bridge. Is the laptop on and connected via Tailscale?"}
+    except Exception as exc:
+        return {"error": f"Upload error: {exc}"}
@@ -0,0 +1,262 @@
+"""Content-addressed cache of LLM proxy responses.
+
+Every agent loop posts a chat-completions payload to the proxy. ``fetch``
+keys that payload (model, messages, tools, temperature and any other request
+fields, canonically serialized) with SHA-256 and serves the stored response
+body when one exists. Modes:
+
+- ``off``: always call the proxy (default).
+- ``on``: serve hits, call and store on a miss.
+- ``replay``: serve hits, raise ``LLMCacheMiss`` on a miss. Use it to rerun
+  pipelines or tests against recorded transcripts without a proxy.
+
+``CUSTODIAN_LLM_CACHE`` sets the process-wide mode; an agent spec can opt in
+with ``llm_cache: on``. A process-wide ``replay`` always wins, so a replayed
+test run can never reach the network.
+
+Responses live in ``CUSTODIAN_LLM_CACHE_DB`` and are evicted least recently
+used once the file holds more than ``CUSTODIAN_LLM_CACHE_BYTES``.
+
+``python llm_cache.py serve`` runs a stub chat-completions endpoint backed by
+the same file in replay mode, so the whole agent stack can run offline.
+
+Stdlib-only: copied next to ``agent_loop.py`` into workstation containers.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable
+
+# In the package the store sits in custodian/; a standalone copy (workstation
+# containers) keeps it beside itself, i.e. on the mounted /workspace.
+LLM_CACHE_DB_PATH = os.environ.get(
+    "CUSTODIAN_LLM_CACHE_DB",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))) if __package__ else os.path.dirname(os.path.abspath(__file__)),
+        "llm_cache.db",
+    ),
+)
+LLM_CACHE_MODE = os.environ.get("CUSTODIAN_LLM_CACHE", "off").strip().lower()
+LLM_CACHE_MAX_BYTES = int(os.environ.get("CUSTODIAN_LLM_CACHE_BYTES", str(256 * 1024 * 1024)))
+MODES = ("off", "on", "replay")
+
+_STORE_LOCK = threading.Lock()
+_STORE_CONN: sqlite3.Connection | None = None
+_STORE_PATH: str | None = None
+_STATS: Counter = Counter()
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when no recorded response matches the request."""
+
+
+def resolve_mode(mode: str | None = None) -> str:
+    """Combine an agent's opt-in with the process-wide mode."""
+    if LLM_CACHE_MODE == "replay":
+        return "replay"
+    resolved = str(mode or LLM_CACHE_MODE or "off").strip().lower()
+    if resolved not in MODES:
+        raise ValueError(f"llm_cache mode must be one of {', '.join(MODES)}, got '{mode}'")
+    return resolved
+
+
+def _canonical(payload: dict[str, Any]) -> str:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def cache_key(payload: dict[str, Any]) -> str:
+    return hashlib.sha256(_canonical(payload).encode("utf-8")).hexdigest()
+
+
+def _store() -> sqlite3.Connection:
+    global _STORE_CONN, _STORE_PATH
+    if _STORE_CONN is not None and _STORE_PATH == LLM_CACHE_DB_PATH:
+        return _STORE_CONN
+    if _STORE_CONN is not None:
+        _STORE_CONN.close()
+    conn = sqlite3.connect(LLM_CACHE_DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS llm_responses (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            request TEXT NOT NULL,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_responses_lru ON llm_responses(last_used_at);
+        """
+    )
+    _STORE_CONN = conn
+    _STORE_PATH = LLM_CACHE_DB_PATH
+    return conn
+
+
+def get(payload: dict[str, Any]) -> str | None:
+    return _get(cache_key(payload))
+
+
+def _get(key: str) -> str | None:
+    with _STORE_LOCK:
+        conn = _store()
+        row = conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _STATS["misses"] += 1
+            return None
+        conn.execute("UPDATE llm_responses SET hits = hits + 1, last_used_at = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+    _STATS["hits"] += 1
+    return row[0]
+
+
+def put(payload: dict[str, Any], response: str) -> None:
+    request = _canonical(payload)
+    _put(hashlib.sha256(request.encode("utf-8")).hexdigest(), str(payload.get("model") or ""), request, response)
+
+
+def _put(key: str, model: str, request: str, response: str) -> None:
+    size = len(request) + len(response)
+    now = time.time()
+    with _STORE_LOCK:
+        conn = _store()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO llm_responses (key, model, request, response, size, hits, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+            """,
+            (key, model, request, response, size, now, now),
+        )
+        _evict(conn)
+        conn.commit()
+    _STATS["stores"] += 1
+
+
+def _evict(conn: sqlite3.Connection) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+    if total <= LLM_CACHE_MAX_BYTES:
+        return
+    # Trim to 90% so a full cache does not evict on every store.
+    target = int(LLM_CACHE_MAX_BYTES * 0.9)
+    doomed: list[str] = []
+    for key, size in conn.execute("SELECT key, size FROM llm_responses ORDER BY last_used_at"):
+        if total <= target:
+            break
+        doomed.append(key)
+        total -= size
+    conn.executemany("DELETE FROM llm_responses WHERE key = ?", [(key,) for key in doomed])
+    _STATS["evictions"] += len(doomed)
+
+
+async def fetch(payload: dict[str, Any], call: Callable[[], Awaitable[str]], mode: str | None = None) -> str:
+    """Return the proxy response body for ``payload``, consulting the cache per ``mode``."""
+    mode = resolve_mode(mode)
+    if mode == "off":
+        return await call()
+    # Serialize before awaiting: callers keep appending to the same messages list.
+    request = _canonical(payload)
+    key = hashlib.sha256(request.encode("utf-8")).hexdigest()
+    cached = _get(key)
+    if cached is not None:
+        return cached
+    if mode == "replay":
+        raise LLMCacheMiss(f"no recorded LLM response for model '{payload.get('model')}' (key {key[:12]}) in {LLM_CACHE_DB_PATH}")
+    response = await call()
+    try:
+        json.loads(response)
+    except json.JSONDecodeError:
+        # Let the caller report the broken response; never replay it.
+        return response
+    _put(key, str(payload.get("model") or ""), request, response)
+    return response
+
+
+def stats() -> dict[str, Any]:
+    with _STORE_LOCK:
+        entries, size = _store().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+    return {
+        "mode": resolve_mode(),
+        "path": LLM_CACHE_DB_PATH,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": LLM_CACHE_MAX_BYTES,
+        **{name: _STATS[name] for name in ("hits", "misses", "stores", "evictions")},
+    }
+
+
+def clear() -> int:
+    with _STORE_LOCK:
+        conn = _store()
+        removed = conn.execute("DELETE FROM llm_responses").rowcount
+        conn.commit()
+    return removed
+
+
+class _StubProxyHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._reply(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._reply(400, {"error": {"message": "request body is not JSON"}})
+            return
+        cached = get(payload)
+        if cached is None:
+            self._reply(404, {"error": {"type": "llm_cache_miss", "message": f"no recorded response (key {cache_key(payload)[:12]})"}})
+            return
+        self._reply(200, cached)
+
+    def _reply(self, status: int, body: Any) -> None:
+        encoded = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server signature
+        print(f"[llm_cache] {self.address_string()} {format % args}", file=sys.stderr)
+
+
+def make_stub_proxy(host: str = "127.0.0.1", port: int = 4096) -> ThreadingHTTPServer:
+    """A chat-completions endpoint that only answers from the cache."""
+    return ThreadingHTTPServer((host, port), _StubProxyHandler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect the LLM response cache or serve it as a stub proxy.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="serve recorded responses on /v1/chat/completions")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=4096)
+    sub.add_parser("stats")
+    sub.add_parser("clear")
+    args = parser.parse_args()
+    if args.command == "serve":
+        server = make_stub_proxy(args.host, args.port)
+        print(f"[llm_cache] replaying {LLM_CACHE_DB_PATH} on http://{args.host}:{args.port}/v1/chat/completions", file=sys.stderr)
+        server.serve_forever()
+    elif args.command == "stats":
+        print(json.dumps(stats(), indent=2))
+    else:
+        print(json.dumps({"cleared": clear()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,73 @@
 from __future__ import annotations
 
-from custodian.opencode_runner import OpenCodeRunnerError, list_available_models, run_opencode
+from typing import Any, Callable
 
-__all__ = ["OpenCodeRunnerError", "list_available_models", "run_opencode"]
+from custodian.opencode_runner import OpenCodeRunnerError, list_available_models, run_opencode, shutdown_opencode_servers
+from custodian.services import agent_events
+
+__all__ = ["OpenCodeRunnerError", "list_available_models", "progress_listener", "run_opencode", "shutdown_opencode_servers"]
+
+
+def progress_listener() -> Callable[[dict[str, Any]], None]:
+    """Translate ``run_opencode`` events (CLI or server) into agent progress events.
+
+    Create it inside the run's ``agent_events.run_scope``: server-mode events
+    arrive on another thread.
+    """
+    publish = agent_events.bind()
+    totals = {"turn": 0, "tokens": 0, "cost_usd": None}
+    running: dict[str, str] = {}
+    finished: set[str] = set()
+
+    def step_start() -> None:
+        totals["turn"] += 1
+        publish("turn_start", turn=totals["turn"])
+
+    def step_finish(part: dict[str, Any]) -> None:
+        tokens = part.get("tokens") or {}
+        totals["tokens"] += int(tokens.get("total") or sum(int(tokens.get(key) or 0) for key in ("input", "output", "reasoning")))
+        if part.get("cost") is not None:
+            totals["cost_usd"] = (totals["cost_usd"] or 0.0) + float(part["cost"])
+        publish("usage", tokens=totals["tokens"], cost_usd=totals["cost_usd"])
+
+    def tool_part(part: dict[str, Any]) -> None:
+        call_id = str(part.get("callID") or part.get("id") or "")
+        name = str(part.get("tool") or "tool")
+        status = (part.get("state") or {}).get("status")
+        if call_id in finished:
+            return
+        if call_id not in running:
+            running[call_id] = name
+            publish("tool_start", call_id=call_id, name=name)
+        if status in ("completed", "error"):
+            running.pop(call_id, None)
+            finished.add(call_id)
+            publish("tool_finish", call_id=call_id, name=name, ok=status == "completed", duration_ms=0)
+
+    def on_event(event: dict[str, Any]) -> None:
+        kind = event.get("type")
+        if kind == "message.part.updated":
+            # Server mode: incremental part updates.
+            props = event.get("properties") or {}
+            part = props.get("part") or {}
+            part_type = part.get("type")
+            if part_type == "text" and props.get("delta"):
+                publish("text", text=props["delta"], delta=True)
+            elif part_type == "tool":
+                tool_part(part)
+            elif part_type == "step-start":
+                step_start()
+            elif part_type == "step-finish":
+                step_finish(part)
+            return
+        part = event.get("part") or {}
+        if kind == "step_start":
+            step_start()
+        elif kind == "text":
+            publish("text", text=part.get("text", ""), delta=True)
+        elif kind == "tool_use":
+            tool_part(part)
+        elif kind == "step_finish":
+            step_finish(part)
+
+    return on_event
@@ -0,0 +1,180 @@
+"""Shared project-name resolution backed by an in-memory alias map.
+
+Every active project is indexed under its exact name, its lowercase name, a
+slug (lowercase, runs of non-alphanumerics collapsed to ``-``), the basename
+of its path and any aliases registered in ``project_aliases``. The map is
+loaded with one query and then answers lookups without touching SQLite. It is
+dropped whenever a tracked connection writes ``projects`` or
+``project_aliases``; writes made by other processes are bounded by
+``PROJECT_RESOLVER_TTL``.
+
+Resolution order matches the old per-module helpers (exact, then
+case-insensitive, then substring) with slug, alias and basename lookups in
+between. Close-but-not-matching names are offered through ``suggest`` and
+never resolved implicitly.
+"""
+from __future__ import annotations
+
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+from custodian.db import connection
+from custodian.db.connection import add_write_listener
+
+PROJECT_RESOLVER_TTL = float(os.environ.get("CUSTODIAN_PROJECT_RESOLVER_TTL", "60"))
+SUGGESTION_CUTOFF = 0.6
+_INDEX_TABLES = {"projects", "project_aliases"}
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+_LOCK = threading.Lock()
+_INDEXES: dict[str, "_Index"] = {}
+_GENERATION = 0
+_STATS: Counter = Counter()
+
+
+def slugify(value: str) -> str:
+    return _SLUG_RE.sub("-", str(value).lower()).strip("-")
+
+
+@dataclass
+class _Index:
+    loaded_at: float
+    exact: dict[str, sqlite3.Row] = field(default_factory=dict)
+    keys: dict[str, sqlite3.Row] = field(default_factory=dict)
+    rows: list[sqlite3.Row] = field(default_factory=list)
+
+    def add_key(self, key: str, row: sqlite3.Row) -> None:
+        # First writer wins: a real project name always beats another project's alias or basename.
+        if key and key not in self.keys:
+            self.keys[key] = row
+
+
+def _load(conn: sqlite3.Connection) -> _Index:
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    rows = cursor.execute("SELECT * FROM projects WHERE status = 'active' ORDER BY id").fetchall()
+    try:
+        aliases = conn.execute(
+            "SELECT a.alias, a.project_id FROM project_aliases a JOIN projects p ON p.id = a.project_id "
+            "WHERE p.status = 'active' ORDER BY a.alias"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Databases that predate the alias table still resolve by name.
+        aliases = []
+
+    index = _Index(loaded_at=time.monotonic(), rows=rows)
+    by_id = {row["id"]: row for row in rows}
+    for row in rows:
+        index.exact[row["name"]] = row
+    for row in rows:
+        index.add_key(row["name"].lower(), row)
+    for row in rows:
+        index.add_key(slugify(row["name"]), row)
+    for alias, project_id in aliases:
+        row = by_id.get(project_id)
+        if row is not None:
+            index.add_key(str(alias).lower(), row)
+            index.add_key(slugify(alias), row)
+    for row in rows:
+        basename = os.path.basename(str(row["path"] or "").replace("\\", "/").rstrip("/"))
+        index.add_key(basename.lower(), row)
+        index.add_key(slugify(basename), row)
+    return index
+
+
+def _index(conn: sqlite3.Connection) -> _Index:
+    if conn.in_transaction and _INDEX_TABLES & getattr(conn, "written_tables", set()):
+        # Uncommitted project writes on this connection: read through it, cache nothing.
+        return _load(conn)
+    key = connection.DB_PATH
+    with _LOCK:
+        index = _INDEXES.get(key)
+    if index is not None and time.monotonic() - index.loaded_at <= PROJECT_RESOLVER_TTL:
+        _STATS["hits"] += 1
+        return index
+    _STATS["loads"] += 1
+    with _LOCK:
+        generation = _GENERATION
+    index = _load(conn)
+    with _LOCK:
+        # A write that landed while loading may not be in this index; serve it once, don't keep it.
+        if generation == _GENERATION:
+            _INDEXES[key] = index
+    return index
+
+
+def _on_write(tables: set[str]) -> None:
+    if tables & _INDEX_TABLES:
+        invalidate()
+
+
+add_write_listener(_on_write)
+
+
+def invalidate() -> None:
+    global _GENERATION
+    with _LOCK:
+        _GENERATION += 1
+        _INDEXES.clear()
+
+
+def get_project_by_name(conn: sqlite3.Connection, name: Any) -> sqlite3.Row | None:
+    """Resolve ``name`` to an active project row, or None.
+
+    Tries the exact name, then lowercase/slug/alias/basename keys, then the
+    shortest project name containing ``name`` (prefix matches first).
+    """
+    if name is None:
+        return None
+    name = str(name).strip()
+    if not name:
+        return None
+    index = _index(conn)
+    row = index.exact.get(name) or index.keys.get(name.lower()) or index.keys.get(slugify(name))
+    if row is not None:
+        return row
+
+    needle = name.lower()
+    partial = [candidate for candidate in index.rows if needle in candidate["name"].lower()]
+    if not partial:
+        return None
+    return min(
+        partial,
+        key=lambda candidate: (not candidate["name"].lower().startswith(needle), len(candidate["name"]), candidate["id"]),
+    )
+
+
+def suggest(conn: sqlite3.Connection, name: Any, limit: int = 3) -> list[str]:
+    """Return up to ``limit`` project names ranked by similarity to ``name``."""
+    needle = slugify(str(name or ""))
+    if not needle:
+        return []
+    index = _index(conn)
+    scored: dict[str, float] = {}
+    for key, row in index.keys.items():
+        ratio = difflib.SequenceMatcher(None, needle, slugify(key)).ratio()
+        if ratio >= SUGGESTION_CUTOFF and ratio > scored.get(row["name"], 0.0):
+            scored[row["name"]] = ratio
+    return [project for project, _ratio in sorted(scored.items(), key=lambda item: (-item[1], item[0]))[:limit]]
+
+
+def not_found_message(conn: sqlite3.Connection, name: Any) -> str:
+    message = f"Project '{name}' not found."
+    suggestions = suggest(conn, name)
+    if suggestions:
+        message += f" Did you mean: {', '.join(suggestions)}?"
+    return message + " Use list_projects to see available projects."
+
+
+def stats() -> dict[str, Any]:
+    with _LOCK:
+        projects = sum(len(index.rows) for index in _INDEXES.values())
+        keys = sum(len(index.keys) for index in _INDEXES.values())
+    return {"projects": projects, "keys": keys, "hits": _STATS["hits"], "loads": _STATS["loads"], "ttl": PROJECT_RESOLVER_TTL}
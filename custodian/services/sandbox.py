@@ -16,6 +16,7 @@ from datetime import datetime
 from urllib.parse import quote
 
 from custodian.db.connection import DB_PATH, db_connection
+from custodian.services.project_resolver import get_project_by_name
 from mcp.types import TextContent
 
 LIVE_FILE_TREE_ENTRY_LIMIT = 50
@@ -56,14 +57,6 @@ def _find_symbol(*args, **kwargs):
     return find_symbol(*args, **kwargs)
 
 
-def get_project_by_name(conn, name):
-    row = conn.execute("SELECT * FROM projects WHERE name = ? AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    row = conn.execute("SELECT * FROM projects WHERE LOWER(name) = LOWER(?) AND status = 'active'", (name,)).fetchone()
-    if row:
-        return row
-    return conn.execute("SELECT * FROM projects WHERE LOWER(name) LIKE LOWER(?) AND status = 'active'", (f"%{name}%",)).fetchone()
 
 _sandbox_log = collections.deque(maxlen=5000)
 _sandbox_log_lock = threading.Lock()
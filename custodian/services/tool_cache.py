@@ -0,0 +1,242 @@
+"""Read-through result cache for idempotent MCP tools.
+
+A tool opts in through its METADATA::
+
+    "cacheable": True,
+    "cache_tables": ["projects", "fossils"],
+    "cache_ttl": 120,  # optional, seconds
+
+Entries are tagged with ``table:<name>`` for every declared table.
+Connections from ``custodian.db.connection`` report the tables they wrote on
+commit/close and every entry carrying one of those tags is dropped. Writes
+made by other processes (``store_fossil.py``, the indexer) show up as a
+change of ``PRAGMA data_version`` on a read-only watcher connection, checked
+when a call is planned, and clear the whole cache since their tables are
+unknown. "Not found" answers are never stored.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+from custodian.db import connection
+from custodian.db.connection import add_write_listener
+
+CACHE_ENABLED = os.environ.get("CUSTODIAN_TOOL_CACHE", "1").strip().lower() not in {"0", "false", "off", "no"}
+CACHE_DEFAULT_TTL = float(os.environ.get("CUSTODIAN_TOOL_CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.environ.get("CUSTODIAN_TOOL_CACHE_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.environ.get("CUSTODIAN_TOOL_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+_LOCK = threading.Lock()
+_ENTRIES: OrderedDict[str, "_Entry"] = OrderedDict()
+_TAG_INDEX: dict[str, set[str]] = {}
+_GENERATIONS: dict[str, int] = {}
+_STATS: Counter = Counter()
+_TOOL_STATS: dict[str, Counter] = {}
+_BYTES = 0
+_WATCH: sqlite3.Connection | None = None
+_WATCH_PATH: str | None = None
+_DATA_VERSION: int | None = None
+_NOT_FOUND_RE = re.compile(r"^(No [^\n]* found|[^\n]* not found\b)", re.IGNORECASE)
+
+
+@dataclass
+class CachePlan:
+    key: str
+    tool: str
+    tags: frozenset[str]
+    ttl: float
+    generations: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class _Entry:
+    value: list
+    tool: str
+    tags: frozenset[str]
+    size: int
+    expires_at: float
+
+
+def table_tag(table: str) -> str:
+    return f"table:{table.lower()}"
+
+
+def plan(metadata: dict, arguments: dict | None) -> CachePlan | None:
+    """Return a cache plan for a cacheable tool call, or None to bypass the cache."""
+    if not CACHE_ENABLED or not metadata.get("cacheable"):
+        return None
+    arguments = arguments or {}
+    try:
+        encoded = json.dumps(arguments, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        return None
+    tags = {table_tag(table) for table in metadata.get("cache_tables") or ()}
+    with _LOCK:
+        if _data_version_moved():
+            _clear_locked()
+            _STATS["external_writes"] += 1
+        generations = {tag: _GENERATIONS.get(tag, 0) for tag in tags}
+    return CachePlan(
+        key=f"{metadata['name']}:{encoded}",
+        tool=metadata["name"],
+        tags=frozenset(tags),
+        ttl=float(metadata.get("cache_ttl") or CACHE_DEFAULT_TTL),
+        generations=generations,
+    )
+
+
+def get(cache_plan: CachePlan) -> list | None:
+    now = time.monotonic()
+    with _LOCK:
+        entry = _ENTRIES.get(cache_plan.key)
+        if entry is not None and entry.expires_at <= now:
+            _drop(cache_plan.key)
+            _STATS["expirations"] += 1
+            entry = None
+        tool_stats = _TOOL_STATS.setdefault(cache_plan.tool, Counter())
+        if entry is None:
+            _STATS["misses"] += 1
+            tool_stats["misses"] += 1
+            return None
+        _ENTRIES.move_to_end(cache_plan.key)
+        _STATS["hits"] += 1
+        tool_stats["hits"] += 1
+        return list(entry.value)
+
+
+def put(cache_plan: CachePlan, value: list) -> bool:
+    """Store ``value`` unless it is a "not found" answer or one of the plan's tags was invalidated while it was computed."""
+    global _BYTES
+    first_text = getattr(value[0], "text", "") or "" if value else ""
+    if _NOT_FOUND_RE.match(first_text):
+        return False
+    size = sum(len(getattr(item, "text", "") or "") for item in value)
+    if size > CACHE_MAX_BYTES:
+        return False
+    with _LOCK:
+        if any(_GENERATIONS.get(tag, 0) != generation for tag, generation in cache_plan.generations.items()):
+            _STATS["stale_skips"] += 1
+            return False
+        if cache_plan.key in _ENTRIES:
+            _drop(cache_plan.key)
+        _ENTRIES[cache_plan.key] = _Entry(
+            value=list(value),
+            tool=cache_plan.tool,
+            tags=cache_plan.tags,
+            size=size,
+            expires_at=time.monotonic() + cache_plan.ttl,
+        )
+        _BYTES += size
+        for tag in cache_plan.tags:
+            _TAG_INDEX.setdefault(tag, set()).add(cache_plan.key)
+        _STATS["stores"] += 1
+        while _ENTRIES and (len(_ENTRIES) > CACHE_MAX_ENTRIES or _BYTES > CACHE_MAX_BYTES):
+            oldest = next(iter(_ENTRIES))
+            _drop(oldest)
+            _STATS["evictions"] += 1
+    return True
+
+
+def invalidate(*, tables: Iterable[str] = ()) -> int:
+    """Drop every entry tagged with one of ``tables``."""
+    tags = {table_tag(table) for table in tables if table}
+    if not tags:
+        return 0
+    dropped = 0
+    with _LOCK:
+        for tag in tags:
+            _GENERATIONS[tag] = _GENERATIONS.get(tag, 0) + 1
+            for key in list(_TAG_INDEX.get(tag, ())):
+                if key in _ENTRIES:
+                    _drop(key)
+                    dropped += 1
+        _STATS["invalidations"] += dropped
+    return dropped
+
+
+def clear() -> int:
+    with _LOCK:
+        return _clear_locked()
+
+
+def stats() -> dict[str, Any]:
+    with _LOCK:
+        lookups = _STATS["hits"] + _STATS["misses"]
+        return {
+            "enabled": CACHE_ENABLED,
+            "entries": len(_ENTRIES),
+            "bytes": _BYTES,
+            "max_entries": CACHE_MAX_ENTRIES,
+            "max_bytes": CACHE_MAX_BYTES,
+            "default_ttl": CACHE_DEFAULT_TTL,
+            "hit_rate": round(_STATS["hits"] / lookups, 4) if lookups else None,
+            **{name: _STATS[name] for name in ("hits", "misses", "stores", "stale_skips", "evictions", "expirations", "invalidations", "external_writes")},
+            "tools": {
+                tool: {"hits": counter["hits"], "misses": counter["misses"]}
+                for tool, counter in sorted(_TOOL_STATS.items())
+            },
+        }
+
+
+def _on_tables_written(tables: set[str]) -> None:
+    invalidate(tables=tables)
+    # This process's own commit moved data_version; adopt it so the next lookup does not flush everything.
+    with _LOCK:
+        _data_version_moved()
+
+
+add_write_listener(_on_tables_written)
+
+
+def _clear_locked() -> int:
+    global _BYTES
+    count = len(_ENTRIES)
+    _ENTRIES.clear()
+    _TAG_INDEX.clear()
+    _BYTES = 0
+    for tag in list(_GENERATIONS):
+        _GENERATIONS[tag] += 1
+    return count
+
+
+def _data_version_moved() -> bool:
+    """True when a connection other than the watcher committed since the last call (caller holds ``_LOCK``)."""
+    global _WATCH, _WATCH_PATH, _DATA_VERSION
+    try:
+        if _WATCH is None or _WATCH_PATH != connection.DB_PATH:
+            if _WATCH is not None:
+                _WATCH.close()
+            _WATCH = None
+            _WATCH_PATH = connection.DB_PATH
+            _DATA_VERSION = None
+            _WATCH = sqlite3.connect(f"{Path(_WATCH_PATH).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        version = _WATCH.execute("PRAGMA data_version").fetchone()[0]
+    except sqlite3.Error:
+        _WATCH = None
+        return False
+    moved = _DATA_VERSION is not None and version != _DATA_VERSION
+    _DATA_VERSION = version
+    return moved
+
+
+def _drop(key: str) -> None:
+    global _BYTES
+    entry = _ENTRIES.pop(key, None)
+    if entry is None:
+        return
+    _BYTES -= entry.size
+    for tag in entry.tags:
+        keys = _TAG_INDEX.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _TAG_INDEX[tag]
@@ -0,0 +1,52 @@
+"""Concurrent execution of the tool calls a model makes in one turn.
+
+``run_tool_calls`` runs independent calls at the same time, up to
+``concurrency`` in flight. A tool marked ``"serial": true`` (side-effecting
+box tools and workstation commands) acts as a barrier: it starts only after
+every earlier call in the turn has finished, and later calls wait for it.
+Results always come back in call order, so the transcript reads the same no
+matter which call finished first.
+
+Stdlib-only: copied next to ``agent_loop.py`` into workstation containers.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Sequence
+
+AGENT_TOOL_CONCURRENCY = int(os.environ.get("CUSTODIAN_AGENT_TOOL_CONCURRENCY", "4"))
+
+
+def is_serial(tool: dict[str, Any] | None) -> bool:
+    return bool(tool and tool.get("serial"))
+
+
+async def run_tool_calls(
+    calls: Sequence[Any],
+    run: Callable[[Any], Awaitable[Any]],
+    *,
+    serial: Callable[[Any], bool],
+    concurrency: int | None = None,
+) -> list[Any]:
+    """Await ``run(call)`` for every call and return the results in call order."""
+    limit = max(1, int(concurrency or AGENT_TOOL_CONCURRENCY))
+    results: list[Any] = [None] * len(calls)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run_one(index: int) -> None:
+        async with semaphore:
+            results[index] = await run(calls[index])
+
+    batch: list[int] = []
+    for index, call in enumerate(calls):
+        if not serial(call):
+            batch.append(index)
+            continue
+        if batch:
+            await asyncio.gather(*(run_one(i) for i in batch))
+            batch = []
+        results[index] = await run(call)
+    if batch:
+        await asyncio.gather(*(run_one(i) for i in batch))
+    return results
@@ -1,18 +1,37 @@
 from __future__ import annotations
 
+import asyncio
 import importlib
 import importlib.util
 import sys
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from custodian.db.connection import get_db
-from custodian.db.native_extensions import get_extension, list_extensions
-from custodian.services.box_bridge import call_project_tool
+from custodian.db.connection import add_write_listener, get_db
+from custodian.db.native_extensions import list_extensions
+from custodian.services import cancellation
+from custodian.services.box_bridge import call_project_tool, call_project_tools_batch
 from custodian.services.native import call_extension
 
 
 _mcp_tool_registry: dict[str, dict] = {}
 _TOOL_DIR = Path(__file__).resolve().parent.parent / "tools"
+# Writes from other processes (box bridge, scripts) are not seen by the write
+# listener, so the box/native half of the index is also refreshed on age.
+TOOL_INDEX_MAX_AGE = 60.0
+_INDEX_TABLES = {"tool_registry", "native_extensions"}
+_INDEX_LOCK = threading.Lock()
+_tool_index: "_ToolIndex | None" = None
+_tool_index_version = 0
+
+
+@dataclass
+class _ToolIndex:
+    box: dict[str, dict[str, dict]] = field(default_factory=dict)
+    native: dict[str, dict] = field(default_factory=dict)
+    loaded_at: float = 0.0
 
 
 def set_mcp_registry(registry: dict) -> None:
@@ -20,6 +39,52 @@ def set_mcp_registry(registry: dict) -> None:
     _mcp_tool_registry = dict(registry)
 
 
+def invalidate_tool_index() -> None:
+    """Drop the box/native index so the next lookup reloads it."""
+    global _tool_index, _tool_index_version
+    _tool_index_version += 1
+    _tool_index = None
+
+
+def _on_tables_written(tables: set[str]) -> None:
+    if tables & _INDEX_TABLES:
+        invalidate_tool_index()
+
+
+add_write_listener(_on_tables_written)
+
+
+def _load_tool_index() -> _ToolIndex:
+    index = _ToolIndex(loaded_at=time.monotonic())
+    conn = get_db()
+    try:
+        for row in conn.execute("SELECT * FROM tool_registry ORDER BY project, tool_name, updated_at").fetchall():
+            tool = dict(row)
+            index.box.setdefault(tool["project"], {})[tool["tool_name"]] = tool
+        for ext in list_extensions(conn):
+            index.native[ext["name"]] = ext
+    finally:
+        conn.close()
+    return index
+
+
+def _get_tool_index() -> _ToolIndex:
+    global _tool_index
+    index = _tool_index
+    if index is not None and time.monotonic() - index.loaded_at < TOOL_INDEX_MAX_AGE:
+        return index
+    with _INDEX_LOCK:
+        index = _tool_index
+        if index is None or time.monotonic() - index.loaded_at >= TOOL_INDEX_MAX_AGE:
+            version = _tool_index_version
+            index = _load_tool_index()
+            # A write that landed while loading leaves this snapshot usable
+            # for the caller but not worth keeping.
+            if version == _tool_index_version:
+                _tool_index = index
+    return index
+
+
 def _ensure_mcp_registry() -> None:
     global _mcp_tool_registry
     if _mcp_tool_registry:
@@ -51,37 +116,33 @@ def _ensure_mcp_registry() -> None:
     _mcp_tool_registry = registry
 
 
-def resolve_tool(tool_name: str, project: str | None = None):
-    _ensure_mcp_registry()
+def _resolve_in_index(index: _ToolIndex, tool_name: str, project: str | None):
     if tool_name in _mcp_tool_registry:
         return {
             "name": tool_name,
             "source": "mcp",
             "details": {"metadata": _mcp_tool_registry[tool_name]["metadata"]},
         }
-
     if project:
-        conn = get_db()
-        try:
-            row = conn.execute(
-                "SELECT * FROM tool_registry WHERE tool_name = ? AND project = ? ORDER BY updated_at DESC LIMIT 1",
-                (tool_name, project),
-            ).fetchone()
-            if row is not None:
-                tool = dict(row)
-                return {"name": tool_name, "source": "box", "details": tool}
-        finally:
-            conn.close()
+        tool = index.box.get(project, {}).get(tool_name)
+        if tool is not None:
+            return {"name": tool_name, "source": "box", "details": dict(tool)}
+    ext = index.native.get(tool_name)
+    if ext is not None:
+        return {"name": tool_name, "source": "native_extension", "details": dict(ext)}
+    return None
 
-    conn = get_db()
-    try:
-        ext = get_extension(conn, tool_name)
-        if ext:
-            return {"name": tool_name, "source": "native_extension", "details": ext}
-    finally:
-        conn.close()
 
-    return None
+def resolve_tool(tool_name: str, project: str | None = None):
+    _ensure_mcp_registry()
+    return _resolve_in_index(_get_tool_index(), tool_name, project)
+
+
+def resolve_tools(tool_names: list[str], project: str | None = None) -> dict[str, dict | None]:
+    """Resolve several tool names against one snapshot of the index."""
+    _ensure_mcp_registry()
+    index = _get_tool_index()
+    return {name: _resolve_in_index(index, name, project) for name in tool_names}
 
 
 async def route_tool_call(tool_name: str, params: dict, project: str | None = None, db=None):
@@ -100,57 +161,69 @@ async def route_tool_call(tool_name: str, params: dict, project: str | None = No
                 conn.close()
         return await handler(params, db)
 
+    # Box and extension calls block on HTTP; run them off the loop so an agent's parallel calls overlap.
     if source == "box":
-        return call_project_tool(project=project, tool_name=tool_name, params=params)
+        return await cancellation.to_thread(call_project_tool, project=project, tool_name=tool_name, params=params)
 
     if source == "native_extension":
         endpoint = params.get("endpoint", "/")
         method = params.get("method", "POST")
         data = {k: v for k, v in params.items() if k not in ("endpoint", "method")}
-        return call_extension(tool_name, endpoint=endpoint, method=method, data=data if data else None, timeout=params.get("timeout", 30))
+        return await asyncio.to_thread(
+            call_extension, tool_name, endpoint=endpoint, method=method, data=data if data else None, timeout=params.get("timeout", 30)
+        )
 
     return {"error": f"Unknown source type: {source}"}
 
 
+async def route_box_batch(project: str, calls: list[dict], concurrency: int) -> list | None:
+    """Run box tool calls for ``project`` in one bridge hop, results in call order.
+
+    Each result has the shape ``/call-tool`` gives the same call: ``{"result": ...}`` from the box, or the
+    bridge's ``{"detail": {"error": ...}}`` for a failed call. Returns None when the bridge or box cannot
+    take the batch, so the caller can route the calls one by one.
+    """
+    batch = [{"tool": call["name"], "params": call["params"]} for call in calls]
+    response = await cancellation.to_thread(call_project_tools_batch, project, batch, concurrency=max(1, int(concurrency)))
+    results = response.get("results") if isinstance(response, dict) else None
+    if not isinstance(results, list) or len(results) != len(calls):
+        return None
+    return [_box_call_envelope(item) for item in results]
+
+
+def _box_call_envelope(item: dict) -> dict:
+    if item.get("status") == "ok":
+        return {"result": item.get("result")}
+    return {"detail": {"error": item.get("error") or item.get("status")}}
+
+
 def list_all_tools(project: str | None = None):
     _ensure_mcp_registry()
+    index = _get_tool_index()
     tools = []
     for name, entry in _mcp_tool_registry.items():
         tools.append({"name": name, "source": "mcp", "description": entry["metadata"].get("description", "")})
 
     if project:
-        conn = get_db()
-        try:
-            rows = conn.execute(
-                "SELECT tool_name, description FROM tool_registry WHERE project = ? ORDER BY tool_name",
-                (project,),
-            ).fetchall()
-            for row in rows:
-                tools.append(
-                    {
-                        "name": row["tool_name"],
-                        "source": "box",
-                        "description": row["description"] or "",
-                        "project": project,
-                    }
-                )
-        finally:
-            conn.close()
-
-    conn = get_db()
-    try:
-        for ext in list_extensions(conn):
-            tools.append({"name": ext["name"], "source": "native_extension", "description": ext.get("description", "")})
-    finally:
-        conn.close()
+        for name, row in sorted(index.box.get(project, {}).items()):
+            tools.append(
+                {
+                    "name": name,
+                    "source": "box",
+                    "description": row.get("description") or "",
+                    "project": project,
+                }
+            )
+
+    for name, ext in sorted(index.native.items()):
+        tools.append({"name": name, "source": "native_extension", "description": ext.get("description", "")})
     return tools
 
 
 def resolve_agent_tools(tool_names: list[str], project: str | None = None):
     resolved = []
     missing = []
-    for name in tool_names:
-        resolution = resolve_tool(name, project)
+    for name, resolution in resolve_tools(tool_names, project).items():
         if resolution:
             resolved.append(resolution)
         else:
@@ -0,0 +1,475 @@
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Mapping
+
+
+TRACE_DB_PATH = os.environ.get(
+    "CUSTODIAN_TRACE_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "trace_store.db"),
+)
+TRACING_ENABLED = os.environ.get("CUSTODIAN_TRACING", "1").strip().lower() not in {"0", "false", "off", "no"}
+TRACEPARENT_HEADER = "traceparent"
+REMOTE_SPAN_HEADER = "X-Custodian-Span"
+WATERFALL_WIDTH = 40
+MAX_ATTRIBUTE_CHARS = 500
+SPAN_FLUSH_SECONDS = float(os.environ.get("CUSTODIAN_TRACE_FLUSH_SECONDS", "1"))
+SPAN_FLUSH_BATCH = int(os.environ.get("CUSTODIAN_TRACE_FLUSH_BATCH", "200"))
+# Spans past this many unwritten ones are dropped rather than growing the buffer.
+MAX_PENDING_SPANS = int(os.environ.get("CUSTODIAN_TRACE_MAX_PENDING", "10000"))
+PRUNE_BATCH_ROWS = 2000
+
+_CURRENT_SPAN: contextvars.ContextVar["SpanContext | None"] = contextvars.ContextVar("custodian_trace_span", default=None)
+_STORE_LOCK = threading.Lock()
+_STORE_CONN: sqlite3.Connection | None = None
+_STORE_PATH: str | None = None
+_PENDING_LOCK = threading.Lock()
+_PENDING_SPANS: list[tuple[Any, ...]] = []
+_FLUSH_TIMER: threading.Timer | None = None
+_DROPPED_SPANS = 0
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+
+
+@dataclass
+class Span:
+    name: str
+    service: str
+    context: SpanContext
+    parent_id: str | None
+    run_kind: str | None = None
+    run_id: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    start_ts: float = field(default_factory=time.time)
+    _start_perf: float = field(default_factory=time.perf_counter)
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+def _new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def _new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def current_context() -> SpanContext | None:
+    return _CURRENT_SPAN.get()
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-01"
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    if not value:
+        return None
+    parts = str(value).strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return SpanContext(trace_id=parts[1], span_id=parts[2])
+
+
+def inject(headers: dict[str, str]) -> dict[str, str]:
+    """Add the current trace context to outgoing request headers."""
+    context = _CURRENT_SPAN.get()
+    if context is not None:
+        headers[TRACEPARENT_HEADER] = format_traceparent(context)
+    return headers
+
+
+def extract(headers: Mapping[str, str] | None) -> SpanContext | None:
+    if headers is None:
+        return None
+    return parse_traceparent(headers.get(TRACEPARENT_HEADER))
+
+
+@contextmanager
+def span(
+    name: str,
+    *,
+    service: str = "custodian",
+    parent: SpanContext | None = None,
+    run_kind: str | None = None,
+    run_id: int | None = None,
+    **attributes: Any,
+) -> Iterator[Span]:
+    """Record a timed span nested under ``parent`` or the active span."""
+    parent_context = parent or _CURRENT_SPAN.get()
+    context = SpanContext(
+        trace_id=parent_context.trace_id if parent_context else _new_trace_id(),
+        span_id=_new_span_id(),
+    )
+    current = Span(
+        name=name,
+        service=service,
+        context=context,
+        parent_id=parent_context.span_id if parent_context else None,
+        run_kind=run_kind,
+        run_id=run_id,
+        attributes={key: value for key, value in attributes.items() if value is not None},
+    )
+    token = _CURRENT_SPAN.set(context)
+    try:
+        yield current
+    except BaseException as exc:
+        if current.status == "ok":
+            current.status = "error"
+        current.attributes.setdefault("error", str(exc)[:MAX_ATTRIBUTE_CHARS])
+        raise
+    finally:
+        _CURRENT_SPAN.reset(token)
+        duration_ms = (time.perf_counter() - current._start_perf) * 1000
+        record_span(
+            trace_id=context.trace_id,
+            span_id=context.span_id,
+            parent_id=current.parent_id,
+            name=current.name,
+            service=current.service,
+            start_ts=current.start_ts,
+            end_ts=current.start_ts + duration_ms / 1000,
+            status=current.status,
+            run_kind=current.run_kind,
+            run_id=current.run_id,
+            attributes=current.attributes,
+        )
+
+
+def record_remote_span(header_value: str | None, parent: SpanContext | None = None) -> None:
+    """Store a span reported back by a downstream hop in ``X-Custodian-Span``."""
+    parent_context = parent or _CURRENT_SPAN.get()
+    if not header_value or parent_context is None:
+        return
+    try:
+        payload = json.loads(header_value)
+    except ValueError:
+        return
+    if not isinstance(payload, dict):
+        return
+    try:
+        start_ts = float(payload["start"])
+        end_ts = float(payload["end"])
+    except (TypeError, ValueError, KeyError):
+        return
+    record_span(
+        trace_id=parent_context.trace_id,
+        span_id=str(payload.get("span_id") or _new_span_id()),
+        parent_id=parent_context.span_id,
+        name=str(payload.get("name") or "remote"),
+        service=str(payload.get("service") or "remote"),
+        start_ts=start_ts,
+        end_ts=end_ts,
+        status=str(payload.get("status") or "ok"),
+        attributes=payload.get("attributes") if isinstance(payload.get("attributes"), dict) else None,
+    )
+
+
+def _store() -> sqlite3.Connection:
+    global _STORE_CONN, _STORE_PATH
+    if _STORE_CONN is not None and _STORE_PATH == TRACE_DB_PATH:
+        return _STORE_CONN
+    if _STORE_CONN is not None:
+        _STORE_CONN.close()
+    conn = sqlite3.connect(TRACE_DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS spans (
+            span_id TEXT PRIMARY KEY,
+            trace_id TEXT NOT NULL,
+            parent_id TEXT,
+            name TEXT NOT NULL,
+            service TEXT NOT NULL,
+            run_kind TEXT,
+            run_id INTEGER,
+            start_ts REAL NOT NULL,
+            end_ts REAL NOT NULL,
+            duration_ms REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'ok',
+            attributes TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id, start_ts);
+        CREATE INDEX IF NOT EXISTS idx_spans_run ON spans(run_kind, run_id);
+        CREATE INDEX IF NOT EXISTS idx_spans_start ON spans(start_ts);
+        """
+    )
+    _STORE_CONN = conn
+    _STORE_PATH = TRACE_DB_PATH
+    return conn
+
+
+def record_span(
+    *,
+    trace_id: str,
+    span_id: str,
+    parent_id: str | None,
+    name: str,
+    service: str,
+    start_ts: float,
+    end_ts: float,
+    status: str = "ok",
+    run_kind: str | None = None,
+    run_id: int | None = None,
+    attributes: dict[str, Any] | None = None,
+) -> None:
+    """Queue a finished span; ``flush_spans`` writes the queue in one transaction.
+
+    The flush runs on a background thread SPAN_FLUSH_SECONDS after the first
+    queued span, or as soon as SPAN_FLUSH_BATCH spans are waiting, so spans
+    closed on the event loop never wait on SQLite.
+    """
+    global _FLUSH_TIMER, _DROPPED_SPANS
+    if not TRACING_ENABLED:
+        return
+    try:
+        encoded = json.dumps(attributes, default=str) if attributes else None
+    except (TypeError, ValueError):
+        encoded = None
+    row = (
+        span_id,
+        trace_id,
+        parent_id,
+        name,
+        service,
+        run_kind,
+        run_id,
+        start_ts,
+        end_ts,
+        round((end_ts - start_ts) * 1000, 3),
+        status,
+        encoded,
+    )
+    flush_now = False
+    with _PENDING_LOCK:
+        if len(_PENDING_SPANS) >= MAX_PENDING_SPANS:
+            _DROPPED_SPANS += 1
+            return
+        _PENDING_SPANS.append(row)
+        if len(_PENDING_SPANS) >= SPAN_FLUSH_BATCH:
+            flush_now = True
+        elif _FLUSH_TIMER is None:
+            _FLUSH_TIMER = threading.Timer(SPAN_FLUSH_SECONDS, flush_spans)
+            _FLUSH_TIMER.daemon = True
+            _FLUSH_TIMER.start()
+    if flush_now:
+        threading.Thread(target=flush_spans, name="trace-flush", daemon=True).start()
+
+
+def flush_spans() -> int:
+    """Write queued spans in a single transaction. Returns how many were written."""
+    global _FLUSH_TIMER, _DROPPED_SPANS
+    with _PENDING_LOCK:
+        pending = list(_PENDING_SPANS)
+        _PENDING_SPANS.clear()
+        dropped, _DROPPED_SPANS = _DROPPED_SPANS, 0
+        if _FLUSH_TIMER is not None:
+            _FLUSH_TIMER.cancel()
+            _FLUSH_TIMER = None
+    if dropped:
+        print(f"[tracing] dropped {dropped} spans while the store fell behind", file=sys.stderr)
+    if not pending:
+        return 0
+    try:
+        with _STORE_LOCK:
+            conn = _store()
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO spans (
+                    span_id, trace_id, parent_id, name, service, run_kind, run_id,
+                    start_ts, end_ts, duration_ms, status, attributes
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                pending,
+            )
+            conn.commit()
+    except sqlite3.Error as exc:
+        print(f"[tracing] failed to record {len(pending)} spans: {exc}", file=sys.stderr)
+        return 0
+    return len(pending)
+
+
+atexit.register(flush_spans)
+
+
+def prune_spans(max_age_days: float | None = None, max_rows: int | None = None, dry_run: bool = False) -> int:
+    """Delete spans older than ``max_age_days`` or beyond the newest ``max_rows``; returns how many (would be) removed."""
+    clauses: list[str] = []
+    params: list[Any] = []
+    if max_age_days is not None:
+        clauses.append("start_ts < ?")
+        params.append(time.time() - float(max_age_days) * 86400)
+    flush_spans()
+    with _STORE_LOCK:
+        conn = _store()
+        if max_rows is not None:
+            row = conn.execute("SELECT start_ts FROM spans ORDER BY start_ts DESC LIMIT 1 OFFSET ?", (int(max_rows),)).fetchone()
+            if row is not None:
+                clauses.append("start_ts <= ?")
+                params.append(row[0])
+        if not clauses:
+            return 0
+        where = " OR ".join(clauses)
+        if dry_run:
+            return int(conn.execute(f"SELECT COUNT(*) FROM spans WHERE {where}", params).fetchone()[0])
+    removed = 0
+    while True:
+        # Chunked so span flushes from running work only wait on one batch.
+        with _STORE_LOCK:
+            conn = _store()
+            deleted = conn.execute(
+                f"DELETE FROM spans WHERE rowid IN (SELECT rowid FROM spans WHERE {where} LIMIT ?)",
+                (*params, PRUNE_BATCH_ROWS),
+            ).rowcount
+            conn.commit()
+        removed += deleted
+        if deleted < PRUNE_BATCH_ROWS:
+            return removed
+
+
+def _span_dict(row: sqlite3.Row) -> dict[str, Any]:
+    item = dict(row)
+    item["attributes"] = json.loads(item["attributes"]) if item["attributes"] else {}
+    return item
+
+
+def _subtree(spans: list[dict[str, Any]], root_id: str) -> list[dict[str, Any]]:
+    children: dict[str | None, list[dict[str, Any]]] = {}
+    for item in spans:
+        children.setdefault(item["parent_id"], []).append(item)
+    by_id = {item["span_id"]: item for item in spans}
+    ordered: list[dict[str, Any]] = []
+    pending = [by_id[root_id]] if root_id in by_id else []
+    while pending:
+        item = pending.pop()
+        ordered.append(item)
+        pending.extend(reversed(children.get(item["span_id"], [])))
+    return ordered
+
+
+def _ordered_tree(spans: list[dict[str, Any]]) -> list[tuple[int, dict[str, Any]]]:
+    known = {item["span_id"] for item in spans}
+    children: dict[str | None, list[dict[str, Any]]] = {}
+    for item in sorted(spans, key=lambda entry: entry["start_ts"]):
+        parent = item["parent_id"] if item["parent_id"] in known else None
+        children.setdefault(parent, []).append(item)
+    ordered: list[tuple[int, dict[str, Any]]] = []
+    pending = [(0, item) for item in reversed(children.get(None, []))]
+    while pending:
+        depth, item = pending.pop()
+        ordered.append((depth, item))
+        pending.extend((depth + 1, child) for child in reversed(children.get(item["span_id"], [])))
+    return ordered
+
+
+def render_waterfall(spans: list[dict[str, Any]], width: int = WATERFALL_WIDTH) -> str:
+    if not spans:
+        return "(no spans recorded)"
+    trace_start = min(item["start_ts"] for item in spans)
+    trace_end = max(item["end_ts"] for item in spans)
+    total_ms = max((trace_end - trace_start) * 1000, 0.001)
+    lines = [f"total {total_ms:.1f}ms"]
+    for depth, item in _ordered_tree(spans):
+        offset_ms = (item["start_ts"] - trace_start) * 1000
+        begin = min(width - 1, int(offset_ms / total_ms * width))
+        end = max(begin + 1, min(width, int(round((offset_ms + item["duration_ms"]) / total_ms * width))))
+        bar = " " * begin + "#" * (end - begin) + " " * (width - end)
+        marker = " !" if item["status"] != "ok" else ""
+        lines.append(
+            f"|{bar}| {offset_ms:>9.1f} +{item['duration_ms']:>9.1f}ms  "
+            f"{'  ' * depth}{item['name']} [{item['service']}]{marker}"
+        )
+    return "\n".join(lines)
+
+
+def self_time_breakdown(spans: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Total time spent in each span name, excluding time covered by child spans."""
+    child_time: dict[str, float] = {}
+    for item in spans:
+        if item["parent_id"]:
+            child_time[item["parent_id"]] = child_time.get(item["parent_id"], 0.0) + item["duration_ms"]
+    totals: dict[tuple[str, str], dict[str, Any]] = {}
+    for item in spans:
+        key = (item["name"], item["service"])
+        entry = totals.setdefault(key, {"name": item["name"], "service": item["service"], "count": 0, "self_ms": 0.0})
+        entry["count"] += 1
+        entry["self_ms"] += max(0.0, item["duration_ms"] - child_time.get(item["span_id"], 0.0))
+    breakdown = sorted(totals.values(), key=lambda entry: entry["self_ms"], reverse=True)
+    for entry in breakdown:
+        entry["self_ms"] = round(entry["self_ms"], 3)
+    return breakdown
+
+
+def get_trace(
+    trace_id: str | None = None,
+    pipeline_run_id: int | None = None,
+    agent_run_id: int | None = None,
+) -> dict[str, Any]:
+    flush_spans()
+    with _STORE_LOCK:
+        conn = _store()
+        if trace_id:
+            roots = [(trace_id, None)]
+        elif pipeline_run_id is not None:
+            rows = conn.execute(
+                "SELECT trace_id FROM spans WHERE run_kind = 'pipeline' AND run_id = ? GROUP BY trace_id ORDER BY MIN(start_ts)",
+                (int(pipeline_run_id),),
+            ).fetchall()
+            roots = [(row["trace_id"], None) for row in rows]
+        elif agent_run_id is not None:
+            rows = conn.execute(
+                "SELECT trace_id, span_id FROM spans WHERE run_kind = 'agent' AND run_id = ? ORDER BY start_ts",
+                (int(agent_run_id),),
+            ).fetchall()
+            roots = [(row["trace_id"], row["span_id"]) for row in rows]
+        else:
+            return {"error": "provide trace_id, pipeline_run_id or agent_run_id"}
+
+        traces = []
+        for root_trace_id, root_span_id in roots:
+            rows = conn.execute(
+                "SELECT * FROM spans WHERE trace_id = ? ORDER BY start_ts",
+                (root_trace_id,),
+            ).fetchall()
+            spans = [_span_dict(row) for row in rows]
+            if root_span_id is not None:
+                spans = _subtree(spans, root_span_id)
+            traces.append((root_trace_id, spans))
+
+    if not traces or not any(spans for _, spans in traces):
+        return {"error": "no trace recorded for the requested run"}
+    return {
+        "traces": [
+            {
+                "trace_id": root_trace_id,
+                "span_count": len(spans),
+                "waterfall": render_waterfall(spans),
+                "self_time": self_time_breakdown(spans),
+                "spans": spans,
+            }
+            for root_trace_id, spans in traces
+        ]
+    }
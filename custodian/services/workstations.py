@@ -10,10 +10,12 @@ import socket
 import sqlite3
 import subprocess
 import sys
+import threading
 from pathlib import Path
 from typing import Any
 
 from custodian.db.connection import db_connection
+from custodian.services import agent_events, cancellation
 
 
 WORKSTATION_ROOT = Path(os.environ.get("CUSTODIAN_WORKSTATION_ROOT", "/home/dev/.workbench/workstations"))
@@ -98,6 +100,8 @@ def _ensure_schema() -> None:
         )
         _ensure_column(conn, "workstation_specs", "tool_definitions", "TEXT NOT NULL DEFAULT '[]'")
         _ensure_column(conn, "agents", "workstation", "TEXT")
+        _ensure_column(conn, "agents", "tool_concurrency", "INTEGER")
+        _ensure_column(conn, "agents", "llm_cache", "TEXT")
         conn.commit()
 
 
@@ -685,6 +689,35 @@ def release_slots(slot_ids: list[int]) -> list[dict[str, Any]]:
     return [_slot_dict(row) or {} for row in rows]
 
 
+def release_agent_slots(agent_run_id: int) -> list[dict[str, Any]]:
+    """Stop any agent loop still running for ``agent_run_id`` and free its slots.
+
+    For runs whose host process is gone, so nothing will release the slots
+    when the ``docker exec`` returns.
+    """
+    _ensure_schema()
+    with db_connection() as conn:
+        slots = conn.execute(
+            """
+            SELECT s.id, s.working_dir, i.container_name
+            FROM workstation_slots s
+            JOIN workstation_instances i ON i.id = s.instance_id
+            WHERE s.agent_run_id = ? AND s.status = 'allocated'
+            """,
+            (int(agent_run_id),),
+        ).fetchall()
+    for slot in slots:
+        try:
+            subprocess.run(
+                ["docker", "exec", slot["container_name"], "pkill", "-f", f"agent_loop.py --task-file {slot['working_dir']}/task.json"],
+                capture_output=True,
+                timeout=30,
+            )
+        except (OSError, subprocess.TimeoutExpired) as exc:
+            print(f"[workstation] could not stop agent loop in slot {slot['id']}: {exc}", file=sys.stderr)
+    return release_slots([int(slot["id"]) for slot in slots])
+
+
 def available_slot_count(spec_name: str) -> int:
     status = get_instance_status(spec_name)
     slots = status.get("slots") or {}
@@ -803,8 +836,9 @@ def exec_in_workstation(spec_name: str, command: str, slot_index: int | None = N
 
 
 def _copy_agent_loop(container_name: str) -> None:
-    source = Path(__file__).with_name("agent_loop.py")
-    _run_docker(["docker", "cp", str(source), f"{container_name}:/workspace/agent_loop.py"], timeout=30)
+    for name in ("agent_loop.py", "agent_events.py", "cancellation.py", "context_budget.py", "tool_fanout.py", "llm_cache.py"):
+        source = Path(__file__).with_name(name)
+        _run_docker(["docker", "cp", str(source), f"{container_name}:/workspace/{name}"], timeout=30)
 
 
 def _write_container_file(container_name: str, path: str, content: str) -> None:
@@ -848,6 +882,8 @@ def _run_slot_payload(
     system_prompt: str,
     tools: list[dict[str, Any]],
     model: str,
+    tool_concurrency: int | None = None,
+    cache_mode: str | None = None,
 ) -> dict[str, Any]:
     instance = slot["instance"]
     container_name = instance["container_name"]
@@ -860,17 +896,23 @@ def _run_slot_payload(
         "working_dir": slot["working_dir"],
         "output_dir": slot["output_dir"],
     }
+    if tool_concurrency:
+        task_payload["tool_concurrency"] = int(tool_concurrency)
+    if cache_mode:
+        task_payload["cache_mode"] = str(cache_mode)
+    timeout = cancellation.timeout(1800)
+    task_payload["timeout_seconds"] = timeout
     task_path = f"{slot['working_dir']}/task.json"
     result_path = f"{slot['output_dir']}/result.json"
     _write_container_file(container_name, task_path, json.dumps(task_payload, indent=2))
-    result = subprocess.run(
-        ["docker", "exec", "-w", slot["working_dir"], container_name, "python3", "/workspace/agent_loop.py", "--task-file", "task.json"],
-        capture_output=True,
-        text=True,
-        timeout=1800,
+    # The absolute task path names this slot's loop, so a cancel can stop it inside the container too.
+    returncode, output = _stream_agent_loop(
+        ["docker", "exec", "-w", slot["working_dir"], container_name, "python3", "/workspace/agent_loop.py", "--task-file", task_path],
+        timeout=timeout,
+        stop=["docker", "exec", container_name, "pkill", "-f", f"agent_loop.py --task-file {task_path}"],
     )
-    if result.returncode != 0:
-        raise RuntimeError((result.stderr or result.stdout or "agent loop failed").strip())
+    if returncode != 0:
+        raise RuntimeError((output or "agent loop failed").strip())
     result_payload = json.loads(_read_container_file(container_name, result_path))
     result_payload["workstation"] = spec_name
     result_payload["slot_id"] = slot["id"]
@@ -879,6 +921,43 @@ def _run_slot_payload(
     return result_payload
 
 
+def _stream_agent_loop(command: list[str], timeout: float, stop: list[str] | None = None) -> tuple[int, str]:
+    """Run the container loop, re-publishing its progress events as they are printed.
+
+    On timeout or cancellation the local ``docker exec`` is killed and ``stop``
+    runs to end the process it started inside the container.
+    """
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    timed_out = threading.Event()
+
+    def halt() -> None:
+        proc.kill()
+        if stop:
+            subprocess.run(stop, capture_output=True, timeout=30)
+
+    def expire() -> None:
+        timed_out.set()
+        halt()
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    remove = cancellation.on_cancel(halt)
+    output: list[str] = []
+    try:
+        assert proc.stdout is not None
+        for line in iter(proc.stdout.readline, ""):
+            if not agent_events.forward_line(line.rstrip("\n")):
+                output.append(line)
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+        remove()
+    cancellation.check()
+    if timed_out.is_set():
+        raise RuntimeError(f"agent loop timed out after {timeout:g}s")
+    return returncode, "".join(output)[-8000:]
+
+
 def _merge_tools(base_tools: list[dict[str, Any]], override_tools: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
     merged: dict[str, dict[str, Any]] = {}
     for tool in [*base_tools, *(override_tools or [])]:
@@ -940,6 +1019,8 @@ def _agent_runtime(agent_name: str) -> dict[str, Any]:
             "tools": _load_agent_specific_tools(agent, spec_data),
             "system_prompt": str(agent["system_prompt"] or (spec_data or {}).get("task") or ""),
             "model": str(agent["model"] or (spec_data or {}).get("model") or "gpt-5.4"),
+            "tool_concurrency": agent["tool_concurrency"] or (spec_data or {}).get("tool_concurrency"),
+            "cache_mode": agent["llm_cache"] or (spec_data or {}).get("llm_cache"),
         }
 
 
@@ -950,6 +1031,8 @@ def dispatch_to_slot(
     tools_override: list[dict[str, Any]] | None = None,
     model: str | None = None,
     agent_run_id: int | None = None,
+    tool_concurrency: int | None = None,
+    cache_mode: str | None = None,
 ) -> dict[str, Any]:
     spec = get_spec(spec_name)
     if spec is None:
@@ -964,6 +1047,8 @@ def dispatch_to_slot(
             system_prompt=system_prompt,
             tools=tools,
             model=model or "gpt-5.4",
+            tool_concurrency=tool_concurrency,
+            cache_mode=cache_mode,
         )
     finally:
         release_slot(int(slot["id"]))
@@ -978,6 +1063,8 @@ def dispatch_agent(agent_name: str, task: str, agent_run_id: int | None = None)
         tools_override=runtime["tools"],
         model=runtime["model"],
         agent_run_id=agent_run_id,
+        tool_concurrency=runtime["tool_concurrency"],
+        cache_mode=runtime["cache_mode"],
     )
 
 
@@ -1012,6 +1099,8 @@ def dispatch_batch(agent_name: str, tasks: list[str], parallel: int | None = Non
                 system_prompt=runtime["system_prompt"],
                 tools=_merge_tools(spec.get("tool_definitions") or [], runtime["tools"]),
                 model=runtime["model"],
+                tool_concurrency=runtime["tool_concurrency"],
+                cache_mode=runtime["cache_mode"],
             )
             failed_tool = next(
                 (
@@ -1031,6 +1120,7 @@ def dispatch_batch(agent_name: str, tasks: list[str], parallel: int | None = Non
 
     async def run_all() -> None:
         for start in range(0, len(task_list), batch_size):
+            cancellation.check()
             end = min(start + batch_size, len(task_list))
             slots = allocate_slots(runtime["workstation"], end - start)
             try:
@@ -103,3 +103,17 @@ def disconnect_session(session_id: str) -> None:
             (_now_iso(), session_id),
         )
         conn.commit()
+
+
+def prune_sessions(max_age_days: float, dry_run: bool = False) -> int:
+    """Delete disconnected sessions idle for longer than ``max_age_days``; returns how many (would be) removed."""
+    if not os.path.exists(REGISTRY_PATH):
+        return 0
+    where = "status != 'active' AND datetime(last_activity_at) < datetime('now', ?)"
+    params = (f"-{float(max_age_days)} days",)
+    with registry_connection() as conn:
+        if dry_run:
+            return int(conn.execute(f"SELECT COUNT(*) FROM sessions WHERE {where}", params).fetchone()[0])
+        removed = conn.execute(f"DELETE FROM sessions WHERE {where}", params).rowcount
+        conn.commit()
+        return int(removed)
@@ -11,7 +11,7 @@ from custodian.agents.spec_loader import load_spec
 from custodian.db.agents import agent_run as db_agent_run, get_agent_spec
 from custodian.services.workstations import dispatch_agent
 
-METADATA = {'description': "Run an agent via Claude CLI and return the result. The agent runs as a subprocess with its configured model, system prompt, and project context. Pass an optional 'prompt' to override the default starter prompt. Returns the agent's output text, token usage, and cost.", 'input_schema': {'properties': {'agent': {'description': 'Agent name or ID to run', 'type': 'string'}, 'input': {'description': 'Input payload for YAML-backed agents. Keys must match {placeholder} names in the YAML task template.', 'type': 'object'}, 'prompt': {'description': 'Task/prompt to send to the agent (overrides default)', 'type': 'string'}}, 'required': ['agent'], 'type': 'object'}, 'name': 'agent_run'}
+METADATA = {'description': "Run an agent via Claude CLI and return the result. The agent runs as a subprocess with its configured model, system prompt, and project context. Pass an optional 'prompt' to override the default starter prompt. Returns the agent's output text, token usage, and cost.", 'input_schema': {'properties': {'agent': {'description': 'Agent name or ID to run', 'type': 'string'}, 'input': {'description': 'Input payload for YAML-backed agents. Keys must match {placeholder} names in the YAML task template.', 'type': 'object'}, 'prompt': {'description': 'Task/prompt to send to the agent (overrides default)', 'type': 'string'}, 'timeout_seconds': {'description': 'Deadline for the run. The run is cancelled when it passes.', 'type': 'number'}}, 'required': ['agent'], 'type': 'object'}, 'name': 'agent_run'}
 
 
 async def handle(params: dict, db):
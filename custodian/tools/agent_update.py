@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.agents import agent_update
 
-METADATA = {'description': "Update an existing agent's configuration. Pass the agent name or ID and any fields to change.", 'input_schema': {'properties': {'agent': {'description': 'Agent name or ID to update', 'type': 'string'}, 'description': {'description': 'New description (optional)', 'type': 'string'}, 'max_turns': {'description': 'New max turns (optional)', 'type': 'integer'}, 'model': {'description': 'New OpenAI model ID (optional). Must match a currently-available model.', 'type': 'string'}, 'name': {'description': 'New name (optional)', 'type': 'string'}, 'project': {'description': 'New project binding (optional, empty string to unbind)', 'type': 'string'}, 'spec_path': {'description': "YAML spec path relative to the bound project's /workspace root", 'type': 'string'}, 'system_prompt': {'description': 'New system prompt (optional)', 'type': 'string'}, 'workstation': {'description': 'New workstation binding (optional, empty string to unbind)', 'type': 'string'}}, 'required': ['agent'], 'type': 'object'}, 'name': 'agent_update'}
+METADATA = {'description': "Update an existing agent's configuration. Pass the agent name or ID and any fields to change.", 'input_schema': {'properties': {'agent': {'description': 'Agent name or ID to update', 'type': 'string'}, 'description': {'description': 'New description (optional)', 'type': 'string'}, 'max_turns': {'description': 'New max turns (optional)', 'type': 'integer'}, 'model': {'description': 'New OpenAI model ID (optional). Must match a currently-available model.', 'type': 'string'}, 'name': {'description': 'New name (optional)', 'type': 'string'}, 'project': {'description': 'New project binding (optional, empty string to unbind)', 'type': 'string'}, 'spec_path': {'description': "YAML spec path relative to the bound project's /workspace root", 'type': 'string'}, 'system_prompt': {'description': 'New system prompt (optional)', 'type': 'string'}, 'tool_concurrency': {'description': 'New per-turn tool-call concurrency (optional, 0 to reset to the default)', 'type': 'integer'}, 'llm_cache': {'description': "New LLM response cache mode: off, on or replay (optional, '' to reset to the default)", 'type': 'string'}, 'workstation': {'description': 'New workstation binding (optional, empty string to unbind)', 'type': 'string'}}, 'required': ['agent'], 'type': 'object'}, 'name': 'agent_update'}
 
 
 async def handle(params: dict, db):
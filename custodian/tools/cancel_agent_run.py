@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import inspect
+import json
+
+from mcp.types import TextContent
+from custodian.db.agents import cancel_agent_run
+
+METADATA = {'description': 'Cancel a running agent run. Its LLM loop, OpenCode session or workstation container loop is stopped, held workstation slots are freed and the run is marked cancelled.', 'input_schema': {'properties': {'reason': {'description': 'Optional reason recorded as the run error.', 'type': 'string'}, 'run_id': {'description': 'Agent run ID.', 'type': 'integer'}}, 'required': ['run_id'], 'type': 'object'}, 'name': 'cancel_agent_run'}
+
+
+async def handle(params: dict, db):
+    result = cancel_agent_run(db, **params)
+    if inspect.isawaitable(result):
+        result = await result
+    if isinstance(result, str):
+        text = result
+    else:
+        text = json.dumps(result, indent=2)
+    return [TextContent(type="text", text=text)]
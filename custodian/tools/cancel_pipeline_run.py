@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import inspect
+import json
+
+from mcp.types import TextContent
+from custodian.db.pipelines import cancel_pipeline_run
+
+METADATA = {'description': 'Cancel a running or paused pipeline run. In-flight steps are stopped (agent loops, OpenCode sessions, workstation slots and box calls) and the run is marked cancelled; it can still be resumed later.', 'input_schema': {'properties': {'reason': {'description': 'Optional reason recorded as the run error.', 'type': 'string'}, 'run_id': {'description': 'Pipeline run ID.', 'type': 'integer'}}, 'required': ['run_id'], 'type': 'object'}, 'name': 'cancel_pipeline_run'}
+
+
+async def handle(params: dict, db):
+    result = cancel_pipeline_run(db, **params)
+    if inspect.isawaitable(result):
+        result = await result
+    if isinstance(result, str):
+        text = result
+    else:
+        text = json.dumps(result, indent=2)
+    return [TextContent(type="text", text=text)]
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from mcp.types import TextContent
+from custodian.db import snapshots
+
+METADATA = {
+    "name": "create_db_snapshot",
+    "description": "Take a consistent online snapshot of custodian.db without blocking tool calls. Unlabelled snapshots rotate (newest CUSTODIAN_SNAPSHOT_KEEP kept); labelled ones are kept until deleted.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "label": {"type": "string", "description": "Optional label (letters, digits, '.', '_', '-'), e.g. 'before-migration'."},
+            "compact": {"type": "boolean", "description": "Use VACUUM INTO for a smaller, defragmented copy. Default: false."},
+        },
+    },
+}
+
+
+async def handle(params: dict, db):
+    label = str(params.get("label") or "").strip() or None
+    try:
+        result = await asyncio.to_thread(snapshots.create_snapshot, label, compact=bool(params.get("compact")))
+    except snapshots.SnapshotError as exc:
+        return [TextContent(type="text", text=f"Error: {exc}")]
+    return [TextContent(type="text", text=json.dumps(result, indent=2))]
@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.meta import get_meta_summary
 
-METADATA = {'description': 'Summarize Custodian-meta friction and changelog state: friction counts by status, recent changelog entries, and currently open friction points.', 'input_schema': {'properties': {}, 'type': 'object'}, 'name': 'get_meta_summary'}
+METADATA = {'cache_tables': ['friction_points', 'changelog_entries'], 'cacheable': True, 'description': 'Summarize Custodian-meta friction and changelog state: friction counts by status, recent changelog entries, and currently open friction points.', 'input_schema': {'properties': {}, 'type': 'object'}, 'name': 'get_meta_summary'}
 
 
 async def handle(params: dict, db):
@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.projects import get_project_state
 
-METADATA = {'description': "Get a project's CURRENT state in one call: live git status + recent session updates + box health + file tree. Use at the start of a session alongside STATUS.md for full project orientation. Fast (<3s). Does not trigger reindexing.", 'input_schema': {'properties': {'include_file_tree': {'default': True, 'description': 'Include live file tree (capped at 500 entries). Default: true.', 'type': 'boolean'}, 'max_recent_commits': {'default': 10, 'description': 'How many recent commits to include. Default: 10.', 'type': 'integer'}, 'project': {'description': 'Project name', 'type': 'string'}}, 'required': ['project'], 'type': 'object'}, 'name': 'get_project_state'}
+METADATA = {'description': "Get a project's CURRENT state in one call: live git status + recent session updates + box health + file tree. Use at the start of a session alongside STATUS.md for full project orientation. Fast (<3s). Does not trigger reindexing.", 'input_schema': {'properties': {'include_file_tree': {'default': True, 'description': 'Include live file tree (one page of entries from the watched tree cache). Default: true.', 'type': 'boolean'}, 'file_tree_path': {'description': 'Only list files under this project-relative directory. Default: whole project.', 'type': 'string'}, 'file_tree_offset': {'default': 0, 'description': 'Skip this many file tree entries (paging). Default: 0.', 'type': 'integer'}, 'file_tree_limit': {'default': 50, 'description': 'Max file tree entries to return (1-500). Default: 50.', 'type': 'integer'}, 'max_recent_commits': {'default': 10, 'description': 'How many recent commits to include. Default: 10.', 'type': 'integer'}, 'project': {'description': 'Project name', 'type': 'string'}}, 'required': ['project'], 'type': 'object'}, 'name': 'get_project_state'}
 
 
 async def handle(params: dict, db):
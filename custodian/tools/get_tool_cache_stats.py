@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import json
+
+from mcp.types import TextContent
+from custodian.services import tool_cache
+
+METADATA = {
+    "name": "get_tool_cache_stats",
+    "description": "Show hit/miss, eviction and invalidation counts for the read-through tool result cache. Optionally clear it.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "clear": {"type": "boolean", "description": "Drop every cached entry after reading the stats. Default: false."},
+        },
+    },
+}
+
+
+async def handle(params: dict, db):
+    result = tool_cache.stats()
+    if params.get("clear"):
+        result["cleared"] = tool_cache.clear()
+    return [TextContent(type="text", text=json.dumps(result, indent=2))]
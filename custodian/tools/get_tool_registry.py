@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.tools_registry import get_tool_registry
 
-METADATA = {'description': 'List all registered tools, optionally filtered by project.', 'input_schema': {'properties': {'project': {'description': 'Optional project name filter.', 'type': 'string'}}, 'type': 'object'}, 'name': 'get_tool_registry'}
+METADATA = {'cache_tables': ['tool_registry'], 'cacheable': True, 'description': 'List all registered tools, optionally filtered by project.', 'input_schema': {'properties': {'project': {'description': 'Optional project name filter.', 'type': 'string'}}, 'type': 'object'}, 'name': 'get_tool_registry'}
 
 
 async def handle(params: dict, db):
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import json
+
+from mcp.types import TextContent
+from custodian.services.tracing import get_trace
+
+METADATA = {
+    "name": "get_trace",
+    "description": "Show the recorded span tree for a trace, pipeline run, or agent run as a waterfall with a self-time breakdown.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "trace_id": {"type": "string", "description": "Trace ID (32 hex chars) from a traceparent header."},
+            "pipeline_run_id": {"type": "integer", "description": "Pipeline run ID; returns every trace recorded for the run."},
+            "agent_run_id": {"type": "integer", "description": "Agent run ID; returns the span subtree for the run."},
+        },
+    },
+}
+
+
+async def handle(params: dict, db):
+    result = get_trace(
+        trace_id=params.get("trace_id"),
+        pipeline_run_id=params.get("pipeline_run_id"),
+        agent_run_id=params.get("agent_run_id"),
+    )
+    return [TextContent(type="text", text=json.dumps(result, indent=2))]
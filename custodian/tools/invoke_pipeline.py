@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.pipelines import invoke_pipeline
 
-METADATA = {'description': 'Run a registered pipeline synchronously with validated input.', 'input_schema': {'properties': {'input': {'description': 'Invocation input matching the pipeline input_schema.', 'type': 'object'}, 'pipeline': {'description': 'Pipeline name or numeric ID.', 'type': 'string'}}, 'required': ['pipeline', 'input'], 'type': 'object'}, 'name': 'invoke_pipeline'}
+METADATA = {'description': 'Run a registered pipeline synchronously with validated input.', 'input_schema': {'properties': {'input': {'description': 'Invocation input matching the pipeline input_schema.', 'type': 'object'}, 'pipeline': {'description': 'Pipeline name or numeric ID.', 'type': 'string'}, 'timeout_seconds': {'description': 'Deadline for the whole run; overrides the spec timeout_seconds. The run is cancelled when it passes.', 'type': 'number'}}, 'required': ['pipeline', 'input'], 'type': 'object'}, 'name': 'invoke_pipeline'}
 
 
 async def handle(params: dict, db):
@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.services.laptop_bridge import download_file
 
-METADATA = {'description': "Download a file from the REMOTE Mac to this PC over Tailscale. Use for binary files (images, archives) that can't transfer through JSON. remote_path is on the Mac, local_path is where to save on the PC.", 'input_schema': {'properties': {'local_path': {'description': "Absolute path to save locally on the PC (e.g., '/tmp/screenshot.png')", 'type': 'string'}, 'remote_path': {'description': "Absolute path on the REMOTE Mac (e.g., '/Users/<username>/screenshot.png')", 'type': 'string'}}, 'required': ['remote_path', 'local_path'], 'type': 'object'}, 'name': 'laptop_download_file'}
+METADATA = {'description': "Download a file from the REMOTE Mac to this PC over Tailscale. Use for binary files (images, archives) and large datasets that can't transfer through JSON. Transfers in parallel SHA-256-verified chunks and resumes an interrupted download from where it stopped. remote_path is on the Mac, local_path is where to save on the PC.", 'input_schema': {'properties': {'compress': {'default': 'auto', 'description': "Chunk compression: 'auto' (text-like files only), 'gzip', 'zstd' or 'none'. Default: auto.", 'enum': ['auto', 'gzip', 'zstd', 'none'], 'type': 'string'}, 'parallel': {'description': 'Chunks transferred concurrently. Default: 4.', 'type': 'integer'}, 'local_path': {'description': "Absolute path to save locally on the PC (e.g., '/tmp/screenshot.png')", 'type': 'string'}, 'remote_path': {'description': "Absolute path on the REMOTE Mac (e.g., '/Users/<username>/screenshot.png')", 'type': 'string'}}, 'required': ['remote_path', 'local_path'], 'type': 'object'}, 'name': 'laptop_download_file'}
 
 
 async def handle(params: dict, db):
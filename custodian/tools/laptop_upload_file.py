@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import inspect
+import json
+
+from mcp.types import TextContent
+from custodian.services.laptop_bridge import upload_file
+
+METADATA = {'description': "Upload a file from this PC to the REMOTE Mac over Tailscale. Transfers in parallel SHA-256-verified chunks into '<remote_path>.part', resumes an interrupted upload and only moves the file into place once the whole-file hash matches. local_path is on the PC, remote_path is the destination on the Mac.", 'input_schema': {'properties': {'compress': {'default': 'auto', 'description': "Chunk compression: 'auto' (text-like files only), 'gzip', 'zstd' or 'none'. Default: auto.", 'enum': ['auto', 'gzip', 'zstd', 'none'], 'type': 'string'}, 'local_path': {'description': 'Absolute path of the file on this PC', 'type': 'string'}, 'parallel': {'description': 'Chunks transferred concurrently. Default: 4.', 'type': 'integer'}, 'remote_path': {'description': "Absolute destination path on the REMOTE Mac (e.g., '/Users/<username>/data.csv')", 'type': 'string'}}, 'required': ['local_path', 'remote_path'], 'type': 'object'}, 'name': 'laptop_upload_file'}
+
+
+async def handle(params: dict, db):
+    result = upload_file(**params)
+    if inspect.isawaitable(result):
+        result = await result
+    if isinstance(result, str):
+        text = result
+    else:
+        text = json.dumps(result, indent=2)
+    return [TextContent(type="text", text=text)]
@@ -15,6 +15,8 @@ METADATA = {
             "project": {"type": "string", "description": "Optional project context for including box tools."},
         },
     },
+    "cacheable": True,
+    "cache_tables": ["mcp_registry", "tool_registry", "native_extensions"],
 }
 
 
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import json
+
+from mcp.types import TextContent
+from custodian.db import snapshots
+
+METADATA = {
+    "name": "list_db_snapshots",
+    "description": "List custodian.db snapshots (newest first) with label, size, page count and checksum.",
+    "input_schema": {"type": "object", "properties": {}},
+}
+
+
+async def handle(params: dict, db):
+    return [TextContent(type="text", text=json.dumps(snapshots.list_snapshots(), indent=2))]
@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.pipelines import list_pipelines
 
-METADATA = {'description': 'List registered pipelines with step counts and most recent run status.', 'input_schema': {'properties': {'status': {'description': 'Optional status filter.', 'type': 'string'}}, 'type': 'object'}, 'name': 'list_pipelines'}
+METADATA = {'cache_tables': ['pipelines', 'pipeline_runs'], 'cacheable': True, 'description': 'List registered pipelines with step counts and most recent run status.', 'input_schema': {'properties': {'status': {'description': 'Optional status filter.', 'type': 'string'}}, 'type': 'object'}, 'name': 'list_pipelines'}
 
 
 async def handle(params: dict, db):
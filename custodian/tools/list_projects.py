@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.projects import list_projects
 
-METADATA = {'description': 'List all registered projects with their status, stack, and last indexed time.', 'input_schema': {'properties': {}, 'type': 'object'}, 'name': 'list_projects'}
+METADATA = {'cache_tables': ['projects', 'fossils', 'symbols'], 'cacheable': True, 'description': 'List all registered projects with their status, stack, and last indexed time.', 'input_schema': {'properties': {}, 'type': 'object'}, 'name': 'list_projects'}
 
 
 async def handle(params: dict, db):
@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.memory import memory_search
 
-METADATA = {'description': 'Search memories using full-text search (FTS5 with bm25 ranking). Optionally filter by project and/or tags.', 'input_schema': {'properties': {'limit': {'default': 20, 'description': 'Max results (default 20)', 'type': 'integer'}, 'project': {'description': 'Filter by project name (optional)', 'type': 'string'}, 'query': {'description': 'Search query (FTS5 — supports AND, OR, NOT, phrases in quotes)', 'type': 'string'}, 'tags': {'description': 'Filter by tags — memory must have ALL specified tags', 'items': {'type': 'string'}, 'type': 'array'}}, 'type': 'object'}, 'name': 'memory_search'}
+METADATA = {'description': 'Search memories. Fuses FTS5 bm25 with a local vector ranking (reciprocal rank fusion) so paraphrased queries still match. Optionally filter by project and/or tags.', 'input_schema': {'properties': {'limit': {'default': 20, 'description': 'Max results (default 20)', 'type': 'integer'}, 'mode': {'default': 'hybrid', 'description': 'Ranking: hybrid (bm25 + vector, default), lexical (bm25 only) or vector', 'enum': ['hybrid', 'lexical', 'vector'], 'type': 'string'}, 'project': {'description': 'Filter by project name (optional)', 'type': 'string'}, 'query': {'description': 'Search query (FTS5 syntax — AND, OR, NOT, phrases in quotes — applies to the bm25 side)', 'type': 'string'}, 'tags': {'description': 'Filter by tags — memory must have ALL specified tags', 'items': {'type': 'string'}, 'type': 'array'}}, 'type': 'object'}, 'name': 'memory_search'}
 
 
 async def handle(params: dict, db):
@@ -6,7 +6,7 @@ import json
 from mcp.types import TextContent
 from custodian.db.projects import register_project
 
-METADATA = {'description': 'Register a new project in Custodian without provisioning or indexing it.', 'input_schema': {'properties': {'name': {'description': "Lowercase project key, e.g. 'finance95-web'. Must be unique.", 'type': 'string'}, 'path': {'description': 'Absolute filesystem path to the repo root.', 'type': 'string'}, 'stack': {'default': '', 'description': 'Tech stack description. Default empty string.', 'type': 'string'}, 'status': {'default': 'active', 'description': "Project status. Default 'active'.", 'type': 'string'}}, 'required': ['name', 'path'], 'type': 'object'}, 'name': 'register_project'}
+METADATA = {'description': 'Register a new project in Custodian without provisioning or indexing it.', 'input_schema': {'properties': {'aliases': {'description': 'Optional extra names the project should resolve under in every tool.', 'items': {'type': 'string'}, 'type': 'array'}, 'name': {'description': "Lowercase project key, e.g. 'finance95-web'. Must be unique.", 'type': 'string'}, 'path': {'description': 'Absolute filesystem path to the repo root.', 'type': 'string'}, 'stack': {'default': '', 'description': 'Tech stack description. Default empty string.', 'type': 'string'}, 'status': {'default': 'active', 'description': "Project status. Default 'active'.", 'type': 'string'}}, 'required': ['name', 'path'], 'type': 'object'}, 'name': 'register_project'}
 
 
 async def handle(params: dict, db):
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from mcp.types import TextContent
+from custodian.db import snapshots
+
+METADATA = {
+    "name": "restore_db_snapshot",
+    "description": "Replace the live custodian.db contents with a verified snapshot. A 'pre-restore' snapshot of the current state is taken first (the newest CUSTODIAN_SNAPSHOT_KEEP_PRE_RESTORE are kept).",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "description": "Snapshot file name from list_db_snapshots."},
+            "label": {"type": "string", "description": "Restore the newest snapshot with this label instead."},
+        },
+    },
+}
+
+
+async def handle(params: dict, db):
+    name = str(params.get("name") or "").strip() or None
+    label = str(params.get("label") or "").strip() or None
+    if name is None and label is None:
+        return [TextContent(type="text", text="Error: provide 'name' or 'label'.")]
+    try:
+        result = await asyncio.to_thread(snapshots.restore_snapshot, snapshots.find_snapshot(name, label))
+    except snapshots.SnapshotError as exc:
+        return [TextContent(type="text", text=f"Error: {exc}")]
+    return [TextContent(type="text", text=json.dumps(result, indent=2))]
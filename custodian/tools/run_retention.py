@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from mcp.types import TextContent
+from custodian.db import retention
+
+METADATA = {
+    "name": "run_retention",
+    "description": "Report (dry run, the default) or apply retention for query_log, pipeline step payloads, pipeline_runs, session_updates, the session registry and the trace store: rows past each policy's age/row limit are rolled up, archived or deleted, then the DB is incrementally vacuumed. Skipped while another server process is applying retention.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "dry_run": {"type": "boolean", "description": "Only report what would be processed. Default: true."},
+            "tables": {
+                "type": "array",
+                "items": {"type": "string", "enum": sorted(retention.DEFAULT_POLICIES)},
+                "description": "Limit the run to these tables. Default: all.",
+            },
+            "policies": {
+                "type": "object",
+                "description": "Per-table overrides for this run, e.g. {\"query_log\": {\"max_age_days\": 7, \"max_rows\": 50000}}.",
+            },
+            "convert_auto_vacuum": {
+                "type": "boolean",
+                "description": "Switch a DB not yet on incremental auto-vacuum with one full VACUUM, which blocks writers until it finishes. Default: false.",
+            },
+        },
+    },
+}
+
+
+async def handle(params: dict, db):
+    try:
+        result = await asyncio.to_thread(
+            retention.run,
+            dry_run=params.get("dry_run", True) is not False,
+            tables=params.get("tables"),
+            policies=params.get("policies"),
+            convert_auto_vacuum=params.get("convert_auto_vacuum") is True,
+        )
+    except ValueError as exc:
+        return [TextContent(type="text", text=f"Error: {exc}")]
+    return [TextContent(type="text", text=json.dumps(result, indent=2))]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from mcp.types import TextContent
+from custodian.db import snapshots
+
+METADATA = {
+    "name": "verify_db_snapshot",
+    "description": "Check a custodian.db snapshot against its manifest checksum and run SQLite's integrity_check on it. Defaults to the newest snapshot.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "description": "Snapshot file name from list_db_snapshots."},
+            "label": {"type": "string", "description": "Verify the newest snapshot with this label instead."},
+        },
+    },
+}
+
+
+async def handle(params: dict, db):
+    name = str(params.get("name") or "").strip() or None
+    label = str(params.get("label") or "").strip() or None
+    try:
+        if name is None and label is None:
+            newest = snapshots.list_snapshots()
+            if not newest:
+                return [TextContent(type="text", text="Error: no snapshots yet.")]
+            name = newest[0]["name"]
+        result = await asyncio.to_thread(snapshots.verify_snapshot, snapshots.find_snapshot(name, label))
+    except snapshots.SnapshotError as exc:
+        return [TextContent(type="text", text=f"Error: {exc}")]
+    return [TextContent(type="text", text=json.dumps(result, indent=2))]
@@ -10,21 +10,34 @@ Bind: Mac bridge target (100.82.234.100:8222) or BRIDGE_HOST override
 Auth: Bearer token via BRIDGE_TOKEN env var
 """
 
+import asyncio
+import bisect
 import fnmatch
+import gzip
+import hashlib
 import hmac
 import json
+import mmap
 import os
 import platform
 import re
 import shutil
 import subprocess
 import sys
+import threading
 import time
+import zlib
+from collections import OrderedDict
 from pathlib import Path
 
 from mcp.server import Server
 from mcp.types import TextContent, Tool
 
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
 # --- Configuration ---
 
 LISTEN_HOST = os.environ.get("BRIDGE_HOST", "0.0.0.0")
@@ -47,6 +60,19 @@ BLOCKED_PATHS = [
 BLOCKED_PATTERNS = os.environ.get("BRIDGE_BLOCKED_PATHS", "").split(":") if os.environ.get("BRIDGE_BLOCKED_PATHS") else []
 BLOCKED_PATHS.extend(BLOCKED_PATTERNS)
 
+# File reads
+READ_DEFAULT_LIMIT = 2000
+READ_MAX_LINE_CHARS = 2000
+READ_MAX_BYTES = int(os.environ.get("BRIDGE_READ_MAX_BYTES", str(1024 * 1024)))  # per response
+READ_INDEX_BLOCK = 64 * 1024
+READ_INDEX_FILES = 32
+# A tail read indexes the rest of the file for real line numbers only if this little is left.
+READ_TAIL_INDEX_BYTES = 64 * 1024 * 1024
+
+# Transfers
+TRANSFER_MAX_CHUNK = 64 * 1024 * 1024
+TRANSFER_CHECKSUM_FILES = 64
+
 
 def _is_blocked(path: str) -> bool:
     """Check if a path matches the deny list."""
@@ -83,13 +109,16 @@ async def list_tools():
     return [
         Tool(
             name="laptop_read_file",
-            description="Read a file from the laptop. Returns content with line numbers.",
+            description="Read a file from the laptop. Returns content with line numbers. Pages, tails and byte ranges of large files cost only the bytes returned.",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "path": {"type": "string", "description": "Absolute file path on the laptop"},
                     "offset": {"type": "integer", "description": "Start line (1-based). Default: 1."},
                     "limit": {"type": "integer", "description": "Max lines to return. Default: 2000."},
+                    "tail": {"type": "integer", "description": "Return the last N lines instead of reading from offset."},
+                    "byte_offset": {"type": "integer", "description": "Return raw text starting at this byte (negative counts from the end) instead of lines."},
+                    "byte_length": {"type": "integer", "description": "Bytes to return with byte_offset. Default and max: 1 MiB."},
                 },
                 "required": ["path"],
             },
@@ -217,13 +246,311 @@ async def call_tool(name: str, arguments: dict):
         return [TextContent(type="text", text=f"Error: {e}")]
 
 
+# --- File reading ---
+
+
+class _LineIndex:
+    """Sparse line index for one file version.
+
+    ``lines_before[b]`` is the number of newlines in the first ``b`` blocks of
+    ``READ_INDEX_BLOCK`` bytes. It is filled lazily, only as far as a read
+    needs, by counting newlines block by block. Finding line N is then a
+    bisect plus a scan inside one block, whatever the file size. An index
+    stays valid while size and mtime match. If a file only grew and its old
+    tail bytes are unchanged (an appended log), the full blocks are kept.
+    """
+
+    def __init__(self, size: int, mtime_ns: int):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.lines_before = [0]
+        self.tail_crc: int | None = None
+        self.lock = threading.Lock()
+
+    def _tail_crc(self, mm) -> int:
+        return zlib.crc32(mm[max(0, self.size - 4096):self.size])
+
+    def matches_prefix(self, mm, new_size: int) -> bool:
+        return new_size >= self.size and self.tail_crc is not None and self._tail_crc(mm) == self.tail_crc
+
+    def grow(self, mm, size: int, mtime_ns: int) -> None:
+        full_blocks = self.size // READ_INDEX_BLOCK
+        del self.lines_before[full_blocks + 1:]
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.tail_crc = self._tail_crc(mm)
+
+    @property
+    def indexed_bytes(self) -> int:
+        return min((len(self.lines_before) - 1) * READ_INDEX_BLOCK, self.size)
+
+    @property
+    def complete(self) -> bool:
+        return self.indexed_bytes >= self.size
+
+    def extend(self, mm, until=lambda newlines: False) -> None:
+        """Count blocks until ``until(newlines_so_far)`` holds or the file is fully indexed."""
+        while not self.complete and not until(self.lines_before[-1]):
+            start = self.indexed_bytes
+            block = mm[start:min(start + READ_INDEX_BLOCK, self.size)]
+            self.lines_before.append(self.lines_before[-1] + block.count(b"\n"))
+
+    def total_lines(self, mm) -> int | None:
+        if not self.complete:
+            return None
+        lines = self.lines_before[-1]
+        if self.size and mm[self.size - 1:self.size] != b"\n":
+            lines += 1
+        return lines
+
+    def line_start(self, mm, line_no: int) -> int | None:
+        """Byte offset where 1-based ``line_no`` starts, or None past the end."""
+        need = line_no - 1
+        if need <= 0:
+            return 0 if self.size else None
+        self.extend(mm, until=lambda newlines: newlines >= need)
+        if self.lines_before[-1] < need:
+            return None
+        block = bisect.bisect_left(self.lines_before, need) - 1
+        pos = block * READ_INDEX_BLOCK
+        for _ in range(need - self.lines_before[block]):
+            pos = mm.find(b"\n", pos) + 1
+        return pos if pos < self.size else None
+
+
+_line_indexes: "OrderedDict[str, _LineIndex]" = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+def _line_index(path: str, mm, st) -> _LineIndex:
+    with _line_indexes_lock:
+        index = _line_indexes.get(path)
+        if index is not None:
+            _line_indexes.move_to_end(path)
+    if index is not None and (index.size, index.mtime_ns) == (st.st_size, st.st_mtime_ns):
+        return index
+    if index is not None and index.matches_prefix(mm, st.st_size):
+        with index.lock:
+            index.grow(mm, st.st_size, st.st_mtime_ns)
+        return index
+    index = _LineIndex(st.st_size, st.st_mtime_ns)
+    index.tail_crc = index._tail_crc(mm)
+    with _line_indexes_lock:
+        _line_indexes[path] = index
+        while len(_line_indexes) > READ_INDEX_FILES:
+            _line_indexes.popitem(last=False)
+    return index
+
+
+def _decode_line(raw: bytes) -> str:
+    # Decode no more than the displayed prefix of very long lines.
+    text = raw[:READ_MAX_LINE_CHARS * 4].decode("utf-8", errors="replace").rstrip("\r")
+    if len(text) > READ_MAX_LINE_CHARS or len(raw) > READ_MAX_LINE_CHARS * 4:
+        text = text[:READ_MAX_LINE_CHARS] + "... [truncated]"
+    return text
+
+
+def _read_lines(mm, size: int, pos: int, limit: int) -> tuple[list[bytes], int]:
+    """Read up to ``limit`` lines from byte ``pos``; returns (lines, next_pos)."""
+    lines = []
+    budget = READ_MAX_BYTES
+    while len(lines) < limit and pos < size and budget > 0:
+        newline = mm.find(b"\n", pos)
+        end = size if newline == -1 else newline
+        lines.append(mm[pos:min(end, pos + READ_MAX_LINE_CHARS * 4 + 1)])
+        budget -= min(end - pos, READ_MAX_LINE_CHARS * 4) + 1
+        pos = end + 1
+    return lines, pos
+
+
+def _read_tail(mm, size: int, count: int) -> list[bytes]:
+    end = size - 1 if mm[size - 1:size] == b"\n" else size
+    lines = []
+    budget = READ_MAX_BYTES
+    while len(lines) < count and end >= 0 and budget > 0:
+        newline = mm.rfind(b"\n", 0, end)
+        lines.append(mm[newline + 1:min(end, newline + 1 + READ_MAX_LINE_CHARS * 4 + 1)])
+        budget -= min(end - newline, READ_MAX_LINE_CHARS * 4)
+        if newline == -1:
+            break
+        end = newline
+    lines.reverse()
+    return lines
+
+
+def _read_file_sync(path: str, offset: int, limit: int, tail: int | None, byte_offset: int | None, byte_length: int | None) -> str:
+    st = os.stat(path)
+    if byte_offset is not None:
+        start = byte_offset if byte_offset >= 0 else max(0, st.st_size + byte_offset)
+        length = min(READ_MAX_BYTES, byte_length if byte_length is not None else READ_MAX_BYTES)
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(max(0, length))
+        end = start + len(data)
+        header = f"[bytes {start}-{end} of {st.st_size}]"
+        if end < st.st_size:
+            header += f" [more: byte_offset={end}]"
+        return header + "\n" + data.decode("utf-8", errors="replace")
+
+    if st.st_size == 0:
+        return "(empty file)"
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = min(st.st_size, len(mm))
+        index = _line_index(path, mm, st)
+        with index.lock:
+            if tail is not None:
+                lines = _read_tail(mm, size, max(1, tail))
+                if size - index.indexed_bytes <= READ_TAIL_INDEX_BYTES:
+                    index.extend(mm)
+                total = index.total_lines(mm)
+                if total is None:
+                    numbered = [f"{i - len(lines):6d}\t{_decode_line(line)}" for i, line in enumerate(lines)]
+                    return "(line numbers counted back from the end of the file)\n" + "\n".join(numbered)
+                first = total - len(lines) + 1
+                return "\n".join(f"{i:6d}\t{_decode_line(line)}" for i, line in enumerate(lines, start=first)) or "(empty file)"
+
+            start_line = max(1, offset)
+            pos = index.line_start(mm, start_line)
+            if pos is None:
+                return "(empty file)"
+            lines, next_pos = _read_lines(mm, size, pos, max(0, limit))
+            result = "\n".join(f"{i:6d}\t{_decode_line(line)}" for i, line in enumerate(lines, start=start_line))
+            if len(lines) < limit and next_pos < size:
+                result += f"\n[output capped at {READ_MAX_BYTES} bytes; continue with offset={start_line + len(lines)}]"
+            return result or "(empty file)"
+
+
+# --- Transfers ---
+#
+# Files move in fixed-size chunks. GET /checksum returns the SHA-256 of the
+# whole file and of every chunk, so a client can skip chunks it already has
+# and check each one it receives. Downloads use HTTP Range on /download.
+# Uploads PUT chunks at offsets into "<path>.part", and POST
+# /upload/complete renames it once the whole-file hash matches. Chunks can
+# be gzip- or zstd-encoded; the encoding used is sent in X-Encoding.
+
+
+def _encodings() -> list[str]:
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def _encode(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decode(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd is not available on the bridge")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding not in ("", "identity"):
+        raise ValueError(f"unsupported encoding: {encoding}")
+    return data
+
+
+_checksums: "OrderedDict[tuple, dict]" = OrderedDict()
+_checksums_lock = threading.Lock()
+
+
+def _file_checksums(path: str, chunk_size: int) -> dict:
+    """Whole-file and per-chunk SHA-256, cached per (path, size, mtime, chunk_size)."""
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns, chunk_size)
+    with _checksums_lock:
+        cached = _checksums.get(key)
+        if cached is not None:
+            _checksums.move_to_end(key)
+            return cached
+    whole = hashlib.sha256()
+    chunks = []
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            whole.update(data)
+            chunks.append(hashlib.sha256(data).hexdigest())
+    result = {
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "chunk_size": chunk_size,
+        "sha256": whole.hexdigest(),
+        "chunks": chunks,
+        "encodings": _encodings(),
+    }
+    with _checksums_lock:
+        _checksums[key] = result
+        while len(_checksums) > TRANSFER_CHECKSUM_FILES:
+            _checksums.popitem(last=False)
+    return result
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single "bytes=a-b" range into an inclusive (start, end)."""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    else:
+        start = max(0, size - int(match.group(2)))
+        end = size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+
+def _write_chunk(path: str, offset: int, total_size: int, data: bytes) -> None:
+    part = path + ".part"
+    fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size != total_size:
+            os.ftruncate(fd, total_size)
+        os.pwrite(fd, data, offset)
+    finally:
+        os.close(fd)
+
+
+def _complete_upload(path: str, size: int, sha256: str) -> dict:
+    part = path + ".part"
+    if not os.path.isfile(part):
+        raise FileNotFoundError(f"No upload in progress for {path}")
+    actual_size = os.path.getsize(part)
+    if actual_size != size:
+        raise ValueError(f"size mismatch: expected {size}, have {actual_size}")
+    digest = hashlib.sha256()
+    with open(part, "rb") as f:
+        for data in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(data)
+    if digest.hexdigest() != sha256:
+        raise ValueError("sha256 mismatch; the partial upload is kept for retry")
+    os.replace(part, path)
+    return {"path": path, "size": size, "sha256": sha256}
+
+
 # --- Tool handlers ---
 
 
 async def handle_read_file(args):
     path = args["path"]
     offset = args.get("offset", 1)
-    limit = args.get("limit", 2000)
+    limit = args.get("limit", READ_DEFAULT_LIMIT)
+    tail = args.get("tail")
+    byte_offset = args.get("byte_offset")
+    byte_length = args.get("byte_length")
 
     if _is_blocked(path):
         return [TextContent(type="text", text=f"Access denied: {path}")]
@@ -232,26 +559,15 @@ async def handle_read_file(args):
         return [TextContent(type="text", text=f"File not found: {path}")]
 
     try:
-        with open(path, "r", errors="replace") as f:
-            lines = f.readlines()
-
-        # Apply offset/limit (1-based offset)
-        start = max(0, offset - 1)
-        end = start + limit
-        selected = lines[start:end]
-
-        # Format with line numbers
-        numbered = []
-        for i, line in enumerate(selected, start=start + 1):
-            # Truncate long lines
-            text = line.rstrip("\n")
-            if len(text) > 2000:
-                text = text[:2000] + "... [truncated]"
-            numbered.append(f"{i:6d}\t{text}")
-
-        result = "\n".join(numbered)
-        if not result:
-            result = "(empty file)"
+        result = await asyncio.to_thread(
+            _read_file_sync,
+            str(Path(path).resolve()),
+            int(offset),
+            int(limit),
+            int(tail) if tail is not None else None,
+            int(byte_offset) if byte_offset is not None else None,
+            int(byte_length) if byte_length is not None else None,
+        )
         return [TextContent(type="text", text=result)]
     except Exception as e:
         return [TextContent(type="text", text=f"Error reading {path}: {e}")]
@@ -535,7 +851,7 @@ def create_starlette_app():
     from starlette.middleware import Middleware
     from starlette.middleware.base import BaseHTTPMiddleware
     from starlette.requests import Request
-    from starlette.responses import JSONResponse, Response
+    from starlette.responses import FileResponse, JSONResponse, Response
     from starlette.routing import Mount, Route
 
     sse_transport = SseServerTransport("/messages/")
@@ -580,6 +896,8 @@ def create_starlette_app():
     async def handle_download(request: Request):
         """Serve a file as raw bytes for binary transfer.
         GET /download?path=/Users/<username>/file.png
+        Honours Range. With ?encoding=gzip|zstd and a Range header the range
+        is returned encoded, with the encoding used in X-Encoding.
         """
         file_path = request.query_params.get("path", "")
         if not file_path:
@@ -589,27 +907,100 @@ def create_starlette_app():
             return Response("Path is blocked", status_code=403)
         if not os.path.isfile(resolved):
             return Response(f"File not found: {resolved}", status_code=404)
-        try:
-            import mimetypes
-            content_type = mimetypes.guess_type(resolved)[0] or "application/octet-stream"
-            with open(resolved, "rb") as f:
-                data = f.read()
+        import mimetypes
+        content_type = mimetypes.guess_type(resolved)[0] or "application/octet-stream"
+        encoding = request.query_params.get("encoding", "")
+        range_header = request.headers.get("range", "")
+        if encoding in _encodings() and range_header:
+            size = os.path.getsize(resolved)
+            byte_range = _parse_range(range_header, size)
+            if byte_range is None or byte_range[1] - byte_range[0] + 1 > TRANSFER_MAX_CHUNK:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+            start, end = byte_range
+            data = await asyncio.to_thread(_read_range, resolved, start, end - start + 1)
+            body = await asyncio.to_thread(_encode, data, encoding)
+            if len(body) >= len(data):
+                body, encoding = data, "identity"
             return Response(
-                content=data,
-                media_type=content_type,
-                headers={
-                    "Content-Disposition": f'attachment; filename="{os.path.basename(resolved)}"',
-                    "Content-Length": str(len(data)),
-                },
+                content=body,
+                status_code=206,
+                media_type="application/octet-stream",
+                headers={"Content-Range": f"bytes {start}-{end}/{size}", "X-Encoding": encoding},
             )
+        # Streamed from disk in chunks instead of read into memory; FileResponse handles Range.
+        return FileResponse(resolved, media_type=content_type, filename=os.path.basename(resolved))
+
+    async def handle_checksum(request: Request):
+        """GET /checksum?path=...&chunk_size=N -> size, sha256 and per-chunk sha256."""
+        file_path = request.query_params.get("path", "")
+        if not file_path:
+            return JSONResponse({"error": "missing path"}, status_code=400)
+        resolved = str(Path(file_path).resolve())
+        if _is_blocked(resolved):
+            return JSONResponse({"error": "path is blocked"}, status_code=403)
+        if not os.path.isfile(resolved):
+            return JSONResponse({"error": f"file not found: {resolved}"}, status_code=404)
+        try:
+            chunk_size = int(request.query_params.get("chunk_size", str(8 * 1024 * 1024)))
+        except ValueError:
+            return JSONResponse({"error": "chunk_size must be an integer"}, status_code=400)
+        if not 0 < chunk_size <= TRANSFER_MAX_CHUNK:
+            return JSONResponse({"error": f"chunk_size must be 1..{TRANSFER_MAX_CHUNK}"}, status_code=400)
+        return JSONResponse(await asyncio.to_thread(_file_checksums, resolved, chunk_size))
+
+    async def handle_upload_chunk(request: Request):
+        """PUT /upload?path=...&offset=N&size=TOTAL[&encoding=gzip|zstd] with the chunk as body."""
+        file_path = request.query_params.get("path", "")
+        if not file_path:
+            return JSONResponse({"error": "missing path"}, status_code=400)
+        resolved = str(Path(file_path).resolve())
+        if _is_blocked(resolved) or _is_blocked(resolved + ".part"):
+            return JSONResponse({"error": "path is blocked"}, status_code=403)
+        try:
+            offset = int(request.query_params["offset"])
+            total_size = int(request.query_params["size"])
+        except (KeyError, ValueError):
+            return JSONResponse({"error": "offset and size are required integers"}, status_code=400)
+        body = await request.body()
+        try:
+            data = await asyncio.to_thread(_decode, body, request.query_params.get("encoding", "identity"))
         except Exception as e:
-            return Response(f"Error reading file: {e}", status_code=500)
+            return JSONResponse({"error": f"cannot decode chunk: {e}"}, status_code=415)
+        if offset < 0 or offset + len(data) > total_size or len(data) > TRANSFER_MAX_CHUNK:
+            return JSONResponse({"error": "chunk outside the declared file size"}, status_code=400)
+        expected = request.headers.get("x-chunk-sha256", "")
+        if expected and hashlib.sha256(data).hexdigest() != expected:
+            return JSONResponse({"error": "chunk sha256 mismatch"}, status_code=422)
+        os.makedirs(os.path.dirname(resolved), exist_ok=True)
+        await asyncio.to_thread(_write_chunk, resolved, offset, total_size, data)
+        return JSONResponse({"written": len(data), "offset": offset})
+
+    async def handle_upload_complete(request: Request):
+        """POST /upload/complete {"path", "size", "sha256"}: verify the .part file and move it into place."""
+        try:
+            body = await request.json()
+            resolved = str(Path(body["path"]).resolve())
+            size = int(body["size"])
+            sha256 = str(body["sha256"])
+        except Exception:
+            return JSONResponse({"error": "path, size and sha256 are required"}, status_code=400)
+        if _is_blocked(resolved):
+            return JSONResponse({"error": "path is blocked"}, status_code=403)
+        try:
+            return JSONResponse(await asyncio.to_thread(_complete_upload, resolved, size, sha256))
+        except FileNotFoundError as e:
+            return JSONResponse({"error": str(e)}, status_code=404)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=409)
 
     starlette_app = Starlette(
         routes=[
             Route("/health", endpoint=health, methods=["GET"]),
             Route("/tool", endpoint=handle_tool, methods=["POST"]),
             Route("/download", endpoint=handle_download, methods=["GET"]),
+            Route("/checksum", endpoint=handle_checksum, methods=["GET"]),
+            Route("/upload", endpoint=handle_upload_chunk, methods=["PUT"]),
+            Route("/upload/complete", endpoint=handle_upload_complete, methods=["POST"]),
             Route("/sse", endpoint=handle_sse),
             Mount("/messages/", app=sse_transport.handle_post_message),
         ],
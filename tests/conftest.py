@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_trace_store(tmp_path, monkeypatch):
+    from custodian.services import tracing
+
+    monkeypatch.setattr(tracing, "TRACE_DB_PATH", str(tmp_path / "trace_store.db"))
+    yield
+    tracing.flush_spans()
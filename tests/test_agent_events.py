@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import executor
+from custodian.services import agent_events
+from custodian.services.opencode import progress_listener
+
+
+def test_executor_publishes_turns_tools_and_usage(monkeypatch):
+    responses = iter(
+        [
+            json.dumps({"tool_calls": [{"name": "lookup", "params": {"q": "a"}}, {"name": "lookup", "params": {"q": "b"}}]}),
+            json.dumps({"final_answer": {"done": True}}),
+        ]
+    )
+
+    async def fake_call_llm(model, messages, cache_mode=None):
+        return next(responses), {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+
+    async def fake_execute_tool(tool_map, name, params, bridge_url):
+        return {"q": params["q"]}
+
+    monkeypatch.setattr(executor, "_call_llm", fake_call_llm)
+    monkeypatch.setattr(executor, "_execute_tool", fake_execute_tool)
+    snapshots: list[dict] = []
+    seen: list[agent_events.AgentEvent] = []
+
+    async def run():
+        with agent_events.listen(seen.append), agent_events.run_scope(7, "echo", progress=snapshots.append):
+            return await executor.run_agent_loop(
+                model="openai/gpt-5.4", compiled_prompt={"system": "s", "user": "u"}, max_turns=3, tools=[{"name": "lookup"}]
+            )
+
+    assert asyncio.run(run()).output == {"done": True}
+    kinds = [event.kind for event in seen]
+    assert kinds[0] == "run_start" and kinds[-1] == "run_finish"
+    assert kinds.count("turn_start") == 2 and kinds.count("tool_start") == kinds.count("tool_finish") == 2
+    assert {event.run_id for event in seen} == {7}
+    assert [event.seq for event in seen] == list(range(1, len(seen) + 1))
+    assert snapshots[-1]["finished"] is True
+    assert snapshots[-1]["turn"] == 2 and snapshots[-1]["tokens"] == 30 and snapshots[-1]["tool_calls"] == 2
+    assert agent_events.recent(7, after=seen[-2].seq)[0]["kind"] == "run_finish"
+
+
+def test_text_chunks_are_throttled_but_other_events_are_not():
+    writes: list[dict] = []
+    recorder = agent_events.ProgressRecorder(writes.append, run_id=1, flush_seconds=60)
+    with agent_events.listen(recorder), agent_events.run_scope(1, "a"):
+        for chunk in ("one ", "two ", "three"):
+            agent_events.publish("text", text=chunk, delta=True)
+        agent_events.publish("turn_start", turn=2)
+    assert [write["last_event"] for write in writes] == ["run_start", "turn_start", "run_finish"]
+    assert writes[1]["text_tail"] == "one two three"
+
+
+def test_container_event_lines_are_republished_on_the_host(capsys):
+    unsubscribe = agent_events.subscribe(agent_events.print_event)
+    try:
+        agent_events.publish("tool_start", call_id="c1", name="pytest")
+    finally:
+        unsubscribe()
+    line = capsys.readouterr().out.strip()
+    assert line.startswith(agent_events.EVENT_LINE_PREFIX)
+
+    seen: list[agent_events.AgentEvent] = []
+    with agent_events.listen(seen.append), agent_events.run_scope(3, "box"):
+        assert agent_events.forward_line(line) is True
+        assert agent_events.forward_line("plain output") is False
+    forwarded = [event for event in seen if event.kind == "tool_start"]
+    assert forwarded[0].run_id == 3 and forwarded[0].data == {"call_id": "c1", "name": "pytest"}
+
+
+def test_opencode_events_map_to_progress_from_any_thread():
+    snapshots: list[dict] = []
+    with agent_events.run_scope(9, "oc", progress=snapshots.append):
+        on_event = progress_listener()
+        events = [
+            {"type": "step_start"},
+            {"type": "tool_use", "part": {"callID": "t1", "tool": "bash", "state": {"status": "completed"}}},
+            {"type": "text", "part": {"text": "hello"}},
+            {"type": "step_finish", "part": {"tokens": {"total": 120}, "cost": 0.002}},
+            {"type": "message.part.updated", "properties": {"part": {"type": "text"}, "delta": " world"}},
+        ]
+        worker = threading.Thread(target=lambda: [on_event(event) for event in events])
+        worker.start()
+        worker.join()
+    final = snapshots[-1]
+    assert final["turn"] == 1 and final["tool_calls"] == 1
+    assert final["tokens"] == 120 and final["cost_usd"] == 0.002
+    assert final["text_tail"] == "hello world"
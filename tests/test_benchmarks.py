@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.run import compare
+
+
+def test_compare_flags_regressions_in_the_right_direction() -> None:
+    baseline = {"metrics": {
+        "tool.memory_search.p50_ms": {"value": 10.0, "better": "lower"},
+        "parser.files_per_sec": {"value": 1000.0, "better": "higher"},
+        "pipeline.steps_per_sec": {"value": 100.0, "better": "higher"},
+    }}
+    current = {"metrics": {
+        "tool.memory_search.p50_ms": {"value": 14.0, "better": "lower"},
+        "parser.files_per_sec": {"value": 850.0, "better": "higher"},
+        "pipeline.steps_per_sec": {"value": 180.0, "better": "higher"},
+        "tool.new_tool.p50_ms": {"value": 1.0, "better": "lower"},
+    }}
+    thresholds = {"default": 0.25, "metrics": {"parser.*": 0.1}}
+
+    rows = {row["metric"]: row for row in compare(current, baseline, thresholds)}
+
+    assert set(rows) == {"tool.memory_search.p50_ms", "parser.files_per_sec", "pipeline.steps_per_sec"}
+    assert rows["tool.memory_search.p50_ms"]["regressed"] is True
+    assert rows["parser.files_per_sec"]["regressed"] is True
+    assert rows["pipeline.steps_per_sec"]["regressed"] is False
+
+
+def test_load_workload_keeps_recorded_sessions_together_and_drops_writes() -> None:
+    from benchmarks.load import assign_sessions, filter_calls
+
+    calls = [
+        {"session_id": "a", "tool": "memory_search", "arguments": {}},
+        {"session_id": "b", "tool": "memory_store", "arguments": {}},
+        {"session_id": "a", "tool": "get_project_state", "arguments": {}},
+        {"session_id": "c", "tool": "lookup_symbol", "arguments": {}},
+    ]
+
+    replayable = filter_calls(calls, allow_writes=False, tools=None)
+    assert [call["tool"] for call in replayable] == ["memory_search", "get_project_state", "lookup_symbol"]
+
+    buckets = assign_sessions(replayable, 2)
+    assert [[call["tool"] for call in bucket] for bucket in buckets] == [
+        ["memory_search", "get_project_state"],
+        ["lookup_symbol"],
+    ]
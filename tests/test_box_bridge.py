@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from custodian import box_bridge, box_tool_server
+from custodian.agents import executor as agent_executor
+from custodian.services import box_bridge as bridge_client
+from custodian.services import tool_router
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "custodian" / "schema.sql"
+
+
+@pytest.fixture
+def bridge(tmp_path, monkeypatch):
+    tools_dir = tmp_path / "tools"
+    tools_dir.mkdir()
+    (tools_dir / "echo.py").write_text("def handler(params):\n    return params\n", encoding="utf-8")
+    (tools_dir / "boom.py").write_text("def handler(params):\n    raise RuntimeError('boom')\n", encoding="utf-8")
+    monkeypatch.setattr(box_tool_server, "TOOLS_DIR", tools_dir)
+    box_tool_server.REGISTRY.load()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), box_tool_server.ToolRequestHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    db_path = tmp_path / "custodian.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    conn.execute("INSERT INTO projects (id, name, path) VALUES (1, 'demo', '/srv/demo')")
+    conn.execute(
+        "INSERT INTO project_boxes (project_id, container_name, image, status, tool_server_port) VALUES (1, 'alpha-demo', 'img', 'running', ?)",
+        (httpd.server_address[1],),
+    )
+    conn.commit()
+    conn.close()
+
+    docker_calls: list[list[str]] = []
+
+    def fake_docker(args, **_kwargs):
+        docker_calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout="alpha-demo\n", stderr="")
+
+    monkeypatch.setattr(box_bridge, "DB_PATH", db_path)
+    monkeypatch.setattr(box_bridge.subprocess, "run", fake_docker)
+    # Tests refresh health themselves (see _monitor_once); the background monitor would race them.
+    monkeypatch.setattr(box_bridge, "_health_monitor", lambda: None)
+    monkeypatch.setattr(box_bridge, "HEALTH_WAIT_SECONDS", 2.0)
+    box_bridge._invalidate_route()
+    box_bridge._forget_health()
+    box_bridge._refresh_health()
+    with TestClient(box_bridge.app) as client:
+        yield client, docker_calls, db_path
+    box_bridge._invalidate_route()
+    box_bridge._forget_health()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_call_tool_uses_cached_route_health_and_connection(bridge, monkeypatch):
+    client, docker_calls, _db_path = bridge
+    first = client.post("/call-tool", json={"project": "demo", "tool_name": "echo", "params": {"n": 1}})
+    assert first.status_code == 200
+    assert first.json() == {"result": {"n": 1}}
+
+    calls_after_first = len(docker_calls)
+    loads = []
+    original_load = box_bridge._load_route
+    monkeypatch.setattr(box_bridge, "_load_route", lambda name: loads.append(name) or original_load(name))
+    for n in range(5):
+        response = client.post("/call-tool", json={"project": "demo", "tool_name": "echo", "params": {"n": n}})
+        assert response.json() == {"result": {"n": n}}
+
+    assert len(docker_calls) == calls_after_first
+    assert loads == []
+    pool = box_bridge._POOLS[(box_bridge.BOX_HOST, box_bridge._route_for("demo").tool_server_port)]
+    assert pool._idle.qsize() == 1
+
+
+def _monitor_once() -> threading.Thread:
+    """Stand in for the health monitor: one refresh when a request wakes it."""
+
+    def run():
+        if box_bridge._MONITOR_WAKE.wait(5):
+            box_bridge._MONITOR_WAKE.clear()
+            box_bridge._refresh_health()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_box_started_after_the_snapshot_is_found_on_the_next_refresh(bridge):
+    client, docker_calls, _db_path = bridge
+    box_bridge._HEALTH = box_bridge._HealthSnapshot(running=frozenset(), checked_at=box_bridge._HEALTH.checked_at)
+    box_bridge._MONITOR_WAKE.clear()
+    before = len(docker_calls)
+    monitor = _monitor_once()
+    response = client.post("/call-tool", json={"project": "demo", "tool_name": "echo"})
+    monitor.join(5)
+    assert response.status_code == 200
+    # The one docker ps came from the monitor thread, not the request.
+    assert len(docker_calls) - before == 1
+
+
+def test_missing_container_fails_fast_once_a_refresh_confirms_it(bridge, monkeypatch):
+    client, docker_calls, _db_path = bridge
+
+    def no_containers(args, **_kwargs):
+        docker_calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(box_bridge.subprocess, "run", no_containers)
+    box_bridge._refresh_health()
+    box_bridge._MONITOR_WAKE.clear()
+    monitor = _monitor_once()
+    assert client.post("/call-tool", json={"project": "demo", "tool_name": "echo"}).status_code == 502
+    monitor.join(5)
+
+    before = len(docker_calls)
+    started = time.monotonic()
+    assert client.post("/call-tool", json={"project": "demo", "tool_name": "echo"}).status_code == 502
+    assert time.monotonic() - started < 1.0
+    assert not box_bridge._MONITOR_WAKE.is_set()
+    assert len(docker_calls) == before
+
+
+def test_requests_serve_the_last_snapshot_without_docker(bridge):
+    client, docker_calls, _db_path = bridge
+    box_bridge._HEALTH = box_bridge._HealthSnapshot(running=box_bridge._HEALTH.running, checked_at=time.monotonic() - 3600)
+    box_bridge._MONITOR_WAKE.clear()
+    before = len(docker_calls)
+    payload = client.get("/status").json()
+    assert payload["projects"][0]["running"] is True
+    assert client.post("/call-tool", json={"project": "demo", "tool_name": "echo"}).status_code == 200
+    assert len(docker_calls) == before
+    # A stale snapshot only nudges the monitor.
+    assert box_bridge._MONITOR_WAKE.is_set()
+
+
+def test_batched_box_calls_match_single_call_results(bridge, monkeypatch):
+    client, _docker_calls, _db_path = bridge
+
+    paths = []
+
+    def through_bridge(method, path, payload=None):
+        paths.append(path)
+        return client.request(method, path, json=payload).json()
+
+    monkeypatch.setattr(bridge_client, "_json_request", through_bridge)
+    monkeypatch.setattr(tool_router, "resolve_tool", lambda tool_name, project=None: {"name": tool_name, "source": "box", "details": {}})
+    tool_map = {"echo": {"source": "box"}, "boom": {"source": "box"}, "missing": {"source": "box"}}
+    calls = [{"name": "echo", "params": {"n": 1}}, {"name": "boom", "params": {}}, {"name": "missing", "params": {}}]
+
+    async def turn(batch: bool):
+        batched = agent_executor._start_box_batch("demo", calls, tool_map, 3) if batch else {}
+        return await asyncio.gather(
+            *(agent_executor._execute_tool("demo", call["name"], call["params"], [], batched.get(id(call))) for call in calls)
+        )
+
+    single = asyncio.run(turn(batch=False))
+    assert single[0] == {"result": {"n": 1}}
+    assert single[1] == {"detail": {"error": "boom"}}
+    assert single[2] == {"detail": {"error": "tool not found: missing"}}
+    assert paths == ["/call-tool"] * 3
+
+    paths.clear()
+    assert asyncio.run(turn(batch=True)) == single
+    assert paths == ["/call-batch"]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import box_tool_server
+
+
+@pytest.fixture
+def tool_server(tmp_path, monkeypatch):
+    tools_dir = tmp_path / "tools"
+    tools_dir.mkdir()
+    (tools_dir / "double.py").write_text(
+        "def handler(params):\n"
+        "    return {'value': params['value'] * 2}\n",
+        encoding="utf-8",
+    )
+    (tools_dir / "loop_id.py").write_text(
+        "import asyncio\n"
+        "async def handler(params):\n"
+        "    await asyncio.sleep(0)\n"
+        "    return {'loop': id(asyncio.get_running_loop())}\n",
+        encoding="utf-8",
+    )
+    (tools_dir / "boom.py").write_text(
+        "def handler(params):\n"
+        "    raise RuntimeError('boom')\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(box_tool_server, "TOOLS_DIR", tools_dir)
+    box_tool_server.REGISTRY.load()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), box_tool_server.ToolRequestHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(url: str, payload: dict) -> dict:
+    request = Request(url, data=json.dumps(payload).encode("utf-8"), method="POST", headers={"Content-Type": "application/json"})
+    with urlopen(request, timeout=10) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def test_async_handlers_share_one_event_loop(tool_server):
+    first = _post(f"{tool_server}/tools/loop_id", {})["result"]["loop"]
+    second = _post(f"{tool_server}/tools/loop_id", {})["result"]["loop"]
+    assert first == second == id(box_tool_server._event_loop())
+
+
+def test_call_batch_keeps_order_and_reports_errors(tool_server):
+    payload = _post(
+        f"{tool_server}/call-batch",
+        {
+            "calls": [
+                {"tool": "double", "params": {"value": 2}},
+                {"tool": "boom"},
+                {"tool": "loop_id"},
+                {"tool": "missing"},
+            ],
+            "concurrency": 4,
+        },
+    )
+    results = payload["results"]
+    assert [item["tool"] for item in results] == ["double", "boom", "loop_id", "missing"]
+    assert results[0] == {"tool": "double", "status": "ok", "result": {"value": 4}, "duration_ms": results[0]["duration_ms"]}
+    assert results[1]["status"] == "error" and results[1]["error"] == "boom"
+    assert results[2]["status"] == "ok"
+    assert results[3]["error"] == "tool not found: missing"
+
+
+def test_call_batch_stop_on_error_skips_the_rest(tool_server):
+    results = _post(
+        f"{tool_server}/call-batch",
+        {"calls": [{"tool": "boom"}, {"tool": "double", "params": {"value": 1}}], "stop_on_error": True},
+    )["results"]
+    assert [item["status"] for item in results] == ["error", "skipped"]
+
+
+def test_call_batch_rejects_empty_calls():
+    with pytest.raises(ValueError):
+        box_tool_server._parse_batch({"calls": []})
+
+
+def test_caller_deadline_cancels_async_handlers(tool_server):
+    (box_tool_server.TOOLS_DIR / "slow.py").write_text(
+        "import asyncio\n"
+        "async def handler(params):\n"
+        "    await asyncio.sleep(5)\n"
+        "    return {'slept': True}\n",
+        encoding="utf-8",
+    )
+    box_tool_server.REGISTRY.load()
+    request = Request(
+        f"{tool_server}/tools/slow",
+        data=b"{}",
+        method="POST",
+        headers={"Content-Type": "application/json", box_tool_server.DEADLINE_HEADER: "0.2"},
+    )
+    with pytest.raises(HTTPError) as exceeded:
+        urlopen(request, timeout=10)
+    assert exceeded.value.code == 504
+    assert "deadline exceeded" in json.loads(exceeded.value.read())["error"]
+
+    request.add_header(box_tool_server.DEADLINE_HEADER, "0")
+    request.data = json.dumps({"calls": [{"tool": "double", "params": {"value": 1}}]}).encode("utf-8")
+    request.full_url = f"{tool_server}/call-batch"
+    with pytest.raises(HTTPError) as spent:
+        urlopen(request, timeout=10)
+    assert spent.value.code == 504
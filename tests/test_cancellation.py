@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.db import connection, migrations, run_owners
+from custodian.db.migrations import _migration_006_agent_progress, _migration_008_retention, _migration_010_run_owners
+from custodian.services import cancellation
+from custodian.tools import cancel_agent_run, cancel_pipeline_run
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "custodian" / "schema.sql"
+
+
+def test_nested_scopes_share_the_earlier_deadline_and_parent_cancels():
+    with cancellation.scope("pipeline", 1, timeout=5) as outer:
+        with cancellation.scope("agent", 2, timeout=60) as inner:
+            assert inner.deadline == outer.deadline
+            assert cancellation.timeout(120) <= 5
+            headers = cancellation.inject({})
+            assert 4 < cancellation.extract(headers) <= 5
+            assert cancellation.cancel("pipeline", 1, "stop requested") is True
+            with pytest.raises(cancellation.Cancelled, match="stop requested"):
+                cancellation.check()
+    assert cancellation.cancel("agent", 2) is False
+    assert cancellation.timeout(120) == 120
+    assert cancellation.inject({}) == {}
+
+
+def test_to_thread_stops_waiting_at_the_deadline_and_runs_on_cancel():
+    release = threading.Event()
+    stopped: list[str] = []
+
+    def blocked() -> None:
+        cancellation.on_cancel(lambda: stopped.append("killed"))
+        release.wait(5)
+
+    async def run() -> None:
+        try:
+            with cancellation.scope(timeout=0.2):
+                await cancellation.to_thread(blocked)
+        finally:
+            release.set()
+
+    with pytest.raises(cancellation.Cancelled, match="deadline exceeded"):
+        asyncio.run(run())
+    assert stopped == ["killed"]
+
+
+@pytest.fixture
+def runs_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "custodian.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    _migration_006_agent_progress(conn)
+    _migration_008_retention(conn)
+    _migration_010_run_owners(conn)
+    conn.executescript(
+        """
+        INSERT INTO agents (id, name, system_prompt) VALUES (1, 'reviewer', 'Review.');
+        INSERT INTO pipelines (id, name, spec) VALUES (1, 'p', 'name: p');
+        INSERT INTO pipeline_runs (id, pipeline_id, run_name, input, output_dir, status, started_at) VALUES
+            (1, 1, 'orphaned', '{}', '/tmp/o', 'running', datetime('now', '-1 hour')),
+            (2, 1, 'done', '{}', '/tmp/o', 'completed', datetime('now', '-2 hours'));
+        INSERT INTO pipeline_step_results (run_id, step_name, step_type, status) VALUES (1, 'review', 'agent', 'running');
+        INSERT INTO agent_runs (id, agent_id, pipeline_id, status, started_at) VALUES
+            (1, 1, 1, 'running', datetime('now')),
+            (2, 1, NULL, 'running', datetime('now')),
+            (3, 1, NULL, 'completed', datetime('now'));
+        """
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "DB_PATH", str(db_path))
+    # release_agent_slots runs the migrations, which bind DB_PATH at import.
+    monkeypatch.setattr(migrations, "DB_PATH", str(db_path))
+    return db_path
+
+
+def _call(tool, params):
+    return asyncio.run(tool.handle(params, None))[0].text
+
+
+def test_cancel_pipeline_run_tool_closes_orphaned_runs(runs_db):
+    result = json.loads(_call(cancel_pipeline_run, {"run_id": 1, "reason": "server restarted"}))
+    assert result["status"] == "cancelled"
+    assert "already completed" in _call(cancel_pipeline_run, {"run_id": 2})
+    assert "not found" in _call(cancel_pipeline_run, {"run_id": 99})
+
+    conn = sqlite3.connect(runs_db)
+    assert conn.execute("SELECT status, error FROM pipeline_step_results WHERE run_id = 1").fetchone() == ("cancelled", "server restarted")
+    assert conn.execute("SELECT status FROM agent_runs WHERE id = 1").fetchone() == ("cancelled",)
+    assert conn.execute("SELECT COUNT(*) FROM query_log WHERE tool_name = 'cancel_pipeline_run'").fetchone()[0] == 3
+    conn.close()
+
+
+def test_cancel_agent_run_tool_uses_live_scope_or_closes_record(runs_db):
+    async def live() -> str:
+        with cancellation.scope("agent", 2):
+            return (await cancel_agent_run.handle({"run_id": 2}, None))[0].text
+
+    assert asyncio.run(live()).startswith("Cancelling agent run #2")
+    assert _call(cancel_agent_run, {"run_id": 2, "reason": "stuck"}) == "Agent run #2 (reviewer) marked cancelled."
+    assert _call(cancel_agent_run, {"run_id": 3}) == "Agent run #3 is already completed."
+
+    conn = sqlite3.connect(runs_db)
+    assert conn.execute("SELECT status, error FROM agent_runs WHERE id = 2").fetchone() == ("cancelled", "stuck")
+    assert conn.execute("SELECT COUNT(*) FROM query_log WHERE tool_name = 'cancel_agent_run'").fetchone()[0] == 3
+    conn.close()
+
+
+def test_cancel_leaves_a_request_for_a_live_owner_in_another_process(runs_db):
+    conn = sqlite3.connect(runs_db)
+    conn.execute("UPDATE agent_runs SET heartbeat_at = datetime('now') WHERE id = 2")
+    conn.commit()
+    assert _call(cancel_agent_run, {"run_id": 2, "reason": "from http"}).startswith("Cancelling agent run #2")
+    # The owner records the outcome itself; the handler neither closed the row nor freed its slots.
+    assert conn.execute("SELECT status, cancel_requested FROM agent_runs WHERE id = 2").fetchone() == ("running", "from http")
+
+    conn.execute("UPDATE agent_runs SET heartbeat_at = datetime('now', '-1 hour') WHERE id = 2")
+    conn.commit()
+    assert _call(cancel_agent_run, {"run_id": 2}) == "Agent run #2 (reviewer) marked cancelled."
+    conn.close()
+
+
+def test_owner_cancels_its_run_when_the_row_asks(runs_db, monkeypatch):
+    monkeypatch.setattr(run_owners, "POLL_SECONDS", 0.05)
+    conn = sqlite3.connect(runs_db)
+    conn.execute("UPDATE agent_runs SET cancel_requested = 'stale request' WHERE id = 2")
+    conn.commit()
+    with cancellation.scope("agent", 2) as token, run_owners.owned("agent", 2):
+        row = conn.execute("SELECT cancel_requested, heartbeat_at IS NOT NULL FROM agent_runs WHERE id = 2").fetchone()
+        assert row == (None, 1)
+        assert run_owners.owner_alive(conn, "agent", 2)
+        run_owners.request_cancel(conn, "agent", 2, "from http")
+        conn.commit()
+        for _ in range(100):
+            if token.cancelled:
+                break
+            time.sleep(0.02)
+        assert token.reason == "from http"
+    conn.close()
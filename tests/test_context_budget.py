@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import executor
+from custodian.services import agent_loop
+from custodian.services.context_budget import READ_TOOL_RESULT, ContextBudget, budget_for
+
+
+def test_budget_is_capped_by_model_window():
+    assert budget_for("openai/gpt-5.4", 24000) == 24000
+    assert budget_for("gpt-4", 24000) == 4096
+    assert budget_for("unknown-model", 5000) == 5000
+
+
+def test_oversized_results_are_stored_behind_handles():
+    context = ContextBudget("gpt-5.4", tool_result_chars=1000)
+    assert context.tool_result_text("small", {"ok": True}) == '{"ok": true}'
+
+    big = {"tree": ["src/file_%04d.py" % n for n in range(500)]}
+    text = context.tool_result_text("file_tree", big)
+    assert len(text) < 2000 and "handle r1" in text
+    assert context.tools([])[0]["name"] == READ_TOOL_RESULT
+
+    full = json.dumps(big, sort_keys=True)
+    chunks, offset = [], 0
+    while offset is not None:
+        page = context.read({"handle": "r1", "offset": offset})
+        chunks.append(page["content"])
+        offset = page.get("next_offset")
+    assert "".join(chunks) == full
+    assert context.read({"handle": "r9"})["ok"] is False
+
+
+def test_compaction_keeps_system_task_and_recent_turns():
+    context = ContextBudget("gpt-5.4", budget=1800, keep_recent=2)
+    messages = [{"role": "system", "content": "S" * 2000}, {"role": "user", "content": "task"}]
+    for n in range(6):
+        messages.append({"role": "assistant", "content": f"call {n}"})
+        messages.append({"role": "user", "content": f"[Tool Result: probe]\n{'x' * 3000}"})
+    recent = [dict(message) for message in messages[-2:]]
+
+    estimate = context.compact(messages)
+    assert estimate <= 1800 and context.estimate_tokens(messages) <= 1800
+    assert messages[0]["content"] == "S" * 2000 and messages[1]["content"] == "task"
+    assert messages[-2:] == recent
+    assert messages[3]["content"].startswith("[Tool Result: probe]\n[earlier probe result")
+    assert len(context.read({"handle": "r1", "limit": 5000})["content"]) > 3000 - 200 - 40
+
+
+def test_executor_prompt_stays_bounded(monkeypatch):
+    sent_sizes: list[int] = []
+    turns = iter(range(20))
+
+    async def fake_call_llm(model, messages, cache_mode=None):
+        sent_sizes.append(sum(len(message["content"]) for message in messages))
+        turn = next(turns)
+        if turn < 12:
+            return json.dumps({"tool_call": {"name": "scan", "params": {"n": turn}}}), {"prompt_tokens": 0}
+        if turn == 12:
+            return json.dumps({"tool_call": {"name": READ_TOOL_RESULT, "params": {"handle": "r1"}}}), {}
+        return json.dumps({"final_answer": {"seen": messages[-1]["content"][:40]}}), {}
+
+    async def fake_execute_tool(tool_map, name, params, bridge_url):
+        return {"rows": ["row-%d-%s" % (params["n"], "y" * 40) for _ in range(400)]}
+
+    monkeypatch.setattr(executor, "_call_llm", fake_call_llm)
+    monkeypatch.setattr(executor, "_execute_tool", fake_execute_tool)
+    monkeypatch.setattr("custodian.services.context_budget.CONTEXT_BUDGET_TOKENS", 2000)
+    result = asyncio.run(
+        executor.run_agent_loop(
+            model="openai/gpt-5.4",
+            compiled_prompt={"system": "sys", "user": "go"},
+            max_turns=20,
+            tools=[{"name": "scan"}],
+        )
+    )
+    assert result.output["seen"].startswith("[Tool Result: read_tool_result]")
+    # Twelve ~18KB results would be >200KB resent per turn; compaction holds each prompt near the budget.
+    assert max(sent_sizes) < 2000 * 4 + 2000
+
+
+def test_workstation_loop_answers_handle_reads_locally(monkeypatch, tmp_path):
+    calls: list[list[str]] = []
+
+    async def fake_call_proxy(*, proxy_url, model, messages, tools, cache_mode=None):
+        calls.append([tool["name"] for tool in tools])
+        if len(calls) == 1:
+            return {"role": "assistant", "tool_calls": [{"id": "c1", "function": {"name": "dump", "arguments": "{}"}}]}
+        if len(calls) == 2:
+            return {"role": "assistant", "tool_calls": [{"id": "c2", "function": {"name": READ_TOOL_RESULT, "arguments": '{"handle": "r1"}'}}]}
+        return {"role": "assistant", "content": messages[-1]["content"][:30]}
+
+    async def fake_execute_tool(tool, params, working_dir):
+        return {"stdout": "z" * 20000}
+
+    monkeypatch.setattr(agent_loop, "_call_proxy", fake_call_proxy)
+    monkeypatch.setattr(agent_loop, "_execute_tool", fake_execute_tool)
+    result = asyncio.run(
+        agent_loop.run_agent_loop("t", "sys", [{"name": "dump"}], output_dir=str(tmp_path), working_dir=str(tmp_path))
+    )
+    assert calls[0] == ["dump"] and calls[1] == ["dump", READ_TOOL_RESULT]
+    assert result["response"].startswith('{"content": "')
+    assert result["context"]["stored"] == 1 and result["context"]["reads"] == 1
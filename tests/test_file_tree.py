@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.services import file_tree
+
+
+def _make_project(root: Path) -> None:
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "README.md").write_text("readme\n", encoding="utf-8")
+    (root / "src" / "app.py").write_text("print('hi')\n", encoding="utf-8")
+    (root / "src" / "pkg" / "util.py").write_text("x = 1\n", encoding="utf-8")
+    (root / "src-extra.txt").write_text("sibling\n", encoding="utf-8")
+    (root / "node_modules" / "dep" / "index.js").write_text("//\n", encoding="utf-8")
+
+
+def _wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def tree_factory(monkeypatch):
+    created = []
+
+    def factory(root: Path, backend: str) -> file_tree.FileTree:
+        monkeypatch.setattr(file_tree, "FILE_TREE_BACKEND", backend)
+        monkeypatch.setattr(file_tree, "FILE_TREE_POLL_SECONDS", 0.1)
+        tree = file_tree.get_tree(str(root))
+        created.append(root)
+        return tree
+
+    yield factory
+    for root in created:
+        file_tree.drop_tree(str(root))
+
+
+def test_snapshot_pages_subtrees_with_stat_data(tmp_path, tree_factory):
+    _make_project(tmp_path)
+    tree = tree_factory(tmp_path, "poll")
+
+    full = tree.snapshot()
+    paths = [entry["path"] for entry in full["entries"]]
+    assert paths == ["README.md", "src-extra.txt", "src/app.py", "src/pkg/util.py"]
+    assert full["entries"][0]["size"] == len("readme\n")
+    assert full["entries"][0]["mtime"] > 0
+
+    subtree = tree.snapshot(prefix="src")
+    assert [entry["path"] for entry in subtree["entries"]] == ["src/app.py", "src/pkg/util.py"]
+
+    page = tree.snapshot(offset=1, limit=2)
+    assert [entry["path"] for entry in page["entries"]] == paths[1:3]
+    assert page["total_files"] == 4 and page["truncated_at"] == 2
+    assert [entry["path"] for entry in tree.snapshot(max_depth=1)["entries"]] == ["README.md", "src-extra.txt"]
+    assert file_tree.get_tree(str(tmp_path)) is tree
+
+
+@pytest.mark.parametrize("backend", ["inotify", "poll"])
+def test_changes_are_applied_and_published(tmp_path, tree_factory, backend, monkeypatch):
+    _make_project(tmp_path)
+    monkeypatch.setattr(file_tree, "_SUBSCRIBERS", list(file_tree._SUBSCRIBERS))
+    published = []
+    file_tree.subscribe(lambda root, changed: published.append((root, set(changed))))
+    tree = tree_factory(tmp_path, backend)
+    if backend == "inotify" and tree.backend != "inotify":
+        pytest.skip("inotify is not available here")
+    version = tree.version
+
+    (tmp_path / "src" / "pkg" / "new.py").write_text("y = 2\n", encoding="utf-8")
+    (tmp_path / "README.md").write_text("readme, longer now\n", encoding="utf-8")
+    (tmp_path / "src-extra.txt").unlink()
+    (tmp_path / "later").mkdir()
+    (tmp_path / "later" / "nested.py").write_text("z = 3\n", encoding="utf-8")
+
+    def current() -> dict:
+        return {entry["path"]: entry["size"] for entry in tree.snapshot()["entries"]}
+
+    expected = {"README.md": 19, "src/app.py": 12, "src/pkg/util.py": 6, "src/pkg/new.py": 6, "later/nested.py": 6}
+    assert _wait_for(lambda: current() == expected), current()
+    assert tree.version > version
+    changed = set().union(*(paths for root, paths in published if root == tree.root))
+    assert {"src/pkg/new.py", "README.md", "src-extra.txt", "later/nested.py"} <= changed
+
+
+def test_git_projects_respect_gitignore(tmp_path, tree_factory):
+    _make_project(tmp_path)
+    (tmp_path / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    (tmp_path / "debug.log").write_text("noise\n", encoding="utf-8")
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    tree = tree_factory(tmp_path, "inotify")
+
+    paths = {entry["path"] for entry in tree.snapshot()["entries"]}
+    assert "debug.log" not in paths and ".gitignore" in paths and "src/app.py" in paths
+    if tree.backend == "inotify":
+        version = tree.version
+        (tmp_path / "other.log").write_text("more noise\n", encoding="utf-8")
+        (tmp_path / "kept.txt").write_text("kept\n", encoding="utf-8")
+        assert _wait_for(lambda: "kept.txt" in {entry["path"] for entry in tree.snapshot()["entries"]})
+        assert tree.version > version
+        assert "other.log" not in {entry["path"] for entry in tree.snapshot()["entries"]}
+
+
+def test_poll_interval_backs_off_while_quiet_and_scales_with_scan_cost(monkeypatch):
+    monkeypatch.setattr(file_tree, "FILE_TREE_POLL_SECONDS", 5)
+    monkeypatch.setattr(file_tree, "FILE_TREE_POLL_MAX_SECONDS", 60)
+    interval = 5.0
+    for expected in (10, 20, 40, 60, 60):
+        interval = file_tree._next_poll_interval(interval, False, 0.01)
+        assert interval == expected
+    assert file_tree._next_poll_interval(interval, True, 0.01) == 5
+    assert file_tree._next_poll_interval(5, True, 4.0) == 80
+
+
+def test_roots_on_drvfs_and_network_mounts_are_polled(tmp_path, tree_factory, monkeypatch):
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "/dev/sdc / ext4 rw 0 0\n"
+        "C:\\134 /mnt/c 9p rw,dirsync,aname=drvfs 0 0\n"
+        "//nas/share /mnt/my\\040share cifs rw 0 0\n",
+        encoding="utf-8",
+    )
+    assert file_tree._mount_fstype("/mnt/c/Users/dev/project", str(mounts)) == "9p"
+    assert file_tree._mount_fstype("/mnt/my share/project", str(mounts)) == "cifs"
+    assert file_tree._mount_fstype("/mnt/cache", str(mounts)) == "ext4"
+    assert file_tree._mount_fstype("/srv", str(tmp_path / "missing")) is None
+
+    root = tmp_path / "project"
+    root.mkdir()
+    monkeypatch.setattr(file_tree, "_mount_fstype", lambda path: "9p")
+    assert tree_factory(root, "auto").backend == "poll"
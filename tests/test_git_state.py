@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.services import git_state
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+GIT_IDENTITY = ["-c", "user.name=test", "-c", "user.email=test@localhost", "-c", "commit.gpgsign=false"]
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", "-C", str(repo), *GIT_IDENTITY, *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(git_state, "GIT_STATE_MAX_AGE", 3600)
+    git_state.invalidate()
+    root = tmp_path / "repo"
+    root.mkdir()
+    _git(root, "init", "-q", "-b", "main")
+    (root / "a.py").write_text("print('a')\n", encoding="utf-8")
+    _git(root, "add", "a.py")
+    _git(root, "commit", "-q", "-m", "first")
+    yield root
+    git_state.invalidate()
+
+
+def test_state_is_cached_until_index_or_head_changes(repo):
+    first = git_state.get_git_state(str(repo))
+    assert first["cached"] is False
+    assert first["branch"]["head"] == "main"
+    assert [commit["message"] for commit in first["commits"]] == ["first"]
+    assert git_state.get_git_state(str(repo))["cached"] is True
+
+    (repo / "b.py").write_text("print('b')\n", encoding="utf-8")
+    _git(repo, "add", "b.py")
+    staged = git_state.get_git_state(str(repo))
+    assert staged["cached"] is False
+    assert staged["status"]["added"] == ["b.py"]
+
+    _git(repo, "commit", "-q", "-m", "second")
+    committed = git_state.get_git_state(str(repo))
+    assert committed["cached"] is False
+    assert committed["status"]["added"] == []
+    assert committed["commits"][0]["message"] == "second"
+
+
+def test_unstaged_edits_show_after_max_age(repo, monkeypatch):
+    git_state.get_git_state(str(repo))
+    (repo / "a.py").write_text("print('changed')\n", encoding="utf-8")
+    (repo / "new.txt").write_text("x", encoding="utf-8")
+    monkeypatch.setattr(git_state, "GIT_STATE_MAX_AGE", 0)
+    state = git_state.get_git_state(str(repo))
+    assert state["status"]["modified"] == ["a.py"]
+    assert state["status"]["untracked"] == ["new.txt"]
+
+
+def test_non_repository_returns_none(tmp_path):
+    assert git_state.get_git_state(str(tmp_path)) is None
+
+
+def test_parse_porcelain_v2_branch_and_entries():
+    parsed = git_state.parse_porcelain_v2(
+        "# branch.oid 0123abcd\n"
+        "# branch.head feature\n"
+        "# branch.upstream origin/feature\n"
+        "# branch.ab +2 -1\n"
+        "1 .M N... 100644 100644 100644 aaa bbb src/app.py\n"
+        "1 D. N... 100644 000000 000000 aaa 000 old.py\n"
+        "2 R. N... 100644 100644 100644 aaa bbb R100 new name.py\told name.py\n"
+        "u UU N... 100644 100644 100644 100644 a b c conflict.py\n"
+        "? notes.md\n"
+    )
+    assert parsed["branch"] == {"head": "feature", "oid": "0123abcd", "upstream": "origin/feature", "ahead": 2, "behind": 1}
+    assert parsed["status"] == {
+        "modified": ["src/app.py", "new name.py", "conflict.py"],
+        "added": [],
+        "deleted": ["old.py"],
+        "untracked": ["notes.md"],
+    }
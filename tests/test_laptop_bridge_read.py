@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SERVER_PATH = Path(__file__).resolve().parents[1] / "laptop-bridge" / "server.py"
+
+
+@pytest.fixture
+def bridge(monkeypatch):
+    spec = importlib.util.spec_from_file_location("laptop_bridge_server", SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "READ_INDEX_BLOCK", 64)
+    return module
+
+
+def _read(bridge, path: Path, **args) -> str:
+    return asyncio.run(bridge.handle_read_file({"path": str(path), **args}))[0].text
+
+
+def _expected(lines: list[str], start: int) -> str:
+    return "\n".join(f"{i:6d}\t{line}" for i, line in enumerate(lines, start=start))
+
+
+def test_pages_match_a_full_read(bridge, tmp_path):
+    lines = [f"line {n} " + "x" * (n % 37) for n in range(1, 1001)]
+    path = tmp_path / "big.log"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    assert _read(bridge, path, offset=500, limit=3) == _expected(lines[499:502], 500)
+    index = bridge._line_indexes[str(path.resolve())]
+    assert 0 < index.indexed_bytes < path.stat().st_size / 2
+    assert _read(bridge, path, offset=1, limit=2) == _expected(lines[:2], 1)
+    assert _read(bridge, path, offset=998, limit=10) == _expected(lines[997:], 998)
+    assert _read(bridge, path, offset=1001) == "(empty file)"
+
+
+def test_tail_and_byte_ranges(bridge, tmp_path):
+    lines = [f"row {n}" for n in range(1, 301)]
+    path = tmp_path / "app.log"
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+    assert _read(bridge, path, tail=2) == _expected(lines[-2:], 299)
+    size = path.stat().st_size
+    assert _read(bridge, path, byte_offset=4, byte_length=7) == f"[bytes 4-11 of {size}] [more: byte_offset=11]\n1\nrow 2"
+    assert _read(bridge, path, byte_offset=-7).endswith("row 300")
+
+
+def test_appended_file_keeps_its_index(bridge, tmp_path):
+    path = tmp_path / "grow.log"
+    path.write_text("".join(f"entry {n}\n" for n in range(1, 201)), encoding="utf-8")
+    assert _read(bridge, path, tail=1) == _expected(["entry 200"], 200)
+    index = bridge._line_indexes[str(path.resolve())]
+
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write("entry 201\nentry 202\n")
+    assert _read(bridge, path, tail=2) == _expected(["entry 201", "entry 202"], 201)
+    assert bridge._line_indexes[str(path.resolve())] is index
+
+    path.write_text("rewritten\n", encoding="utf-8")
+    assert _read(bridge, path) == _expected(["rewritten"], 1)
+    assert bridge._line_indexes[str(path.resolve())] is not index
+
+
+def test_long_lines_and_crlf(bridge, tmp_path):
+    path = tmp_path / "wide.txt"
+    path.write_bytes(b"short\r\n" + b"y" * 50_000 + b"\r\nend")
+    text = _read(bridge, path)
+    first, second, third = text.split("\n")
+    assert first == "     1\tshort"
+    assert second.endswith("... [truncated]") and len(second) < 2100
+    assert third == "     3\tend"
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+requests = pytest.importorskip("requests")
+uvicorn = pytest.importorskip("uvicorn")
+
+from custodian.services import laptop_bridge
+
+SERVER_PATH = Path(__file__).resolve().parents[1] / "laptop-bridge" / "server.py"
+
+
+@pytest.fixture
+def bridge_url(monkeypatch):
+    spec = importlib.util.spec_from_file_location("laptop_bridge_server", SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "BRIDGE_TOKEN", "secret")
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(module.create_starlette_app(), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    url = f"http://127.0.0.1:{port}"
+    monkeypatch.setattr(laptop_bridge, "LAPTOP_URL", url)
+    monkeypatch.setattr(laptop_bridge, "LAPTOP_TOKEN", "secret")
+    monkeypatch.setattr(laptop_bridge, "_SESSION", None)
+    yield module
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def test_download_is_chunked_verified_and_resumable(bridge_url, tmp_path, monkeypatch):
+    source = tmp_path / "remote" / "data.csv"
+    source.parent.mkdir()
+    source.write_bytes(b"".join(f"{n},value-{n % 7}\n".encode() for n in range(20000)))
+    target = tmp_path / "local" / "data.csv"
+
+    result = laptop_bridge.download_file(str(source), str(target), parallel=3, chunk_size=32 * 1024)
+    assert "error" not in result, result
+    assert target.read_bytes() == source.read_bytes()
+    assert result["encoding"] == "gzip" and result["wire_bytes"] < result["size"]
+    assert result["chunks"] == -(-source.stat().st_size // (32 * 1024))
+
+    # An interrupted transfer leaves a .part file; only its bad chunks are fetched again.
+    part = Path(f"{target}.part")
+    data = bytearray(source.read_bytes())
+    data[40000:40010] = b"X" * 10
+    part.write_bytes(bytes(data))
+    target.unlink()
+    resumed = laptop_bridge.download_file(str(source), str(target), chunk_size=32 * 1024, compress="none")
+    assert resumed["transferred_bytes"] == 32 * 1024
+    assert resumed["resumed_bytes"] == source.stat().st_size - 32 * 1024
+    assert target.read_bytes() == source.read_bytes() and not part.exists()
+
+
+def test_upload_resumes_and_verifies_before_rename(bridge_url, tmp_path):
+    source = tmp_path / "local.bin"
+    source.write_bytes(os.urandom(100_000))
+    destination = tmp_path / "remote" / "copy.bin"
+
+    # Pretend an earlier upload got the first chunk across.
+    destination.parent.mkdir()
+    Path(f"{destination}.part").write_bytes(source.read_bytes()[:40_000] + b"\0" * 60_000)
+
+    result = laptop_bridge.upload_file(str(source), str(destination), chunk_size=40_000, parallel=2)
+    assert "error" not in result, result
+    assert result["resumed_bytes"] == 40_000 and result["encoding"] == "identity"
+    assert destination.read_bytes() == source.read_bytes()
+    assert not Path(f"{destination}.part").exists()
+
+    response = requests.post(
+        f"{laptop_bridge.LAPTOP_URL}/upload/complete",
+        json={"path": str(destination), "size": 1, "sha256": "0" * 64},
+        headers={"Authorization": "Bearer secret"},
+    )
+    assert response.status_code == 404
+
+
+def test_tool_calls_reuse_one_pooled_session(bridge_url, tmp_path):
+    note = tmp_path / "note.txt"
+    note.write_text("hello\n", encoding="utf-8")
+    assert laptop_bridge.read_file(str(note)) == "     1\thello"
+    session = laptop_bridge._SESSION
+    assert laptop_bridge.read_file(str(note), tail=1) == "     1\thello"
+    assert laptop_bridge._SESSION is session
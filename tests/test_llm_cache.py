@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import executor
+from custodian.services import agent_loop, llm_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_DB_PATH", str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_MODE", "off")
+    monkeypatch.setattr(llm_cache, "_STATS", llm_cache.Counter())
+    yield llm_cache
+    if llm_cache._STORE_CONN is not None:
+        llm_cache._STORE_CONN.close()
+        llm_cache._STORE_CONN = None
+
+
+def _completion(content: str) -> str:
+    return json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}], "usage": {"prompt_tokens": 3}})
+
+
+def test_on_mode_records_and_replay_serves_without_the_proxy(cache, monkeypatch):
+    calls = []
+
+    def fake_read(request):
+        calls.append(json.loads(request.data))
+        return _completion(json.dumps({"final_answer": {"turns": len(calls)}}))
+
+    monkeypatch.setattr(executor, "_read_http_response", fake_read)
+    prompt = {"system": "sys", "user": "same input"}
+    first = asyncio.run(executor.run_agent_loop(model="openai/gpt-5.4", compiled_prompt=prompt, max_turns=2, tools=[], cache_mode="on"))
+    again = asyncio.run(executor.run_agent_loop(model="openai/gpt-5.4", compiled_prompt=prompt, max_turns=2, tools=[], cache_mode="on"))
+    assert first.output == again.output == {"turns": 1}
+    assert len(calls) == 1
+
+    monkeypatch.setattr(cache, "LLM_CACHE_MODE", "replay")
+    replayed = asyncio.run(executor.run_agent_loop(model="openai/gpt-5.4", compiled_prompt=prompt, max_turns=2, tools=[]))
+    assert replayed.output == {"turns": 1} and len(calls) == 1
+    with pytest.raises(cache.LLMCacheMiss):
+        asyncio.run(
+            executor.run_agent_loop(
+                model="openai/gpt-5.4", compiled_prompt={"system": "sys", "user": "new"}, max_turns=2, tools=[], cache_mode="off"
+            )
+        )
+
+
+def test_keys_cover_the_whole_request(cache):
+    base = {"model": "gpt-5.4", "messages": [{"role": "user", "content": "hi"}]}
+    assert cache.cache_key(base) == cache.cache_key(json.loads(json.dumps(base)))
+    assert cache.cache_key(base) != cache.cache_key({**base, "temperature": 0.2})
+    assert cache.cache_key(base) != cache.cache_key({**base, "tools": [{"type": "function"}]})
+    assert cache.cache_key(base) != cache.cache_key({**base, "model": "gpt-5.4-mini"})
+
+
+def test_eviction_drops_least_recently_used(cache, monkeypatch):
+    monkeypatch.setattr(cache, "LLM_CACHE_MAX_BYTES", 3000)
+    payloads = [{"model": "m", "messages": [{"role": "user", "content": str(n)}]} for n in range(5)]
+    for payload in payloads:
+        cache.put(payload, "x" * 600)
+        cache.get(payloads[0])
+    assert cache.get(payloads[0]) is not None
+    assert cache.get(payloads[1]) is None
+    stats = cache.stats()
+    assert stats["bytes"] <= 3000 and stats["evictions"] >= 1
+
+
+def test_stub_proxy_replays_for_the_workstation_loop(cache, tmp_path):
+    payload = {
+        "model": "gpt-5.4",
+        "messages": [{"role": "system", "content": "sys"}, {"role": "user", "content": "task"}],
+    }
+    cache.put(payload, _completion("recorded answer"))
+    server = cache.make_stub_proxy(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+        result = asyncio.run(
+            agent_loop.run_agent_loop("task", "sys", [], proxy_url=url, output_dir=str(tmp_path), working_dir=str(tmp_path))
+        )
+        assert result["response"] == "recorded answer"
+        with pytest.raises(RuntimeError, match="404"):
+            asyncio.run(agent_loop._call_proxy(proxy_url=url, model="gpt-5.4", messages=[{"role": "user", "content": "?"}], tools=[]))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_standalone_copy_keeps_its_store_beside_itself(tmp_path, monkeypatch):
+    monkeypatch.delenv("CUSTODIAN_LLM_CACHE_DB", raising=False)
+    (tmp_path / "llm_cache.py").write_text(Path(llm_cache.__file__).read_text(encoding="utf-8"), encoding="utf-8")
+    completed = subprocess.run(
+        [sys.executable, "-c", "import llm_cache; print(llm_cache.LLM_CACHE_DB_PATH)"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.strip() == str(tmp_path / "llm_cache.db")
+    assert llm_cache.LLM_CACHE_DB_PATH != "/llm_cache.db"
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.db import connection, memory, memory_index
+from custodian.db.migrations import _migration_003_memory_index
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "custodian" / "schema.sql"
+
+MEMORIES = [
+    ("Restart uvicorn on the box bridge after every deployment or it keeps serving stale routes", ["infra", "bridge"]),
+    ("Keepa exports are throttled; wait between downloads", ["keepa"]),
+    ("Pipeline foreach steps write partial results to _results.json", ["pipeline"]),
+    ("OAuth tokens expire after one hour", ["oauth", "infra"]),
+]
+
+
+@pytest.fixture
+def memory_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "custodian.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    conn.execute("INSERT INTO projects (id, name, path) VALUES (1, 'demo', '/srv/demo')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "DB_PATH", str(db_path))
+    monkeypatch.setattr(memory, "ACCESS_FLUSH_SECONDS", 3600)
+    memory.flush_access_counts()
+    yield db_path
+    memory.flush_access_counts()
+
+
+def _store_all():
+    for content, tags in MEMORIES:
+        asyncio.run(memory.handle_memory_store({"content": content, "tags": tags}))
+
+
+def _search(**args) -> str:
+    return asyncio.run(memory.handle_memory_search(args))[0].text
+
+
+def test_paraphrased_query_found_by_vector_side_only(memory_db):
+    _store_all()
+    query = "restarting uvicorn when deploying the bridge server"
+    assert _search(query=query, mode="lexical") == "No memories found."
+    hybrid = _search(query=query).splitlines()
+    assert hybrid[2].startswith("  [1] ") and "Restart uvicorn" in hybrid[4]
+
+
+def test_tag_filter_uses_tag_table(memory_db):
+    _store_all()
+    result = _search(tags=["infra"])
+    assert "Restart uvicorn" in result and "OAuth tokens" in result and "Keepa" not in result
+    result = _search(tags=["infra", "bridge"])
+    assert "Restart uvicorn" in result and "OAuth tokens" not in result
+
+
+def test_update_and_delete_keep_index_in_sync(memory_db):
+    _store_all()
+    conn = sqlite3.connect(memory_db)
+    memory_id = conn.execute("SELECT id FROM memories WHERE content LIKE 'Keepa%'").fetchone()[0]
+    conn.close()
+
+    asyncio.run(memory.handle_memory_update({"id": memory_id, "content": "Brand scanner retries on 429", "tags": ["scanner"]}))
+    assert "Brand scanner" in _search(query="scanner retrying", mode="vector")
+    assert "Keepa" not in _search(query="keepa downloads", mode="vector")
+    assert "Brand scanner" in _search(tags=["scanner"])
+
+    asyncio.run(memory.handle_memory_delete({"id": memory_id}))
+    conn = sqlite3.connect(memory_db)
+    assert conn.execute("SELECT COUNT(*) FROM memory_vector_terms WHERE memory_id = ?", (memory_id,)).fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM memory_tags WHERE memory_id = ?", (memory_id,)).fetchone()[0] == 0
+    conn.close()
+
+
+def test_migration_backfills_existing_memories(memory_db):
+    conn = sqlite3.connect(memory_db)
+    conn.execute("INSERT INTO memories (content, tags) VALUES ('legacy note about sandbox images', '[\"infra\"]')")
+    conn.execute("DELETE FROM memory_tags")
+    conn.commit()
+    _migration_003_memory_index(conn)
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM memory_vector_docs").fetchone()[0] == 1
+    assert conn.execute("SELECT tag FROM memory_tags").fetchall() == [("infra",)]
+    ids = memory_index.hybrid_search(conn, "sandbox image", limit=5)
+    conn.close()
+    assert len(ids) == 1
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    fused = memory_index.reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]])
+    assert [memory_id for memory_id, _score in fused][:2] == [1, 3]
+
+
+def _context(**args) -> str:
+    return asyncio.run(memory.handle_memory_context(args))[0].text
+
+
+def test_memory_context_ranks_tiers_in_one_pass(memory_db):
+    conn = sqlite3.connect(memory_db)
+    conn.executemany(
+        "INSERT INTO memories (id, content, importance, access_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            (1, "plain note about sandbox", 3, 0, "2026-01-01"),
+            (2, "critical oauth rotation", 9, 0, "2026-01-01"),
+            (3, "recently used bridge tip", 4, 2, "2026-03-01"),
+            (4, "important but older", 7, 0, "2025-01-01"),
+            (5, "another sandbox detail", 2, 0, "2026-02-01"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    text = _context(topics=["sandbox"])
+    order = [int(line.split("]")[0].strip(" [")) for line in text.splitlines() if line.startswith("  [")]
+    assert order[:3] == [2, 4, 3]
+    assert sorted(order[3:]) == [1, 5]
+    assert _context(topics=['"unbalanced']).count("  [") == 3
+
+
+def test_access_counts_are_buffered_and_flushed_in_batch(memory_db):
+    _store_all()
+    conn = sqlite3.connect(memory_db)
+    conn.execute("UPDATE memories SET importance = 8")
+    conn.commit()
+
+    _context()
+    _context()
+    assert conn.execute("SELECT SUM(access_count) FROM memories").fetchone()[0] == 0
+    assert memory.pending_access_count(1) == 2
+
+    assert memory.flush_access_counts() == len(MEMORIES)
+    assert conn.execute("SELECT SUM(access_count) FROM memories").fetchone()[0] == 2 * len(MEMORIES)
+    assert memory.pending_access_count(1) == 0
+    conn.close()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import oauth_provider
+from custodian.db import connection
+from custodian.db.connection import db_connection
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_PATH", str(tmp_path / "custodian.db"))
+    oauth_provider.ensure_oauth_schema()
+    with db_connection() as conn:
+        conn.execute(
+            "INSERT INTO oauth_clients (id, name, redirect_uris, grant_types, response_types) VALUES (?, ?, ?, ?, ?)",
+            ("c1", "test", '["https://example.test/cb"]', '["refresh_token"]', '["code"]'),
+        )
+        conn.commit()
+    verifications = []
+    original = oauth_provider._verify_hash
+    monkeypatch.setattr(
+        oauth_provider, "_verify_hash", lambda value, stored: verifications.append(value) or original(value, stored)
+    )
+    yield oauth_provider.CustodianOAuthProvider("https://example.test/mcp"), verifications
+
+
+def _issue(provider):
+    with db_connection() as conn:
+        token = provider._issue_token_pair_sync(conn, client_id="c1", scopes=["custodian.full"], resource=None)
+        conn.commit()
+    return token
+
+
+def test_verified_token_is_served_from_cache(provider):
+    provider, verifications = provider
+    token = _issue(provider)
+
+    first = asyncio.run(provider.load_access_token(token.access_token))
+    for _ in range(5):
+        again = asyncio.run(provider.load_access_token(token.access_token))
+        assert again.token_id == first.token_id
+    assert len(verifications) == 1
+
+    assert asyncio.run(provider.load_access_token(token.access_token + "x")) is None
+    stats = provider.token_cache.stats()
+    assert stats["hits"] == 5 and stats["bcrypt_verifications"] == 2 and stats["entries"] == 1
+
+
+def test_revoke_and_refresh_evict_immediately(provider):
+    provider, _verifications = provider
+    token = _issue(provider)
+    access = asyncio.run(provider.load_access_token(token.access_token))
+    asyncio.run(provider.revoke_token(access))
+    assert asyncio.run(provider.load_access_token(token.access_token)) is None
+
+    token = _issue(provider)
+    asyncio.run(provider.load_access_token(token.access_token))
+    client = asyncio.run(provider.get_client("c1"))
+    refresh = asyncio.run(provider.load_refresh_token(client, token.refresh_token))
+    asyncio.run(provider.exchange_refresh_token(client, refresh, []))
+    assert asyncio.run(provider.load_access_token(token.access_token)) is None
+    assert provider.token_cache.stats()["revoked"] == 2
+
+
+def test_load_that_read_the_row_before_a_revoke_does_not_recache_it(provider, monkeypatch):
+    provider, _verifications = provider
+    token = _issue(provider)
+    original = oauth_provider._verify_hash
+
+    def revoked_mid_verification(value, stored):
+        # The row was read while still valid; the revoke commits and evicts before bcrypt finishes.
+        provider._revoke_token_sync(SimpleNamespace(family_id=family_id))
+        return original(value, stored)
+
+    with db_connection() as conn:
+        family_id = conn.execute("SELECT family_id FROM oauth_tokens WHERE token_type = 'access'").fetchone()[0]
+    monkeypatch.setattr(oauth_provider, "_verify_hash", revoked_mid_verification)
+    assert asyncio.run(provider.load_access_token(token.access_token)) is not None
+    assert provider.token_cache.stats()["stale_puts"] == 1
+    assert asyncio.run(provider.load_access_token(token.access_token)) is None
+
+
+def test_cache_lifetime_is_bounded_by_token_expiry(monkeypatch):
+    cache = oauth_provider.VerifiedTokenCache(ttl=60, max_entries=2)
+
+    def make(token_id, expires_at):
+        return oauth_provider.CustodianAccessToken(
+            token=f"tok-{token_id}", client_id="c1", scopes=[], expires_at=expires_at, token_id=token_id
+        )
+
+    cache.put(make("expired", int(time.time()) - 1))
+    assert cache.get("tok-expired") is None
+
+    cache.put(make("soon", int(time.time()) + 1))
+    assert cache.get("tok-soon") is not None
+    monkeypatch.setattr(oauth_provider.time, "monotonic", lambda: time.perf_counter() + 3600)
+    assert cache.get("tok-soon") is None
+    assert cache.stats()["expired"] == 1
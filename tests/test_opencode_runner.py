@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import os
+import stat
+import sys
+import textwrap
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import opencode_runner
+
+FAKE_OPENCODE = textwrap.dedent(
+    """
+    import json, os, sys, threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    with open(os.environ["FAKE_OPENCODE_LOG"], "a") as log:
+        log.write(" ".join(sys.argv[1:]) + "\\n")
+
+    if sys.argv[1] == "models":
+        print("openai/gpt-cli")
+        sys.exit(0)
+
+    subscribers = []
+    sessions = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path == "/config/providers":
+                self.reply({"providers": [{"id": "openai", "models": {"gpt-b": {}, "gpt-a": {}}}, {"id": "x", "models": {"y": {}}}]})
+            elif self.path == "/event":
+                done = threading.Event()
+                subscribers.append((self.wfile, done))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                self.wfile.flush()
+                done.wait()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+            if self.path == "/session":
+                sessions.append("ses_%d" % len(sessions))
+                self.reply({"id": sessions[-1]})
+                return
+            session_id = self.path.split("/")[2]
+            text = body["parts"][0]["text"]
+            if "explode" in text:
+                self.reply({"info": {"error": {"name": "ProviderError", "data": {"message": "boom"}}}, "parts": []})
+                return
+            events = [
+                {"type": "message.part.updated", "properties": {"part": {"sessionID": session_id, "type": "text"}, "delta": chunk}}
+                for chunk in ("echo:", text)
+            ]
+            events.append({"type": "session.idle", "properties": {"sessionID": session_id}})
+            for event in events:
+                for wfile, _ in subscribers:
+                    wfile.write(("data: " + json.dumps(event) + "\\n\\n").encode())
+                    wfile.flush()
+            self.reply({
+                "info": {"sessionID": session_id, "tokens": {"input": 5, "output": 2, "reasoning": 1}, "cost": 0.01, "model": body["model"]},
+                "parts": [{"type": "text", "text": "echo:"}, {"type": "text", "text": text}],
+            })
+
+        def reply(self, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    print("opencode server listening on http://127.0.0.1:%d" % server.server_address[1], flush=True)
+    server.serve_forever()
+    """
+)
+
+
+@pytest.fixture
+def fake_opencode(tmp_path, monkeypatch):
+    binary = tmp_path / "opencode"
+    binary.write_text(f"#!{sys.executable}\n{FAKE_OPENCODE}")
+    binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+    calls = tmp_path / "calls.log"
+    calls.write_text("")
+    monkeypatch.setenv("FAKE_OPENCODE_LOG", str(calls))
+    monkeypatch.setattr(opencode_runner, "OPENCODE_BIN", str(binary))
+    monkeypatch.setattr(opencode_runner, "OPENCODE_MODE", "server")
+    monkeypatch.setattr(opencode_runner, "_MODEL_CACHE", {"timestamp": 0.0, "models": []})
+    yield calls
+    opencode_runner.shutdown_opencode_servers()
+
+
+def test_server_mode_reuses_one_worker_per_project(fake_opencode, tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    results = [
+        opencode_runner.run_opencode(f"task {n}", "openai/gpt-5.4", system_prompt="sys", project_dir=str(project))
+        for n in range(3)
+    ]
+    assert results[0].text == "echo:## System\nsys\n\n## Task\ntask 0"
+    assert results[0].tokens_used == 8 and results[0].cost_usd == 0.01
+    assert len({result.session_id for result in results}) == 3
+    assert fake_opencode.read_text().splitlines() == ["serve --hostname 127.0.0.1 --port 0"]
+
+    with pytest.raises(opencode_runner.OpenCodeRunnerError, match="boom"):
+        opencode_runner.run_opencode("explode", "openai/gpt-5.4", project_dir=str(project))
+    assert opencode_runner.run_opencode("still up", "openai/gpt-5.4", project_dir=str(project)).text == "echo:still up"
+    assert len(fake_opencode.read_text().splitlines()) == 1
+
+
+def test_server_mode_streams_session_events(fake_opencode, tmp_path):
+    deltas: list[str] = []
+    seen = threading.Event()
+
+    def on_event(event):
+        if event["type"] == "session.idle":
+            seen.set()
+        else:
+            deltas.append(event["properties"]["delta"])
+
+    result = opencode_runner.run_opencode("hello", "openai/gpt-5.4", project_dir=str(tmp_path), on_event=on_event)
+    assert seen.is_set()
+    assert "".join(deltas) == result.text == "echo:hello"
+
+
+def test_pool_grows_to_its_limit_under_concurrent_prompts(fake_opencode, tmp_path, monkeypatch):
+    monkeypatch.setattr(opencode_runner, "OPENCODE_POOL_SIZE", 2)
+    errors: list[Exception] = []
+
+    def run(n):
+        try:
+            opencode_runner.run_opencode(f"p{n}", "openai/gpt-5.4", project_dir=str(tmp_path))
+        except Exception as exc:  # pragma: no cover - surfaced by the assert below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert 1 <= len(fake_opencode.read_text().splitlines()) <= 2
+
+
+def test_model_list_is_cached(fake_opencode, monkeypatch):
+    assert opencode_runner.list_available_models() == ["openai/gpt-a", "openai/gpt-b"]
+    opencode_runner.list_available_models()
+    assert len(fake_opencode.read_text().splitlines()) == 1
+
+    monkeypatch.setattr(opencode_runner, "OPENCODE_MODE", "cli")
+    monkeypatch.setattr(opencode_runner, "_MODEL_CACHE", {"timestamp": 0.0, "models": []})
+    assert opencode_runner.list_available_models() == ["openai/gpt-cli"]
+    assert fake_opencode.read_text().splitlines()[-1] == "models openai"
+
+
+def test_failed_worker_start_falls_back_to_the_cli(tmp_path, monkeypatch):
+    binary = tmp_path / "opencode"
+    binary.write_text(
+        f"#!{sys.executable}\n"
+        "import json, sys\n"
+        "if sys.argv[1] == 'serve':\n"
+        "    sys.exit(3)\n"
+        "prompt = sys.stdin.read()\n"
+        "print(json.dumps({'type': 'text', 'sessionID': 'ses_cli', 'part': {'text': 'cli:' + prompt}}))\n"
+    )
+    binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(opencode_runner, "OPENCODE_BIN", str(binary))
+    monkeypatch.setattr(opencode_runner, "OPENCODE_MODE", "server")
+    events = []
+    result = opencode_runner.run_opencode("hi", "openai/gpt-5.4", project_dir=str(tmp_path), on_event=events.append)
+    assert result.text == "cli:hi" and result.session_id == "ses_cli"
+    assert events[0]["type"] == "text"
+    assert opencode_runner._POOLS.get(os.path.abspath(tmp_path)) == []
+
+
+def test_cancelling_the_scope_kills_the_cli(tmp_path, monkeypatch):
+    from custodian.services import cancellation
+
+    binary = tmp_path / "opencode"
+    binary.write_text(
+        f"#!{sys.executable}\n"
+        "import json, sys, time\n"
+        "print(json.dumps({'type': 'step_start', 'sessionID': 'ses_slow'}), flush=True)\n"
+        "time.sleep(30)\n"
+    )
+    binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(opencode_runner, "OPENCODE_BIN", str(binary))
+    monkeypatch.setattr(opencode_runner, "OPENCODE_MODE", "cli")
+    started = threading.Event()
+    with cancellation.scope("agent", 41) as token:
+        canceller = threading.Thread(target=lambda: started.wait(5) and token.cancel("operator stop"))
+        canceller.start()
+        with pytest.raises(cancellation.Cancelled, match="operator stop"):
+            opencode_runner.run_opencode("hi", "openai/gpt-5.4", project_dir=str(tmp_path), on_event=lambda event: started.set())
+        canceller.join()
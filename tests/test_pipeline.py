@@ -4,6 +4,7 @@ import asyncio
 import json
 import sqlite3
 import sys
+import threading
 import time
 from pathlib import Path
 from urllib.error import URLError
@@ -14,6 +15,7 @@ import pytest
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from custodian.pipeline import PipelineRun, PipelineSpec, PipelineError, RefResolver
+from custodian.services import agent_events
 
 
 FIXTURE = Path(__file__).resolve().parents[1] / "custodian" / "pipelines" / "fba-brand-analysis.yaml"
@@ -34,7 +36,9 @@ def create_test_db(path: Path) -> str:
             started_at TEXT DEFAULT CURRENT_TIMESTAMP,
             finished_at TEXT,
             error TEXT,
-            stats TEXT
+            stats TEXT,
+            cancel_requested TEXT,
+            heartbeat_at TEXT
         );
         CREATE TABLE pipeline_step_results (
             id INTEGER PRIMARY KEY,
@@ -50,7 +54,8 @@ def create_test_db(path: Path) -> str:
             started_at TEXT,
             finished_at TEXT,
             duration_ms INTEGER,
-            error TEXT
+            error TEXT,
+            progress TEXT
         );
         CREATE TABLE agents (
             id INTEGER PRIMARY KEY,
@@ -60,6 +65,7 @@ def create_test_db(path: Path) -> str:
             model TEXT DEFAULT 'openai/gpt-5.4',
             project_id INTEGER,
             max_turns INTEGER DEFAULT 20,
+            llm_cache TEXT,
             tools TEXT,
             mcp_servers TEXT,
             status TEXT DEFAULT 'active',
@@ -104,7 +110,10 @@ def create_test_db(path: Path) -> str:
             output TEXT,
             tokens_used INTEGER,
             error TEXT,
-            triggered_by TEXT
+            triggered_by TEXT,
+            progress TEXT,
+            cancel_requested TEXT,
+            heartbeat_at TEXT
         );
         """
     )
@@ -471,7 +480,7 @@ steps:
     conn = sqlite3.connect(db_path)
     conn.execute("INSERT INTO projects (id, name, path, status) VALUES (1, 'fba-command-center', '/tmp/fba', 'active')")
     conn.execute(
-        "INSERT INTO agents (id, name, system_prompt, model, project_id, max_turns, tools, status) VALUES (1, 'test-echo', 'Echo input.', 'openai/gpt-5.4', 1, 5, '[]', 'active')"
+        "INSERT INTO agents (id, name, system_prompt, model, project_id, max_turns, tools, llm_cache, status) VALUES (1, 'test-echo', 'Echo input.', 'openai/gpt-5.4', 1, 5, '[]', 'on', 'active')"
     )
     conn.commit()
     conn.close()
@@ -485,13 +494,19 @@ steps:
         captured["db"] = db
         return {"system": system_prompt, "user": json.dumps(input_data)}
 
-    async def fake_run_agent_loop(*, model, compiled_prompt, max_turns, tools, bridge_url):
+    async def fake_run_agent_loop(*, model, compiled_prompt, max_turns, tools, bridge_url, tool_concurrency=None, cache_mode=None):
         from custodian.executor import AgentLoopResult
 
         captured["model"] = model
         captured["compiled_prompt"] = compiled_prompt
         captured["max_turns"] = max_turns
         captured["bridge_url"] = bridge_url
+        captured["cache_mode"] = cache_mode
+        agent_events.publish("turn_start", turn=1)
+        agent_events.publish("usage", tokens=42)
+        conn = sqlite3.connect(db_path)
+        captured["live_progress"] = conn.execute("SELECT progress FROM pipeline_step_results WHERE step_name = 'screen'").fetchone()[0]
+        conn.close()
         return AgentLoopResult(output={"verdict": "GO", "brand": "Corelle"}, tokens_used=42)
 
     monkeypatch.setattr("custodian.compiler.compile_prompt", fake_compile_prompt)
@@ -512,12 +527,15 @@ steps:
     payload = json.loads((tmp_path / "outputs" / spec.name / "run_test" / "screen.json").read_text(encoding="utf-8"))
     assert payload == {"verdict": "GO", "brand": "Corelle"}
     assert captured["input_data"] == {"brand": "Corelle"}
+    assert captured["cache_mode"] == "on"
+    assert json.loads(captured["live_progress"])["tokens"] == 42
     conn = sqlite3.connect(db_path)
-    row = conn.execute("SELECT output, tokens_used, status FROM agent_runs WHERE agent_id = 1").fetchone()
+    row = conn.execute("SELECT output, tokens_used, status, progress FROM agent_runs WHERE agent_id = 1").fetchone()
     conn.close()
     assert json.loads(row[0]) == {"verdict": "GO", "brand": "Corelle"}
     assert row[1] == 42
     assert row[2] == "completed"
+    assert json.loads(row[3])["finished"] is True
 
 
 def test_human_gate_pauses_run(tmp_path: Path) -> None:
@@ -683,7 +701,7 @@ steps:
     conn.commit()
     conn.close()
 
-    async def fake_run_agent_loop(*, model, compiled_prompt, max_turns, tools, bridge_url):
+    async def fake_run_agent_loop(*, model, compiled_prompt, max_turns, tools, bridge_url, tool_concurrency=None, cache_mode=None):
         from custodian.executor import AgentLoopResult
 
         brand = json.loads(compiled_prompt["user"])["brand"]
@@ -811,3 +829,65 @@ steps:
     result = asyncio.run(run.execute())
     assert result["status"] == "paused"
     assert result["waiting_for"] == "gate"
+
+
+def test_cancel_and_deadline_stop_a_blocked_tool_step(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from custodian import pipeline
+    from custodian.services import cancellation
+
+    spec_yaml = """
+name: slow
+steps:
+  - name: fetch
+    type: tool
+    project: p
+    tool: slow_tool
+    input: {}
+    output: data
+"""
+    db_path = create_test_db(tmp_path / "test.db")
+    started = threading.Event()
+    release = threading.Event()
+    seen_headers: list[float | None] = []
+
+    def blocking_bridge(bridge_url, project, tool_name, params):
+        seen_headers.append(cancellation.extract(cancellation.inject({})))
+        started.set()
+        release.wait(5)
+        return {"late": True}
+
+    monkeypatch.setattr(pipeline, "_call_bridge", blocking_bridge)
+
+    async def cancel_when_started() -> float:
+        run = PipelineRun(PipelineSpec.from_yaml(spec_yaml), {}, db_path, str(tmp_path / "outputs"), pipeline_id=1, run_id=1)
+        task = asyncio.create_task(run.execute())
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        began = time.monotonic()
+        assert cancellation.cancel("pipeline", 1, "operator stop")
+        with pytest.raises(cancellation.Cancelled, match="operator stop"):
+            await task
+        # The abandoned bridge call is only waited for again by asyncio.run's executor shutdown.
+        release.set()
+        return time.monotonic() - began
+
+    assert asyncio.run(cancel_when_started()) < 1
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT status, error FROM pipeline_runs WHERE id = 1").fetchone() == ("cancelled", "operator stop")
+    assert conn.execute("SELECT status FROM pipeline_step_results WHERE run_id = 1").fetchone() == ("cancelled",)
+    assert not cancellation.cancel("pipeline", 1)
+
+    release.clear()
+
+    async def run_past_deadline() -> None:
+        timed = PipelineSpec.from_yaml("timeout_seconds: 0.3\n" + spec_yaml)
+        run = PipelineRun(timed, {}, db_path, str(tmp_path / "outputs"), pipeline_id=1, run_id=1)
+        try:
+            with pytest.raises(cancellation.Cancelled, match="deadline exceeded"):
+                await run.execute()
+        finally:
+            release.set()
+
+    asyncio.run(run_past_deadline())
+    assert seen_headers[0] is None and 0 < seen_headers[1] <= 0.3
+    assert conn.execute("SELECT status FROM pipeline_runs WHERE id = 1").fetchone() == ("cancelled",)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.db import connection, tasks
+from custodian.db.connection import db_connection
+from custodian.services import project_resolver
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "custodian" / "schema.sql"
+
+
+@pytest.fixture
+def projects_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "custodian.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    conn.executemany(
+        "INSERT INTO projects (id, name, path, status) VALUES (?, ?, ?, ?)",
+        [
+            (1, "Finance95-Web", "/mnt/c/Users/dev/finance95", "active"),
+            (2, "keepa-tools", "/srv/keepa_tools", "active"),
+            (3, "keepa", "/srv/keepa", "active"),
+            (4, "old-app", "/srv/old-app", "archived"),
+        ],
+    )
+    conn.execute("INSERT INTO project_aliases (alias, project_id) VALUES ('f95', 1)")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "DB_PATH", str(db_path))
+    project_resolver.invalidate()
+    yield db_path
+    project_resolver.invalidate()
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("Finance95-Web", "Finance95-Web"),
+        ("finance95-web", "Finance95-Web"),
+        ("finance95 web", "Finance95-Web"),
+        ("F95", "Finance95-Web"),
+        ("finance95", "Finance95-Web"),
+        ("keepa_tools", "keepa-tools"),
+        ("keep", "keepa"),
+        ("tools", "keepa-tools"),
+    ],
+)
+def test_resolves_names_aliases_slugs_and_partials(projects_db, query, expected):
+    with db_connection() as conn:
+        assert project_resolver.get_project_by_name(conn, query)["name"] == expected
+
+
+def test_inactive_and_unknown_projects_do_not_resolve(projects_db):
+    with db_connection() as conn:
+        assert project_resolver.get_project_by_name(conn, "old-app") is None
+        assert project_resolver.get_project_by_name(conn, "kepa") is None
+        assert project_resolver.suggest(conn, "kepa") == ["keepa"]
+        assert project_resolver.suggest(conn, "finanse95-web") == ["Finance95-Web"]
+        assert "Did you mean: keepa?" in project_resolver.not_found_message(conn, "kepa")
+
+
+def test_lookups_skip_sql_until_projects_are_written(projects_db, monkeypatch):
+    loads = []
+    original = project_resolver._load
+    monkeypatch.setattr(project_resolver, "_load", lambda conn: loads.append(1) or original(conn))
+    with db_connection() as conn:
+        for _ in range(5):
+            assert project_resolver.get_project_by_name(conn, "keepa")["id"] == 3
+    assert len(loads) == 1
+
+    with db_connection() as conn:
+        conn.execute("INSERT INTO project_aliases (alias, project_id) VALUES ('kt', 2)")
+        assert project_resolver.get_project_by_name(conn, "kt")["name"] == "keepa-tools"
+        conn.commit()
+    with db_connection() as conn:
+        assert project_resolver.get_project_by_name(conn, "kt")["name"] == "keepa-tools"
+        assert project_resolver.get_project_by_name(conn, "kt")["name"] == "keepa-tools"
+    assert len(loads) == 3
+
+
+def test_db_modules_share_the_resolver(projects_db):
+    assert tasks.get_project_by_name is project_resolver.get_project_by_name
+    result = asyncio.run(tasks.handle_submit_task({"project": "kepa", "title": "t", "body": "b"}))
+    assert "Did you mean: keepa?" in result[0].text
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import session_registry
+from custodian.db import connection, retention
+from custodian.db.migrations import _migration_007_id_sequences, _migration_008_retention
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "custodian" / "schema.sql"
+
+
+@pytest.fixture
+def retention_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "custodian.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    _migration_007_id_sequences(conn)
+    _migration_008_retention(conn)
+    conn.executescript(
+        """
+        INSERT INTO query_log (tool_name, project_name, timestamp) VALUES
+            ('lookup_symbol', 'demo', datetime('now', '-40 days')),
+            ('lookup_symbol', 'demo', datetime('now', '-40 days')),
+            ('list_tasks', NULL, datetime('now', '-35 days')),
+            ('list_tasks', NULL, datetime('now'));
+        INSERT INTO pipelines (id, name, spec) VALUES (1, 'p', 'name: p');
+        INSERT INTO pipeline_runs (id, pipeline_id, run_name, input, output_dir, status, finished_at) VALUES
+            (1, 1, 'old', '{}', '/tmp/o', 'completed', datetime('now', '-20 days')),
+            (2, 1, 'live', '{}', '/tmp/o', 'running', NULL),
+            (3, 1, 'ancient', '{}', '/tmp/o', 'failed', datetime('now', '-400 days'));
+        INSERT INTO pipeline_step_results (run_id, step_name, step_type, status, input, output) VALUES
+            (1, 'fetch', 'tool', 'completed', '{"url": "x"}', '{"rows": [1, 2, 3]}'),
+            (2, 'fetch', 'tool', 'running', '{"url": "y"}', NULL),
+            (3, 'fetch', 'tool', 'failed', '{"url": "z"}', NULL);
+        """
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "DB_PATH", str(db_path))
+    monkeypatch.setattr(session_registry, "REGISTRY_PATH", str(tmp_path / "session_registry.db"))
+    return db_path
+
+
+def test_dry_run_reports_without_changing_anything(retention_db):
+    report = retention.run(dry_run=True)
+    tables = report["tables"]
+    assert tables["query_log"]["rows"] == 3
+    assert tables["pipeline_step_results"]["runs"] == 2 and tables["pipeline_step_results"]["bytes"] > 0
+    assert tables["pipeline_runs"]["rows"] == 1
+    assert tables["sessions"]["rows"] == 0
+    assert tables["spans"]["rows"] == 0
+    assert report["compaction"]["auto_vacuum"] == "none"
+
+    conn = sqlite3.connect(retention_db)
+    assert conn.execute("SELECT COUNT(*) FROM query_log").fetchone()[0] == 4
+    assert conn.execute("SELECT COUNT(*) FROM pipeline_runs").fetchone()[0] == 3
+    conn.close()
+
+
+def test_run_rolls_up_archives_deletes_and_compacts(retention_db):
+    report = retention.run(tables=["query_log", "pipeline_step_results", "pipeline_runs"])
+    # The full VACUUM that switches auto_vacuum mode is opt-in.
+    assert report["compaction"]["action"] == "none"
+    assert retention.run(tables=["query_log"], convert_auto_vacuum=True)["compaction"]["action"] == "vacuum"
+
+    conn = sqlite3.connect(retention_db)
+    conn.row_factory = sqlite3.Row
+    daily = {(row["tool_name"], row["project_name"]): row["calls"] for row in conn.execute("SELECT * FROM query_log_daily")}
+    assert daily == {("lookup_symbol", "demo"): 2, ("list_tasks", ""): 1}
+    assert conn.execute("SELECT COUNT(*) FROM query_log").fetchone()[0] == 1
+    assert [row["id"] for row in conn.execute("SELECT id FROM pipeline_runs ORDER BY id")] == [1, 2]
+    archive = conn.execute("SELECT payloads_archive FROM pipeline_runs WHERE id = 1").fetchone()[0]
+    assert Path(archive).exists()
+    assert conn.execute("SELECT output FROM pipeline_step_results WHERE run_id = 1").fetchone()[0] is None
+    assert conn.execute("SELECT input FROM pipeline_step_results WHERE run_id = 2").fetchone()[0] == '{"url": "y"}'
+    conn.close()
+
+    with connection.db_connection() as conn:
+        assert retention.restore_run_payloads(conn, 1) == 1
+        assert conn.execute("SELECT output FROM pipeline_step_results WHERE run_id = 1").fetchone()[0] == '{"rows": [1, 2, 3]}'
+    assert not Path(archive).exists()
+
+    again = retention.run(tables=["query_log"], policies={"query_log": {"max_age_days": None, "max_rows": 0}})
+    assert again["tables"]["query_log"]["rows"] == 1
+    assert again["compaction"]["action"] == "incremental_vacuum"
+    assert again["compaction"]["after"]["auto_vacuum"] == "incremental"
+
+
+def test_invalid_policy_overrides_are_rejected(retention_db):
+    with pytest.raises(ValueError, match="Unknown retention table"):
+        retention.run(dry_run=True, policies={"memories": {"max_rows": 1}})
+    with pytest.raises(ValueError, match="non-negative"):
+        retention.run(dry_run=True, policies={"query_log": {"max_age_days": -1}})
+
+
+def test_runs_skip_while_another_process_holds_the_lease(retention_db):
+    conn = sqlite3.connect(retention_db)
+    conn.execute(
+        "INSERT INTO config (key, value) VALUES (?, ?)",
+        (retention.LOCK_KEY, json.dumps({"owner": "other-host:1", "expires": time.time() + 60})),
+    )
+    conn.commit()
+    report = retention.run(tables=["query_log"])
+    assert report["skipped"] and report["tables"] == {}
+    assert conn.execute("SELECT COUNT(*) FROM query_log").fetchone()[0] == 4
+    assert retention.run(dry_run=True, tables=["query_log"])["tables"]["query_log"]["rows"] == 3
+
+    conn.execute("UPDATE config SET value = ? WHERE key = ?", (json.dumps({"owner": "other-host:1", "expires": time.time() - 1}), retention.LOCK_KEY))
+    conn.commit()
+    assert retention.run(tables=["query_log"])["tables"]["query_log"]["rows"] == 3
+    assert conn.execute("SELECT COUNT(*) FROM config WHERE key = ?", (retention.LOCK_KEY,)).fetchone()[0] == 0
+    conn.close()
+
+
+def test_archive_skips_a_run_another_writer_archived_after_selection(retention_db, monkeypatch):
+    original = retention._batched
+
+    def racing(conn, table, where, params, process, batch=retention.BATCH_ROWS):
+        def archived_elsewhere_first(ids, marks):
+            other = sqlite3.connect(retention_db)
+            other.execute("UPDATE pipeline_step_results SET output = NULL WHERE run_id = 1")
+            other.execute("UPDATE pipeline_runs SET payloads_archive = 'elsewhere' WHERE id = 1")
+            other.commit()
+            other.close()
+            process(ids, marks)
+
+        return original(conn, table, where, params, archived_elsewhere_first, batch)
+
+    monkeypatch.setattr(retention, "_batched", racing)
+    report = retention.run(tables=["pipeline_step_results"])
+    assert report["tables"]["pipeline_step_results"]["rows"] == 1
+    assert not (retention.archive_dir() / "run-1.jsonl.gz").exists()
+    assert (retention.archive_dir() / "run-3.jsonl.gz").exists()
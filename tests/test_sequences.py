@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.db import connection, sequences
+from custodian.db.migrations import _migration_007_id_sequences
+from custodian.db.transports import handle_submit_transport
+
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "custodian" / "schema.sql"
+
+
+@pytest.fixture
+def seq_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "sequences.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    conn.executescript(
+        """
+        INSERT INTO tasks (ct_id, title, body, created_by) VALUES ('CT-007', 't', 'b', 'test'), ('CT-012', 't', 'b', 'test'), ('NW-003', 't', 'b', 'test');
+        INSERT INTO todo_items (todo_id, title) VALUES ('TD-041', 'todo');
+        INSERT INTO session_transports (cs_id, title, body) VALUES ('CS-002', 'hand-off', 'body');
+        """
+    )
+    _migration_007_id_sequences(conn)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "DB_PATH", str(db_path))
+    return db_path
+
+
+def test_migration_seeds_from_existing_ids_and_allocates_blocks(seq_db):
+    conn = sqlite3.connect(seq_db)
+    assert dict(conn.execute("SELECT name, value FROM sequences").fetchall()) == {
+        "tasks:CT": 12,
+        "tasks:NW": 3,
+        "todo_items:TD": 41,
+        "session_transports:CS": 2,
+        "friction_points:FP": 0,
+        "changelog_entries:CL": 0,
+        "memory_flags:MF": 0,
+    }
+    assert sequences.next_id(conn, "tasks", "CT") == "CT-013"
+    assert sequences.reserve_ids(conn, "todo_items", "TD", 3) == ["TD-042", "TD-043", "TD-044"]
+    # An unseen prefix seeds itself on first use.
+    assert sequences.next_id(conn, "tasks", "ZZ") == "ZZ-001"
+    conn.rollback()
+    assert sequences.next_id(conn, "tasks", "CT") == "CT-013"
+
+    _migration_007_id_sequences(conn)
+    assert conn.execute("SELECT value FROM sequences WHERE name = 'tasks:CT'").fetchone()[0] == 13
+    conn.close()
+
+
+def test_parallel_writers_never_collide(seq_db):
+    allocated: list[str] = []
+    lock = threading.Lock()
+
+    def writer() -> None:
+        conn = connection.get_db()
+        try:
+            for _ in range(20):
+                conn.execute("BEGIN IMMEDIATE")
+                todo_id = sequences.next_id(conn, "todo_items", "TD")
+                conn.execute("INSERT INTO todo_items (todo_id, title) VALUES (?, 'x')", (todo_id,))
+                conn.commit()
+                with lock:
+                    allocated.append(todo_id)
+        finally:
+            conn.close()
+
+    workers = [threading.Thread(target=writer) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(allocated) == [f"TD-{number:03d}" for number in range(42, 122)]
+
+
+def test_insert_resyncs_after_a_row_written_outside_the_allocator(seq_db):
+    conn = sqlite3.connect(seq_db)
+    conn.execute("INSERT INTO session_transports (cs_id, title, body) VALUES ('CS-003', 'manual', 'body')")
+    conn.commit()
+    conn.close()
+
+    result = asyncio.run(handle_submit_transport({"title": "next", "body": "b"}))
+    assert json.loads(result[0].text)["cs_id"] == "CS-004"
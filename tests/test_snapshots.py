@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.db import connection, snapshots
+
+
+@pytest.fixture
+def live_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "custodian.db"
+    monkeypatch.setattr(connection, "DB_PATH", str(db_path))
+    monkeypatch.setattr(snapshots, "PAGES_PER_STEP", 2)
+    with connection.db_connection() as conn:
+        conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)")
+        conn.executemany("INSERT INTO notes (body) VALUES (?)", [("x" * 500,) for _ in range(200)])
+        conn.commit()
+    return db_path
+
+
+def test_snapshot_is_consistent_while_writers_run(live_db):
+    stop = threading.Event()
+
+    def writer() -> None:
+        with connection.db_connection() as conn:
+            while not stop.is_set():
+                conn.execute("INSERT INTO notes (body) VALUES ('during')")
+                conn.commit()
+
+    worker = threading.Thread(target=writer)
+    worker.start()
+    try:
+        manifest = snapshots.create_snapshot()
+    finally:
+        stop.set()
+        worker.join()
+
+    path = snapshots.snapshot_dir() / manifest["name"]
+    assert snapshots.verify_snapshot(path) == {"name": manifest["name"], "ok": True, "checksum_ok": True, "integrity": "ok"}
+    assert not Path(f"{path}-wal").exists()
+    copy = sqlite3.connect(path)
+    assert copy.execute("SELECT COUNT(*) FROM notes WHERE body != 'during'").fetchone()[0] == 200
+    copy.close()
+
+
+def test_save_point_restores_under_open_connections(live_db):
+    saved = connection.save_point("CT-007")
+    assert Path(saved).exists()
+    reader = connection.get_db()
+    with connection.db_connection() as conn:
+        conn.execute("DELETE FROM notes")
+        conn.commit()
+    assert reader.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 0
+
+    assert connection.restore_save_point("CT-007") is True
+    assert reader.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 200
+    reader.close()
+    assert connection.restore_save_point("CT-999") is False
+    assert [item["label"] for item in snapshots.list_snapshots()] == ["pre-restore", "pre-CT-007"]
+
+
+def test_corrupt_snapshots_are_refused_and_rotation_keeps_labelled(live_db, monkeypatch):
+    manifest = snapshots.create_snapshot()
+    path = snapshots.snapshot_dir() / manifest["name"]
+    with open(path, "r+b") as handle:
+        handle.seek(4096)
+        handle.write(b"\x00" * 64)
+    assert snapshots.verify_snapshot(path)["checksum_ok"] is False
+    with pytest.raises(snapshots.SnapshotError, match="failed verification"):
+        snapshots.restore_snapshot(path)
+
+    monkeypatch.setattr(snapshots, "KEEP", 2)
+    snapshots.create_snapshot("keep-me")
+    for _ in range(3):
+        snapshots.create_snapshot(compact=True)
+    labels = [item["label"] for item in snapshots.list_snapshots()]
+    assert labels.count(None) == 2 and "keep-me" in labels
+
+
+def test_restore_notifies_write_listeners_and_caps_pre_restore_copies(live_db, monkeypatch):
+    seen: list[set[str]] = []
+    monkeypatch.setattr(connection, "_WRITE_LISTENERS", [seen.append])
+    monkeypatch.setattr(snapshots, "KEEP_PRE_RESTORE", 2)
+    path = snapshots.snapshot_dir() / snapshots.create_snapshot("baseline")["name"]
+    for _ in range(3):
+        snapshots.restore_snapshot(path)
+
+    assert seen == [{"notes"}] * 3
+    labels = [item["label"] for item in snapshots.list_snapshots()]
+    assert labels.count("pre-restore") == 2 and "baseline" in labels
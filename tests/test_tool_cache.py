@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.db import connection
+from custodian.services import tool_cache
+
+
+@pytest.fixture
+def cache_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "DB_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(tool_cache, "CACHE_ENABLED", True)
+    tool_cache.clear()
+    with connection.db_connection() as conn:
+        conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+    yield
+    tool_cache.clear()
+
+
+def _list_projects_tool(calls):
+    from mcp.types import TextContent
+
+    metadata = {"name": "fake_list_projects", "cacheable": True, "cache_tables": ["projects"]}
+
+    async def handler(params, db):
+        calls.append(params)
+        with connection.db_connection() as conn:
+            names = [row["name"] for row in conn.execute("SELECT name FROM projects ORDER BY id")]
+        return [TextContent(type="text", text=",".join(names))]
+
+    return metadata, handler
+
+
+async def _call(metadata, handler, arguments):
+    plan = tool_cache.plan(metadata, arguments)
+    cached = tool_cache.get(plan)
+    if cached is not None:
+        return cached
+    result = await handler(arguments, None)
+    tool_cache.put(plan, result)
+    return result
+
+
+def test_hits_until_a_write_to_a_declared_table(cache_db) -> None:
+    calls: list[dict] = []
+    metadata, handler = _list_projects_tool(calls)
+
+    assert asyncio.run(_call(metadata, handler, {}))[0].text == ""
+    assert asyncio.run(_call(metadata, handler, {}))[0].text == ""
+    assert len(calls) == 1
+
+    with connection.db_connection() as conn:
+        conn.execute("INSERT INTO projects (name) VALUES ('alpha')")
+        conn.commit()
+
+    assert asyncio.run(_call(metadata, handler, {}))[0].text == "alpha"
+    assert len(calls) == 2
+    stats = tool_cache.stats()
+    assert stats["tools"]["fake_list_projects"] == {"hits": 1, "misses": 2}
+    assert stats["invalidations"] == 1
+
+
+def test_store_is_skipped_when_invalidated_mid_call_and_lru_is_bounded(cache_db, monkeypatch) -> None:
+    metadata = {"name": "fake", "cacheable": True, "cache_tables": ["projects"]}
+    plan = tool_cache.plan(metadata, {"project": "Alpha"})
+    tool_cache.invalidate(tables=["projects"])
+    assert tool_cache.put(plan, []) is False
+
+    monkeypatch.setattr(tool_cache, "CACHE_MAX_ENTRIES", 2)
+    for index in range(3):
+        assert tool_cache.put(tool_cache.plan(metadata, {"i": index}), [])
+    assert tool_cache.get(tool_cache.plan(metadata, {"i": 0})) is None
+    assert tool_cache.get(tool_cache.plan(metadata, {"i": 2})) == []
+    assert tool_cache.stats()["evictions"] == 1
+
+
+def test_writes_from_another_process_and_not_found_answers_are_never_served(cache_db) -> None:
+    from mcp.types import TextContent
+
+    calls: list[dict] = []
+    metadata, handler = _list_projects_tool(calls)
+    asyncio.run(_call(metadata, handler, {}))
+
+    # A plain sqlite3 connection stands in for store_fossil.py: no write listener fires.
+    other = sqlite3.connect(connection.DB_PATH)
+    other.execute("INSERT INTO projects (name) VALUES ('beta')")
+    other.commit()
+    other.close()
+
+    assert asyncio.run(_call(metadata, handler, {}))[0].text == "beta"
+    assert asyncio.run(_call(metadata, handler, {}))[0].text == "beta"
+    assert len(calls) == 2
+    assert tool_cache.stats()["external_writes"] == 1
+
+    plan = tool_cache.plan({"name": "fake_fossil", "cacheable": True}, {"project": "beta"})
+    assert tool_cache.put(plan, [TextContent(type="text", text="No fossil found for 'beta'. Run trigger_custodian to create one.")]) is False
+    assert tool_cache.put(plan, [TextContent(type="text", text="Project 'gamma' not found. Use list_projects to see available projects.")]) is False
+    assert tool_cache.get(plan) is None
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian import executor
+from custodian.services.tool_fanout import run_tool_calls
+
+
+def _recorder(delays: dict[str, float]):
+    events: list[tuple[str, str]] = []
+    in_flight = {"now": 0, "max": 0}
+
+    async def run(call: str) -> str:
+        events.append(("start", call))
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(delays.get(call, 0.01))
+        in_flight["now"] -= 1
+        events.append(("end", call))
+        return f"result-{call}"
+
+    return run, events, in_flight
+
+
+def test_results_keep_call_order_and_respect_the_limit():
+    run, events, in_flight = _recorder({"a": 0.05, "b": 0.01, "c": 0.03, "d": 0.01, "e": 0.02})
+    results = asyncio.run(run_tool_calls(list("abcde"), run, serial=lambda call: False, concurrency=3))
+    assert results == [f"result-{name}" for name in "abcde"]
+    assert in_flight["max"] == 3
+    assert events.index(("end", "b")) < events.index(("end", "a"))
+
+
+def test_serial_tools_act_as_barriers():
+    run, events, in_flight = _recorder({})
+    calls = ["read1", "read2", "write", "read3", "read4"]
+    results = asyncio.run(run_tool_calls(calls, run, serial=lambda call: call == "write", concurrency=8))
+    assert results == [f"result-{name}" for name in calls]
+    write_start = events.index(("start", "write"))
+    assert events.index(("end", "read1")) < write_start and events.index(("end", "read2")) < write_start
+    assert events.index(("end", "write")) < events.index(("start", "read3"))
+    assert in_flight["max"] == 2
+
+
+def test_executor_fans_out_one_turn(monkeypatch):
+    responses = iter(
+        [
+            json.dumps({"tool_calls": [{"name": "lookup", "params": {"q": q}} for q in ("a", "b", "c", "d", "e")]}),
+            json.dumps({"final_answer": {"done": True}}),
+        ]
+    )
+    transcripts = []
+
+    async def fake_call_llm(model, messages, cache_mode=None):
+        transcripts.append([message["content"] for message in messages])
+        return next(responses), {}
+
+    async def fake_execute_tool(tool_map, name, params, bridge_url):
+        await asyncio.sleep(0.2 if params["q"] == "a" else 0.05)
+        return {"q": params["q"]}
+
+    monkeypatch.setattr(executor, "_call_llm", fake_call_llm)
+    monkeypatch.setattr(executor, "_execute_tool", fake_execute_tool)
+    started = time.perf_counter()
+    result = asyncio.run(
+        executor.run_agent_loop(
+            model="openai/gpt-5.4",
+            compiled_prompt={"system": "sys", "user": "go"},
+            max_turns=3,
+            tools=[{"name": "lookup"}],
+            tool_concurrency=5,
+        )
+    )
+    elapsed = time.perf_counter() - started
+    assert result.output == {"done": True}
+    assert elapsed < 0.4
+    tool_messages = transcripts[1][3:]
+    assert tool_messages == [f'[Tool Result: lookup]\n{{"q": "{q}"}}' for q in "abcde"]
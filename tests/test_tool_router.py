@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.db import connection
+from custodian.db.migrations import _migration_001_native_extensions
+from custodian.services import tool_router
+
+
+@pytest.fixture
+def router_db(tmp_path, monkeypatch):
+    db_path = tmp_path / "router.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE tool_registry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tool_name TEXT NOT NULL,
+            project TEXT NOT NULL,
+            description TEXT,
+            source_module TEXT NOT NULL DEFAULT 'm',
+            hook_point TEXT NOT NULL DEFAULT 'h',
+            return_type TEXT NOT NULL DEFAULT 'dict',
+            wrapper_path TEXT NOT NULL DEFAULT 'w.py',
+            status TEXT DEFAULT 'active',
+            updated_at TEXT DEFAULT (datetime('now')),
+            UNIQUE(tool_name, project)
+        );
+        INSERT INTO tool_registry (tool_name, project, description) VALUES ('scrape', 'demo', 'Scrape a page');
+        """
+    )
+    _migration_001_native_extensions(conn)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(connection, "DB_PATH", str(db_path))
+    monkeypatch.setattr(tool_router, "_mcp_tool_registry", {"list_projects": {"metadata": {"description": "List"}, "handler": None}})
+    tool_router.invalidate_tool_index()
+    yield db_path
+    tool_router.invalidate_tool_index()
+
+
+def test_batch_resolution_uses_one_index_load(router_db, monkeypatch) -> None:
+    loads = []
+    original = tool_router._load_tool_index
+    monkeypatch.setattr(tool_router, "_load_tool_index", lambda: loads.append(1) or original())
+
+    result = tool_router.resolve_agent_tools(["list_projects", "scrape", "missing"], "demo")
+
+    assert [item["source"] for item in result["resolved"]] == ["mcp", "box"]
+    assert result["missing"] == ["missing"]
+    assert tool_router.resolve_tool("scrape", "other") is None
+    assert len(loads) == 1
+
+
+def test_index_refreshes_after_registry_writes(router_db) -> None:
+    assert tool_router.resolve_tool("vision", None) is None
+
+    with connection.db_connection() as conn:
+        conn.execute(
+            "INSERT INTO native_extensions (name, host, port) VALUES ('vision', '127.0.0.1', 9300)"
+        )
+        conn.execute("INSERT INTO tool_registry (tool_name, project) VALUES ('crawl', 'demo')")
+        conn.commit()
+
+    assert tool_router.resolve_tool("vision", None)["source"] == "native_extension"
+    names = {tool["name"] for tool in tool_router.list_all_tools("demo")}
+    assert {"list_projects", "scrape", "crawl", "vision"} <= names
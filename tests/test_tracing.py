@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custodian.services import tracing
+
+
+def test_traceparent_round_trip():
+    with tracing.span("outer") as outer:
+        headers = tracing.inject({"Content-Type": "application/json"})
+    parsed = tracing.extract(headers)
+    assert parsed == outer.context
+    assert tracing.parse_traceparent("garbage") is None
+    assert tracing.inject({}) == {}
+
+
+def test_nested_spans_and_remote_span_form_one_tree():
+    with tracing.span("pipeline.run", run_kind="pipeline", run_id=7) as root:
+        with tracing.span("bridge.call", project="demo"):
+            now = time.time()
+            tracing.record_remote_span(json.dumps({
+                "span_id": "ab" * 8,
+                "name": "box_tool.echo",
+                "service": "box_tool_server",
+                "start": now - 0.01,
+                "end": now,
+                "status": "ok",
+            }))
+        with pytest.raises(RuntimeError):
+            with tracing.span("step.fail"):
+                raise RuntimeError("boom")
+
+    result = tracing.get_trace(pipeline_run_id=7)
+    [trace] = result["traces"]
+    assert trace["trace_id"] == root.context.trace_id
+    by_name = {item["name"]: item for item in trace["spans"]}
+    assert set(by_name) == {"pipeline.run", "bridge.call", "box_tool.echo", "step.fail"}
+    assert by_name["box_tool.echo"]["parent_id"] == by_name["bridge.call"]["span_id"]
+    assert by_name["step.fail"]["status"] == "error"
+    assert "box_tool.echo [box_tool_server]" in trace["waterfall"]
+    assert {row["name"] for row in trace["self_time"]} >= {"pipeline.run", "box_tool.echo"}
+
+
+def test_get_trace_by_agent_run_returns_subtree():
+    with tracing.span("pipeline.run", run_kind="pipeline", run_id=1):
+        with tracing.span("agent.run", run_kind="agent", run_id=3):
+            with tracing.span("llm.call"):
+                pass
+        with tracing.span("step.other"):
+            pass
+
+    [trace] = tracing.get_trace(agent_run_id=3)["traces"]
+    assert [item["name"] for item in trace["spans"]] == ["agent.run", "llm.call"]
+    assert "error" in tracing.get_trace(agent_run_id=99)
+
+
+def test_spans_are_buffered_and_written_in_one_flush(monkeypatch):
+    monkeypatch.setattr(tracing, "SPAN_FLUSH_SECONDS", 60)
+    with tracing.span("pipeline.run", run_kind="pipeline", run_id=5):
+        for n in range(3):
+            with tracing.span("step", n=n):
+                pass
+    with tracing._STORE_LOCK:
+        assert tracing._store().execute("SELECT COUNT(*) FROM spans").fetchone()[0] == 0
+
+    assert tracing.flush_spans() == 4
+    assert tracing.flush_spans() == 0
+    [trace] = tracing.get_trace(pipeline_run_id=5)["traces"]
+    assert trace["span_count"] == 4
+
+
+def test_prune_spans_applies_age_and_row_limits():
+    now = time.time()
+    for n, age_days in enumerate([10, 3, 2, 1, 0]):
+        start = now - age_days * 86400
+        tracing.record_span(
+            trace_id="t" * 32, span_id=f"{n:016x}", parent_id=None, name=f"s{n}", service="custodian", start_ts=start, end_ts=start + 1
+        )
+
+    assert tracing.prune_spans(max_age_days=7, dry_run=True) == 1
+    assert tracing.prune_spans(max_age_days=7, max_rows=2) == 3
+    names = [item["name"] for item in tracing.get_trace(trace_id="t" * 32)["traces"][0]["spans"]]
+    assert names == ["s3", "s4"]